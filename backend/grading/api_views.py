@@ -13,6 +13,7 @@ from .services.class_service import ClassService
 from .services.course_service import CourseService
 from .services.semester_manager import SemesterManager
 from .services.semester_status import semester_status_service
+from .services.storage_usage import StorageUsageService
 
 
 @ensure_csrf_cookie
@@ -510,6 +511,28 @@ def tenant_users_api(request):
     )
 
 
+@login_required
+@require_GET
+def tenant_storage_usage_api(request):
+    profile = UserProfile.objects.select_related("tenant").filter(user=request.user).first()
+    if request.user.is_staff and request.GET.get("tenant_id"):
+        tenant = Tenant.objects.filter(id=request.GET["tenant_id"]).first()
+        if not tenant:
+            return JsonResponse({"status": "error", "message": "租户不存在"}, status=404)
+    elif profile and profile.is_tenant_admin:
+        tenant = profile.tenant
+    else:
+        return JsonResponse({"status": "error", "message": "无权限访问"}, status=403)
+
+    return JsonResponse(
+        {
+            "status": "success",
+            "tenant": {"id": tenant.id, "name": tenant.name},
+            "repositories": StorageUsageService().tenant_report(tenant),
+        }
+    )
+
+
 @login_required
 @require_GET
 def student_assignment_list_api(request):
@@ -36,6 +36,8 @@ import subprocess
 from grading.services.storage_adapter import RemoteAccessError
 from grading.services.repository_service import RepositoryService
 from grading.services.git_storage_adapter import GitStorageAdapter
+from grading.services.filesystem_storage_adapter import FileSystemStorageAdapter
+from grading.services.file_serving import serve_bytes, serve_path
 from urllib.parse import urlparse
 
 from django.contrib import messages
@@ -757,12 +759,18 @@ def get_assignment_structure_api(request):
 def get_assignment_file_api(request):
     """获取作业文件内容 API
 
+    参数：
+    - assignment_id: 作业配置ID
+    - file_path: 文件路径
+    - download: 为 1 时直接返回文件（流式传输，支持 Range 和条件请求），否则返回 JSON
+
     实现需求:
     - Requirements 3.4: 直接从远程仓库获取作业文件内容
     """
     try:
         assignment_id = request.GET.get("assignment_id")
         file_path = request.GET.get("file_path", "")
+        download = request.GET.get("download") == "1"
 
         if not assignment_id:
             return JsonResponse({"success": False, "error": "未提供作业ID"})
@@ -787,6 +795,19 @@ def get_assignment_file_api(request):
 
         # 读取文件内容
         try:
+            if download:
+                filename = os.path.basename(file_path.rstrip("/"))
+                if isinstance(adapter, FileSystemStorageAdapter):
+                    return serve_path(
+                        request,
+                        adapter.get_local_path(file_path),
+                        filename=filename,
+                        as_attachment=True,
+                    )
+                return serve_bytes(
+                    request, adapter.read_file(file_path), filename=filename, as_attachment=True
+                )
+
             content = adapter.read_file(file_path)
 
             # 尝试解码为文本
@@ -6,15 +6,22 @@
 - 目录树结构缓存
 - 文件内容缓存
 - 缓存过期管理
+- 按命名空间版本号整体失效（不依赖缓存后端的模式删除）
+- 两级缓存后端（进程内 LRU + 共享缓存）及命中统计
 """
 
 import logging
 import os
+import pickle
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +37,21 @@ class CacheManager:
     PREFIX_COMMENT_TEMPLATE = "comment_template"
     PREFIX_COURSE_LIST = "course_list"
     PREFIX_CLASS_LIST = "class_list"
+    PREFIXES = (
+        PREFIX_FILE_COUNT,
+        PREFIX_DIR_TREE,
+        PREFIX_FILE_CONTENT,
+        PREFIX_FILE_METADATA,
+        PREFIX_COMMENT_TEMPLATE,
+        PREFIX_COURSE_LIST,
+        PREFIX_CLASS_LIST,
+    )
+
+    # 命名空间版本号与统计计数的键前缀
+    NAMESPACE_VERSION_PREFIX = "cache_ns"
+    NAMESPACE_STATS_PREFIX = "cache_ns_stats"
+    # 由文件系统监听器精确失效的作用域（"租户ID:用户ID" 列表），由监听器定期刷新
+    WATCHED_SCOPES_KEY = "cache_watched_scopes"
 
     # 缓存过期时间（秒）
     TIMEOUT_FILE_COUNT = 300  # 5分钟
@@ -57,24 +79,45 @@ class CacheManager:
         self.tenant_id = tenant_id
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
 
-    def _make_key(self, prefix: str, identifier: str) -> str:
+    def _scope_parts(self, prefix: str) -> List[str]:
         """
-        生成缓存键
+        缓存作用域路径：前缀 → 租户 → 用户
 
         Args:
             prefix: 缓存键前缀
-            identifier: 标识符
 
         Returns:
-            完整的缓存键
+            作用域路径各段
         """
         parts = [prefix]
         if self.tenant_id:
             parts.append(f"tenant_{self.tenant_id}")
         if self.user_id:
             parts.append(f"user_{self.user_id}")
-        parts.append(identifier)
-        return ":".join(parts)
+        return parts
+
+    def _make_key(self, prefix: str, identifier: str) -> str:
+        """
+        生成缓存键
+
+        键中嵌入作用域路径上每一级的命名空间版本号，
+        任何一级版本号递增后，其下的旧缓存键都不再被读取。
+
+        Args:
+            prefix: 缓存键前缀
+            identifier: 标识符
+
+        Returns:
+            完整的缓存键
+        """
+        parts = self._scope_parts(prefix)
+        versions = self._get_namespace_versions(parts)
+        key_parts = []
+        for part, version in zip(parts, versions):
+            key_parts.append(part)
+            key_parts.append(f"v{version}")
+        key_parts.append(identifier)
+        return ":".join(key_parts)
 
     # ==================== 目录文件数量缓存 ====================
 
@@ -103,7 +146,8 @@ class CacheManager:
             count: 文件数量
         """
         key = self._make_key(self.PREFIX_FILE_COUNT, dir_path)
-        cache.set(key, count, self.TIMEOUT_FILE_COUNT)
+        cache.set(key, count, self._path_timeout(self.TIMEOUT_FILE_COUNT))
+        self._record_write(self.PREFIX_FILE_COUNT)
         self.logger.debug(f"缓存设置 - 目录文件数量: {dir_path} = {count}")
 
     def clear_file_count(self, dir_path: Optional[str] = None) -> None:
@@ -118,9 +162,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 目录文件数量: {dir_path}")
         else:
-            # 清除所有文件数量缓存（通过模式匹配）
-            pattern = self._make_key(self.PREFIX_FILE_COUNT, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_FILE_COUNT)
             self.logger.debug("缓存清除 - 所有目录文件数量")
 
     # ==================== 目录树结构缓存 ====================
@@ -150,7 +192,8 @@ class CacheManager:
             tree: 目录树结构
         """
         key = self._make_key(self.PREFIX_DIR_TREE, dir_path)
-        cache.set(key, tree, self.TIMEOUT_DIR_TREE)
+        cache.set(key, tree, self._path_timeout(self.TIMEOUT_DIR_TREE))
+        self._record_write(self.PREFIX_DIR_TREE)
         self.logger.debug(f"缓存设置 - 目录树: {dir_path}")
 
     def clear_dir_tree(self, dir_path: Optional[str] = None) -> None:
@@ -165,8 +208,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 目录树: {dir_path}")
         else:
-            pattern = self._make_key(self.PREFIX_DIR_TREE, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_DIR_TREE)
             self.logger.debug("缓存清除 - 所有目录树")
 
     # ==================== 文件内容缓存 ====================
@@ -197,7 +239,8 @@ class CacheManager:
             content_type: 内容类型
         """
         key = self._make_key(self.PREFIX_FILE_CONTENT, file_path)
-        cache.set(key, (content, content_type), self.TIMEOUT_FILE_CONTENT)
+        cache.set(key, (content, content_type), self._path_timeout(self.TIMEOUT_FILE_CONTENT))
+        self._record_write(self.PREFIX_FILE_CONTENT)
         self.logger.debug(f"缓存设置 - 文件内容: {file_path}")
 
     def clear_file_content(self, file_path: Optional[str] = None) -> None:
@@ -212,8 +255,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 文件内容: {file_path}")
         else:
-            pattern = self._make_key(self.PREFIX_FILE_CONTENT, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_FILE_CONTENT)
             self.logger.debug("缓存清除 - 所有文件内容")
 
     # ==================== 评价模板缓存 ====================
@@ -246,6 +288,7 @@ class CacheManager:
         """
         key = self._make_key(self.PREFIX_COMMENT_TEMPLATE, f"{template_type}_{identifier}")
         cache.set(key, templates, self.TIMEOUT_COMMENT_TEMPLATE)
+        self._record_write(self.PREFIX_COMMENT_TEMPLATE)
         self.logger.debug(
             f"缓存设置 - 评价模板: {template_type}_{identifier}, " f"数量={len(templates)}"
         )
@@ -265,8 +308,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 评价模板: {template_type}_{identifier}")
         else:
-            pattern = self._make_key(self.PREFIX_COMMENT_TEMPLATE, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_COMMENT_TEMPLATE)
             self.logger.debug("缓存清除 - 所有评价模板")
 
     # ==================== 课程列表缓存 ====================
@@ -307,6 +349,7 @@ class CacheManager:
             identifier += f"_semester_{semester_id}"
         key = self._make_key(self.PREFIX_COURSE_LIST, identifier)
         cache.set(key, courses, self.TIMEOUT_COURSE_LIST)
+        self._record_write(self.PREFIX_COURSE_LIST)
         self.logger.debug(f"缓存设置 - 课程列表: {identifier}, 数量={len(courses)}")
 
     def clear_course_list(
@@ -327,8 +370,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 课程列表: {identifier}")
         else:
-            pattern = self._make_key(self.PREFIX_COURSE_LIST, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_COURSE_LIST)
             self.logger.debug("缓存清除 - 所有课程列表")
 
     # ==================== 班级列表缓存 ====================
@@ -380,6 +422,7 @@ class CacheManager:
             identifier = "all"
         key = self._make_key(self.PREFIX_CLASS_LIST, identifier)
         cache.set(key, classes, self.TIMEOUT_CLASS_LIST)
+        self._record_write(self.PREFIX_CLASS_LIST)
         self.logger.debug(f"缓存设置 - 班级列表: {identifier}, 数量={len(classes)}")
 
     def clear_class_list(
@@ -403,8 +446,7 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 班级列表: {identifier}")
         else:
-            pattern = self._make_key(self.PREFIX_CLASS_LIST, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_CLASS_LIST)
             self.logger.debug("缓存清除 - 所有班级列表")
 
     # ==================== 文件元数据缓存 ====================
@@ -434,7 +476,8 @@ class CacheManager:
             metadata: 文件元数据
         """
         key = self._make_key(self.PREFIX_FILE_METADATA, file_path)
-        cache.set(key, metadata, self.TIMEOUT_FILE_METADATA)
+        cache.set(key, metadata, self._path_timeout(self.TIMEOUT_FILE_METADATA))
+        self._record_write(self.PREFIX_FILE_METADATA)
         self.logger.debug(f"缓存设置 - 文件元数据: {file_path}")
 
     def clear_file_metadata(self, file_path: Optional[str] = None) -> None:
@@ -449,10 +492,34 @@ class CacheManager:
             cache.delete(key)
             self.logger.debug(f"缓存清除 - 文件元数据: {file_path}")
         else:
-            pattern = self._make_key(self.PREFIX_FILE_METADATA, "*")
-            self._clear_by_pattern(pattern)
+            self._invalidate_namespace(self.PREFIX_FILE_METADATA)
             self.logger.debug("缓存清除 - 所有文件元数据")
 
+    # ==================== 按路径失效 ====================
+
+    def invalidate_paths(self, dir_paths=(), file_paths=()) -> int:
+        """
+        按路径精确清除目录与文件相关的缓存（文件系统监听器使用）
+
+        Args:
+            dir_paths: 目录路径（清除文件数量与目录树缓存）
+            file_paths: 文件路径（清除文件内容与文件元数据缓存）
+
+        Returns:
+            清除的缓存键数量
+        """
+        keys = []
+        for dir_path in dict.fromkeys(dir_paths):
+            keys.append(self._make_key(self.PREFIX_FILE_COUNT, dir_path))
+            keys.append(self._make_key(self.PREFIX_DIR_TREE, dir_path))
+        for file_path in dict.fromkeys(file_paths):
+            keys.append(self._make_key(self.PREFIX_FILE_CONTENT, file_path))
+            keys.append(self._make_key(self.PREFIX_FILE_METADATA, file_path))
+        if keys:
+            cache.delete_many(keys)
+            self.logger.debug(f"缓存清除 - 按路径: {len(keys)} 个键")
+        return len(keys)
+
     # ==================== 批量操作 ====================
 
     def clear_all(self) -> None:
@@ -472,18 +539,9 @@ class CacheManager:
             self.logger.warning("无法清除用户缓存：未指定用户ID")
             return
 
-        # 清除用户相关的所有缓存
-        for prefix in [
-            self.PREFIX_FILE_COUNT,
-            self.PREFIX_DIR_TREE,
-            self.PREFIX_FILE_CONTENT,
-            self.PREFIX_FILE_METADATA,
-            self.PREFIX_COMMENT_TEMPLATE,
-            self.PREFIX_COURSE_LIST,
-            self.PREFIX_CLASS_LIST,
-        ]:
-            pattern = self._make_key(prefix, "*")
-            self._clear_by_pattern(pattern)
+        # 清除用户相关的所有缓存（每个前缀递增一次用户级命名空间版本）
+        for prefix in self.PREFIXES:
+            self._invalidate_namespace(prefix)
 
         self.logger.info(f"缓存清除 - 用户 {self.user_id} 的所有缓存")
 
@@ -493,21 +551,31 @@ class CacheManager:
             self.logger.warning("无法清除租户缓存：未指定租户ID")
             return
 
-        # 清除租户相关的所有缓存
-        for prefix in [
-            self.PREFIX_FILE_COUNT,
-            self.PREFIX_DIR_TREE,
-            self.PREFIX_FILE_CONTENT,
-            self.PREFIX_FILE_METADATA,
-            self.PREFIX_COMMENT_TEMPLATE,
-            self.PREFIX_COURSE_LIST,
-            self.PREFIX_CLASS_LIST,
-        ]:
-            pattern = self._make_key(prefix, "*")
-            self._clear_by_pattern(pattern)
+        # 清除租户相关的所有缓存（递增租户级命名空间版本，覆盖租户下所有用户）
+        for prefix in self.PREFIXES:
+            self._invalidate_namespace(prefix, include_user=False)
 
         self.logger.info(f"缓存清除 - 租户 {self.tenant_id} 的所有缓存")
 
+    @classmethod
+    def set_watched_scopes(cls, scopes, timeout: float) -> None:
+        """
+        记录文件系统监听器负责失效的缓存作用域
+
+        只有这些作用域中的目录与文件类缓存使用 CACHE_WATCHED_PATH_TIMEOUT；
+        其他用户（如租户管理员）查看同一仓库时写入的缓存不会被监听器清除，仍使用默认过期时间。
+        监听器停止后记录随过期时间失效，所有作用域回到默认过期时间。
+
+        Args:
+            scopes: (tenant_id, user_id) 列表，为空时清除记录
+            timeout: 记录的过期时间（秒）
+        """
+        scope_ids = sorted({cls._format_scope(tenant_id, user_id) for tenant_id, user_id in scopes})
+        if scope_ids:
+            cache.set(cls.WATCHED_SCOPES_KEY, scope_ids, timeout)
+        else:
+            cache.delete(cls.WATCHED_SCOPES_KEY)
+
     # ==================== 性能检查 ====================
 
     def check_file_count_threshold(self, file_count: int) -> Dict[str, Any]:
@@ -594,11 +662,12 @@ class CacheManager:
             "user_id": self.user_id,
             "tenant_id": self.tenant_id,
             "cache_backend": settings.CACHES.get("default", {}).get("BACKEND", "unknown"),
+            "shared_backend": getattr(cache, "shared_backend", None),
             "timeouts": {
-                "file_count": self.TIMEOUT_FILE_COUNT,
-                "dir_tree": self.TIMEOUT_DIR_TREE,
-                "file_content": self.TIMEOUT_FILE_CONTENT,
-                "file_metadata": self.TIMEOUT_FILE_METADATA,
+                "file_count": self._path_timeout(self.TIMEOUT_FILE_COUNT),
+                "dir_tree": self._path_timeout(self.TIMEOUT_DIR_TREE),
+                "file_content": self._path_timeout(self.TIMEOUT_FILE_CONTENT),
+                "file_metadata": self._path_timeout(self.TIMEOUT_FILE_METADATA),
                 "comment_template": self.TIMEOUT_COMMENT_TEMPLATE,
                 "course_list": self.TIMEOUT_COURSE_LIST,
                 "class_list": self.TIMEOUT_CLASS_LIST,
@@ -608,30 +677,422 @@ class CacheManager:
                 "max_files_batch": self.MAX_FILES_BATCH,
                 "max_file_size_mb": self.MAX_FILE_SIZE / 1024 / 1024,
             },
+            "namespaces": self.get_namespace_stats(),
+            "tiers": cache.get_stats() if hasattr(cache, "get_stats") else None,
         }
 
         return stats
 
+    def get_namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取当前作用域各前缀的命名空间统计
+
+        Returns:
+            {作用域路径: {"version": 版本号, "writes": 写入次数, "invalidations": 失效次数}}
+        """
+        stats = {}
+        for prefix in self.PREFIXES:
+            parts = self._scope_parts(prefix)
+            keys = {
+                "version": self._namespace_key(parts),
+                "writes": self._stats_key(parts, "writes"),
+                "invalidations": self._stats_key(parts, "invalidations"),
+            }
+            try:
+                found = cache.get_many(list(keys.values()))
+            except Exception as e:
+                self.logger.error(f"读取缓存命名空间统计失败: {str(e)}")
+                found = {}
+            stats[":".join(parts)] = {name: found.get(key, 0) for name, key in keys.items()}
+        return stats
+
     # ==================== 私有方法 ====================
 
-    def _clear_by_pattern(self, pattern: str) -> None:
+    def _path_timeout(self, default: int) -> int:
+        """
+        目录与文件类缓存的过期时间
+
+        运行文件系统监听器（watch_repository_caches）时，仓库所有者作用域中的这些缓存
+        由文件事件精确失效，可通过 CACHE_WATCHED_PATH_TIMEOUT 设置更长的过期时间；
+        监听器不负责的作用域仍使用默认过期时间。
+        """
+        extended = getattr(settings, "CACHE_WATCHED_PATH_TIMEOUT", 0)
+        if not extended:
+            return default
+        watched = cache.get(self.WATCHED_SCOPES_KEY) or ()
+        if self._format_scope(self.tenant_id, self.user_id) in watched:
+            return extended
+        return default
+
+    @staticmethod
+    def _format_scope(tenant_id: Optional[int], user_id: Optional[int]) -> str:
+        return f"{tenant_id or ''}:{user_id or ''}"
+
+    def _namespace_key(self, parts: List[str]) -> str:
+        """作用域路径对应的版本号键"""
+        return ":".join([self.NAMESPACE_VERSION_PREFIX, *parts])
+
+    def _stats_key(self, parts: List[str], counter: str) -> str:
+        """作用域路径对应的统计计数键"""
+        return ":".join([self.NAMESPACE_STATS_PREFIX, *parts, counter])
+
+    @staticmethod
+    def _initial_version() -> int:
+        """
+        新命名空间的起始版本号
+
+        使用毫秒时间戳而不是 0：版本号键被缓存后端淘汰后重新创建时，
+        新版本号仍大于淘汰前的版本号，旧缓存键不会重新生效。
         """
-        根据模式清除缓存
+        return int(time.time() * 1000)
+
+    def _get_namespace_versions(self, parts: List[str]) -> List[int]:
+        """
+        读取作用域路径上每一级的命名空间版本号（一次 get_many）
 
         Args:
-            pattern: 缓存键模式（支持通配符）
+            parts: 作用域路径，如 ["dir_tree", "tenant_1", "user_2"]
+
+        Returns:
+            与 parts 一一对应的版本号列表
         """
+        ns_keys = [self._namespace_key(parts[: depth + 1]) for depth in range(len(parts))]
         try:
-            # Django的cache框架不直接支持模式删除
-            # 这里使用delete_pattern（如果可用）或记录警告
-            if hasattr(cache, "delete_pattern"):
-                cache.delete_pattern(pattern)
-            else:
-                self.logger.warning(
-                    f"缓存后端不支持模式删除: {pattern}，" "建议使用Redis或Memcached"
-                )
+            found = cache.get_many(ns_keys)
         except Exception as e:
-            self.logger.error(f"清除缓存失败: {pattern} - {str(e)}")
+            self.logger.error(f"读取缓存命名空间版本失败: {str(e)}")
+            found = {}
+
+        versions = []
+        for ns_key in ns_keys:
+            version = found.get(ns_key)
+            if version is None:
+                # add 是原子的：并发初始化时以先写入者为准
+                cache.add(ns_key, self._initial_version(), None)
+                version = cache.get(ns_key) or 0
+            versions.append(version)
+        return versions
+
+    def _incr(self, key: str, initial: int) -> int:
+        """原子递增计数键，键不存在时先以 initial 创建"""
+        cache.add(key, initial, None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # 键在 add 与 incr 之间被淘汰
+            cache.set(key, initial + 1, None)
+            return initial + 1
+
+    def _invalidate_namespace(self, prefix: str, include_user: bool = True) -> None:
+        """
+        使当前作用域下某个前缀的所有缓存失效
+
+        递增作用域的命名空间版本号（一次原子 INCR），旧键随之不可达并由 TTL 回收，
+        与缓存后端是否支持模式删除无关。
+
+        Args:
+            prefix: 缓存键前缀
+            include_user: 为 False 时只到租户级，覆盖租户下所有用户
+        """
+        parts = self._scope_parts(prefix)
+        if not include_user and self.user_id:
+            parts = parts[:-1]
+        try:
+            version = self._incr(self._namespace_key(parts), self._initial_version())
+            self._incr(self._stats_key(parts, "invalidations"), 0)
+            self.logger.debug(f"缓存命名空间失效: {':'.join(parts)} -> v{version}")
+        except Exception as e:
+            self.logger.error(f"缓存命名空间失效失败: {':'.join(parts)} - {str(e)}")
+
+    def _record_write(self, prefix: str) -> None:
+        """记录当前作用域的缓存写入次数"""
+        try:
+            self._incr(self._stats_key(self._scope_parts(prefix), "writes"), 0)
+        except Exception as e:
+            self.logger.debug(f"记录缓存写入统计失败: {prefix} - {str(e)}")
+
+
+# ==================== 两级缓存后端 ====================
+
+_MISSING = object()
+
+
+class LocalCacheTier:
+    """
+    进程内 LRU 缓存层
+
+    按条目数和字节数双重限制容量，条目带过期时间。值以 pickle 字节保存，
+    命中时反序列化，调用方修改返回值不会影响缓存。
+    同时记录每个键前缀的命中、未命中、淘汰次数与占用字节数。
+    """
+
+    STAT_FIELDS = ("local_hits", "shared_hits", "misses", "evictions", "bytes")
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Any], Tuple[float, str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _counter(self, prefix: str) -> Dict[str, int]:
+        counter = self._stats.get(prefix)
+        if counter is None:
+            counter = self._stats[prefix] = dict.fromkeys(self.STAT_FIELDS, 0)
+        return counter
+
+    def _pop(self, entry_key: Tuple[str, Any]) -> Optional[str]:
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return None
+        _, prefix, data = entry
+        self._bytes -= len(data)
+        self._counter(prefix)["bytes"] -= len(data)
+        return prefix
+
+    def get(self, entry_key: Tuple[str, Any]) -> Any:
+        """读取未过期的条目，不存在时返回 _MISSING（不计入统计）"""
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return _MISSING
+            expires_at, prefix, data = entry
+            if expires_at <= time.monotonic():
+                self._pop(entry_key)
+                return _MISSING
+            self._entries.move_to_end(entry_key)
+            self._counter(prefix)["local_hits"] += 1
+        return pickle.loads(data)
+
+    def set(self, entry_key: Tuple[str, Any], prefix: str, value: Any, timeout: float) -> None:
+        """写入条目，超出容量时按最近最少使用淘汰"""
+        if self.max_entries <= 0 or timeout <= 0:
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pop(entry_key)
+            if len(data) > self.max_bytes:
+                return
+            self._entries[entry_key] = (time.monotonic() + timeout, prefix, data)
+            self._bytes += len(data)
+            self._counter(prefix)["bytes"] += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                evicted_key = next(iter(self._entries))
+                evicted_prefix = self._pop(evicted_key)
+                self._counter(evicted_prefix)["evictions"] += 1
+
+    def delete(self, entry_key: Tuple[str, Any]) -> None:
+        with self._lock:
+            self._pop(entry_key)
+
+    def record(self, prefix: str, field: str) -> None:
+        with self._lock:
+            self._counter(prefix)[field] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for counter in self._stats.values():
+                counter["bytes"] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "prefixes": {prefix: dict(counter) for prefix, counter in self._stats.items()},
+            }
+
+
+# 进程内缓存层按缓存别名的 LOCATION 共享（Django 为每个线程创建独立的后端实例）
+_local_tiers: Dict[str, LocalCacheTier] = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    两级缓存后端：进程内 LRU 在前，共享缓存（Redis / LocMem）在后
+
+    只有 LOCAL_PREFIXES 中前缀的键进入进程内层。CacheManager 的键内嵌命名空间版本号，
+    版本号键（cache_ns:*）和监听作用域键（cache_watched_scopes）每次读写缓存都要读取，
+    也进入进程内层，但只保留 LOCAL_METADATA_TIMEOUT 秒，本地层命中时不必访问共享层。
+    一致性边界：
+    - 本进程的整体失效（INCR 版本号）会删除本地副本，立即生效
+    - 其他进程的整体失效和监听作用域变化最多延迟 LOCAL_METADATA_TIMEOUT 秒可见
+    - 单键删除和覆盖写入在其他进程中最多延迟 LOCAL_TIMEOUT 秒可见
+
+    配置示例::
+
+        CACHES = {
+            "default": {
+                "BACKEND": "grading.cache_manager.TwoTierCache",
+                "OPTIONS": {
+                    "SHARED": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                               "LOCATION": "redis://127.0.0.1:6379/1"},
+                    "LOCAL_MAX_ENTRIES": 1024,
+                    "LOCAL_MAX_BYTES": 32 * 1024 * 1024,
+                    "LOCAL_TIMEOUT": 5,
+                    "LOCAL_METADATA_TIMEOUT": 1,
+                },
+            }
+        }
+    """
+
+    DEFAULT_LOCAL_PREFIXES = CacheManager.PREFIXES + ("git_storage",)
+    # 命名空间版本号与监听作用域：在进程内层保留更短的时间
+    METADATA_PREFIXES = (CacheManager.NAMESPACE_VERSION_PREFIX, CacheManager.WATCHED_SCOPES_KEY)
+
+    def __init__(self, location: str, params: Dict[str, Any]):
+        options = dict(params.get("OPTIONS") or {})
+        shared_params = options.pop(
+            "SHARED", {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        )
+        max_entries = int(options.pop("LOCAL_MAX_ENTRIES", 1024))
+        max_bytes = int(options.pop("LOCAL_MAX_BYTES", 32 * 1024 * 1024))
+        self.local_timeout = float(options.pop("LOCAL_TIMEOUT", 5))
+        self.metadata_timeout = float(options.pop("LOCAL_METADATA_TIMEOUT", 1))
+        self.metadata_prefixes = frozenset(self.METADATA_PREFIXES)
+        self.local_prefixes = (
+            frozenset(options.pop("LOCAL_PREFIXES", self.DEFAULT_LOCAL_PREFIXES))
+            | self.metadata_prefixes
+        )
+        super().__init__({**params, "OPTIONS": options})
+
+        self.shared_backend = shared_params["BACKEND"]
+        self.shared = import_string(self.shared_backend)(
+            shared_params.get("LOCATION", ""), shared_params
+        )
+        with _local_tiers_lock:
+            self.local = _local_tiers.get(location)
+            if self.local is None:
+                self.local = _local_tiers[location] = LocalCacheTier(max_entries, max_bytes)
+
+    @staticmethod
+    def _prefix(key: str) -> str:
+        return str(key).split(":", 1)[0]
+
+    def _local_timeout(self, prefix: str, timeout=DEFAULT_TIMEOUT) -> float:
+        limit = self.metadata_timeout if prefix in self.metadata_prefixes else self.local_timeout
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return limit
+        return min(float(timeout), limit)
+
+    def get(self, key, default=None, version=None):
+        prefix = self._prefix(key)
+        entry_key = (key, version)
+        is_local = prefix in self.local_prefixes
+        if is_local:
+            value = self.local.get(entry_key)
+            if value is not _MISSING:
+                return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.local.record(prefix, "misses")
+            return default
+        self.local.record(prefix, "shared_hits")
+        if is_local:
+            self.local.set(entry_key, prefix, value, self._local_timeout(prefix))
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            if self._prefix(key) in self.local_prefixes:
+                value = self.local.get((key, version))
+                if value is not _MISSING:
+                    found[key] = value
+                    continue
+            remaining.append(key)
+        if not remaining:
+            return found
+
+        shared_found = self.shared.get_many(remaining, version=version)
+        for key in remaining:
+            prefix = self._prefix(key)
+            if key not in shared_found:
+                self.local.record(prefix, "misses")
+                continue
+            self.local.record(prefix, "shared_hits")
+            if prefix in self.local_prefixes:
+                self.local.set(
+                    (key, version), prefix, shared_found[key], self._local_timeout(prefix)
+                )
+        found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout=timeout, version=version)
+        prefix = self._prefix(key)
+        if prefix in self.local_prefixes:
+            self.local.set((key, version), prefix, value, self._local_timeout(prefix, timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout=timeout, version=version)
+        for key, value in data.items():
+            prefix = self._prefix(key)
+            if prefix in self.local_prefixes and key not in failed:
+                self.local.set((key, version), prefix, value, self._local_timeout(prefix, timeout))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout=timeout, version=version)
+        prefix = self._prefix(key)
+        if prefix in self.local_prefixes:
+            if added:
+                self.local.set((key, version), prefix, value, self._local_timeout(prefix, timeout))
+            else:
+                self.local.delete((key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete((key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete((key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self.local.get((key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete((key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete((key, version))
+        return self.shared.decr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """进程内层的容量与各前缀命中统计（仅当前进程）"""
+        stats = self.local.get_stats()
+        stats.update(
+            {
+                "pid": os.getpid(),
+                "shared_backend": self.shared_backend,
+                "local_timeout": self.local_timeout,
+            }
+        )
+        return stats
 
 
 # ==================== 便捷函数 ====================
@@ -0,0 +1,67 @@
+"""
+Word 作业文档解析（登分册批量写入的进程池工作函数）
+
+本模块只依赖 grading.grade_registry_writer 中的文档解析函数，不导入 Django
+（模型、设置、缓存），spawn 方式启动的子进程无需初始化 Django 即可导入。
+"""
+
+import logging
+import math
+from typing import Dict, Optional
+
+from grading.grade_registry_writer import GradeFileProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def sanitize_grade_value(value) -> Optional[str]:
+    """将成绩值转换为非空字符串，过滤 NaN/None。"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.lower() in {"nan", "none", "null"}:
+        return None
+    return text
+
+
+def extract_word_file_info(word_file: str) -> Dict[str, any]:
+    """
+    解析单个Word文档
+
+    只读取文档本身，不访问数据库和登分册，可在子进程中执行。
+    按原有顺序短路：姓名提取失败或评价校验失败时不再解析成绩。
+
+    Args:
+        word_file: Word文档路径
+
+    Returns:
+        解析结果字典：student_name, comment_valid, comment_error, grade, error
+    """
+    info = {
+        "student_name": None,
+        "comment_valid": True,
+        "comment_error": None,
+        "grade": None,
+        "error": None,
+    }
+    try:
+        info["student_name"] = GradeFileProcessor.extract_student_name(word_file)
+        if not info["student_name"]:
+            return info
+
+        is_valid, error_msg = GradeFileProcessor.validate_lab_report_comment(word_file)
+        info["comment_valid"] = is_valid
+        info["comment_error"] = error_msg
+        if not is_valid:
+            return info
+
+        grade = GradeFileProcessor.extract_grade_from_word(word_file)
+        info["grade"] = sanitize_grade_value(grade)
+    except Exception as e:
+        logger.error("解析Word文档出错: %s - %s", word_file, str(e), exc_info=True)
+        info["error"] = str(e)
+    return info
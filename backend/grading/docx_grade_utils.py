@@ -24,7 +24,7 @@ def _normalize_signature_text(text: str) -> str:
     return normalized
 
 
-def _has_signature_marker(text: str) -> bool:
+def has_signature_marker(text: str) -> bool:
     normalized = _normalize_signature_text(text)
     return (
         "教师(签字)" in normalized
@@ -46,7 +46,7 @@ def find_teacher_signature_cell(doc):
         for row_idx, row in enumerate(table.rows):
             for col_idx, cell in enumerate(row.cells):
                 cell_text = cell.text.strip()
-                if _has_signature_marker(cell_text):
+                if has_signature_marker(cell_text):
                     logger.info(
                         "找到'教师（签字）'单元格: 表格%d, 行%d, 列%d",
                         table_idx + 1,
@@ -84,7 +84,7 @@ def extract_grade_and_comment_from_cell(cell) -> Tuple[Optional[str], Optional[s
 
     signature_line_idx = -1
     for i, line in enumerate(lines):
-        if _has_signature_marker(line):
+        if has_signature_marker(line):
             signature_line_idx = i
             signature_text = "\n".join(lines[i:])
             logger.info("✓ 找到'教师（签字）'在第%d行", i + 1)
@@ -200,6 +200,6 @@ def extract_grade_from_homework_doc(doc) -> Optional[str]:
             continue
         for prefix in prefixes:
             if text.startswith(prefix):
-                grade = text[len(prefix):].strip()
+                grade = text[len(prefix) :].strip()
                 return grade or None
     return None
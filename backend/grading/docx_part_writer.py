@@ -0,0 +1,147 @@
+"""
+Word 文档主部件原地改写
+
+写入评分和评价只修改正文中的一个表格单元格或几个段落，但 Document().save() 会重新序列化
+包中的所有部件，并重新压缩每一张嵌入图片。图片较多的实验报告因此保存很慢。
+
+本模块只读取并解析主文档部件（通常是 word/document.xml），构造只包含该部件的
+python-docx Document 供现有的编辑函数使用；保存时：
+- 主文档部件重新序列化并压缩（序列化方式与 python-docx 保存时一致）
+- 其他 zip 成员按原始压缩数据逐字节复制，不解压也不重新压缩
+- 先写入同目录的临时文件，再用 os.replace 原子替换原文件，并保留原文件权限
+
+编辑函数只能修改正文内容（段落、表格、文字格式），不能访问样式、图片等其他部件。
+
+使用示例：
+    editor = edit_docx("/path/to/张三.docx")
+    write_grade_to_lab_report(editor.document, "A", "很好")
+    editor.save()
+"""
+
+import copy
+import logging
+import os
+import shutil
+import struct
+import uuid
+import zipfile
+
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.exceptions import PackageNotFoundError
+from docx.opc.packuri import PackURI
+from docx.parts.document import DocumentPart
+
+from .docx_stream_reader import _main_document_part
+
+logger = logging.getLogger(__name__)
+
+# zip 本地文件头：签名、固定部分长度，以及其中文件名长度、扩展字段长度的偏移
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_NAME_LENGTHS = slice(26, 30)
+# 通用标志位：大小和 CRC 写在数据后面的数据描述符中
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# 按原始数据追加成员需要直接操作 ZipFile 的写入状态（CPython 3.8 起未变）；
+# 这些属性不存在时退回解压后重新压缩，结果正确但较慢
+_RAW_COPY_ATTRS = ("fp", "start_dir", "filelist", "NameToInfo", "_didModify")
+
+
+class DocxPartEditor:
+    """只加载主文档部件的 Word 文档编辑器"""
+
+    def __init__(self, path):
+        """打开 Word 文档
+
+        Args:
+            path: 文件路径
+
+        Raises:
+            PackageNotFoundError: 路径不存在或不是有效的 docx 包
+        """
+        self.path = os.fspath(path)
+        if not zipfile.is_zipfile(self.path):
+            raise PackageNotFoundError(f"Package not found at '{self.path}'")
+        with zipfile.ZipFile(self.path) as zf:
+            self.part_name = _main_document_part(zf)
+            try:
+                blob = zf.read(self.part_name)
+            except KeyError:
+                raise ValueError(f"主文档部件不存在: {self.path}")
+        # package=None：主文档部件不属于任何包，调用方只能修改正文（段落、表格、文字格式），
+        # 不能访问样式、编号、页眉页脚、图片等其他部件或关系，否则会抛出 AttributeError
+        self.part = DocumentPart.load(
+            PackURI("/" + self.part_name), CT.WML_DOCUMENT_MAIN, blob, None
+        )
+        self.document = self.part.document
+
+    def save(self) -> None:
+        """写回修改后的主文档部件，其他部件原样复制，完成后原子替换原文件"""
+        blob = self.part.blob
+        directory, filename = os.path.split(os.path.abspath(self.path))
+        tmp_path = os.path.join(directory, f".{filename}.{uuid.uuid4().hex}.tmp")
+        try:
+            with zipfile.ZipFile(self.path) as src, zipfile.ZipFile(tmp_path, "w") as dst:
+                for info in src.infolist():
+                    if info.filename == self.part_name:
+                        part_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                        part_info.compress_type = zipfile.ZIP_DEFLATED
+                        part_info.external_attr = info.external_attr
+                        dst.writestr(part_info, blob)
+                    elif _supports_raw_copy(dst):
+                        _copy_member_raw(src, dst, info)
+                    else:
+                        dst.writestr(info, src.read(info))
+            shutil.copymode(self.path, tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def _supports_raw_copy(zf: zipfile.ZipFile) -> bool:
+    return all(hasattr(zf, attr) for attr in _RAW_COPY_ATTRS)
+
+
+def _copy_member_raw(src: zipfile.ZipFile, dst: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """把 src 中的一个成员按原始压缩数据复制到 dst"""
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(_LOCAL_HEADER_SIZE)
+    if len(header) != _LOCAL_HEADER_SIZE or header[:4] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header: {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[_LOCAL_HEADER_NAME_LENGTHS])
+    src.fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    # 大小和 CRC 已知，直接写入本地文件头，不再使用数据描述符
+    member = copy.copy(info)
+    member.flag_bits &= ~_FLAG_DATA_DESCRIPTOR
+    # 中央目录中的扩展字段（如原文件的 ZIP64 偏移记录）不适用于新文件，
+    # 清空后由 FileHeader() 和 close() 按新的大小和偏移重新生成
+    member.extra = b""
+    dst.fp.seek(dst.start_dir)
+    member.header_offset = dst.fp.tell()
+    dst.fp.write(member.FileHeader())
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src.fp.read(min(remaining, _COPY_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated member: {info.filename}")
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+
+    dst.start_dir = dst.fp.tell()
+    dst.filelist.append(member)
+    dst.NameToInfo[member.filename] = member
+    # 让 close() 写出中央目录
+    dst._didModify = True
+
+
+def edit_docx(path) -> DocxPartEditor:
+    """打开 Word 文档进行正文编辑（保存时只重写主文档部件）"""
+    return DocxPartEditor(path)
@@ -0,0 +1,405 @@
+"""
+Word 文档流式只读解析
+
+只读场景（检测评分、评价、锁定标记）不需要 python-docx 构建完整的对象图：
+Document() 会把整个包（包括嵌入的图片）读入内存并解析所有部件。
+本模块只打开主文档部件（通常是 word/document.xml），用 lxml.iterparse
+按顶层块（段落 / 表格）流式解析，调用方停止遍历时即停止读取。
+
+返回的对象只实现只读接口，文本语义与 python-docx 保持一致：
+- StreamDocument.paragraphs / tables：正文的直接子段落 / 表格
+- StreamTable.rows、StreamRow.cells：合并单元格（gridSpan / vMerge）重复返回同一单元格
+- StreamCell.text：单元格内各段落文本以换行连接
+- StreamParagraph.text：段落中 w:r 和 w:hyperlink 的文本
+
+因此 find_teacher_signature_cell、extract_grade_and_comment_from_cell、
+extract_grade_from_homework_doc 等函数可以直接作用于 StreamDocument。
+
+使用示例：
+    with open_docx("/path/to/张三.docx") as doc:
+        for table in doc.tables:  # 惰性解析，break 后不再读取后续内容
+            ...
+        texts = [p.text for p in doc.paragraphs]
+"""
+
+import logging
+import os
+import posixpath
+import zipfile
+from typing import Iterator, List, Optional, Tuple, Union
+
+from docx.opc.exceptions import PackageNotFoundError
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_RELTYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY = _w("body")
+W_P = _w("p")
+W_TBL = _w("tbl")
+W_TR = _w("tr")
+W_TC = _w("tc")
+W_R = _w("r")
+W_HYPERLINK = _w("hyperlink")
+W_T = _w("t")
+W_TAB = _w("tab")
+W_PTAB = _w("ptab")
+W_BR = _w("br")
+W_CR = _w("cr")
+W_NO_BREAK_HYPHEN = _w("noBreakHyphen")
+W_TRPR = _w("trPr")
+W_TCPR = _w("tcPr")
+W_GRID_BEFORE = _w("gridBefore")
+W_GRID_SPAN = _w("gridSpan")
+W_VMERGE = _w("vMerge")
+W_VAL = _w("val")
+W_TYPE = _w("type")
+
+
+# ==================== 只读对象 ====================
+
+
+class StreamParagraph:
+    """只读段落"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StreamCell:
+    """只读表格单元格"""
+
+    __slots__ = ("paragraphs", "tables")
+
+    def __init__(self, paragraphs: List[StreamParagraph], tables: List["StreamTable"]):
+        self.paragraphs = paragraphs
+        self.tables = tables
+
+    @property
+    def text(self) -> str:
+        return "\n".join(p.text for p in self.paragraphs)
+
+
+class StreamRow:
+    """只读表格行
+
+    合并单元格解析失败时（与 python-docx 一致抛出 ValueError）延迟到访问 cells 时才抛出。
+    """
+
+    __slots__ = ("_cells", "_error")
+
+    def __init__(self, cells: Tuple[StreamCell, ...], error: Optional[ValueError] = None):
+        self._cells = cells
+        self._error = error
+
+    @property
+    def cells(self) -> Tuple[StreamCell, ...]:
+        if self._error is not None:
+            raise self._error
+        return self._cells
+
+
+class StreamTable:
+    """只读表格"""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: List[StreamRow]):
+        self.rows = rows
+
+
+Block = Union[StreamParagraph, StreamTable]
+
+
+# ==================== 元素转换 ====================
+
+
+def _run_text(r) -> str:
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or "")
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append("\t")
+        elif tag == W_BR:
+            parts.append("\n" if child.get(W_TYPE, "textWrapping") == "textWrapping" else "")
+        elif tag == W_CR:
+            parts.append("\n")
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph(p) -> StreamParagraph:
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == W_R)
+    return StreamParagraph("".join(parts))
+
+
+def _cell(tc) -> StreamCell:
+    paragraphs = []
+    tables = []
+    for child in tc:
+        if child.tag == W_P:
+            paragraphs.append(_paragraph(child))
+        elif child.tag == W_TBL:
+            tables.append(_table(child))
+    return StreamCell(paragraphs, tables)
+
+
+def _int_val(parent, tag: str, default: int) -> int:
+    if parent is None:
+        return default
+    el = parent.find(tag)
+    if el is None:
+        return default
+    return int(el.get(W_VAL))
+
+
+def _tc_props(tc) -> Tuple[int, Optional[str]]:
+    tc_pr = tc.find(W_TCPR)
+    grid_span = _int_val(tc_pr, W_GRID_SPAN, 1)
+    v_merge = None
+    if tc_pr is not None:
+        v_merge_el = tc_pr.find(W_VMERGE)
+        if v_merge_el is not None:
+            v_merge = v_merge_el.get(W_VAL, "continue")
+    return grid_span, v_merge
+
+
+def _table(tbl) -> StreamTable:
+    """转换表格元素
+
+    行内单元格的展开规则与 python-docx 的 _Row.cells 相同：
+    gridSpan 跨列的单元格重复返回，vMerge="continue" 的单元格返回上一行同一网格位置的单元格。
+    """
+    rows: List[StreamRow] = []
+    # 上一行：[(网格起始位置, gridSpan, 该 tc 展开的单元格)]
+    prev_row: Optional[List[Tuple[int, int, Tuple[StreamCell, ...]]]] = None
+    prev_grid_before = 0
+
+    for tr in tbl:
+        if tr.tag != W_TR:
+            continue
+        grid_before = _int_val(tr.find(W_TRPR), W_GRID_BEFORE, 0)
+        offset = grid_before
+        row_tcs: List[Tuple[int, int, Tuple[StreamCell, ...]]] = []
+        cells: List[StreamCell] = []
+        error = None
+
+        for tc in tr:
+            if tc.tag != W_TC:
+                continue
+            grid_span, v_merge = _tc_props(tc)
+            if v_merge == "continue":
+                expanded = ()
+                if error is None:
+                    try:
+                        expanded = _tc_above(prev_row, prev_grid_before, offset)
+                    except ValueError as e:
+                        error = e
+            else:
+                cell = _cell(tc)
+                expanded = (cell,) * grid_span
+            row_tcs.append((offset, grid_span, expanded))
+            cells.extend(expanded)
+            offset += grid_span
+
+        rows.append(StreamRow(tuple(cells), error))
+        prev_row = row_tcs
+        prev_grid_before = grid_before
+
+    return StreamTable(rows)
+
+
+def _tc_above(prev_row, prev_grid_before: int, grid_offset: int) -> Tuple[StreamCell, ...]:
+    if prev_row is None:
+        raise ValueError("no tr above topmost tr in w:tbl")
+    remaining = grid_offset - prev_grid_before
+    for _, grid_span, expanded in prev_row:
+        if remaining < 0:
+            break
+        if remaining == 0:
+            return expanded
+        remaining -= grid_span
+    raise ValueError(f"no `tc` element at grid_offset={grid_offset}")
+
+
+# ==================== 文档 ====================
+
+
+def _main_document_part(zf: zipfile.ZipFile) -> str:
+    try:
+        rels = etree.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return DEFAULT_DOCUMENT_PART
+    for rel in rels.iter(f"{{{RELS_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT_RELTYPE and rel.get("TargetMode") != "External":
+            return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    return DEFAULT_DOCUMENT_PART
+
+
+class _LazyTables:
+    """顶层表格的惰性序列，可重复遍历；遍历到哪里才解析到哪里"""
+
+    def __init__(self, document: "StreamDocument"):
+        self._document = document
+
+    def __iter__(self) -> Iterator[StreamTable]:
+        tables = self._document._tables
+        i = 0
+        while True:
+            if i < len(tables):
+                yield tables[i]
+                i += 1
+            elif not self._document._advance():
+                return
+
+    def __len__(self) -> int:
+        self._document._drain()
+        return len(self._document._tables)
+
+    def __getitem__(self, index):
+        self._document._drain()
+        return self._document._tables[index]
+
+
+class StreamDocument:
+    """流式只读 Word 文档
+
+    只在需要时解析后续内容；解析完毕或调用 close() 后释放文件句柄。
+    """
+
+    def __init__(self, docx):
+        """打开 Word 文档
+
+        Args:
+            docx: 文件路径或二进制文件对象
+
+        Raises:
+            PackageNotFoundError: 路径不存在或不是有效的 docx 包
+        """
+        if isinstance(docx, (str, os.PathLike)) and not zipfile.is_zipfile(docx):
+            raise PackageNotFoundError(f"Package not found at '{docx}'")
+        self._zip = zipfile.ZipFile(docx)
+        try:
+            part_name = _main_document_part(self._zip)
+            self._stream = self._zip.open(part_name)
+        except KeyError:
+            self._zip.close()
+            raise ValueError(f"主文档部件不存在: {docx}")
+        except Exception:
+            self._zip.close()
+            raise
+        self._blocks: List[Block] = []
+        self._paragraphs: List[StreamParagraph] = []
+        self._tables: List[StreamTable] = []
+        self._iterator = self._parse_blocks()
+        self._exhausted = False
+
+    def __enter__(self) -> "StreamDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def paragraphs(self) -> List[StreamParagraph]:
+        """正文中的全部顶层段落（会解析整篇文档）"""
+        self._drain()
+        return self._paragraphs
+
+    @property
+    def tables(self) -> _LazyTables:
+        """正文中的顶层表格（惰性）"""
+        return _LazyTables(self)
+
+    def iter_blocks(self) -> Iterator[Block]:
+        """按文档顺序遍历顶层段落和表格"""
+        i = 0
+        while True:
+            if i < len(self._blocks):
+                yield self._blocks[i]
+                i += 1
+            elif not self._advance():
+                return
+
+    def close(self) -> None:
+        """停止解析并关闭文件"""
+        if not self._exhausted:
+            self._exhausted = True
+            self._iterator.close()
+        self._stream.close()
+        self._zip.close()
+
+    # ==================== 私有方法 ====================
+
+    def _parse_blocks(self) -> Iterator[Block]:
+        # 与 python-docx 使用相同的解析选项，保证空白文本的处理一致
+        context = etree.iterparse(
+            self._stream,
+            events=("end",),
+            tag=(W_P, W_TBL),
+            remove_blank_text=True,
+            resolve_entities=False,
+            no_network=True,
+        )
+        for _, elem in context:
+            parent = elem.getparent()
+            if parent is None or parent.tag != W_BODY:
+                continue
+            block = _paragraph(elem) if elem.tag == W_P else _table(elem)
+            # 释放已处理的元素，保持内存占用与单个块相当
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+            yield block
+
+    def _advance(self) -> bool:
+        if self._exhausted:
+            return False
+        try:
+            block = next(self._iterator)
+        except StopIteration:
+            self.close()
+            return False
+        self._blocks.append(block)
+        if isinstance(block, StreamTable):
+            self._tables.append(block)
+        else:
+            self._paragraphs.append(block)
+        return True
+
+    def _drain(self) -> None:
+        while self._advance():
+            pass
+
+
+def open_docx(docx) -> StreamDocument:
+    """以流式只读方式打开 Word 文档
+
+    Args:
+        docx: 文件路径或二进制文件对象
+
+    Returns:
+        StreamDocument 实例，建议配合 with 语句使用
+    """
+    return StreamDocument(docx)
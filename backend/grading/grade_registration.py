@@ -2,11 +2,13 @@ import glob
 import logging
 import os
 import re
+import tempfile
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, List, Tuple
 
 import openpyxl
-from docx import Document
+
+from .docx_stream_reader import open_docx
 
 logger = logging.getLogger(__name__)
 
@@ -18,31 +20,46 @@ class GradeRegistration:
 
     # --------------------- helpers ---------------------
     def _ensure_excel_headers(self, excel_path: str) -> openpyxl.workbook.workbook.Workbook:
+        """加载登记表；不存在时在内存中创建带表头的新表（由调用方保存）"""
         if not os.path.exists(excel_path):
             wb = openpyxl.Workbook()
             ws = wb.active
             ws.cell(row=1, column=1, value="序号")
             ws.cell(row=1, column=2, value="学号")
             ws.cell(row=1, column=3, value="姓名")
-            wb.save(excel_path)
+            return wb
         with open(excel_path, "rb") as f:
             return openpyxl.load_workbook(f)
 
-    def _load_student_list(self, excel_path: Path) -> Dict[str, int]:
+    def _student_rows(self, ws) -> Dict[str, int]:
         student_rows: Dict[str, int] = {}
+        for row_idx in range(1, ws.max_row + 1):
+            value = ws.cell(row=row_idx, column=3).value
+            if value is None:
+                continue
+            name = str(value).strip()
+            if name and name != "姓名":
+                student_rows[name] = row_idx
+        return student_rows
+
+    def _load_student_list(self, excel_path: Path) -> Dict[str, int]:
         if not excel_path.exists():
-            return student_rows
+            return {}
         with open(str(excel_path), "rb") as f:
-            wb = openpyxl.load_workbook(f)
-            ws = wb.active
-            for row_idx in range(1, ws.max_row + 1):
-                value = ws.cell(row=row_idx, column=3).value
-                if value is None:
-                    continue
-                name = str(value).strip()
-                if name and name != "姓名":
-                    student_rows[name] = row_idx
-        return student_rows
+            return self._student_rows(openpyxl.load_workbook(f).active)
+
+    def _save_workbook_atomic(self, wb, excel_path: str) -> None:
+        """先写入同目录临时文件再替换，避免保存中断导致登记表损坏"""
+        directory = os.path.dirname(os.path.abspath(excel_path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                wb.save(f)
+            os.replace(tmp_path, excel_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
 
     def _parse_homework_number(self, homework_dir_name: str) -> int:
         m = re.search(
@@ -79,7 +96,7 @@ class GradeRegistration:
 
     def _extract_grade_from_docx(self, path: Path) -> str:
         try:
-            doc = Document(str(path))
+            doc = open_docx(str(path))
             for p in doc.paragraphs:
                 if "老师评分：" in p.text:
                     g = p.text.split("老师评分：")[-1].strip()
@@ -94,28 +111,46 @@ class GradeRegistration:
     def write_grade_to_excel(
         self, excel_path: str, student_name: str, homework_dir_name: str, grade: str
     ) -> None:
-        wb = self._ensure_excel_headers(excel_path)
-        ws = wb.active
+        self.write_grades_to_excel(excel_path, [(student_name, homework_dir_name, grade)])
 
-        if excel_path not in self._student_cache:
-            self._student_cache[excel_path] = self._load_student_list(Path(excel_path))
-        student_rows = self._student_cache[excel_path]
+    def write_grades_to_excel(
+        self, excel_path: str, entries: Iterable[Tuple[str, str, str]]
+    ) -> int:
+        """批量写入成绩：加载登记表一次，在内存中完成所有单元格更新后原子保存一次
 
-        if student_name not in student_rows:
-            new_row = ws.max_row + 1
-            ws.cell(row=new_row, column=1, value=new_row - 1)
-            ws.cell(row=new_row, column=3, value=student_name)
-            student_rows[student_name] = new_row
-        row_idx = student_rows[student_name]
+        Args:
+            excel_path: 登记表路径
+            entries: (学生姓名, 作业目录名, 成绩) 列表，同一单元格以后出现的为准
 
-        hw_no = self._parse_homework_number(homework_dir_name)
-        col_idx = 3 + hw_no
-        if ws.cell(row=1, column=col_idx).value in (None, ""):
-            # 规范化表头为“第N次作业”
-            ws.cell(row=1, column=col_idx, value=f"第{hw_no}次作业")
-        ws.cell(row=row_idx, column=col_idx, value=grade)
+        Returns:
+            写入的成绩条数
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
 
-        wb.save(excel_path)
+        wb = self._ensure_excel_headers(excel_path)
+        ws = wb.active
+        student_rows = self._student_rows(ws)
+
+        for student_name, homework_dir_name, grade in entries:
+            if student_name not in student_rows:
+                new_row = ws.max_row + 1
+                ws.cell(row=new_row, column=1, value=new_row - 1)
+                ws.cell(row=new_row, column=3, value=student_name)
+                student_rows[student_name] = new_row
+            row_idx = student_rows[student_name]
+
+            hw_no = self._parse_homework_number(homework_dir_name)
+            col_idx = 3 + hw_no
+            if ws.cell(row=1, column=col_idx).value in (None, ""):
+                # 规范化表头为“第N次作业”
+                ws.cell(row=1, column=col_idx, value=f"第{hw_no}次作业")
+            ws.cell(row=row_idx, column=col_idx, value=grade)
+
+        self._save_workbook_atomic(wb, excel_path)
+        self._student_cache[excel_path] = student_rows
+        return len(entries)
 
     def _is_multi_class_repo(self, repo_path: str) -> bool:
         excel_files = glob.glob(os.path.join(repo_path, "平时成绩登记表-*.xlsx"))
@@ -124,30 +159,57 @@ class GradeRegistration:
                 return True
         return False
 
-    def process_docx_files(self, repository_path: str) -> None:
+    def process_docx_files(self, repository_path: str) -> List[Dict[str, str]]:
+        """登记仓库中所有作业的成绩
+
+        先从所有文档收集 (学生, 作业, 成绩)，再一次性写入登记表。
+
+        Returns:
+            每个文件的处理结果：{"file", "student", "homework", "grade", "status", "error"}
+        """
         repo_path = Path(repository_path)
         if not repo_path.exists():
             logger.warning(f"仓库路径不存在: {repository_path}")
-            return
+            return []
 
         # 查找根目录下的登记表
         excel_files = list(repo_path.glob("平时成绩登记表-*.xlsx"))
         if not excel_files:
             logger.warning(f"在 {repository_path} 中未找到成绩登记表文件")
-            return
+            return []
         excel_path = str(excel_files[0])
 
-        # 遍历docx
-        for docx_file in repo_path.rglob("*.docx"):
+        # 第一阶段：遍历docx，收集成绩
+        outcomes: List[Dict[str, str]] = []
+        collected: List[Dict[str, str]] = []
+        for docx_file in sorted(repo_path.rglob("*.docx")):
             # 最近包含“作业”的父目录名
             hw_dir_name = docx_file.parent.name
             for parent in docx_file.parents:
                 if "作业" in parent.name:
                     hw_dir_name = parent.name
                     break
+            outcome = {"file": str(docx_file), "homework": hw_dir_name}
             try:
-                student_name = self._extract_student_name(str(docx_file))
-                grade = self._extract_grade_from_docx(docx_file)
-                self.write_grade_to_excel(excel_path, student_name, hw_dir_name, grade)
+                outcome["student"] = self._extract_student_name(str(docx_file))
+                outcome["grade"] = self._extract_grade_from_docx(docx_file)
+                outcome["status"] = "success"
+                collected.append(outcome)
             except Exception as e:
                 logger.warning(f"处理文件失败 {docx_file}: {e}")
+                outcome.update({"status": "failed", "error": str(e)})
+            outcomes.append(outcome)
+
+        # 第二阶段：一次加载、一次保存登记表
+        try:
+            self.write_grades_to_excel(
+                excel_path, [(o["student"], o["homework"], o["grade"]) for o in collected]
+            )
+        except Exception as e:
+            logger.warning(f"写入登记表失败 {excel_path}: {e}")
+            for outcome in collected:
+                outcome.update({"status": "failed", "error": str(e)})
+
+        success = sum(1 for o in outcomes if o["status"] == "success")
+        logger.info(f"批量登分完成: {excel_path}, 文件={len(outcomes)}, 成功={success}")
+        return outcomes
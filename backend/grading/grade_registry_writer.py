@@ -29,12 +29,12 @@ except ImportError:
     except ImportError:
         HAS_MSVCRT = False
 
-from docx import Document
 from grading.docx_grade_utils import (
     extract_grade_and_comment_from_cell,
     extract_grade_from_homework_doc,
     find_teacher_signature_cell,
 )
+from grading.docx_stream_reader import StreamDocument, StreamTable, open_docx
 from openpyxl import load_workbook
 from openpyxl.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
@@ -300,21 +300,31 @@ class GradeFileProcessor:
             True表示是实验报告，False表示是普通作业
         """
         try:
-            doc = Document(file_path)
-
-            # 检查文档中是否包含实验报告的特征标记
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if "实验报告" in text or "实验名称" in text:
-                    return True
-
-            # 检查表格中是否有"教师（签字）："标记
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if "教师（签字）" in cell.text or "教师签字" in cell.text:
+            # 段落和表格中任一处出现特征标记即为实验报告，按文档顺序流式检查，找到即停止
+            table_error = None
+            with open_docx(file_path) as doc:
+                for block in doc.iter_blocks():
+                    if not isinstance(block, StreamTable):
+                        # 检查文档中是否包含实验报告的特征标记
+                        text = block.text.strip()
+                        if "实验报告" in text or "实验名称" in text:
                             return True
+                        continue
 
+                    if table_error is not None:
+                        continue
+                    # 检查表格中是否有"教师（签字）："标记
+                    try:
+                        for row in block.rows:
+                            for cell in row.cells:
+                                if "教师（签字）" in cell.text or "教师签字" in cell.text:
+                                    return True
+                    except ValueError as e:
+                        # 段落标记优先，表格解析错误留到段落检查完毕后再抛出
+                        table_error = e
+
+            if table_error is not None:
+                raise table_error
             return False
 
         except (OSError, ValueError) as e:
@@ -335,17 +345,17 @@ class GradeFileProcessor:
         try:
             logger.debug("开始从Word文档提取成绩: %s", file_path)
 
-            doc = Document(file_path)
             is_lab = GradeFileProcessor.is_lab_report(file_path)
 
-            if is_lab:
-                logger.debug("识别为实验报告，使用实验报告提取方法")
-                # 实验报告：在"教师（签字）："单元格中查找评分
-                grade = GradeFileProcessor._extract_grade_from_lab_report(doc)
-            else:
-                logger.debug("识别为普通作业，使用普通作业提取方法")
-                # 普通作业：在文档末尾查找"老师评分："标记
-                grade = GradeFileProcessor._extract_grade_from_homework(doc)
+            with open_docx(file_path) as doc:
+                if is_lab:
+                    logger.debug("识别为实验报告，使用实验报告提取方法")
+                    # 实验报告：在"教师（签字）："单元格中查找评分
+                    grade = GradeFileProcessor._extract_grade_from_lab_report(doc)
+                else:
+                    logger.debug("识别为普通作业，使用普通作业提取方法")
+                    # 普通作业：在文档末尾查找"老师评分："标记
+                    grade = GradeFileProcessor._extract_grade_from_homework(doc)
 
             if grade:
                 logger.debug("成功提取成绩: %s", grade)
@@ -485,7 +495,7 @@ class GradeFileProcessor:
             return []
 
     @staticmethod
-    def _extract_grade_from_lab_report(doc: Document) -> Optional[str]:
+    def _extract_grade_from_lab_report(doc: StreamDocument) -> Optional[str]:
         """
         从实验报告提取成绩
 
@@ -501,7 +511,7 @@ class GradeFileProcessor:
         return None
 
     @staticmethod
-    def _extract_comment_from_lab_report(doc: Document) -> Optional[str]:
+    def _extract_comment_from_lab_report(doc: StreamDocument) -> Optional[str]:
         """
         从实验报告提取评价
 
@@ -558,11 +568,9 @@ class GradeFileProcessor:
                 # 不是实验报告，不需要验证评价
                 return True, None
 
-            # 读取文档
-            doc = Document(file_path)
-
-            # 提取评价
-            comment = GradeFileProcessor._extract_comment_from_lab_report(doc)
+            # 读取文档并提取评价
+            with open_docx(file_path) as doc:
+                comment = GradeFileProcessor._extract_comment_from_lab_report(doc)
 
             if comment and comment.strip():
                 # 有评价，验证通过
@@ -576,7 +584,7 @@ class GradeFileProcessor:
             return False, f"验证评价时出错: {str(e)}"
 
     @staticmethod
-    def _extract_grade_from_homework(doc: Document) -> Optional[str]:
+    def _extract_grade_from_homework(doc: StreamDocument) -> Optional[str]:
         """从普通作业提取成绩"""
         return extract_grade_from_homework_doc(doc)
 
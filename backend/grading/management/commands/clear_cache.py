@@ -104,3 +104,9 @@ class Command(BaseCommand):
         self.stdout.write(f"  性能阈值:")
         for key, value in stats["thresholds"].items():
             self.stdout.write(f"    - {key}: {value}")
+        self.stdout.write(f"  命名空间:")
+        for scope, counters in stats["namespaces"].items():
+            self.stdout.write(
+                f"    - {scope}: 版本 {counters['version']}, "
+                f"写入 {counters['writes']}, 失效 {counters['invalidations']}"
+            )
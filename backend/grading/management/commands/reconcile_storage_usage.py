@@ -0,0 +1,41 @@
+"""
+存储空间对账管理命令
+
+以磁盘为准重算仓库与学生的存储空间计数，修正在应用之外修改仓库文件造成的偏差。
+建议通过 cron 定期执行，例如每小时一次；请求中新建的汇总行尚未对账，
+可以用 --pending 更频繁地（例如每几分钟）只对账这些仓库。
+
+用法:
+    python manage.py reconcile_storage_usage                     # 所有激活的本地仓库
+    python manage.py reconcile_storage_usage --tenant 1          # 指定租户
+    python manage.py reconcile_storage_usage --repository 3 5    # 指定仓库
+    python manage.py reconcile_storage_usage --pending           # 只对账尚未对账的仓库
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from grading.models import Tenant
+from grading.services.storage_usage import StorageUsageService
+
+
+class Command(BaseCommand):
+    help = "重算仓库与学生的存储空间计数"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="只对账该租户的仓库")
+        parser.add_argument("--repository", type=int, nargs="+", help="只对账这些仓库")
+        parser.add_argument("--pending", action="store_true", help="只对账尚未对账的仓库")
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options["tenant"]:
+            tenant = Tenant.objects.filter(id=options["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"租户不存在: {options['tenant']}")
+
+        count = StorageUsageService().reconcile_all(
+            tenant=tenant,
+            repository_ids=options["repository"],
+            pending_only=options["pending"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"✓ 已完成 {count} 个仓库的存储空间对账"))
@@ -0,0 +1,46 @@
+"""
+仓库文件目录刷新管理命令
+
+增量刷新本地仓库的文件目录（RepositoryCatalog），并标记为当前。
+运行 watch_repository_caches 时目录由监听器保持同步，无需执行本命令；
+未运行监听器时建议通过 cron 定期执行，间隔小于 REPOSITORY_CATALOG_MAX_AGE_SECONDS，
+否则目录过期后请求会回退到直接读取文件系统。
+
+用法:
+    python manage.py refresh_repository_catalogs                     # 所有激活的本地仓库
+    python manage.py refresh_repository_catalogs --repository 3 5    # 指定仓库
+    python manage.py refresh_repository_catalogs --full              # 重新列出所有目录
+"""
+
+from django.core.management.base import BaseCommand
+
+from grading.models import Repository
+from grading.services.repository_catalog import RepositoryCatalog
+
+
+class Command(BaseCommand):
+    help = "增量刷新本地仓库的文件目录"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repository", type=int, nargs="+", help="只刷新这些仓库")
+        parser.add_argument(
+            "--full", action="store_true", help="重新列出所有目录（默认只列出 mtime 变化的目录）"
+        )
+
+    def handle(self, *args, **options):
+        repositories = Repository.objects.filter(is_active=True, repo_type="filesystem")
+        if options["repository"]:
+            repositories = repositories.filter(id__in=options["repository"])
+
+        count = 0
+        for repository in repositories.select_related("owner", "tenant"):
+            try:
+                stats = RepositoryCatalog(repository).refresh(full=options["full"])
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"✗ 刷新失败: {repository.name} - {e}"))
+                RepositoryCatalog.mark_stale(repository)
+                continue
+            count += 1
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  {repository.name}: {stats}")
+        self.stdout.write(self.style.SUCCESS(f"✓ 已刷新 {count} 个仓库的文件目录"))
@@ -0,0 +1,56 @@
+"""
+仓库缓存监听管理命令
+
+监听本地仓库目录的文件变化，精确清除受影响路径的目录树、文件数量和文件内容缓存。
+运行该命令时可以通过 CACHE_WATCHED_PATH_TIMEOUT 大幅延长仓库所有者作用域中这些缓存的过期时间，
+其他用户查看同一仓库时的缓存不由监听器失效，仍使用默认过期时间。
+
+用法:
+    python manage.py watch_repository_caches                 # inotify（不可用时自动轮询）
+    python manage.py watch_repository_caches --polling       # 强制轮询
+    python manage.py watch_repository_caches --interval 5    # 轮询间隔（秒）
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from grading.services.filesystem_watcher import InotifyWatcher, RepositoryCacheWatcher
+
+
+class Command(BaseCommand):
+    help = "监听仓库目录变化并精确失效缓存"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--polling",
+            action="store_true",
+            help="强制使用轮询（默认在 Linux 上使用 inotify）",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "CACHE_WATCHER_POLL_INTERVAL", 2.0),
+            help="轮询间隔（秒）",
+        )
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            default=getattr(settings, "CACHE_WATCHER_DEBOUNCE", 0.5),
+            help="事件合并窗口（秒）",
+        )
+
+    def handle(self, *args, **options):
+        watcher = RepositoryCacheWatcher(
+            polling=options["polling"],
+            interval=options["interval"],
+            debounce=options["debounce"],
+        )
+        mode = "inotify" if isinstance(watcher.watcher, InotifyWatcher) else "轮询"
+        watcher.reload()
+        self.stdout.write(f"开始监听 {len(watcher.roots)} 个仓库目录（{mode}），按 Ctrl+C 停止")
+
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
+            self.stdout.write(self.style.SUCCESS("✓ 已停止监听"))
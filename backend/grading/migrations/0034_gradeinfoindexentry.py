@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grading", "0033_assignment_setting"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GradeInfoIndexEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("path_hash", models.CharField(help_text="文件绝对路径的 SHA-256（用于唯一索引）", max_length=64, unique=True)),
+                ("file_path", models.TextField(help_text="文件绝对路径")),
+                ("mtime_ns", models.BigIntegerField(help_text="解析时文件的 st_mtime_ns")),
+                ("file_size", models.BigIntegerField(help_text="解析时文件的 st_size")),
+                ("grade_info", models.JSONField(default=dict, help_text="解析得到的评分信息")),
+                ("parsed_at", models.DateTimeField(auto_now=True, help_text="解析时间")),
+            ],
+            options={
+                "verbose_name": "评分信息索引",
+                "verbose_name_plural": "评分信息索引",
+                "db_table": "grading_grade_info_index",
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("grading", "0034_gradeinfoindexentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AIScoringJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("directory", "目录批量评分"), ("advanced", "作业批量评分（按班级评分类型）")], default="directory", help_text="任务类型", max_length=20)),
+                ("base_dir", models.TextField(help_text="评分目录或仓库根目录")),
+                ("course_name", models.CharField(blank=True, help_text="课程名称", max_length=255)),
+                ("status", models.CharField(choices=[("pending", "等待中"), ("running", "处理中"), ("success", "已完成"), ("error", "失败")], default="pending", help_text="任务状态", max_length=20)),
+                ("total_files", models.IntegerField(default=0, help_text="总文件数")),
+                ("processed_files", models.IntegerField(default=0, help_text="已处理文件数")),
+                ("success_files", models.IntegerField(default=0, help_text="成功文件数")),
+                ("failed_files", models.IntegerField(default=0, help_text="失败文件数")),
+                ("skipped_files", models.IntegerField(default=0, help_text="跳过文件数")),
+                ("current_file", models.CharField(blank=True, help_text="正在处理的文件", max_length=255, null=True)),
+                ("message", models.TextField(blank=True, help_text="任务消息")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("repository", models.ForeignKey(blank=True, help_text="所属仓库", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="ai_scoring_jobs", to="grading.repository")),
+                ("user", models.ForeignKey(help_text="发起用户", on_delete=django.db.models.deletion.CASCADE, related_name="ai_scoring_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "批量AI评分任务",
+                "verbose_name_plural": "批量AI评分任务",
+                "db_table": "grading_ai_scoring_job",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AIScoringJobItem",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("file_path", models.TextField(help_text="文件绝对路径")),
+                ("status", models.CharField(choices=[("pending", "等待中"), ("running", "处理中"), ("success", "成功"), ("failed", "失败"), ("skipped", "跳过")], default="pending", help_text="处理状态", max_length=20)),
+                ("grade", models.CharField(blank=True, help_text="评分等级", max_length=20, null=True)),
+                ("score", models.IntegerField(blank=True, help_text="AI评分分数", null=True)),
+                ("comment", models.TextField(blank=True, help_text="AI评价")),
+                ("message", models.TextField(blank=True, help_text="处理消息")),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("job", models.ForeignKey(help_text="所属任务", on_delete=django.db.models.deletion.CASCADE, related_name="items", to="grading.aiscoringjob")),
+            ],
+            options={
+                "verbose_name": "批量AI评分任务文件",
+                "verbose_name_plural": "批量AI评分任务文件",
+                "db_table": "grading_ai_scoring_job_item",
+                "indexes": [models.Index(fields=["job", "status"], name="grading_ai__job_id_e6c696_idx")],
+            },
+        ),
+    ]
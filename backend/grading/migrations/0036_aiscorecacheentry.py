@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grading", "0035_aiscoringjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AIScoreCacheEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("content_key", models.CharField(help_text="规范化文本 + 模型 + 提示词版本的 SHA-256", max_length=64, unique=True)),
+                ("model_name", models.CharField(help_text="AI模型名称", max_length=100)),
+                ("prompt_version", models.IntegerField(help_text="提示词版本")),
+                ("score", models.IntegerField(help_text="AI评分分数")),
+                ("comment", models.TextField(blank=True, help_text="AI回复原文")),
+                ("hit_count", models.IntegerField(default=0, help_text="命中次数")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("expires_at", models.DateTimeField(db_index=True, help_text="过期时间")),
+            ],
+            options={
+                "verbose_name": "AI评分缓存",
+                "verbose_name_plural": "AI评分缓存",
+                "db_table": "grading_ai_score_cache",
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grading", "0036_aiscorecacheentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RegistrySyncManifest",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("manifest_key", models.CharField(help_text="登分册标识（本地为绝对路径，远程仓库为仓库内路径）的 SHA-256", max_length=64)),
+                ("registry_path", models.TextField(help_text="登分册标识")),
+                ("homework_number", models.IntegerField(help_text="作业批次")),
+                ("registry_mtime_ns", models.BigIntegerField(default=0, help_text="上次写入后登分册的 st_mtime_ns")),
+                ("registry_size", models.BigIntegerField(default=0, help_text="上次写入后登分册的 st_size")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "登分册同步清单",
+                "verbose_name_plural": "登分册同步清单",
+                "db_table": "grading_registry_sync_manifest",
+                "unique_together": {("manifest_key", "homework_number")},
+            },
+        ),
+        migrations.CreateModel(
+            name="RegistrySyncEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("path_hash", models.CharField(help_text="相对作业目录路径的 SHA-256", max_length=64)),
+                ("file_path", models.TextField(help_text="相对作业目录的文件路径")),
+                ("mtime_ns", models.BigIntegerField(help_text="解析时文件的 st_mtime_ns")),
+                ("file_size", models.BigIntegerField(help_text="解析时文件的 st_size")),
+                ("content_hash", models.CharField(help_text="文件内容的 SHA-256", max_length=64)),
+                ("extracted", models.JSONField(default=dict, help_text="解析结果（学生姓名、评价校验、成绩）")),
+                ("written_grade", models.CharField(blank=True, help_text="上次写入（或已一致）的成绩", max_length=50, null=True)),
+                ("status", models.CharField(choices=[("success", "已写入"), ("skipped", "成绩相同"), ("failed", "失败")], max_length=20)),
+                ("error_message", models.TextField(blank=True, default="")),
+                ("manifest", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="entries", to="grading.registrysyncmanifest")),
+            ],
+            options={
+                "verbose_name": "登分册同步清单条目",
+                "verbose_name_plural": "登分册同步清单条目",
+                "db_table": "grading_registry_sync_entry",
+                "unique_together": {("manifest", "path_hash")},
+            },
+        ),
+    ]
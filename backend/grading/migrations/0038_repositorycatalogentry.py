@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grading", "0037_registrysyncmanifest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositoryCatalogEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("path_hash", models.CharField(help_text="仓库内相对路径的 SHA-256", max_length=64)),
+                ("path", models.TextField(help_text="仓库内相对路径（/ 分隔，根目录为空）")),
+                ("parent_hash", models.CharField(blank=True, default="", help_text="上级目录相对路径的 SHA-256", max_length=64)),
+                ("name", models.CharField(help_text="文件或目录名", max_length=255)),
+                ("is_dir", models.BooleanField(default=False)),
+                ("depth", models.IntegerField(default=0, help_text="路径层级（课程目录为 1）")),
+                ("size", models.BigIntegerField(default=0, help_text="文件大小（目录为 0）")),
+                ("mtime_ns", models.BigIntegerField(default=0, help_text="扫描时的 st_mtime_ns")),
+                ("extension", models.CharField(blank=True, default="", help_text="小写扩展名", max_length=20)),
+                ("course_name", models.CharField(blank=True, default="", max_length=255)),
+                ("class_name", models.CharField(blank=True, default="", max_length=255)),
+                ("homework_name", models.CharField(blank=True, default="", max_length=255)),
+                ("student_name", models.CharField(blank=True, default="", max_length=100)),
+                ("scanned_at", models.DateTimeField(auto_now=True)),
+                ("grade_index", models.ForeignKey(blank=True, help_text="评分信息索引条目", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="+", to="grading.gradeinfoindexentry")),
+                ("repository", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="catalog_entries", to="grading.repository")),
+            ],
+            options={
+                "verbose_name": "仓库文件目录",
+                "verbose_name_plural": "仓库文件目录",
+                "db_table": "grading_repository_catalog",
+                "unique_together": {("repository", "path_hash")},
+                "indexes": [
+                    models.Index(fields=["repository", "parent_hash"], name="grading_rep_reposit_a2abb7_idx"),
+                    models.Index(fields=["repository", "is_dir", "depth"], name="grading_rep_reposit_4e416a_idx"),
+                    models.Index(fields=["repository", "course_name", "homework_name"], name="grading_rep_reposit_6824a4_idx"),
+                ],
+            },
+        ),
+    ]
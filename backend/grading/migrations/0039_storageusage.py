@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("grading", "0038_repositorycatalogentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StorageUsage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("used_bytes", models.BigIntegerField(default=0, help_text="已使用空间（字节）")),
+                ("file_count", models.IntegerField(default=0, help_text="文件数量")),
+                ("reconciled_at", models.DateTimeField(blank=True, help_text="最近一次对账时间", null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("repository", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="storage_usages", to="grading.repository")),
+                ("student", models.ForeignKey(blank=True, help_text="学生（为空表示仓库汇总）", null=True, on_delete=django.db.models.deletion.CASCADE, related_name="storage_usages", to=settings.AUTH_USER_MODEL)),
+                ("tenant", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="storage_usages", to="grading.tenant")),
+            ],
+            options={
+                "verbose_name": "存储空间用量",
+                "verbose_name_plural": "存储空间用量",
+                "db_table": "grading_storage_usage",
+                "indexes": [
+                    models.Index(fields=["tenant", "student"], name="grading_sto_tenant__c8fbae_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(fields=("repository", "student"), name="unique_storage_usage_student"),
+                    models.UniqueConstraint(condition=models.Q(("student__isnull", True)), fields=("repository",), name="unique_storage_usage_repository"),
+                ],
+            },
+        ),
+    ]
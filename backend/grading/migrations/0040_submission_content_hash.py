@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grading", "0039_storageusage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", help_text="文件内容 SHA-256（内容寻址存储键）", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(fields=["content_hash"], name="grading_sub_content_4c53ed_idx"),
+        ),
+    ]
@@ -329,6 +329,9 @@ class Submission(models.Model):
     file_path = models.CharField(max_length=500, help_text="文件路径")
     file_name = models.CharField(max_length=200, help_text="文件名")
     file_size = models.IntegerField(default=0, help_text="文件大小（字节）")
+    content_hash = models.CharField(
+        max_length=64, blank=True, default="", help_text="文件内容 SHA-256（内容寻址存储键）"
+    )
     submitted_at = models.DateTimeField(auto_now_add=True, help_text="提交时间")
     version = models.IntegerField(default=1, help_text="版本号")
     graded_at = models.DateTimeField(null=True, blank=True, help_text="评分时间")
@@ -345,6 +348,7 @@ class Submission(models.Model):
             models.Index(fields=["repository", "-submitted_at"]),
             models.Index(fields=["tenant", "-submitted_at"]),
             models.Index(fields=["student", "-submitted_at"]),
+            models.Index(fields=["content_hash"]),
         ]
 
     def __str__(self):
@@ -391,6 +395,360 @@ class FileGradeStatus(models.Model):
         return f"{self.repository_id}:{self.file_path}"
 
 
+class GradeInfoIndexEntry(models.Model):
+    """文件评分信息索引 - 按 (路径, mtime_ns, 大小) 缓存解析结果
+
+    文件内容未变化（stat 一致）时直接复用解析结果，避免重复打开 Word 文档。
+    """
+
+    path_hash = models.CharField(
+        max_length=64, unique=True, help_text="文件绝对路径的 SHA-256（用于唯一索引）"
+    )
+    file_path = models.TextField(help_text="文件绝对路径")
+    mtime_ns = models.BigIntegerField(help_text="解析时文件的 st_mtime_ns")
+    file_size = models.BigIntegerField(help_text="解析时文件的 st_size")
+    grade_info = models.JSONField(default=dict, help_text="解析得到的评分信息")
+    parsed_at = models.DateTimeField(auto_now=True, help_text="解析时间")
+
+    class Meta:
+        db_table = "grading_grade_info_index"
+        verbose_name = "评分信息索引"
+        verbose_name_plural = "评分信息索引"
+
+    def __str__(self):
+        return self.file_path
+
+
+class RepositoryCatalogEntry(models.Model):
+    """仓库文件目录 - 本地仓库中每个文件和目录的元数据
+
+    由 RepositoryCatalog 增量维护：只重新扫描 mtime 变化的目录，
+    列表、计数和空间统计通过索引查询完成，不再遍历文件系统。
+    """
+
+    repository = models.ForeignKey(
+        Repository, on_delete=models.CASCADE, related_name="catalog_entries"
+    )
+    path_hash = models.CharField(max_length=64, help_text="仓库内相对路径的 SHA-256")
+    path = models.TextField(help_text="仓库内相对路径（/ 分隔，根目录为空）")
+    parent_hash = models.CharField(
+        max_length=64, blank=True, default="", help_text="上级目录相对路径的 SHA-256"
+    )
+    name = models.CharField(max_length=255, help_text="文件或目录名")
+    is_dir = models.BooleanField(default=False)
+    depth = models.IntegerField(default=0, help_text="路径层级（课程目录为 1）")
+    size = models.BigIntegerField(default=0, help_text="文件大小（目录为 0）")
+    mtime_ns = models.BigIntegerField(default=0, help_text="扫描时的 st_mtime_ns")
+    extension = models.CharField(max_length=20, blank=True, default="", help_text="小写扩展名")
+    course_name = models.CharField(max_length=255, blank=True, default="")
+    class_name = models.CharField(max_length=255, blank=True, default="")
+    homework_name = models.CharField(max_length=255, blank=True, default="")
+    student_name = models.CharField(max_length=100, blank=True, default="")
+    grade_index = models.ForeignKey(
+        GradeInfoIndexEntry,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="评分信息索引条目",
+    )
+    scanned_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "grading_repository_catalog"
+        unique_together = ["repository", "path_hash"]
+        indexes = [
+            models.Index(fields=["repository", "parent_hash"]),
+            models.Index(fields=["repository", "is_dir", "depth"]),
+            models.Index(fields=["repository", "course_name", "homework_name"]),
+        ]
+        verbose_name = "仓库文件目录"
+        verbose_name_plural = "仓库文件目录"
+
+    def __str__(self):
+        return f"{self.repository_id}:{self.path or '/'}"
+
+
+class StorageUsage(models.Model):
+    """存储空间用量计数 - 每个仓库一行汇总（student 为空），另有每个学生一行
+
+    保存和删除文件时按字节增量更新，定期对账任务修正偏差。
+    """
+
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="storage_usages", null=True, blank=True
+    )
+    repository = models.ForeignKey(
+        "Repository", on_delete=models.CASCADE, related_name="storage_usages"
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="storage_usages",
+        null=True,
+        blank=True,
+        help_text="学生（为空表示仓库汇总）",
+    )
+    used_bytes = models.BigIntegerField(default=0, help_text="已使用空间（字节）")
+    file_count = models.IntegerField(default=0, help_text="文件数量")
+    reconciled_at = models.DateTimeField(null=True, blank=True, help_text="最近一次对账时间")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "grading_storage_usage"
+        verbose_name = "存储空间用量"
+        verbose_name_plural = "存储空间用量"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["repository", "student"], name="unique_storage_usage_student"
+            ),
+            models.UniqueConstraint(
+                fields=["repository"],
+                condition=models.Q(student__isnull=True),
+                name="unique_storage_usage_repository",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["tenant", "student"]),
+        ]
+
+    def __str__(self):
+        return f"{self.repository_id}:{self.student_id or '*'} {self.used_bytes}B"
+
+
+class AIScoringJob(models.Model):
+    """批量AI评分任务 - 请求立即返回任务 ID，文件由后台线程池处理"""
+
+    KIND_DIRECTORY = "directory"
+    KIND_ADVANCED = "advanced"
+    KIND_CHOICES = [
+        (KIND_DIRECTORY, "目录批量评分"),
+        (KIND_ADVANCED, "作业批量评分（按班级评分类型）"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCESS = "success"
+    STATUS_ERROR = "error"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "等待中"),
+        (STATUS_RUNNING, "处理中"),
+        (STATUS_SUCCESS, "已完成"),
+        (STATUS_ERROR, "失败"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="ai_scoring_jobs", help_text="发起用户"
+    )
+    repository = models.ForeignKey(
+        "Repository",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="ai_scoring_jobs",
+        help_text="所属仓库",
+    )
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, default=KIND_DIRECTORY, help_text="任务类型"
+    )
+    base_dir = models.TextField(help_text="评分目录或仓库根目录")
+    course_name = models.CharField(max_length=255, blank=True, help_text="课程名称")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, help_text="任务状态"
+    )
+    total_files = models.IntegerField(default=0, help_text="总文件数")
+    processed_files = models.IntegerField(default=0, help_text="已处理文件数")
+    success_files = models.IntegerField(default=0, help_text="成功文件数")
+    failed_files = models.IntegerField(default=0, help_text="失败文件数")
+    skipped_files = models.IntegerField(default=0, help_text="跳过文件数")
+    current_file = models.CharField(max_length=255, null=True, blank=True, help_text="正在处理的文件")
+    message = models.TextField(blank=True, help_text="任务消息")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "grading_ai_scoring_job"
+        verbose_name = "批量AI评分任务"
+        verbose_name_plural = "批量AI评分任务"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.base_dir} - {self.status}"
+
+    def progress(self, include_details: bool = True) -> dict:
+        """进度信息（字段与 BatchGradeProgressTracker 一致）"""
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total_files,
+            "processed": self.processed_files,
+            "success": self.success_files,
+            "failed": self.failed_files,
+            "skipped": self.skipped_files,
+            "current_file": self.current_file,
+            "message": self.message,
+        }
+        if include_details:
+            data["details"] = [
+                item.to_detail()
+                for item in self.items.exclude(
+                    status__in=[AIScoringJobItem.STATUS_PENDING, AIScoringJobItem.STATUS_RUNNING]
+                ).order_by("id")
+            ]
+        return data
+
+
+class AIScoringJobItem(models.Model):
+    """批量AI评分任务中的单个文件"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCESS = "success"
+    STATUS_FAILED = "failed"
+    STATUS_SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "等待中"),
+        (STATUS_RUNNING, "处理中"),
+        (STATUS_SUCCESS, "成功"),
+        (STATUS_FAILED, "失败"),
+        (STATUS_SKIPPED, "跳过"),
+    ]
+    FINAL_STATUSES = (STATUS_SUCCESS, STATUS_FAILED, STATUS_SKIPPED)
+
+    job = models.ForeignKey(
+        AIScoringJob, on_delete=models.CASCADE, related_name="items", help_text="所属任务"
+    )
+    file_path = models.TextField(help_text="文件绝对路径")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, help_text="处理状态"
+    )
+    grade = models.CharField(max_length=20, null=True, blank=True, help_text="评分等级")
+    score = models.IntegerField(null=True, blank=True, help_text="AI评分分数")
+    comment = models.TextField(blank=True, help_text="AI评价")
+    message = models.TextField(blank=True, help_text="处理消息")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "grading_ai_scoring_job_item"
+        verbose_name = "批量AI评分任务文件"
+        verbose_name_plural = "批量AI评分任务文件"
+        indexes = [models.Index(fields=["job", "status"])]
+
+    def __str__(self):
+        return f"{self.file_path} - {self.status}"
+
+    @property
+    def file_name(self) -> str:
+        return os.path.basename(self.file_path)
+
+    def to_detail(self) -> dict:
+        detail = {"file": self.file_name, "status": self.status}
+        if self.status == self.STATUS_SUCCESS:
+            comment = self.comment
+            detail.update(
+                {
+                    "grade": self.grade,
+                    "score": self.score,
+                    "comment": comment[:50] + "..." if len(comment) > 50 else comment,
+                }
+            )
+            if self.message:
+                detail["warning"] = self.message
+        else:
+            detail["message"] = self.message
+        return detail
+
+
+class AIScoreCacheEntry(models.Model):
+    """AI评分结果缓存 - 按 (规范化文本, 模型, 提示词版本) 的哈希缓存
+
+    内容相同的作业（重复提交、重新运行批量评分）直接复用评分结果，不再调用AI服务。
+    """
+
+    content_key = models.CharField(
+        max_length=64, unique=True, help_text="规范化文本 + 模型 + 提示词版本的 SHA-256"
+    )
+    model_name = models.CharField(max_length=100, help_text="AI模型名称")
+    prompt_version = models.IntegerField(help_text="提示词版本")
+    score = models.IntegerField(help_text="AI评分分数")
+    comment = models.TextField(blank=True, help_text="AI回复原文")
+    hit_count = models.IntegerField(default=0, help_text="命中次数")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, help_text="过期时间")
+
+    class Meta:
+        db_table = "grading_ai_score_cache"
+        verbose_name = "AI评分缓存"
+        verbose_name_plural = "AI评分缓存"
+
+    def __str__(self):
+        return f"{self.model_name} v{self.prompt_version} - {self.score}"
+
+
+class RegistrySyncManifest(models.Model):
+    """登分册同步清单 - 每个 (登分册, 作业批次) 一份
+
+    记录上次批量登分后登分册文件的 stat，登分册与源文件都未变化时无需重新加载登分册。
+    """
+
+    manifest_key = models.CharField(
+        max_length=64, help_text="登分册标识（本地为绝对路径，远程仓库为仓库内路径）的 SHA-256"
+    )
+    registry_path = models.TextField(help_text="登分册标识")
+    homework_number = models.IntegerField(help_text="作业批次")
+    registry_mtime_ns = models.BigIntegerField(default=0, help_text="上次写入后登分册的 st_mtime_ns")
+    registry_size = models.BigIntegerField(default=0, help_text="上次写入后登分册的 st_size")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "grading_registry_sync_manifest"
+        unique_together = ["manifest_key", "homework_number"]
+        verbose_name = "登分册同步清单"
+        verbose_name_plural = "登分册同步清单"
+
+    def __str__(self):
+        return f"{self.registry_path} - 第{self.homework_number}次作业"
+
+
+class RegistrySyncEntry(models.Model):
+    """登分册同步清单条目 - 单个源文件的 stat、内容哈希、解析结果与上次写入的成绩"""
+
+    STATUS_SUCCESS = "success"
+    STATUS_SKIPPED = "skipped"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_SUCCESS, "已写入"),
+        (STATUS_SKIPPED, "成绩相同"),
+        (STATUS_FAILED, "失败"),
+    ]
+
+    manifest = models.ForeignKey(
+        RegistrySyncManifest, on_delete=models.CASCADE, related_name="entries"
+    )
+    path_hash = models.CharField(max_length=64, help_text="相对作业目录路径的 SHA-256")
+    file_path = models.TextField(help_text="相对作业目录的文件路径")
+    mtime_ns = models.BigIntegerField(help_text="解析时文件的 st_mtime_ns")
+    file_size = models.BigIntegerField(help_text="解析时文件的 st_size")
+    content_hash = models.CharField(max_length=64, help_text="文件内容的 SHA-256")
+    extracted = models.JSONField(default=dict, help_text="解析结果（学生姓名、评价校验、成绩）")
+    written_grade = models.CharField(
+        max_length=50, null=True, blank=True, help_text="上次写入（或已一致）的成绩"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    error_message = models.TextField(blank=True, default="")
+
+    class Meta:
+        db_table = "grading_registry_sync_entry"
+        unique_together = ["manifest", "path_hash"]
+        verbose_name = "登分册同步清单条目"
+        verbose_name_plural = "登分册同步清单条目"
+
+    def __str__(self):
+        return f"{self.file_path} - {self.status}"
+
+
 class GradeTypeConfig(models.Model):
     """评分类型配置模型 - 支持多租户"""
 
@@ -0,0 +1,121 @@
+"""
+AI评分结果缓存模块
+
+学生经常提交相同或几乎相同的文档，教师也会在部分失败后重新运行批量评分。
+本模块把评分结果按 (规范化文本, 模型, 提示词版本) 的哈希存入数据库：
+- 文本规范化：Unicode NFKC + 合并空白，排版差异不影响命中
+- 只缓存成功解析出分数的结果
+- 条目带过期时间，写入时定期清理过期条目
+
+配置（settings）：
+- AI_SCORE_CACHE_TTL_SECONDS: 缓存有效期（秒），默认 30 天
+
+使用示例：
+    cache = AIScoreCache()
+    key = cache.key(content, model="deepseek-r1-250528", prompt_version=1)
+    hit = cache.get(key)          # (分数, 评价) 或 None
+    cache.set(key, 85, "分数：85分...", model="deepseek-r1-250528", prompt_version=1)
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from grading.models import AIScoreCacheEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# 过期条目清理间隔（秒）
+PRUNE_INTERVAL_SECONDS = 60 * 60
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(content: str) -> str:
+    """规范化作业文本：NFKC + 合并连续空白"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", content)).strip()
+
+
+class AIScoreCache:
+    """数据库AI评分缓存"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        if ttl_seconds is None:
+            ttl_seconds = int(getattr(settings, "AI_SCORE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self.ttl_seconds = ttl_seconds
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: str, model: str, prompt_version: int) -> str:
+        """计算缓存键"""
+        data = f"{model}\0{prompt_version}\0{normalize_text(content)}"
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[int, str]]:
+        """读取单个缓存条目"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[int, str]]:
+        """批量读取未过期的缓存条目"""
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        entries = AIScoreCacheEntry.objects.filter(
+            content_key__in=keys, expires_at__gt=timezone.now()
+        ).values_list("content_key", "score", "comment")
+        hits = {key: (score, comment) for key, score, comment in entries}
+        if hits:
+            AIScoreCacheEntry.objects.filter(content_key__in=list(hits)).update(
+                hit_count=F("hit_count") + 1
+            )
+            logger.info(f"AI评分缓存命中: {len(hits)}/{len(keys)}")
+        return hits
+
+    def set(self, key: str, score: int, comment: str, model: str, prompt_version: int) -> None:
+        """写入缓存条目（已存在时覆盖并续期）"""
+        expires_at = timezone.now() + timedelta(seconds=self.ttl_seconds)
+        defaults = {
+            "model_name": model,
+            "prompt_version": prompt_version,
+            "score": score,
+            "comment": comment,
+            "expires_at": expires_at,
+        }
+        try:
+            AIScoreCacheEntry.objects.update_or_create(content_key=key, defaults=defaults)
+        except IntegrityError:
+            # 并发写入同一条目，另一方已创建
+            AIScoreCacheEntry.objects.filter(content_key=key).update(**defaults)
+        self._maybe_prune()
+
+    def prune(self) -> int:
+        """删除过期条目
+
+        Returns:
+            删除的条目数
+        """
+        deleted, _ = AIScoreCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        if deleted:
+            logger.info(f"清理过期AI评分缓存: {deleted} 条")
+        return deleted
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._last_prune and now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+        self.prune()
@@ -0,0 +1,251 @@
+"""
+AI评分客户端模块
+
+volcengine_score_homework 过去每次调用都新建 httpx.Client、传输层和 Ark 客户端，
+并在调用前做 DNS 探测，批量评分时每个文件都要重新握手。本模块提供进程级客户端：
+- 同步 Ark 客户端与 httpx 连接池在进程内复用（keep-alive），首次使用时创建
+- 批量评分的工作线程共享同一个令牌桶限流器（见 ai_scoring_jobs.get_api_rate_limiter）
+- 评分结果按规范化文本哈希缓存（见 ai_score_cache），相同文本并发请求时只调用一次AI服务
+
+配置（settings）：
+- AI_SCORING_MAX_CONNECTIONS: 连接池大小，默认 8
+- AI_SCORE_CACHE_TTL_SECONDS: 评分结果缓存有效期（秒），默认 30 天
+
+使用示例：
+    client = get_scoring_client()
+    score, comment = client.score(content)
+"""
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+from grading.services.ai_score_cache import AIScoreCache
+from grading.services.ai_scoring_jobs import TokenBucket, get_api_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+try:
+    from volcenginesdkarkruntime import Ark
+
+    ARK_AVAILABLE = True
+except ImportError:
+    ARK_AVAILABLE = False
+
+DEFAULT_MODEL = "deepseek-r1-250528"
+
+# 提示词版本，修改 build_scoring_prompt 时递增，使旧的缓存结果失效
+PROMPT_VERSION = 1
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 3
+
+_UUID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# 从AI回复中提取分数的模式，按优先级排列
+SCORE_PATTERNS = [
+    r"分数[:：]?\s*(\d{1,3})\s*分",
+    r"得分[:：]?\s*(\d{1,3})",
+    r"成绩[:：]?\s*(\d{1,3})",
+    r"Score[:：]?\s*(\d{1,3})",
+    r"(\d{1,3})\s*/\s*100",
+    r"(\d{1,3})\s*points",
+    r"(\d{1,3})\s*out of\s*100",
+]
+
+
+def build_scoring_prompt(content: str) -> str:
+    """构建评分提示词：强制模型以固定的两行格式返回，便于稳定解析"""
+    return (
+        "请作为严格的批改老师，对以下作业给出评分与评价。\n"
+        "要求：\n"
+        "1. 只按照如下格式输出，两行，不要添加其他内容；\n"
+        "2. 分数为0-100的整数；\n"
+        "3. 评价不超过50字。\n"
+        "格式：\n"
+        "分数：<整数>分\n"
+        "评价：<不超过50字>\n\n"
+        f"{content}"
+    )
+
+
+def parse_score(result: str) -> Optional[int]:
+    """从AI回复中提取 0-100 的分数，未找到时返回 None"""
+    for pattern in SCORE_PATTERNS:
+        match = re.search(pattern, result, flags=re.IGNORECASE)
+        if match:
+            candidate = int(match.group(1))
+            if 0 <= candidate <= 100:
+                return candidate
+    return None
+
+
+class AIScoringClient:
+    """复用连接池的火山引擎评分客户端"""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = DEFAULT_MODEL,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        rate_limiter: Optional[TokenBucket] = None,
+        cache: Optional[AIScoreCache] = None,
+    ):
+        """初始化客户端（不会立即建立连接）
+
+        Args:
+            api_key: Ark API 密钥
+            model: 模型名称
+            max_connections: 连接池大小
+            timeout: 请求超时（秒）
+            max_retries: SDK 重试次数
+            rate_limiter: 限流器，为 None 时不限流
+            cache: 评分结果缓存，为 None 时不缓存
+        """
+        self.api_key = api_key
+        self.model = model
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._client = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+        if not _UUID_PATTERN.match(api_key):
+            logger.warning("API密钥格式可能不正确，请检查是否为有效的火山引擎API密钥")
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # 与旧实现一致：禁用SSL验证，传输层重试 3 次
+                    transport = httpx.HTTPTransport(verify=False, retries=3, limits=self._limits())
+                    http_client = httpx.Client(transport=transport, timeout=self.timeout)
+                    self._client = Ark(
+                        api_key=self.api_key,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                        http_client=http_client,
+                    )
+                    logger.info(
+                        f"创建AI评分客户端: 模型={self.model}, 连接池={self.max_connections}"
+                    )
+        return self._client
+
+    def _messages(self, content: str) -> list:
+        return [{"content": build_scoring_prompt(content), "role": "user"}]
+
+    def cache_key(self, content: str) -> str:
+        return AIScoreCache.key(content, self.model, PROMPT_VERSION)
+
+    def score(self, content: str) -> Tuple[Optional[int], str]:
+        """同步评分（优先读取缓存；相同文本的并发请求只调用一次AI服务）
+
+        Returns:
+            (分数, AI回复原文)；调用失败时为 (None, "")
+        """
+        key = self.cache_key(content)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached:
+                return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            logger.info("相同内容正在评分，等待结果")
+            return future.result()
+
+        try:
+            result = self._score_uncached(content)
+            if self.cache and result[0] is not None:
+                self.cache.set(key, result[0], result[1], self.model, PROMPT_VERSION)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _score_uncached(self, content: str) -> Tuple[Optional[int], str]:
+        if self.rate_limiter:
+            wait_time = self.rate_limiter.acquire()
+            if wait_time > 0:
+                logger.info(f"API限流：等待 {wait_time:.2f} 秒")
+
+        try:
+            resp = self._get_client().chat.completions.create(
+                model=self.model, messages=self._messages(content)
+            )
+            result = resp.choices[0].message.content or ""
+        except Exception as e:
+            logger.error(f"调用火山引擎AI评分失败: {str(e)}")
+            result = ""
+        return parse_score(result), result
+
+    def close(self) -> None:
+        """关闭连接池"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client:
+            client.close()
+
+
+_scoring_client: Optional[AIScoringClient] = None
+_scoring_client_lock = threading.Lock()
+
+
+def get_scoring_client() -> Optional[AIScoringClient]:
+    """获取进程级评分客户端
+
+    API 密钥与模型从环境变量 ARK_API_KEY / ARK_MODEL 读取，变化时重新创建客户端。
+
+    Returns:
+        评分客户端；SDK 未安装或未配置密钥时返回 None
+    """
+    global _scoring_client
+    if not ARK_AVAILABLE:
+        return None
+    api_key = os.environ.get("ARK_API_KEY")
+    if not api_key:
+        return None
+    model = os.environ.get("ARK_MODEL", DEFAULT_MODEL)
+
+    with _scoring_client_lock:
+        client = _scoring_client
+        if client is None or client.api_key != api_key or client.model != model:
+            if client is not None:
+                client.close()
+            client = AIScoringClient(
+                api_key=api_key,
+                model=model,
+                max_connections=int(
+                    getattr(settings, "AI_SCORING_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+                ),
+                rate_limiter=get_api_rate_limiter(),
+                cache=AIScoreCache(),
+            )
+            _scoring_client = client
+    return client
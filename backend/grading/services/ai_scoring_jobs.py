@@ -0,0 +1,321 @@
+"""
+批量AI评分任务服务模块
+
+批量AI评分不再在 HTTP 请求内逐个文件处理，而是：
+- 请求创建 AIScoringJob 及其 AIScoringJobItem 后立即返回任务 ID
+- 后台线程池并发处理各文件（文本提取、AI评分、写回），处理函数由调用方提供
+- 所有工作线程共享一个令牌桶限流器，保证对 AI 服务的请求速率不超过配置
+- 任务计数使用 F() 表达式原子更新，进度查询只需读取任务记录
+- 进程重启后未完成的任务在查询进度时重新排队（resume_if_orphaned）
+- 所有文件都失败的任务标记为失败，部分失败时在任务消息中说明
+
+配置（settings）：
+- AI_SCORING_WORKERS: 工作线程数，默认 4；0 表示在调用线程内同步执行
+- AI_SCORING_RATE_LIMIT: AI 服务每秒最大请求数，默认 2
+- AI_SCORING_STALE_SECONDS: 未完成任务多久没有进展视为中断，默认 300
+
+使用示例：
+    runner = AIScoringJobRunner(processor=process_item)
+    job = runner.create_job(user, file_paths, base_dir=base_dir)
+    runner.submit(job)
+    AIScoringJob.objects.get(id=job.id).progress()
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Max, Q, Value, When
+from django.utils import timezone
+
+from grading.models import AIScoringJob, AIScoringJobItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 2.0
+DEFAULT_STALE_SECONDS = 300
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器
+
+    令牌以 rate 个/秒的速度补充，最多积累 capacity 个；acquire 在令牌不足时等待。
+    与全局锁 + sleep 不同，等待期间不持有锁，多个工作线程可以并发排队。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """获取令牌，必要时等待
+
+        Returns:
+            等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 先扣减再等待：令牌可以为负，后来者按顺序排在更后面
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_api_rate_limiter: Optional[TokenBucket] = None
+_api_rate_limiter_lock = threading.Lock()
+
+
+def get_api_rate_limiter() -> TokenBucket:
+    """获取所有工作线程共享的 AI 服务限流器"""
+    global _api_rate_limiter
+    if _api_rate_limiter is None:
+        with _api_rate_limiter_lock:
+            if _api_rate_limiter is None:
+                rate = float(getattr(settings, "AI_SCORING_RATE_LIMIT", DEFAULT_RATE_LIMIT))
+                _api_rate_limiter = TokenBucket(rate)
+    return _api_rate_limiter
+
+
+class AIScoringJobRunner:
+    """批量AI评分任务执行器
+
+    processor(item) 处理单个文件并返回结果字典：
+        {"status": "success" | "failed" | "skipped", "message": str,
+         "grade": str, "score": int, "comment": str}
+    抛出的异常视为该文件失败，不影响其他文件。
+    """
+
+    def __init__(
+        self,
+        processor: Callable[[AIScoringJobItem], Dict],
+        max_workers: Optional[int] = None,
+    ):
+        self.processor = processor
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 本进程内已提交、尚未完成的任务
+        self._active_jobs: Set[int] = set()
+
+    @property
+    def max_workers(self) -> int:
+        if self._max_workers is not None:
+            return self._max_workers
+        return int(getattr(settings, "AI_SCORING_WORKERS", DEFAULT_WORKERS))
+
+    def create_job(
+        self,
+        user,
+        file_paths: Iterable[str],
+        base_dir: str,
+        kind: str = AIScoringJob.KIND_DIRECTORY,
+        repository=None,
+        course_name: str = "",
+    ) -> AIScoringJob:
+        """创建任务及其文件条目"""
+        file_paths = list(file_paths)
+        job = AIScoringJob.objects.create(
+            user=user,
+            kind=kind,
+            repository=repository,
+            base_dir=base_dir,
+            course_name=course_name or "",
+            total_files=len(file_paths),
+        )
+        AIScoringJobItem.objects.bulk_create(
+            [AIScoringJobItem(job=job, file_path=path) for path in file_paths]
+        )
+        logger.info(f"创建批量AI评分任务: job={job.id}, 文件数={len(file_paths)}")
+        return job
+
+    def submit(self, job: AIScoringJob) -> None:
+        """提交任务；工作线程数为 0 时在当前线程同步执行"""
+        AIScoringJob.objects.filter(id=job.id).update(
+            status=AIScoringJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+        item_ids = list(
+            job.items.filter(status=AIScoringJobItem.STATUS_PENDING).values_list("id", flat=True)
+        )
+        if not item_ids:
+            self._finish_if_done(job.id)
+            return
+
+        with self._lock:
+            self._active_jobs.add(job.id)
+
+        if self.max_workers <= 0:
+            for item_id in item_ids:
+                self._run_item(item_id)
+            return
+
+        executor = self._get_executor()
+        for item_id in item_ids:
+            executor.submit(self._run_item_in_worker, item_id)
+
+    def resume_if_orphaned(self, job: AIScoringJob) -> bool:
+        """重新排队中断的任务
+
+        进程重启后，线程池中的文件随之丢失，任务停留在等待中/处理中。
+        任务不在本进程内执行、且超过 AI_SCORING_STALE_SECONDS 没有进展时，
+        把处理中的文件重置为等待中并重新提交。
+
+        Returns:
+            是否重新提交了任务
+        """
+        if job.status not in (AIScoringJob.STATUS_PENDING, AIScoringJob.STATUS_RUNNING):
+            return False
+        with self._lock:
+            if job.id in self._active_jobs:
+                return False
+
+        stale_seconds = float(getattr(settings, "AI_SCORING_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+        activity = job.items.aggregate(started=Max("started_at"), finished=Max("finished_at"))
+        moments = [m for m in (job.started_at, *activity.values()) if m is not None]
+        last_activity = max(moments) if moments else job.created_at
+        if (timezone.now() - last_activity).total_seconds() < stale_seconds:
+            return False
+
+        requeued = job.items.filter(status=AIScoringJobItem.STATUS_RUNNING).update(
+            status=AIScoringJobItem.STATUS_PENDING, started_at=None
+        )
+        logger.warning(f"批量AI评分任务中断，重新排队: job={job.id}, 处理中文件={requeued}")
+        self.submit(job)
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    # ==================== 私有方法 ====================
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="ai-scoring"
+                )
+            return self._executor
+
+    def _run_item_in_worker(self, item_id: int) -> None:
+        close_old_connections()
+        try:
+            self._run_item(item_id)
+        finally:
+            close_old_connections()
+
+    def _run_item(self, item_id: int) -> None:
+        try:
+            self._process_item(item_id)
+        except Exception as e:
+            # 读写数据库等处理函数之外的异常也要计入失败，否则任务永远无法完成
+            logger.error(f"AI评分任务文件处理异常: item={item_id}: {e}", exc_info=True)
+            job_id = (
+                AIScoringJobItem.objects.filter(id=item_id).values_list("job_id", flat=True).first()
+            )
+            if job_id is not None:
+                self._record_result(
+                    item_id,
+                    job_id,
+                    {"status": AIScoringJobItem.STATUS_FAILED, "message": f"处理失败: {e}"},
+                )
+
+    def _process_item(self, item_id: int) -> None:
+        item = AIScoringJobItem.objects.select_related("job", "job__user", "job__repository").get(
+            id=item_id
+        )
+        job_id = item.job_id
+        AIScoringJobItem.objects.filter(id=item_id).update(
+            status=AIScoringJobItem.STATUS_RUNNING, started_at=timezone.now()
+        )
+        AIScoringJob.objects.filter(id=job_id).update(current_file=item.file_name)
+
+        try:
+            result = self.processor(item) or {}
+        except Exception as e:
+            logger.error(f"AI评分任务文件处理失败: job={job_id}, 文件={item.file_path}: {e}")
+            result = {"status": AIScoringJobItem.STATUS_FAILED, "message": f"处理失败: {e}"}
+
+        self._record_result(item_id, job_id, result)
+
+    def _record_result(self, item_id: int, job_id: int, result: Dict) -> None:
+        status = result.get("status", AIScoringJobItem.STATUS_FAILED)
+        if status not in AIScoringJobItem.FINAL_STATUSES:
+            status = AIScoringJobItem.STATUS_FAILED
+        # 条件更新保证每个文件只计数一次（重新排队的任务可能重复处理同一文件）
+        updated = (
+            AIScoringJobItem.objects.filter(id=item_id)
+            .exclude(status__in=AIScoringJobItem.FINAL_STATUSES)
+            .update(
+                status=status,
+                grade=result.get("grade"),
+                score=result.get("score"),
+                comment=result.get("comment") or "",
+                message=result.get("message") or "",
+                finished_at=timezone.now(),
+            )
+        )
+        if updated:
+            counter = {
+                AIScoringJobItem.STATUS_SUCCESS: "success_files",
+                AIScoringJobItem.STATUS_FAILED: "failed_files",
+                AIScoringJobItem.STATUS_SKIPPED: "skipped_files",
+            }[status]
+            AIScoringJob.objects.filter(id=job_id).update(
+                processed_files=F("processed_files") + 1, **{counter: F(counter) + 1}
+            )
+        self._finish_if_done(job_id)
+
+    def _finish_if_done(self, job_id: int) -> None:
+        # 条件更新保证只有一个线程完成任务；所有文件都失败时任务标记为失败
+        finished = AIScoringJob.objects.filter(
+            id=job_id,
+            status__in=[AIScoringJob.STATUS_PENDING, AIScoringJob.STATUS_RUNNING],
+            processed_files__gte=F("total_files"),
+        ).update(
+            status=Case(
+                When(
+                    Q(total_files__gt=0) & Q(failed_files__gte=F("total_files")),
+                    then=Value(AIScoringJob.STATUS_ERROR),
+                ),
+                default=Value(AIScoringJob.STATUS_SUCCESS),
+            ),
+            current_file=None,
+            finished_at=timezone.now(),
+        )
+        if not finished:
+            return
+
+        with self._lock:
+            self._active_jobs.discard(job_id)
+        job = AIScoringJob.objects.get(id=job_id)
+        if job.status == AIScoringJob.STATUS_ERROR:
+            message = f"全部 {job.total_files} 个文件处理失败"
+        elif job.failed_files:
+            message = f"{job.failed_files} 个文件处理失败"
+        else:
+            message = ""
+        if message:
+            AIScoringJob.objects.filter(id=job_id).update(message=message)
+        logger.info(
+            f"批量AI评分任务完成: job={job_id}, 状态={job.status}, 成功={job.success_files}, "
+            f"失败={job.failed_files}, 跳过={job.skipped_files}"
+        )
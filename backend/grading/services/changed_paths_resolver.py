@@ -0,0 +1,144 @@
+"""
+提交变更解析服务模块
+
+判断文件自上次评分（FileGradeStatus.last_graded_commit）以来是否有变更。
+旧实现对每个文件执行一次 git diff --name-only A..B -- <path>；本模块按提交分组：
+- 每个不同的 (last_graded_commit, HEAD) 只执行一次 git diff --name-only -z
+- 结果按 (仓库, A, HEAD) 缓存到 Django 缓存，提交 SHA 不可变，缓存不会过时
+- 同时适用于本地仓库（subprocess）和远程仓库镜像（GitStorageAdapter）
+
+使用示例：
+    resolver = ChangedPathsResolver.for_local_repo(repository.get_full_path())
+    changed = resolver.resolve(
+        [("数据结构/计算机1班/第一次作业/张三.docx", "abc123"), ...],
+        head=current_head,
+    )
+    if "数据结构/计算机1班/第一次作业/张三.docx" in changed:
+        ...
+"""
+
+import hashlib
+import logging
+import subprocess
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 变更集合缓存时间（秒）
+DEFAULT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class ChangedPathsResolver:
+    """按提交分组的变更文件解析器"""
+
+    def __init__(
+        self,
+        repo_key: str,
+        run_git: Callable[[List[str]], bytes],
+        cache_timeout: int = DEFAULT_CACHE_TIMEOUT,
+        diff_options: Sequence[str] = (),
+    ):
+        """初始化解析器
+
+        Args:
+            repo_key: 仓库标识（本地路径或 URL@分支），用于缓存键
+            run_git: 执行 git 命令并返回 stdout 的函数，失败时抛出异常
+            cache_timeout: 变更集合缓存时间（秒）
+            diff_options: 附加的 git diff 选项
+        """
+        self.repo_key = repo_key
+        self.run_git = run_git
+        self.cache_timeout = cache_timeout
+        self.diff_options = list(diff_options)
+        self._memo: Dict[Tuple[str, str], Optional[Set[str]]] = {}
+
+    @classmethod
+    def for_local_repo(cls, repo_root: str) -> "ChangedPathsResolver":
+        """为本地仓库创建解析器"""
+
+        def run_git(args: List[str]) -> bytes:
+            result = subprocess.run(["git"] + args, cwd=repo_root, capture_output=True, check=False)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode("utf-8", errors="ignore").strip())
+            return result.stdout
+
+        # 仓库根目录可能是 git 工作区的子目录：--relative 输出相对 repo_root 的路径，
+        # 与 FileGradeStatus.file_path 一致
+        return cls(repo_key=repo_root, run_git=run_git, diff_options=["--relative"])
+
+    def changed_paths(self, commit: str, head: str) -> Optional[Set[str]]:
+        """返回 commit..head 之间变更的文件集合（相对仓库根目录）
+
+        Returns:
+            变更文件集合，git diff 失败（如提交不存在）时返回 None
+        """
+        if commit == head:
+            return set()
+
+        memo_key = (commit, head)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        key_data = f"{self.repo_key}:{commit}:{head}"
+        cache_key = f"git_changed_paths:{hashlib.md5(key_data.encode()).hexdigest()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            changed = set(cached)
+        else:
+            try:
+                # --no-renames：重命名同时报告旧路径和新路径，与逐文件 diff 的结果一致
+                output = self.run_git(
+                    ["diff", "--name-only", "--no-renames", "-z", *self.diff_options]
+                    + [f"{commit}..{head}"]
+                )
+            except Exception as e:
+                logger.warning(f"检测提交变更失败: {commit[:12]}..{head[:12]}: {e}")
+                self._memo[memo_key] = None
+                return None
+            changed = {
+                path for path in output.decode("utf-8", errors="replace").split("\0") if path
+            }
+            cache.set(cache_key, sorted(changed), self.cache_timeout)
+
+        self._memo[memo_key] = changed
+        return changed
+
+    def resolve(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        head: str,
+        assume_changed_on_error: bool = False,
+    ) -> Set[str]:
+        """批量判断文件自上次评分提交以来是否变更
+
+        Args:
+            pairs: (文件路径, 上次评分提交) 列表，路径相对仓库根目录
+            head: 当前提交
+            assume_changed_on_error: git diff 失败时是否视为已变更
+
+        Returns:
+            发生变更的文件路径集合
+        """
+        paths_by_commit: Dict[str, List[str]] = {}
+        for path, commit in pairs:
+            if commit and commit != head:
+                paths_by_commit.setdefault(commit, []).append(path)
+
+        result: Set[str] = set()
+        for commit, paths in paths_by_commit.items():
+            changed = self.changed_paths(commit, head)
+            if changed is None:
+                if assume_changed_on_error:
+                    result.update(paths)
+                continue
+            result.update(path for path in paths if path in changed)
+
+        logger.debug(
+            "变更解析完成: 文件=%d, 提交分组=%d, 变更=%d",
+            sum(len(paths) for paths in paths_by_commit.values()),
+            len(paths_by_commit),
+            len(result),
+        )
+        return result
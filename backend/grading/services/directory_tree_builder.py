@@ -0,0 +1,501 @@
+"""
+目录树构建服务模块
+
+为评分页面的目录树提供单次遍历的构建引擎，包括：
+- 使用 os.scandir 一次性遍历课程目录；本地仓库的文件目录（RepositoryCatalog）为当前时
+  改为一次查询读取目录记录，不访问文件系统
+- 一次查询加载仓库下所有 FileGradeStatus 记录
+- 每个不同的 last_graded_commit 只执行一次 git diff（见 ChangedPathsResolver）
+- 在内存中自底向上传播 has_updates 标记
+
+旧实现对每个节点分别执行 os.walk、数据库查询和 git 子进程，
+请求开销与“文件数 × 子进程数”成正比；本模块将其降为与文件数成正比。
+
+使用示例：
+    builder = DirectoryTreeBuilder(
+        base_dir="/path/to/repo/数据结构",
+        course_name="数据结构",
+        repository=repository,
+        grade_info_func=get_file_grade_info,
+    )
+    nodes = builder.build("")
+"""
+
+import logging
+import os
+import subprocess
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db.models import Q
+
+from grading.models import Course, FileGradeStatus, Homework
+
+from .changed_paths_resolver import ChangedPathsResolver
+from .repository_catalog import RepositoryCatalog
+
+logger = logging.getLogger(__name__)
+
+
+def _split_rel_path_parts(rel_path: str) -> List[str]:
+    if not rel_path:
+        return []
+    return [p for p in rel_path.replace("\\", "/").split("/") if p]
+
+
+# 目录子项：(名称, 绝对路径, 是否目录, mtime)；mtime 为 None 时按需 stat
+DirItem = Tuple[str, str, bool, Optional[float]]
+
+
+class DirectoryTreeBuilder:
+    """目录树构建器
+
+    一次请求内：
+    1. 扫描阶段：递归 scandir（或读取仓库文件目录）构建节点，并收集需要检测更新的作业文件
+    2. 解析阶段：批量加载评分状态，按提交分组计算变更文件集合
+    3. 传播阶段：为文件节点设置 has_updates，再自底向上标记文件夹
+
+    返回的节点结构与 views.get_directory_tree 的历史输出保持一致。
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        course_name: Optional[str] = None,
+        repository=None,
+        homework_names: Optional[Iterable[str]] = None,
+        cache_manager=None,
+        grade_info_func: Optional[Callable] = None,
+        grade_info_many_func: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+    ):
+        """初始化目录树构建器
+
+        Args:
+            base_dir: 目录树根目录（本地仓库时通常为 <仓库>/<课程>）
+            course_name: 课程名称，用于作业类型和更新检测
+            repository: 仓库对象（可选，提供时检测作业更新）
+            homework_names: 作业文件夹名称集合（可选）
+            cache_manager: 缓存管理器（可选，用于回填目录文件数量缓存）
+            grade_info_func: 读取文件评分信息的函数，签名同 views.get_file_grade_info
+            grade_info_many_func: 批量读取评分信息的函数（可选），参数为绝对路径列表，
+                返回 {绝对路径: 评分信息}；提供时每个目录只调用一次
+        """
+        self.base_dir = base_dir
+        self.course_name = (course_name or "").strip()
+        self.repository = repository
+        self.homework_names = set(homework_names or [])
+        self.cache_manager = cache_manager
+        self.grade_info_func = grade_info_func
+        self.grade_info_many_func = grade_info_many_func
+
+        self.repo_root = repository.get_full_path() if repository else None
+        # (节点, 仓库相对路径, 绝对路径, mtime)
+        self._candidates: List[Tuple[Dict, str, str, float]] = []
+        self._course = None
+        self._homeworks: Optional[Dict[str, Homework]] = None
+        # 仓库文件目录中的子树：{绝对目录路径: 子项列表}；为 None 时遍历文件系统
+        self._catalog_children: Optional[Dict[str, List[DirItem]]] = None
+
+    # ==================== 公共接口 ====================
+
+    def build(self, file_path: str = "") -> List[Dict]:
+        """构建 file_path 下的目录树
+
+        Args:
+            file_path: 相对 base_dir 的路径
+
+        Returns:
+            节点列表（目录在前、文件在后，按名称排序）
+        """
+        file_path = (file_path or "").replace("\\", "/").strip("/")
+        full_path = os.path.join(self.base_dir, file_path) if file_path else self.base_dir
+
+        self._candidates = []
+        self._catalog_children = self._load_catalog_children(full_path)
+        nodes = self._scan(full_path, file_path)
+
+        if self.repository and self._candidates:
+            self._mark_file_updates()
+        self._propagate(nodes)
+        return nodes
+
+    # ==================== 扫描阶段 ====================
+
+    def _load_catalog_children(self, full_path: str) -> Optional[Dict[str, List[DirItem]]]:
+        """从当前的仓库文件目录一次查询加载子树，按上级目录分组
+
+        仓库文件目录未标记为当前、子树根目录尚未记录或查询失败时返回 None，回退到遍历文件系统。
+        """
+        if not self.repository or self.repository.repo_type != "filesystem":
+            return None
+        try:
+            catalog = RepositoryCatalog.current(self.repository)
+            if catalog is None:
+                return None
+            rel_root = catalog.relative_path(full_path)
+            if rel_root is None:
+                return None
+            rows = catalog.list_subtree(rel_root).values_list("path", "is_dir", "mtime_ns")
+
+            def to_abs(path: str) -> str:
+                return os.path.join(catalog.root, *path.split("/")) if path else catalog.root
+
+            found = False
+            children: Dict[str, List[DirItem]] = defaultdict(list)
+            for path, is_dir, mtime_ns in rows:
+                if path == rel_root:
+                    found = is_dir
+                    continue
+                parent, _, name = path.rpartition("/")
+                children[to_abs(parent)].append((name, to_abs(path), is_dir, mtime_ns / 1e9))
+        except Exception as e:
+            logger.warning(f"读取仓库文件目录失败，回退到遍历文件系统: {e}")
+            return None
+
+        if not found:
+            return None
+        for items in children.values():
+            items.sort(key=lambda item: item[0])
+        return children
+
+    def _list_dir(self, dir_path: str) -> Optional[List[DirItem]]:
+        """目录的直接子项（按名称排序），列出失败时返回 None"""
+        if self._catalog_children is not None:
+            return self._catalog_children.get(os.path.abspath(dir_path), [])
+
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            logger.error(f"Error listing directory contents: {e}")
+            return None
+
+        items = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            items.append((entry.name, entry.path, is_dir, None))
+        return items
+
+    def _scan(self, dir_path: str, rel_dir: str) -> List[Dict]:
+        entries = self._list_dir(dir_path)
+        if entries is None:
+            return []
+
+        items = []
+        docx_count = 0
+        for name, path, is_dir, mtime in entries:
+            if name.startswith("."):
+                continue
+            # 仓库文件目录由有读取权限的刷新过程写入，只在遍历文件系统时检查权限
+            if self._catalog_children is None and not os.access(path, os.R_OK):
+                logger.warning(f"No read permission for item: {path}")
+                continue
+
+            relative_path = f"{rel_dir}/{name}" if rel_dir else name
+            node = {
+                "id": relative_path,
+                "text": name,
+                "type": "folder" if is_dir else "file",
+                "icon": "jstree-folder" if is_dir else "jstree-file",
+                "state": {"opened": False, "disabled": False, "selected": False},
+            }
+
+            if is_dir:
+                children = self._scan(path, relative_path)
+                node["children"] = children
+                if not children:
+                    node["state"]["disabled"] = True
+                node["data"] = {"file_count": self._count_docx(path, relative_path)}
+                if self.course_name and rel_dir and "/" not in rel_dir:
+                    self._apply_homework_type(node, name)
+            else:
+                if name.lower().endswith(".docx"):
+                    docx_count += 1
+                _, ext = os.path.splitext(name)
+                node["a_attr"] = {"href": "#", "data-type": "file", "data-ext": ext.lower()}
+                if self.repository and self._is_homework_file(relative_path):
+                    self._collect_candidate(node, relative_path, path, mtime)
+
+            items.append(node)
+
+        items.sort(key=lambda x: (x["type"] == "file", x["text"].lower()))
+        return items
+
+    def _count_docx(self, dir_path: str, relative_path: str) -> int:
+        """统计目录下直接包含的 .docx 文件数量，并回填缓存"""
+        if self.cache_manager:
+            cached = self.cache_manager.get_file_count(relative_path)
+            if cached is not None:
+                return cached
+
+        count = 0
+        if self._catalog_children is not None:
+            count = sum(
+                1
+                for name, _, is_dir, _ in self._list_dir(dir_path)
+                if not is_dir and name.lower().endswith(".docx")
+            )
+        else:
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.name.lower().endswith(".docx") and entry.is_file():
+                            count += 1
+            except OSError as e:
+                logger.error(f"统计目录文件数量失败: {e}")
+                return 0
+
+        if self.cache_manager:
+            self.cache_manager.set_file_count(relative_path, count)
+            threshold_check = self.cache_manager.check_file_count_threshold(count)
+            if threshold_check["warning"]:
+                logger.warning(f"目录文件数量警告: {relative_path} - {threshold_check['message']}")
+        return count
+
+    def _is_homework_file(self, relative_path: str) -> bool:
+        return bool(self.course_name) and len(_split_rel_path_parts(relative_path)) >= 3
+
+    def _is_homework_folder(self, relative_path: str) -> bool:
+        return bool(self.course_name) and len(_split_rel_path_parts(relative_path)) == 2
+
+    def _to_repo_rel_path(self, relative_path: str) -> str:
+        rel_path = relative_path.replace("\\", "/").lstrip("/")
+        if self.course_name and not rel_path.startswith(f"{self.course_name}/"):
+            rel_path = f"{self.course_name}/{rel_path}"
+        return rel_path
+
+    def _collect_candidate(
+        self, node: Dict, relative_path: str, abs_path: str, mtime: Optional[float]
+    ) -> None:
+        if mtime is None:
+            try:
+                mtime = os.stat(abs_path).st_mtime
+            except OSError:
+                mtime = 0.0
+        self._candidates.append((node, self._to_repo_rel_path(relative_path), abs_path, mtime))
+
+    # ==================== 作业类型 ====================
+
+    def _load_homeworks(self) -> Dict[str, Homework]:
+        if self._homeworks is not None:
+            return self._homeworks
+
+        self._homeworks = {}
+        try:
+            self._course = Course.objects.select_related("semester", "teacher", "tenant").get(
+                name=self.course_name
+            )
+        except Course.DoesNotExist:
+            return self._homeworks
+        except Exception as e:
+            logger.warning(f"查询课程失败: {self.course_name} - {e}")
+            return self._homeworks
+
+        self._homeworks = {
+            hw.folder_name: hw for hw in Homework.objects.filter(course=self._course)
+        }
+        return self._homeworks
+
+    def _apply_homework_type(self, node: Dict, folder_name: str) -> None:
+        homeworks = self._load_homeworks()
+        if self._course is None:
+            return
+
+        homework = homeworks.get(folder_name)
+        if homework:
+            node["data"]["homework_type"] = homework.homework_type
+            node["data"]["homework_type_display"] = homework.get_homework_type_display()
+            return
+
+        # 作业不存在，根据课程类型使用默认类型
+        default_type = (
+            "lab_report" if self._course.course_type in ["lab", "practice", "mixed"] else "normal"
+        )
+        node["data"]["homework_type"] = default_type
+        node["data"]["homework_type_display"] = (
+            "实验报告" if default_type == "lab_report" else "普通作业"
+        )
+
+    # ==================== 更新检测 ====================
+
+    def _load_statuses(self) -> Dict[str, Tuple]:
+        """一次查询加载当前子树相关的评分状态
+
+        状态记录的 file_path 可能带课程前缀，也可能不带（历史数据），
+        因此按两种前缀同时过滤。
+        """
+        prefixes = {f"{self.course_name}/"} if self.course_name else set()
+        for _, rel_path, _, _ in self._candidates:
+            parts = _split_rel_path_parts(rel_path)
+            if self.course_name and len(parts) > 1:
+                prefixes.add(f"{parts[1]}/")
+
+        query = Q()
+        for prefix in prefixes:
+            query |= Q(file_path__startswith=prefix)
+
+        queryset = FileGradeStatus.objects.filter(repository=self.repository)
+        if prefixes:
+            queryset = queryset.filter(query)
+
+        return {
+            file_path: (last_graded_at, last_graded_commit)
+            for file_path, last_graded_at, last_graded_commit in queryset.values_list(
+                "file_path", "last_graded_at", "last_graded_commit"
+            )
+        }
+
+    def _lookup_status(self, statuses: Dict[str, Tuple], rel_path: str) -> Optional[Tuple]:
+        status = statuses.get(rel_path)
+        if status is None and self.course_name and rel_path.startswith(f"{self.course_name}/"):
+            status = statuses.get(rel_path[len(self.course_name) + 1 :])
+        return status
+
+    def _get_head_commit(self) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=self.repo_root,
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+            if result.returncode == 0:
+                return result.stdout.strip()
+        except Exception as e:
+            logger.warning(f"读取仓库提交失败: {e}")
+        return None
+
+    def _mark_file_updates(self) -> None:
+        from grading.utils import GitHandler
+
+        try:
+            statuses = self._load_statuses()
+        except Exception as e:
+            logger.warning(f"加载评分状态失败: {e}")
+            return
+
+        is_git_repo = bool(self.repo_root) and GitHandler.is_git_repo(self.repo_root)
+        current_head = self._get_head_commit() if is_git_repo else None
+
+        candidate_statuses = [
+            self._lookup_status(statuses, rel_path) for _, rel_path, _, _ in self._candidates
+        ]
+        changed_paths: Set[str] = set()
+        commit_pairs = [
+            (rel_path, status[1])
+            for (_, rel_path, _, _), status in zip(self._candidates, candidate_statuses)
+            if status is not None and status[1]
+        ]
+        if current_head and commit_pairs:
+            changed_paths = ChangedPathsResolver.for_local_repo(self.repo_root).resolve(
+                commit_pairs, current_head
+            )
+
+        graded = self._load_has_grade(
+            [
+                abs_path
+                for (_, _, abs_path, _), status in zip(self._candidates, candidate_statuses)
+                if status is None
+            ]
+        )
+
+        for (node, rel_path, abs_path, mtime), status in zip(self._candidates, candidate_statuses):
+            try:
+                if status is None:
+                    has_updates = not graded.get(abs_path, False)
+                else:
+                    last_graded_at, last_graded_commit = status
+                    if current_head and last_graded_commit:
+                        has_updates = rel_path in changed_paths
+                    else:
+                        has_updates = bool(last_graded_at and mtime > last_graded_at.timestamp())
+            except Exception as e:
+                logger.warning(f"检测文件更新失败: {e}")
+                has_updates = False
+
+            if has_updates:
+                node["data"] = node.get("data", {})
+                node["data"]["has_updates"] = True
+                logger.debug("[STAR] file_update course=%s rel=%s", self.course_name, rel_path)
+
+        logger.info(
+            "目录树更新检测完成: 文件=%d, 状态=%d, 提交分组=%d",
+            len(self._candidates),
+            len(statuses),
+            len({commit for _, commit in commit_pairs if commit != current_head}),
+        )
+
+    def _load_has_grade(self, abs_paths: List[str]) -> Dict[str, bool]:
+        """判断没有评分状态记录的文件是否已有评分
+
+        提供批量函数时按目录分组，每个目录只查询一次评分信息索引。
+        """
+        graded: Dict[str, bool] = {}
+        if not abs_paths:
+            return graded
+
+        if self.grade_info_many_func:
+            by_dir: Dict[str, List[str]] = {}
+            for abs_path in abs_paths:
+                by_dir.setdefault(os.path.dirname(abs_path), []).append(abs_path)
+            for paths in by_dir.values():
+                try:
+                    infos = self.grade_info_many_func(paths)
+                except Exception as e:
+                    # 与逐个读取失败时一致：不标记为有更新
+                    logger.warning(f"批量读取评分信息失败: {e}")
+                    graded.update((abs_path, True) for abs_path in paths)
+                    continue
+                for abs_path in paths:
+                    info = infos.get(os.path.abspath(abs_path)) or {}
+                    graded[abs_path] = bool(info.get("has_grade"))
+            return graded
+
+        if not self.grade_info_func:
+            return graded
+        for abs_path in abs_paths:
+            try:
+                grade_info = self.grade_info_func(
+                    abs_path, base_dir=self.repo_root, course_name=self.course_name
+                )
+            except Exception as e:
+                logger.warning(f"检测文件更新失败: {e}")
+                graded[abs_path] = True
+                continue
+            graded[abs_path] = bool(grade_info.get("has_grade"))
+        return graded
+
+    # ==================== 传播阶段 ====================
+
+    def _propagate(self, nodes: List[Dict]) -> bool:
+        """自底向上传播文件夹的 has_updates 标记
+
+        Returns:
+            子树中是否存在带有 has_updates 的节点
+        """
+        any_updates = False
+        for node in nodes:
+            if node["type"] == "folder":
+                children = node.get("children", [])
+                subtree_updates = self._propagate(children)
+                direct_file_updates = any(
+                    child["type"] == "file" and child.get("data", {}).get("has_updates")
+                    for child in children
+                )
+                if subtree_updates and (
+                    self._is_homework_folder(node["id"])
+                    or node["text"] in self.homework_names
+                    or direct_file_updates
+                ):
+                    node["data"]["has_updates"] = True
+                    logger.debug(
+                        "[STAR] folder_update course=%s rel=%s", self.course_name, node["id"]
+                    )
+                any_updates = any_updates or subtree_updates
+            if node.get("data", {}).get("has_updates"):
+                any_updates = True
+        return any_updates
@@ -0,0 +1,349 @@
+"""
+Word 文档预览缓存模块
+
+教师逐个点击作业文件时，get_file_content 每次都要用 mammoth 把整个 .docx 转成 HTML。
+本模块把转换结果保存在磁盘上：
+- 本地文件按 (绝对路径, mtime_ns, 大小) 的哈希作为键，无需读取文件即可判断是否命中；
+  远程仓库读取到的内容按内容 SHA-256 作为键
+- 文档中的图片写成独立的资源文件，HTML 中引用资源 URL 而不是内联 base64，
+  资源按键和内容哈希命名，浏览器可以长期缓存
+- 总大小超过预算时按最近访问时间（index.html 的 mtime，命中时更新）淘汰最久未用的条目
+- 教师打开作业文件夹时，后台线程池预先转换其中的 Word 文档，下一次点击直接读取缓存
+
+配置（settings）：
+- DOCX_PREVIEW_DIR: 预览存储目录
+- DOCX_PREVIEW_MAX_MB: 存储大小预算（MB），默认 512
+- DOCX_PREVIEW_WORKERS: 预渲染线程数，默认 2；0 表示在调用线程内同步执行
+
+使用示例：
+    store = get_preview_store()
+    html = store.render_path(full_path)               # 本地文件
+    html = store.render_bytes(content_bytes)          # 远程仓库读取的内容
+    get_prerenderer().schedule_local_folder(folder)   # 后台预渲染
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Optional, Set
+
+import mammoth
+from django.conf import settings
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 512
+DEFAULT_WORKERS = 2
+
+# 淘汰后保留的比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+INDEX_NAME = "index.html"
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+_ASSET_RE = re.compile(r"^[0-9a-f]{16}\.[a-z0-9]{1,8}$")
+
+
+def stat_key(path: str) -> str:
+    """本地文件的预览键：(绝对路径, mtime_ns, 大小) 的 SHA-256"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    data = f"{path}\0{st.st_mtime_ns}\0{st.st_size}"
+    return hashlib.sha256(data.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def content_key(data: bytes) -> str:
+    """内容的预览键：内容 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocxPreviewStore:
+    """磁盘上的 Word 预览存储"""
+
+    # 每个存储目录的已用字节数（进程内估计，淘汰时重新统计）
+    _usage = {}
+    _usage_lock = threading.Lock()
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        """初始化预览存储
+
+        Args:
+            root: 存储目录，默认 settings.DOCX_PREVIEW_DIR
+            max_bytes: 大小预算（字节），默认 settings.DOCX_PREVIEW_MAX_MB
+        """
+        if root is None:
+            root = getattr(
+                settings,
+                "DOCX_PREVIEW_DIR",
+                os.path.join(settings.BASE_DIR, "cache", "docx_previews"),
+            )
+        if max_bytes is None:
+            max_bytes = int(getattr(settings, "DOCX_PREVIEW_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.max_bytes = max_bytes
+
+    # ==================== 读取 ====================
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def has(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.entry_dir(key), INDEX_NAME))
+
+    def get(self, key: str) -> Optional[str]:
+        """读取已转换的 HTML 并标记为最近使用"""
+        index_path = os.path.join(self.entry_dir(key), INDEX_NAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(index_path)
+        except OSError:
+            pass
+        return html
+
+    def asset_path(self, key: str, name: str) -> Optional[str]:
+        """图片资源文件路径（键或文件名不合法、文件不存在时返回 None）"""
+        if not _KEY_RE.match(key or "") or not _ASSET_RE.match(name or ""):
+            return None
+        path = os.path.join(self.entry_dir(key), name)
+        return path if os.path.isfile(path) else None
+
+    # ==================== 转换 ====================
+
+    def render_path(self, path: str) -> str:
+        """转换本地 Word 文档（命中缓存时不读取文件）"""
+        key = stat_key(path)
+        html = self.get(key)
+        if html is None:
+            with open(path, "rb") as f:
+                html = self._render(key, f)
+        return html
+
+    def render_bytes(self, data: bytes) -> str:
+        """转换内存中的 Word 文档内容"""
+        key = content_key(data)
+        html = self.get(key)
+        if html is None:
+            html = self._render(key, BytesIO(data))
+        return html
+
+    def _render(self, key: str, source) -> str:
+        """转换并原子写入条目目录：先写临时目录，完成后整体重命名"""
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        work_dir = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        os.makedirs(work_dir)
+        try:
+            result = mammoth.convert_to_html(
+                source, convert_image=mammoth.images.img_element(self._image_writer(key, work_dir))
+            )
+            html = result.value
+            with open(os.path.join(work_dir, INDEX_NAME), "w", encoding="utf-8") as f:
+                f.write(html)
+            size = self._dir_size(work_dir)
+
+            target = self.entry_dir(key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.rename(work_dir, target)
+            except OSError:
+                # 其他线程或进程已写入同一条目
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return html
+        except BaseException:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        self._account(size)
+        return html
+
+    def _image_writer(self, key: str, work_dir: str) -> Callable:
+        def write_image(image):
+            with image.open() as f:
+                data = f.read()
+            extension = (mimetypes.guess_extension(image.content_type or "") or ".bin").lstrip(".")
+            name = f"{hashlib.sha256(data).hexdigest()[:16]}.{extension.lower()}"
+            path = os.path.join(work_dir, name)
+            if not os.path.exists(path):
+                with open(path, "wb") as out:
+                    out.write(data)
+            return {"src": reverse("grading:docx_preview_asset", args=[key, name])}
+
+        return write_image
+
+    # ==================== 淘汰 ====================
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    total += entry.stat().st_size
+                except OSError:
+                    pass
+        return total
+
+    def _account(self, size: int) -> None:
+        with self._usage_lock:
+            used = self._usage.get(self.root)
+            if used is not None:
+                used += size
+                self._usage[self.root] = used
+        if used is None or used > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """统计实际占用，超过预算时删除最久未访问的条目
+
+        Returns:
+            删除的条目数
+        """
+        entries = []
+        total = 0
+        if os.path.isdir(self.root):
+            for shard in os.scandir(self.root):
+                if not shard.is_dir() or shard.path == self.tmp_dir:
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        size = self._dir_size(entry.path)
+                        atime = os.stat(os.path.join(entry.path, INDEX_NAME)).st_mtime
+                    except OSError:
+                        continue
+                    entries.append((atime, size, entry.path))
+                    total += size
+
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET_RATIO
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                removed += 1
+            logger.info(f"Word 预览缓存淘汰 {removed} 个条目，剩余 {total} bytes")
+
+        with self._usage_lock:
+            self._usage[self.root] = total
+        return removed
+
+
+class DocxPrerenderer:
+    """后台预渲染 Word 预览"""
+
+    def __init__(self, store: Optional[DocxPreviewStore] = None, workers: Optional[int] = None):
+        self.store = store or DocxPreviewStore()
+        if workers is None:
+            workers = int(getattr(settings, "DOCX_PREVIEW_WORKERS", DEFAULT_WORKERS))
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, ident: str, func: Callable[[], None]) -> bool:
+        """提交一个预渲染任务（同一标识的任务未完成前不重复提交）"""
+        with self._lock:
+            if ident in self._pending:
+                return False
+            self._pending.add(ident)
+
+        def run():
+            started = time.monotonic()
+            try:
+                func()
+                logger.debug(f"预渲染完成: {ident} ({time.monotonic() - started:.2f}s)")
+            except Exception as e:
+                logger.warning(f"预渲染失败: {ident} - {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(ident)
+
+        if self.workers <= 0:
+            run()
+        else:
+            self._get_executor().submit(run)
+        return True
+
+    def schedule_local_folder(self, folder: str, max_depth: int = 3) -> int:
+        """预渲染本地文件夹下（max_depth 层以内）尚未缓存的 Word 文档
+
+        Returns:
+            提交的任务数
+        """
+        folder = os.path.abspath(folder)
+        base_depth = folder.rstrip(os.sep).count(os.sep)
+        scheduled = 0
+        for root, dirnames, filenames in os.walk(folder):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            if root.rstrip(os.sep).count(os.sep) - base_depth >= max_depth:
+                dirnames[:] = []
+            for filename in filenames:
+                if not filename.lower().endswith(".docx") or filename.startswith(("~$", ".")):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    if self.store.has(stat_key(path)):
+                        continue
+                except OSError:
+                    continue
+                if self.submit(path, lambda path=path: self.store.render_path(path)):
+                    scheduled += 1
+        return scheduled
+
+    def schedule_remote_folder(self, adapter, folder: str, repository_id: int) -> bool:
+        """预渲染远程仓库文件夹中的 Word 文档（单个任务内顺序读取，避免并发使用同一适配器）"""
+        folder = folder.strip("/")
+
+        def run():
+            for entry in adapter.list_directory(folder):
+                name = entry.get("name", "")
+                if entry.get("type") != "file" or not name.lower().endswith(".docx"):
+                    continue
+                path = f"{folder}/{name}" if folder else name
+                self.store.render_bytes(adapter.read_file(path))
+
+        return self.submit(f"remote:{repository_id}:{folder}", run)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="docx-preview"
+                )
+            return self._executor
+
+
+_store: Optional[DocxPreviewStore] = None
+_prerenderer: Optional[DocxPrerenderer] = None
+_singleton_lock = threading.Lock()
+
+
+def get_preview_store() -> DocxPreviewStore:
+    global _store
+    with _singleton_lock:
+        if _store is None:
+            _store = DocxPreviewStore()
+        return _store
+
+
+def get_prerenderer() -> DocxPrerenderer:
+    global _prerenderer
+    store = get_preview_store()
+    with _singleton_lock:
+        if _prerenderer is None:
+            _prerenderer = DocxPrerenderer(store)
+        return _prerenderer
@@ -0,0 +1,226 @@
+"""
+文件下载响应模块
+
+serve_file 和作业文件 API 原先把整个文件读入内存再返回，大文件（PDF、视频、打包的项目）
+每次请求都完整缓存一份，也无法断点续传。本模块统一构造下载响应：
+- 使用 FileResponse 分块流式返回，完整文件由 WSGI 服务器的 file_wrapper（sendfile）发送，
+  每次下载的内存占用与文件大小无关
+- 支持单段 Range / If-Range 请求（206 Partial Content，范围无效时返回 416）
+- 返回 ETag、Last-Modified，条件请求（If-None-Match / If-Modified-Since）命中时返回 304
+- 部署在 nginx 之后时可改为 X-Accel-Redirect，由 nginx 直接发送文件
+
+配置（settings）：
+- FILE_SERVE_ACCEL_ROOT: 启用 X-Accel-Redirect 的本地目录（为空表示不启用）
+- FILE_SERVE_ACCEL_PREFIX: 该目录在 nginx 中对应的 internal location，例如 /protected/
+
+nginx 配置示例：
+    location /protected/ {
+        internal;
+        alias /data/repos/;
+    }
+
+使用示例：
+    return serve_path(request, full_path, filename=os.path.basename(full_path))
+    return serve_bytes(request, content, filename="作业.pdf")
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from io import BytesIO
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _RangeReader:
+    """只读取文件中 [start, start + length) 范围的文件对象包装"""
+
+    def __init__(self, fileobj, start: int, length: int):
+        fileobj.seek(start)
+        self._file = fileobj
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def file_etag(st: os.stat_result) -> str:
+    """根据修改时间和大小生成 ETag（无需读取文件内容）"""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单段 Range 请求头
+
+    Args:
+        header: Range 请求头，例如 "bytes=0-1023"、"bytes=1024-"、"bytes=-500"
+        size: 文件大小
+
+    Returns:
+        (start, end) 闭区间；多段范围、格式不支持或文件为空时返回 None（按完整文件返回）
+
+    Raises:
+        ValueError: 范围无法满足（应返回 416）
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # 后缀范围：最后 N 个字节
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag: str, mtime: Optional[float]) -> bool:
+    """If-Range 与当前版本一致时才按范围返回，否则返回完整文件"""
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    # 日期形式的 If-Range 只在与 Last-Modified 完全相同时才算同一版本
+    return mtime is not None and since is not None and int(mtime) == since
+
+
+def _accel_location(full_path: str) -> Optional[str]:
+    root = getattr(settings, "FILE_SERVE_ACCEL_ROOT", "")
+    prefix = getattr(settings, "FILE_SERVE_ACCEL_PREFIX", "")
+    if not root or not prefix:
+        return None
+    root = os.path.abspath(root)
+    full_path = os.path.abspath(full_path)
+    if not full_path.startswith(root + os.sep):
+        return None
+    relative = os.path.relpath(full_path, root).replace(os.sep, "/")
+    return prefix.rstrip("/") + "/" + quote(relative)
+
+
+def _respond(request, fileobj, size, etag, mtime, filename, content_type, as_attachment):
+    """按条件请求和 Range 请求头构造响应；fileobj 在返回 304/416 时由本函数关闭"""
+    last_modified = int(mtime) if mtime is not None else None
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        fileobj.close()
+        return conditional
+
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if (
+        range_header
+        and request.method in ("GET", "HEAD")
+        and _if_range_matches(request, etag, mtime)
+    ):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            fileobj.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(
+            fileobj, as_attachment=as_attachment, filename=filename, content_type=content_type
+        )
+        response["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            _RangeReader(fileobj, start, end - start + 1),
+            status=206,
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type,
+        )
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    if mtime is not None:
+        response["Last-Modified"] = http_date(mtime)
+    return response
+
+
+def serve_path(
+    request,
+    full_path: str,
+    filename: Optional[str] = None,
+    as_attachment: bool = False,
+    content_type: Optional[str] = None,
+):
+    """流式返回本地文件（调用方负责路径校验和权限检查）"""
+    st = os.stat(full_path)
+    etag = file_etag(st)
+    filename = filename or os.path.basename(full_path)
+    if not content_type:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    accel_location = _accel_location(full_path)
+    if accel_location:
+        conditional = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+        if conditional is not None:
+            return conditional
+        # 由 nginx 发送文件并处理 Range 请求
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel_location
+        response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(st.st_mtime)
+        return response
+
+    return _respond(
+        request,
+        open(full_path, "rb"),
+        st.st_size,
+        etag,
+        st.st_mtime,
+        filename,
+        content_type,
+        as_attachment,
+    )
+
+
+def serve_bytes(
+    request,
+    content: bytes,
+    filename: str,
+    as_attachment: bool = False,
+    content_type: Optional[str] = None,
+    mtime: Optional[float] = None,
+):
+    """返回内存中的文件内容（远程仓库读取的文件），同样支持条件请求和 Range 请求"""
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    if not content_type:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return _respond(
+        request, BytesIO(content), len(content), etag, mtime, filename, content_type, as_attachment
+    )
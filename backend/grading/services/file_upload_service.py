@@ -4,7 +4,7 @@
 提供学生作业文件上传功能，包括：
 - 上传作业文件
 - 验证文件格式和大小
-- 保存文件到指定路径
+- 保存文件到指定路径（内容寻址存储，相同内容的版本共用一份）
 - 创建提交记录
 - 版本管理
 """
@@ -19,6 +19,8 @@ from django.db import transaction
 from django.utils import timezone
 
 from grading.models import Homework, Repository, Submission
+from grading.services.storage_usage import StorageUsageService
+from grading.services.submission_blob_store import SubmissionBlobStore
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -125,8 +127,16 @@ class FileUploadService:
         # 生成文件保存路径
         file_path = self._generate_file_path(repository, homework, student, file.name)
 
-        # 保存文件
-        self.save_file(file, file_path)
+        # 同名重新上传会覆盖原文件，空间计数只累加差值
+        try:
+            previous_size = os.path.getsize(file_path)
+        except OSError:
+            previous_size = None
+
+        # 保存文件（内容寻址存储 + 工作副本）
+        content_hash, blob_delta = self.store_file(
+            file, file_path, repository, previous=existing_submission
+        )
 
         # 创建提交记录
         submission = self.create_submission_record(
@@ -137,6 +147,15 @@ class FileUploadService:
             file_name=file.name,
             file_size=file.size,
             version=version,
+            content_hash=content_hash,
+        )
+
+        # 在提交记录创建之后累加，首次对账才能把本次文件计入学生用量
+        StorageUsageService().record_change(
+            repository,
+            delta_bytes=file.size - (previous_size or 0) + blob_delta,
+            delta_files=0 if previous_size is not None else 1,
+            student=student,
         )
 
         logger.info(
@@ -227,6 +246,71 @@ class FileUploadService:
             logger.error(f"{error_msg}, 错误: {e}")
             raise ValueError(error_msg)
 
+    def store_file(
+        self,
+        file: UploadedFile,
+        file_path: str,
+        repository: Repository,
+        previous: Optional[Submission] = None,
+    ) -> Tuple[str, int]:
+        """边写入边计算哈希，存入仓库的内容寻址存储，并生成提交目录中的工作副本
+
+        与上一版本内容相同、且工作副本自上次提交后未被修改时，不重写工作副本。
+
+        Args:
+            file: 上传的文件对象
+            file_path: 工作副本路径
+            repository: 仓库对象
+            previous: 该学生该作业的上一版本提交（可选）
+
+        Returns:
+            (文件内容的 SHA-256, blob 单独占用空间的变化字节数)
+
+        Raises:
+            ValueError: 如果保存失败
+        """
+        store = SubmissionBlobStore.for_repository(repository)
+        # 本次上传只影响新旧两个 blob 是否与工作副本共用 inode
+        previous_hash = previous.content_hash if previous else ""
+        blob_bytes_before = store.unshared_size(previous_hash)
+        try:
+            content_hash, _, created = store.write_blob(file.chunks())
+            if not created and content_hash != previous_hash:
+                blob_bytes_before += store.unshared_size(content_hash)
+            if self._working_copy_unchanged(previous, file_path, content_hash):
+                logger.info(f"内容与上一版本相同，保留现有文件: {file_path}")
+            else:
+                store.materialize(content_hash, file_path)
+                logger.info(f"文件保存成功: {file_path} (sha256: {content_hash})")
+            blob_bytes_after = sum(
+                store.unshared_size(blob) for blob in {previous_hash, content_hash} if blob
+            )
+            return content_hash, blob_bytes_after - blob_bytes_before
+
+        except PermissionError as e:
+            error_msg = f"无权限写入文件: {file_path}"
+            logger.error(f"{error_msg}, 错误: {e}")
+            raise ValueError(error_msg)
+        except OSError as e:
+            error_msg = f"保存文件失败: {file_path}"
+            logger.error(f"{error_msg}, 错误: {e}")
+            raise ValueError(error_msg)
+
+    def _working_copy_unchanged(
+        self, previous: Optional[Submission], file_path: str, content_hash: str
+    ) -> bool:
+        """工作副本是否仍是上一版本上传的相同内容"""
+        if not previous or previous.content_hash != content_hash or previous.file_path != file_path:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return (
+            stat.st_size == previous.file_size
+            and stat.st_mtime <= previous.submitted_at.timestamp()
+        )
+
     def create_submission_record(
         self,
         student: User,
@@ -236,6 +320,7 @@ class FileUploadService:
         file_name: str,
         file_size: int,
         version: int = 1,
+        content_hash: str = "",
     ) -> Submission:
         """创建提交记录
 
@@ -247,6 +332,7 @@ class FileUploadService:
             file_name: 文件名
             file_size: 文件大小（字节）
             version: 版本号
+            content_hash: 文件内容 SHA-256
 
         Returns:
             创建的提交记录
@@ -267,6 +353,7 @@ class FileUploadService:
             file_path=file_path,
             file_name=file_name,
             file_size=file_size,
+            content_hash=content_hash,
             version=version,
             submitted_at=timezone.now(),
         )
@@ -402,20 +489,8 @@ class FileUploadService:
         if repository.repo_type != "filesystem":
             return 0, 0, 0.0
 
-        # 获取仓库路径
-        repo_path = repository.get_full_path()
-
-        # 计算已使用空间
-        used_space_bytes = 0
-        if os.path.exists(repo_path):
-            for dirpath, _, filenames in os.walk(repo_path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    try:
-                        used_space_bytes += os.path.getsize(filepath)
-                    except OSError:
-                        # 忽略无法访问的文件
-                        pass
+        # 读取增量维护的空间计数（由 reconcile_storage_usage 定期对账）
+        used_space_bytes = StorageUsageService().get_repository_usage(repository).used_bytes
 
         # 转换为MB
         used_space_mb = used_space_bytes / (1024 * 1024)
@@ -220,6 +220,31 @@ class FileSystemStorageAdapter(StorageAdapter):
                 details={"path": path, "error": str(e)},
             )
 
+    def get_local_path(self, path: str) -> str:
+        """获取文件的本地绝对路径（用于流式返回文件，不读取内容）
+
+        Args:
+            path: 文件相对路径
+
+        Returns:
+            文件完整路径
+
+        Raises:
+            ValidationError: 路径为空或不安全时抛出
+            FileSystemError: 文件不存在或不是文件时抛出
+        """
+        if not path:
+            raise ValidationError("File path cannot be empty", user_message="文件路径不能为空")
+
+        full_path = self._get_full_path(path)
+        self._validate_path(full_path)
+
+        if not os.path.isfile(full_path):
+            raise FileSystemError(
+                f"File not found: {full_path}", user_message="文件不存在", details={"path": path}
+            )
+        return full_path
+
     def read_file(self, path: str) -> bytes:
         """读取文件内容
 
@@ -0,0 +1,487 @@
+"""
+文件系统监听缓存失效服务模块
+
+监听本地仓库目录的文件变化，把文件事件转换为精确的缓存失效：
+- Linux 上使用 inotify（通过 ctypes 调用 libc，无额外依赖），其他平台或 inotify 不可用时退回轮询
+- 只清除受影响路径（文件所在目录及其各级上级目录、文件本身）的文件数量、目录树和文件内容缓存
+- 同一批事件去重后再失效；inotify 事件队列溢出时退回清除仓库所有者的整类缓存
+- 定期重新加载仓库列表，新建或停用的仓库自动加入或移出监听
+- 同步刷新仓库文件目录（RepositoryCatalog）中受影响的目录，并持续标记被监听仓库的目录为当前
+
+目录缓存键是相对路径，但不同的调用方相对的基础目录不同（用户仓库根目录、仓库目录、课程目录），
+因此每个受影响目录会按所有基础目录各生成一个相对路径。
+
+使用示例：
+    watcher = RepositoryCacheWatcher()
+    watcher.run()          # 阻塞运行，通常由 manage.py watch_repository_caches 启动
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from grading.cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# 事件队列溢出时 poll 返回的特殊路径
+OVERFLOW = "<overflow>"
+
+
+def _is_hidden(name: str) -> bool:
+    """跳过隐藏文件与目录（如 .git）以及 Office 临时文件"""
+    return name.startswith(".") or name.startswith("~$")
+
+
+class PollingWatcher:
+    """轮询监听器：定期扫描目录快照并比较 (mtime, size)"""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._roots: Set[str] = set()
+        self._snapshots: Dict[str, Dict[str, Tuple[bool, int, int]]] = {}
+
+    def add_root(self, root: str) -> None:
+        root = os.path.abspath(root)
+        if root not in self._roots:
+            self._roots.add(root)
+            self._snapshots[root] = self._snapshot(root)
+
+    def remove_root(self, root: str) -> None:
+        root = os.path.abspath(root)
+        self._roots.discard(root)
+        self._snapshots.pop(root, None)
+
+    @staticmethod
+    def _snapshot(root: str) -> Dict[str, Tuple[bool, int, int]]:
+        snapshot = {}
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if _is_hidden(entry.name):
+                            continue
+                        try:
+                            stat = entry.stat(follow_symlinks=False)
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        snapshot[entry.path] = (is_dir, stat.st_mtime_ns, stat.st_size)
+                        if is_dir:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return snapshot
+
+    def poll(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """
+        等待一个轮询周期并返回变化的路径
+
+        Returns:
+            {绝对路径: 是否为目录}
+        """
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        changed: Dict[str, bool] = {}
+        for root in list(self._roots):
+            before = self._snapshots.get(root, {})
+            after = self._snapshot(root)
+            for path, state in after.items():
+                if before.get(path) != state:
+                    changed[path] = state[0]
+            for path, state in before.items():
+                if path not in after:
+                    changed[path] = state[0]
+            self._snapshots[root] = after
+        return changed
+
+    def close(self) -> None:
+        self._roots.clear()
+        self._snapshots.clear()
+
+
+class InotifyWatcher:
+    """inotify 监听器：递归为每个目录添加监听，新建目录自动加入"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 失败: {os.strerror(errno)}")
+        self._wd_paths: Dict[int, str] = {}
+        self._path_wds: Dict[str, int] = {}
+
+    @classmethod
+    def is_supported(cls) -> bool:
+        return sys.platform.startswith("linux")
+
+    def _add_watch(self, path: str) -> None:
+        if path in self._path_wds:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning("添加 inotify 监听失败: %s - %s", path, os.strerror(errno))
+            return
+        self._wd_paths[wd] = path
+        self._path_wds[path] = wd
+
+    def _add_tree(self, root: str) -> None:
+        self._add_watch(root)
+        for current, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not _is_hidden(d)]
+            for name in dirs:
+                self._add_watch(os.path.join(current, name))
+
+    def add_root(self, root: str) -> None:
+        self._add_tree(os.path.abspath(root))
+
+    def remove_root(self, root: str) -> None:
+        root = os.path.abspath(root)
+        for path, wd in list(self._path_wds.items()):
+            if path == root or path.startswith(root + os.sep):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._path_wds.pop(path, None)
+                self._wd_paths.pop(wd, None)
+
+    def poll(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """
+        等待文件事件并返回变化的路径
+
+        Returns:
+            {绝对路径: 是否为目录}；事件队列溢出时包含 OVERFLOW 键
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return {}
+
+        changed: Dict[str, bool] = {}
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + name_len].rstrip(b"\0"))
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    changed[OVERFLOW] = True
+                    continue
+                parent = self._wd_paths.get(wd)
+                if mask & IN_IGNORED:
+                    if parent is not None:
+                        self._path_wds.pop(parent, None)
+                        self._wd_paths.pop(wd, None)
+                    continue
+                if parent is None or (name and _is_hidden(name)):
+                    continue
+
+                path = os.path.join(parent, name) if name else parent
+                is_dir = bool(mask & IN_ISDIR) or not name
+                changed[path] = is_dir
+                if is_dir and name and mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新目录：加入监听（其中已有的文件通过目录自身的失效覆盖）
+                    self._add_tree(path)
+                elif is_dir and name and mask & IN_MOVED_FROM:
+                    # 移走的目录：旧路径的监听不再有效
+                    self.remove_root(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._wd_paths.clear()
+        self._path_wds.clear()
+
+
+def create_watcher(polling: bool = False, interval: float = 2.0):
+    """创建监听器：优先 inotify，不可用时退回轮询"""
+    if not polling and InotifyWatcher.is_supported():
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify 不可用，改为轮询: %s", str(e))
+    return PollingWatcher(interval=interval)
+
+
+class WatchedRoot:
+    """一个被监听的本地仓库目录及其缓存作用域"""
+
+    def __init__(
+        self,
+        root: str,
+        user_id: Optional[int],
+        tenant_id: Optional[int],
+        base_dirs: Iterable[str] = (),
+        repository=None,
+    ):
+        self.root = os.path.abspath(root)
+        # 仓库对象：提供时同步刷新仓库文件目录
+        self.repository = repository
+        self.cache_manager = CacheManager(user_id=user_id, tenant_id=tenant_id)
+        # 目录缓存键可能相对于的基础目录（仓库目录本身总是包含在内）
+        self.base_dirs = [self.root]
+        for base in base_dirs:
+            base = os.path.abspath(base) if base else None
+            if base and base not in self.base_dirs and self.root.startswith(base + os.sep):
+                self.base_dirs.append(base)
+        # 最外层基础目录：上级目录失效的终点
+        self.top = min(self.base_dirs, key=len)
+
+    def contains(self, path: str) -> bool:
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def _relative_keys(self, abs_path: str) -> List[str]:
+        """绝对路径相对于各基础目录（以及课程目录）的缓存键"""
+        keys = []
+        bases = list(self.base_dirs)
+        rel_to_root = os.path.relpath(abs_path, self.root)
+        if rel_to_root != ".":
+            course = rel_to_root.split(os.sep, 1)[0]
+            bases.append(os.path.join(self.root, course))
+        for base in bases:
+            if abs_path != base and not abs_path.startswith(base + os.sep):
+                continue
+            rel = os.path.relpath(abs_path, base)
+            keys.append("" if rel == "." else rel.replace(os.sep, "/"))
+        return keys
+
+    def invalidate(self, changed: Dict[str, bool]) -> int:
+        """
+        清除受变化路径影响的缓存
+
+        Args:
+            changed: {绝对路径: 是否为目录}
+
+        Returns:
+            清除的缓存键数量
+        """
+        dirs: Set[str] = set()
+        files: Set[str] = set()
+        for path, is_dir in changed.items():
+            (dirs if is_dir else files).add(path)
+            # 所在目录及各级上级目录（直到最外层基础目录）的文件数量与目录树都可能变化
+            parent = os.path.dirname(path)
+            while parent == self.top or parent.startswith(self.top + os.sep):
+                dirs.add(parent)
+                if parent == self.top:
+                    break
+                parent = os.path.dirname(parent)
+
+        dir_keys = [key for path in sorted(dirs) for key in self._relative_keys(path)]
+        file_keys = [key for path in sorted(files) for key in self._relative_keys(path)]
+        if self.repository is not None:
+            self._refresh_catalog(changed)
+        return self.cache_manager.invalidate_paths(dir_paths=dir_keys, file_paths=file_keys)
+
+    def _refresh_catalog(self, changed: Optional[Dict[str, bool]] = None) -> None:
+        """刷新仓库文件目录；changed 为 None 时执行一次完整的增量刷新"""
+        from grading.services.repository_catalog import RepositoryCatalog
+
+        try:
+            catalog = RepositoryCatalog(self.repository)
+            if changed is None:
+                catalog.refresh()
+            else:
+                catalog.refresh_paths(changed)
+        except Exception as e:
+            logger.warning("刷新仓库文件目录失败: %s - %s", self.root, str(e))
+            RepositoryCatalog.mark_stale(self.repository)
+
+    def keep_catalog_current(self, timeout: float, refresh: bool = False) -> None:
+        """续期仓库文件目录的当前标记；refresh=True 或标记已过期时先完整增量刷新"""
+        from grading.services.repository_catalog import RepositoryCatalog
+
+        try:
+            catalog = None if refresh else RepositoryCatalog.current(self.repository)
+            if catalog is None:
+                catalog = RepositoryCatalog(self.repository)
+                catalog.refresh()
+            catalog.mark_current(timeout)
+        except Exception as e:
+            logger.warning("刷新仓库文件目录失败: %s - %s", self.root, str(e))
+            RepositoryCatalog.mark_stale(self.repository)
+
+    def invalidate_all(self) -> None:
+        """事件丢失时退回清除整个作用域的目录与文件缓存"""
+        self.cache_manager.clear_file_count()
+        self.cache_manager.clear_dir_tree()
+        self.cache_manager.clear_file_content()
+        self.cache_manager.clear_file_metadata()
+        if self.repository is not None:
+            self._refresh_catalog()
+
+
+class RepositoryCacheWatcher:
+    """
+    仓库缓存监听服务
+
+    监听所有激活的本地仓库目录，按批次把文件事件转换为缓存失效。
+    """
+
+    def __init__(
+        self,
+        polling: bool = False,
+        interval: float = 2.0,
+        debounce: float = 0.5,
+        reload_interval: float = 60.0,
+    ):
+        """
+        Args:
+            polling: 强制使用轮询监听
+            interval: 轮询间隔（秒）
+            debounce: 收到事件后继续收集的时间（秒），同一批事件去重后统一失效
+            reload_interval: 重新加载仓库列表的间隔（秒）
+        """
+        self.watcher = create_watcher(polling=polling, interval=interval)
+        self.debounce = debounce
+        self.reload_interval = reload_interval
+        self.roots: Dict[str, WatchedRoot] = {}
+        self._loaded_at: Optional[float] = None
+        self._running = False
+
+    def load_roots(self) -> List[WatchedRoot]:
+        """读取需要监听的本地仓库目录"""
+        from grading.models import Repository
+
+        roots = []
+        repositories = Repository.objects.filter(is_active=True).select_related(
+            "owner", "owner__profile"
+        )
+        for repository in repositories:
+            try:
+                root = repository.get_full_path()
+            except Exception as e:
+                logger.warning("无法解析仓库目录: %s - %s", repository, str(e))
+                continue
+            if not os.path.isdir(root):
+                continue
+            profile = getattr(repository.owner, "profile", None) if repository.owner else None
+            tenant_id = getattr(profile, "tenant_id", None) or repository.tenant_id
+            base_dirs = [repository._get_user_root_base_dir()]
+            if profile and profile.get_repo_base_dir():
+                base_dirs.append(os.path.expanduser(profile.get_repo_base_dir()))
+            roots.append(
+                WatchedRoot(root, repository.owner_id, tenant_id, base_dirs, repository=repository)
+            )
+        return roots
+
+    def reload(self) -> None:
+        """同步监听的仓库目录"""
+        roots = {root.root: root for root in self.load_roots()}
+        for path in set(self.roots) - set(roots):
+            self.watcher.remove_root(path)
+            logger.info("停止监听仓库目录: %s", path)
+        added = set(roots) - set(self.roots)
+        for path in added:
+            self.watcher.add_root(path)
+            logger.info("开始监听仓库目录: %s", path)
+        self.roots = roots
+        self._loaded_at = time.monotonic()
+        # 只有被监听的所有者作用域使用更长的缓存过期时间；记录在监听器停止后自动过期
+        timeout = max(self.reload_interval * 3, 60)
+        CacheManager.set_watched_scopes(
+            [(root.cache_manager.tenant_id, root.cache_manager.user_id) for root in roots.values()],
+            timeout=timeout,
+        )
+        # 仓库文件目录：开始监听时（已注册监听，不会漏掉刷新期间的事件）完整增量刷新，
+        # 之后由事件保持同步，这里只续期当前标记
+        for path, root in roots.items():
+            if root.repository is not None:
+                root.keep_catalog_current(timeout, refresh=path in added)
+
+    def dispatch(self, changed: Dict[str, bool]) -> int:
+        """把一批变化路径分发给所属仓库并执行失效"""
+        if OVERFLOW in changed:
+            logger.warning("文件事件队列溢出，清除所有监听仓库的目录缓存")
+            for root in self.roots.values():
+                root.invalidate_all()
+            return 0
+
+        by_root: Dict[str, Dict[str, bool]] = {}
+        # 嵌套仓库时归属最深的目录
+        ordered = sorted(self.roots, key=len, reverse=True)
+        for path, is_dir in changed.items():
+            for root_path in ordered:
+                if self.roots[root_path].contains(path):
+                    by_root.setdefault(root_path, {})[path] = is_dir
+                    break
+
+        cleared = 0
+        for root_path, root_changes in by_root.items():
+            cleared += self.roots[root_path].invalidate(root_changes)
+            logger.debug("仓库目录 %s: %d 个路径变化", root_path, len(root_changes))
+        return cleared
+
+    def run_once(self, timeout: Optional[float] = None) -> int:
+        """等待一批事件并失效，返回清除的缓存键数量"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+            self.reload()
+
+        changed = self.watcher.poll(timeout if timeout is not None else self.reload_interval)
+        if not changed:
+            return 0
+        deadline = time.monotonic() + self.debounce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            changed.update(self.watcher.poll(remaining))
+        return self.dispatch(changed)
+
+    def run(self) -> None:
+        """阻塞运行，直到 stop() 被调用"""
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error("缓存监听处理失败: %s", str(e), exc_info=True)
+                    time.sleep(1)
+        finally:
+            CacheManager.set_watched_scopes((), timeout=0)
+            self.watcher.close()
+
+    def stop(self) -> None:
+        self._running = False
@@ -0,0 +1,277 @@
+"""
+Git cat-file 进程池模块
+
+GitStorageAdapter 读取远程文件时，每个文件执行一次 git show 需要一次 fork/exec。
+本模块为每个本地镜像维护常驻的 git cat-file --batch 进程：
+- 通过 stdin 发送对象名（如 "<提交>:<路径>"），从 stdout 流式读取对象内容
+- 并发进程数有上限，超出时等待空闲进程
+- 进程崩溃（管道断开、输出不完整）时丢弃并重启后重试一次
+- 空闲超过一定时间的进程由定时器关闭（借用/归还时也会顺带清理），进程退出时关闭全部进程
+- 借用期间出现任何异常都会杀掉该进程，不会归还到池中
+- read_many 以流水线方式批量发送请求，批量读取只需一个进程
+
+使用示例：
+    pool = CatFilePool("/tmp/huali-edu-git/<hash>")
+    content = pool.read("abc123:第一次作业/张三.docx")   # 不存在时返回 None
+    contents = pool.read_many(["abc123:a.docx", "abc123:b.docx"])
+"""
+
+import atexit
+import logging
+import subprocess
+import threading
+import time
+import weakref
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个镜像最多同时运行的 cat-file 进程数
+DEFAULT_MAX_PROCESSES = 4
+
+# 空闲进程保留时间（秒）
+DEFAULT_IDLE_TIMEOUT = 120
+
+# 流水线中一次写入 stdin 的最大字节数，小于管道缓冲区，避免双方互相阻塞
+PIPELINE_CHUNK_BYTES = 32 * 1024
+
+
+class CatFileError(Exception):
+    """cat-file 进程异常"""
+
+
+class CatFileProcess:
+    """单个 git cat-file --batch 进程"""
+
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self.last_used = time.monotonic()
+        self._proc = subprocess.Popen(
+            ["git", "-c", "core.quotepath=false", "cat-file", "--batch"],
+            cwd=repo_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def request(self, objects: List[str]) -> List[Optional[bytes]]:
+        """按顺序读取一组对象
+
+        请求分块写入 stdin，每块写完后读取对应的响应。
+
+        Args:
+            objects: 对象名列表
+
+        Returns:
+            与 objects 一一对应的内容，对象不存在或不是文件时为 None
+
+        Raises:
+            CatFileError: 进程异常退出或输出格式错误
+        """
+        results: List[Optional[bytes]] = []
+        start = 0
+        while start < len(objects):
+            end = start
+            size = 0
+            while end < len(objects) and (end == start or size < PIPELINE_CHUNK_BYTES):
+                size += len(objects[end].encode("utf-8")) + 1
+                end += 1
+            chunk = objects[start:end]
+
+            try:
+                self._proc.stdin.write(b"".join(o.encode("utf-8") + b"\n" for o in chunk))
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                raise CatFileError(f"写入 cat-file 进程失败: {e}")
+
+            for _ in chunk:
+                results.append(self._read_response())
+            start = end
+
+        self.last_used = time.monotonic()
+        return results
+
+    def _read_response(self) -> Optional[bytes]:
+        header = self._proc.stdout.readline()
+        if not header.endswith(b"\n"):
+            raise CatFileError("cat-file 进程意外退出")
+
+        # 格式: <sha> <type> <size>，或 <object> missing / ambiguous
+        parts = header.rstrip(b"\n").rsplit(b" ", 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            return None
+
+        size = int(parts[2])
+        content = self._proc.stdout.read(size)
+        if len(content) != size or self._proc.stdout.read(1) != b"\n":
+            raise CatFileError("cat-file 输出不完整")
+        return content if parts[1] == b"blob" else None
+
+    def close(self) -> None:
+        """关闭进程"""
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+        self._proc.stdout.close()
+
+    def kill(self) -> None:
+        """立即结束进程（状态未知时使用，不等待剩余输出）"""
+        try:
+            self._proc.kill()
+        except OSError:
+            pass
+        for stream in (self._proc.stdin, self._proc.stdout):
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+        self._proc.wait()
+
+
+# 所有进程池，进程退出时关闭其中的空闲进程
+_pools: "weakref.WeakSet[CatFilePool]" = weakref.WeakSet()
+
+
+class CatFilePool:
+    """单个镜像的 cat-file 进程池"""
+
+    def __init__(
+        self,
+        repo_dir: str,
+        max_processes: int = DEFAULT_MAX_PROCESSES,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """初始化进程池（不会立即启动进程）
+
+        Args:
+            repo_dir: 本地镜像目录
+            max_processes: 最大并发进程数
+            idle_timeout: 空闲进程保留时间（秒）
+        """
+        self.repo_dir = repo_dir
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(max_processes)
+        self._idle: List[CatFileProcess] = []
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Timer] = None
+        _pools.add(self)
+
+    def read(self, obj: str) -> Optional[bytes]:
+        """读取单个对象
+
+        Args:
+            obj: 对象名，如 "<提交>:<路径>"
+
+        Returns:
+            文件内容，不存在时返回 None
+        """
+        return self.read_many([obj])[0]
+
+    def read_many(self, objects: List[str]) -> List[Optional[bytes]]:
+        """流水线批量读取对象
+
+        Args:
+            objects: 对象名列表
+
+        Returns:
+            与 objects 一一对应的内容，不存在时为 None
+
+        Raises:
+            CatFileError: 重启后仍然失败
+        """
+        if not objects:
+            return []
+        for obj in objects:
+            if "\n" in obj:
+                raise CatFileError(f"对象名不能包含换行: {obj!r}")
+
+        with self._slots:
+            for attempt in range(2):
+                process = self._acquire()
+                try:
+                    results = process.request(objects)
+                except CatFileError as e:
+                    process.kill()
+                    if attempt == 0:
+                        logger.warning(f"cat-file 进程异常，重启后重试: {self.repo_dir}: {e}")
+                        continue
+                    raise
+                except BaseException:
+                    # 进程可能停在一次请求中间，不能再归还
+                    process.kill()
+                    raise
+                self._release(process)
+                return results
+
+    def close(self) -> None:
+        """关闭所有空闲进程"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for process in idle:
+            process.close()
+
+    def _acquire(self) -> CatFileProcess:
+        with self._lock:
+            expired = self._pop_expired()
+            process = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.alive:
+                    process = candidate
+                    break
+                expired.append(candidate)
+        for stale in expired:
+            stale.close()
+        return process or CatFileProcess(self.repo_dir)
+
+    def _release(self, process: CatFileProcess) -> None:
+        with self._lock:
+            self._idle.append(process)
+            expired = self._pop_expired()
+            self._schedule_reaper()
+        for stale in expired:
+            stale.close()
+
+    def _schedule_reaper(self) -> None:
+        """有空闲进程时启动定时器，池长时间不用也能关闭空闲进程（需持有 _lock）"""
+        if self._reaper is not None or not self._idle:
+            return
+        oldest = min(p.last_used for p in self._idle)
+        wait = max(oldest + self.idle_timeout - time.monotonic(), 0.01)
+        self._reaper = threading.Timer(wait, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        with self._lock:
+            self._reaper = None
+            expired = self._pop_expired()
+            self._schedule_reaper()
+        for stale in expired:
+            stale.close()
+
+    def _pop_expired(self) -> List[CatFileProcess]:
+        now = time.monotonic()
+        expired = [p for p in self._idle if now - p.last_used >= self.idle_timeout]
+        if expired:
+            self._idle = [p for p in self._idle if p not in expired]
+        return expired
+
+
+@atexit.register
+def _close_all_pools() -> None:
+    for pool in list(_pools):
+        pool.close()
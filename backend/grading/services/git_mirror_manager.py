@@ -0,0 +1,168 @@
+"""
+Git 镜像管理服务模块
+
+为 GitStorageAdapter 维护长期存在的本地裸镜像，避免每次读取都执行 git fetch：
+- 每个 (仓库 URL, 分支) 对应一个裸镜像目录
+- 在可配置的新鲜度窗口内最多 fetch 一次（settings.GIT_MIRROR_FRESHNESS_SECONDS）
+- 每个镜像一把锁，并发请求只会触发一次 fetch，其余请求等待并复用结果
+- 记录 fetch 后解析出的 FETCH_HEAD 提交，供调用方将一次请求内的所有读取固定到同一提交
+- 每个镜像附带一个 git cat-file --batch 进程池，用于读取文件内容
+
+使用示例：
+    manager = get_mirror_manager()
+    mirror = manager.ensure_fresh(
+        git_url, branch, fetch=adapter_fetch, resolve_head=adapter_resolve_head
+    )
+    mirror.repo_dir      # 裸镜像目录
+    mirror.head_commit   # 本次 fetch 得到的提交 SHA
+    mirror.cat_file_pool.read(f"{mirror.head_commit}:第一次作业/张三.docx")
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .git_cat_file_pool import CatFilePool
+
+logger = logging.getLogger(__name__)
+
+# 默认新鲜度窗口（秒）
+DEFAULT_FRESHNESS_SECONDS = 60
+
+
+class GitMirror:
+    """单个裸镜像的状态"""
+
+    def __init__(self, git_url: str, branch: str, repo_dir: str):
+        self.git_url = git_url
+        self.branch = branch
+        self.repo_dir = repo_dir
+        self.lock = threading.Lock()
+        self.fetched_at: Optional[float] = None
+        self.head_commit: Optional[str] = None
+        self.cat_file_pool = CatFilePool(repo_dir)
+
+    def is_fresh(self, max_age: float) -> bool:
+        """判断镜像是否在新鲜度窗口内"""
+        if self.fetched_at is None or not self.head_commit:
+            return False
+        return time.monotonic() - self.fetched_at < max_age
+
+
+class GitMirrorManager:
+    """Git 裸镜像管理器
+
+    进程内单例，按 (URL, 分支) 管理镜像；fetch 的具体实现（认证、重试）由调用方提供。
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, freshness_seconds: Optional[float] = None):
+        """初始化镜像管理器
+
+        Args:
+            base_dir: 镜像根目录，默认 <临时目录>/huali-edu-git
+            freshness_seconds: 新鲜度窗口（秒），默认读取 settings.GIT_MIRROR_FRESHNESS_SECONDS
+        """
+        self.base_dir = base_dir or os.path.join(tempfile.gettempdir(), "huali-edu-git")
+        if freshness_seconds is None:
+            freshness_seconds = getattr(
+                settings, "GIT_MIRROR_FRESHNESS_SECONDS", DEFAULT_FRESHNESS_SECONDS
+            )
+        self.freshness_seconds = freshness_seconds
+        self._mirrors: Dict[Tuple[str, str], GitMirror] = {}
+        self._lock = threading.Lock()
+
+    def get_mirror(self, git_url: str, branch: str) -> GitMirror:
+        """获取（必要时创建）镜像对象，不执行 fetch
+
+        Args:
+            git_url: 仓库 URL（不含认证信息）
+            branch: 分支名称
+
+        Returns:
+            GitMirror 实例
+        """
+        key = (git_url, branch)
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                mirror = GitMirror(git_url, branch, self._mirror_dir(git_url, branch))
+                self._mirrors[key] = mirror
+            return mirror
+
+    def ensure_fresh(
+        self,
+        git_url: str,
+        branch: str,
+        fetch: Callable[[str], None],
+        resolve_head: Callable[[str], str],
+        max_age: Optional[float] = None,
+        force: bool = False,
+    ) -> GitMirror:
+        """确保镜像在新鲜度窗口内，必要时执行一次 fetch
+
+        同一镜像的并发调用串行化：第一个调用执行 fetch，其余调用拿到锁后发现已新鲜直接返回。
+
+        Args:
+            git_url: 仓库 URL（不含认证信息）
+            branch: 分支名称
+            fetch: 执行 fetch 的函数，参数为镜像目录
+            resolve_head: 解析 FETCH_HEAD 提交的函数，参数为镜像目录
+            max_age: 新鲜度窗口（秒），默认使用管理器配置
+            force: 为 True 时忽略新鲜度强制 fetch
+
+        Returns:
+            GitMirror 实例
+
+        Raises:
+            fetch / resolve_head 抛出的异常（镜像状态保持不变）
+        """
+        if max_age is None:
+            max_age = self.freshness_seconds
+        mirror = self.get_mirror(git_url, branch)
+
+        with mirror.lock:
+            if not force and mirror.is_fresh(max_age):
+                return mirror
+
+            os.makedirs(mirror.repo_dir, exist_ok=True)
+            started = time.monotonic()
+            fetch(mirror.repo_dir)
+            head_commit = resolve_head(mirror.repo_dir)
+            mirror.head_commit = head_commit
+            mirror.fetched_at = time.monotonic()
+            logger.info(
+                f"Git 镜像已更新: {git_url}@{branch} -> {head_commit[:12]} "
+                f"({mirror.fetched_at - started:.2f}s)"
+            )
+            return mirror
+
+    def invalidate(self, git_url: str, branch: str) -> None:
+        """标记镜像过期，下次访问时重新 fetch（例如推送新提交之后）"""
+        mirror = self._mirrors.get((git_url, branch))
+        if mirror is not None:
+            with mirror.lock:
+                mirror.fetched_at = None
+
+    def _mirror_dir(self, git_url: str, branch: str) -> str:
+        mirror_hash = hashlib.md5(f"{git_url}\0{branch}".encode("utf-8")).hexdigest()
+        return os.path.join(self.base_dir, mirror_hash)
+
+
+_mirror_manager: Optional[GitMirrorManager] = None
+_mirror_manager_lock = threading.Lock()
+
+
+def get_mirror_manager() -> GitMirrorManager:
+    """获取进程内共享的镜像管理器"""
+    global _mirror_manager
+    if _mirror_manager is None:
+        with _mirror_manager_lock:
+            if _mirror_manager is None:
+                _mirror_manager = GitMirrorManager()
+    return _mirror_manager
@@ -4,7 +4,7 @@ Git 远程仓库存储适配器 (Git Storage Adapter)
 本模块实现通过 Git 命令直接访问远程仓库的存储适配器，无需本地克隆。
 
 核心特性：
-1. 远程直接访问：使用 git ls-tree 和 git show 命令直接读取远程仓库
+1. 远程直接访问：使用 git ls-tree 和常驻的 git cat-file --batch 进程读取远程仓库
 2. 无本地克隆：不在本地文件系统创建仓库副本，节省存储空间
 3. 自动缓存：使用 Django 缓存框架缓存远程数据，提高性能
 4. 认证支持：支持 HTTP/HTTPS 用户名密码认证和 SSH 密钥认证
@@ -26,9 +26,12 @@ Git 远程仓库存储适配器 (Git Storage Adapter)
 - 使用 hashlib 生成缓存键
 
 缓存策略：
+- 本地裸镜像由 GitMirrorManager 管理，新鲜度窗口内不重复 fetch
+- 每个适配器实例固定读取首次解析出的提交，一次请求内的读取版本一致
 - 目录列表缓存：5分钟
+- 子树递归列表缓存：按 tree 对象 SHA 缓存，子树不变时跨提交复用
 - 文件内容缓存：5分钟
-- 缓存键格式：git_ls_{hash} 或 git_file_{hash}
+- 缓存键格式：git_storage:{hash}，包含提交 SHA
 - 多用户访问同一仓库共享缓存
 
 使用示例：
@@ -44,6 +47,9 @@ Git 远程仓库存储适配器 (Git Storage Adapter)
 
     # 读取文件（直接从远程读取）
     content = adapter.read_file("第一次作业/张三-作业1.docx")
+
+    # 批量读取（流水线，只占用一个 cat-file 进程）
+    contents = adapter.read_many(["第一次作业/张三-作业1.docx", "第一次作业/李四-作业1.docx"])
 """
 
 import hashlib
@@ -57,6 +63,8 @@ from urllib.parse import urlparse, urlunparse
 
 from django.core.cache import cache
 
+from .changed_paths_resolver import ChangedPathsResolver
+from .git_mirror_manager import get_mirror_manager
 from .storage_adapter import RemoteAccessError, StorageAdapter, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -103,6 +111,7 @@ class GitStorageAdapter(StorageAdapter):
         username: str = "",
         password: str = "",
         cache_timeout: int = 300,
+        fetch_interval: Optional[float] = None,
     ):
         """初始化 Git 存储适配器
 
@@ -112,13 +121,19 @@ class GitStorageAdapter(StorageAdapter):
             username: 用户名（可选）
             password: 密码（可选）
             cache_timeout: 缓存超时时间（秒），默认 300 秒（5分钟）
+            fetch_interval: 镜像新鲜度窗口（秒），None 表示使用镜像管理器的默认配置
         """
         self.git_url = git_url
         self.branch = branch
         self.username = username
         self.password = password
         self.cache_timeout = cache_timeout
+        self.fetch_interval = fetch_interval
         self._auth_url = self._build_auth_url()
+        # 本适配器固定读取的提交（首次访问镜像时确定）
+        self._head_commit: Optional[str] = None
+        # "<提交>:<路径>" -> tree 对象 SHA
+        self._tree_shas: Dict[str, str] = {}
 
     def _build_auth_url(self) -> str:
         """构建带认证的 URL
@@ -154,10 +169,7 @@ class GitStorageAdapter(StorageAdapter):
         return temp_file.name
 
     def _get_repo_dir(self) -> str:
-        repo_hash = hashlib.md5(self.git_url.encode("utf-8")).hexdigest()
-        base_dir = os.path.join(tempfile.gettempdir(), "huali-edu-git")
-        os.makedirs(base_dir, exist_ok=True)
-        return os.path.join(base_dir, repo_hash)
+        return get_mirror_manager().get_mirror(self.git_url, self.branch).repo_dir
 
     def _ensure_remote_configured(self, repo_dir: str) -> None:
         try:
@@ -182,9 +194,54 @@ class GitStorageAdapter(StorageAdapter):
             )
 
     def _ensure_remote_fetched(self) -> str:
-        repo_dir = self._get_repo_dir()
-        os.makedirs(repo_dir, exist_ok=True)
+        """确保本地镜像可用并固定读取的提交
+
+        同一个适配器实例只在第一次调用时访问镜像管理器；镜像在新鲜度窗口内不会重复 fetch。
+        之后的所有读取都使用第一次解析出的提交，保证一次请求内看到的是同一个版本。
+
+        Returns:
+            裸镜像目录
+        """
+        if self._head_commit:
+            return self._get_repo_dir()
+
+        mirror = get_mirror_manager().ensure_fresh(
+            self.git_url,
+            self.branch,
+            fetch=self._fetch_remote,
+            resolve_head=self._resolve_fetch_head,
+            max_age=self.fetch_interval,
+        )
+        self._head_commit = mirror.head_commit
+        return mirror.repo_dir
+
+    def refresh(self) -> Optional[str]:
+        """强制重新 fetch 并固定到最新提交
+
+        Returns:
+            最新提交 SHA
+        """
+        mirror = get_mirror_manager().ensure_fresh(
+            self.git_url,
+            self.branch,
+            fetch=self._fetch_remote,
+            resolve_head=self._resolve_fetch_head,
+            force=True,
+        )
+        self._head_commit = mirror.head_commit
+        return self._head_commit
+
+    def _resolve_fetch_head(self, repo_dir: str) -> str:
+        output = self._execute_git_command(
+            ["rev-parse", "FETCH_HEAD"], cwd=repo_dir, use_auth=False
+        )
+        return output.decode("utf-8", errors="ignore").strip()
+
+    @property
+    def _revision(self) -> str:
+        return self._head_commit or "FETCH_HEAD"
 
+    def _fetch_remote(self, repo_dir: str) -> None:
         if not os.path.isfile(os.path.join(repo_dir, "HEAD")):
             self._execute_git_command(["init", "--bare"], cwd=repo_dir, use_auth=False)
 
@@ -261,8 +318,6 @@ class GitStorageAdapter(StorageAdapter):
                 else:
                     # 非网络问题，直接抛出
                     raise exc
-        
-        return repo_dir
 
     def _get_cache_key(self, path: str, operation: str) -> str:
         """生成缓存键
@@ -271,20 +326,19 @@ class GitStorageAdapter(StorageAdapter):
             path: 文件或目录路径
             operation: 操作类型（ls, file 等）
 
+        缓存键包含固定的提交 SHA，新的提交自然使用新的缓存。
+
         Returns:
             缓存键字符串
         """
-        key_data = f"{self.git_url}:{self.branch}:{path}:{operation}"
+        key_data = f"{self.git_url}:{self.branch}:{self._head_commit or ''}:{path}:{operation}"
         key_hash = hashlib.md5(key_data.encode()).hexdigest()
         return f"git_storage:{key_hash}"
 
     def get_head_commit(self) -> Optional[str]:
         try:
-            repo_dir = self._ensure_remote_fetched()
-            output = self._execute_git_command(
-                ["rev-parse", "FETCH_HEAD"], cwd=repo_dir, use_auth=False
-            )
-            return output.decode("utf-8", errors="ignore").strip()
+            self._ensure_remote_fetched()
+            return self._head_commit
         except Exception:
             return None
 
@@ -292,16 +346,26 @@ class GitStorageAdapter(StorageAdapter):
         if not path or not commit:
             return None
         try:
-            repo_dir = self._ensure_remote_fetched()
-            output = self._execute_git_command(
-                ["diff", "--name-only", f"{commit}..FETCH_HEAD", "--", path],
-                cwd=repo_dir,
-                use_auth=False,
-            )
-            output_str = output.decode("utf-8", errors="ignore").strip()
-            return bool(output_str)
+            resolver = self.changed_paths_resolver()
+            changed = resolver.changed_paths(commit, self._head_commit)
         except Exception:
             return None
+        if changed is None:
+            return None
+        prefix = f"{path.rstrip('/')}/"
+        return path in changed or any(p.startswith(prefix) for p in changed)
+
+    def changed_paths_resolver(self) -> ChangedPathsResolver:
+        """创建基于本地镜像的变更解析器（同时固定读取的提交）
+
+        Returns:
+            ChangedPathsResolver 实例，head 应使用 get_head_commit() 的返回值
+        """
+        repo_dir = self._ensure_remote_fetched()
+        return ChangedPathsResolver(
+            repo_key=f"{self.git_url}@{self.branch}",
+            run_git=lambda args: self._execute_git_command(args, cwd=repo_dir, use_auth=False),
+        )
 
     def _execute_git_command(
         self,
@@ -493,16 +557,17 @@ class GitStorageAdapter(StorageAdapter):
         Raises:
             RemoteAccessError: 访问失败时抛出
         """
-        # 检查缓存
-        cache_key = self._get_cache_key(path, "ls")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            logger.debug(f"Cache hit for directory listing: {path}")
-            return cached
-
         try:
             repo_dir = self._ensure_remote_fetched()
-            ref = f"FETCH_HEAD:{path}" if path else "FETCH_HEAD"
+
+            # 检查缓存
+            cache_key = self._get_cache_key(path, "ls")
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Cache hit for directory listing: {path}")
+                return cached
+
+            ref = f"{self._revision}:{path}" if path else self._revision
             output = self._execute_git_command(
                 ["ls-tree", "-l", ref], cwd=repo_dir, use_auth=False
             )
@@ -524,10 +589,114 @@ class GitStorageAdapter(StorageAdapter):
                 details={"path": path, "error": str(e)},
             )
 
+    def list_tree(self, path: str = "", recursive: bool = True) -> List[Dict]:
+        """列出远程子树的完整目录结构
+
+        使用一次 git ls-tree -r -t -l -z 列出整个子树，单遍解析为嵌套结构，
+        目录条目的 children 字段为其子条目列表。
+        结果按子树的 tree 对象 SHA 缓存：子树内容不变时，即使仓库其他位置有新提交也不会重新列出。
+
+        Args:
+            path: 相对路径，空字符串表示根目录
+            recursive: 为 False 时只列出一层（等同 list_directory）
+
+        Returns:
+            目录条目列表（嵌套）
+
+        Raises:
+            RemoteAccessError: 访问失败时抛出
+        """
+        if not recursive:
+            return self.list_directory(path)
+
+        try:
+            repo_dir = self._ensure_remote_fetched()
+            tree_sha = self._resolve_tree_sha(path, repo_dir)
+
+            cache_key = f"git_storage:tree:{tree_sha}"
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Cache hit for tree listing: {path} ({tree_sha[:12]})")
+                return cached
+
+            output = self._execute_git_command(
+                ["ls-tree", "-r", "-t", "-l", "-z", tree_sha], cwd=repo_dir, use_auth=False
+            )
+            entries = self._parse_recursive_ls_tree_output(output)
+
+            cache.set(cache_key, entries, self.cache_timeout)
+            logger.debug(f"Cached tree listing: {path} ({tree_sha[:12]})")
+
+            return entries
+
+        except RemoteAccessError:
+            raise
+        except Exception as e:
+            raise RemoteAccessError(
+                f"Failed to list tree: {str(e)}",
+                user_message="无法读取远程目录，请检查路径是否正确",
+                details={"path": path, "error": str(e)},
+            )
+
+    def _resolve_tree_sha(self, path: str, repo_dir: str) -> str:
+        """解析固定提交中指定路径的 tree 对象 SHA"""
+        ref = f"{self._revision}:{path}" if path else f"{self._revision}^{{tree}}"
+        tree_sha = self._tree_shas.get(ref)
+        if tree_sha is None:
+            output = self._execute_git_command(
+                ["rev-parse", "--verify", ref], cwd=repo_dir, use_auth=False
+            )
+            tree_sha = output.decode("utf-8", errors="ignore").strip()
+            self._tree_shas[ref] = tree_sha
+        return tree_sha
+
+    def _parse_recursive_ls_tree_output(self, output: bytes) -> List[Dict]:
+        """解析 git ls-tree -r -t -l -z 输出为嵌套结构
+
+        -t 保证目录条目先于其子条目输出，因此单遍即可挂接到父目录。
+
+        Args:
+            output: git ls-tree 命令的输出（NUL 分隔，路径相对于子树根）
+
+        Returns:
+            顶层条目列表，目录条目包含 children
+        """
+        root: List[Dict] = []
+        children_by_dir: Dict[str, List[Dict]] = {"": root}
+
+        for record in self._decode_output(output).split("\0"):
+            # 格式: <mode> <type> <hash> <size>\t<path>
+            meta, sep, rel_path = record.partition("\t")
+            if not sep or not rel_path:
+                continue
+            meta_parts = meta.split()
+            if len(meta_parts) < 3:
+                continue
+
+            mode, obj_type, obj_hash = meta_parts[0], meta_parts[1], meta_parts[2]
+            size = int(meta_parts[3]) if len(meta_parts) > 3 and meta_parts[3] != "-" else 0
+            parent, _, name = rel_path.rpartition("/")
+            siblings = children_by_dir.get(parent)
+            if siblings is None:
+                continue
+
+            entry = {
+                "name": name,
+                "type": "dir" if obj_type == "tree" else "file",
+                "size": size,
+                "mode": mode,
+                "hash": obj_hash,
+            }
+            if obj_type == "tree":
+                entry["children"] = children_by_dir[rel_path] = []
+            siblings.append(entry)
+
+        return root
+
     def read_file(self, path: str) -> bytes:
         """读取远程文件内容
 
-        使用 git show 命令读取远程仓库的文件内容。
+        通过镜像的 git cat-file 进程池读取固定提交中的文件内容。
         结果会被缓存以提高性能。
 
         Args:
@@ -541,24 +710,58 @@ class GitStorageAdapter(StorageAdapter):
         """
         if not path:
             raise ValidationError("File path cannot be empty", user_message="文件路径不能为空")
+        return self.read_many([path])[path]
 
-        # 检查缓存
-        cache_key = self._get_cache_key(path, "file")
-        cached = cache.get(cache_key)
-        if cached is not None:
-            logger.debug(f"Cache hit for file: {path}")
-            return cached
+    def read_many(self, paths: List[str]) -> Dict[str, bytes]:
+        """批量读取远程文件内容
 
-        try:
-            repo_dir = self._ensure_remote_fetched()
-            ref = f"FETCH_HEAD:{path}"
-            content = self._execute_git_command(["show", ref], cwd=repo_dir, use_auth=False)
+        未命中缓存的文件以流水线方式一次性发送给同一个 cat-file 进程，
+        批量操作不需要为每个文件启动一个 git 进程。
 
-            # 缓存结果（文件内容缓存时间更长）
-            cache.set(cache_key, content, self.cache_timeout * 2)
-            logger.debug(f"Cached file content: {path}")
+        Args:
+            paths: 文件相对路径列表
 
-            return content
+        Returns:
+            路径到文件内容的字典
+
+        Raises:
+            RemoteAccessError: 任一文件读取失败时抛出
+        """
+        if any(not path for path in paths):
+            raise ValidationError("File path cannot be empty", user_message="文件路径不能为空")
+
+        results: Dict[str, bytes] = {}
+        try:
+            self._ensure_remote_fetched()
+
+            # 检查缓存
+            missing: List[str] = []
+            for path in dict.fromkeys(paths):
+                cached = cache.get(self._get_cache_key(path, "file"))
+                if cached is not None:
+                    logger.debug(f"Cache hit for file: {path}")
+                    results[path] = cached
+                else:
+                    missing.append(path)
+            if not missing:
+                return results
+
+            pool = get_mirror_manager().get_mirror(self.git_url, self.branch).cat_file_pool
+            contents = pool.read_many([f"{self._revision}:{path}" for path in missing])
+
+            for path, content in zip(missing, contents):
+                if content is None:
+                    raise RemoteAccessError(
+                        f"File not found: {self._revision}:{path}",
+                        user_message="无法读取文件内容，请检查文件路径",
+                        details={"path": path},
+                    )
+                # 缓存结果（文件内容缓存时间更长）
+                cache.set(self._get_cache_key(path, "file"), content, self.cache_timeout * 2)
+                results[path] = content
+            logger.debug(f"Cached file content: {len(missing)} file(s)")
+
+            return results
 
         except RemoteAccessError:
             raise
@@ -566,7 +769,7 @@ class GitStorageAdapter(StorageAdapter):
             raise RemoteAccessError(
                 f"Failed to read file: {str(e)}",
                 user_message="无法读取文件内容，请检查文件路径",
-                details={"path": path, "error": str(e)},
+                details={"paths": paths, "error": str(e)},
             )
 
     def write_file(self, path: str, content: bytes) -> bool:
@@ -0,0 +1,212 @@
+"""
+评分信息索引服务模块
+
+为 get_file_grade_info 提供持久化的解析结果索引，包括：
+- 以 (绝对路径, st_mtime_ns, st_size) 为键缓存完整的评分信息
+- 进程内 LRU 记忆，保证同一文件在一次请求中不会被解析两次
+- 数据库持久化，服务重启后仍可复用解析结果
+- get_many() 批量接口，供目录级调用方一次查询多个文件
+
+缓存的只是文件内容决定的字段（has_grade、grade、grade_type、locked、
+has_comment、format_valid、signature_cell、in_table、comment），依赖课程上下文的
+is_lab_report 由调用方自行计算。
+
+使用示例：
+    index = GradeInfoIndex(parser=parse_file_grade_info)
+    info = index.get("/path/to/张三.docx")
+    infos = index.get_many(["/path/a.docx", "/path/b.docx"])
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from grading.models import GradeInfoIndexEntry
+
+logger = logging.getLogger(__name__)
+
+# 进程内记忆的最大条目数
+DEFAULT_MEMORY_ENTRIES = 4096
+
+
+def _path_hash(path: str) -> str:
+    return hashlib.sha256(path.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+class GradeInfoIndex:
+    """评分信息索引
+
+    查找顺序：进程内 LRU → 数据库 → 解析文件。
+    stat 不一致视为未命中，解析后回写两级缓存。
+    """
+
+    def __init__(
+        self,
+        parser: Callable[[str], Dict],
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+    ):
+        """初始化评分信息索引
+
+        Args:
+            parser: 解析单个文件评分信息的函数，参数为文件绝对路径
+            max_memory_entries: 进程内记忆的最大条目数
+        """
+        self.parser = parser
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Tuple[Tuple[int, int], Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ==================== 公共接口 ====================
+
+    def get(self, path: str) -> Dict:
+        """获取单个文件的评分信息
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            评分信息字典（副本，调用方可自由修改）
+
+        Raises:
+            OSError: 文件不存在或无法访问
+            Exception: 解析失败时透传解析函数的异常（失败结果不会被缓存）
+        """
+        return self.get_many([path], raise_errors=True)[os.path.abspath(path)]
+
+    def get_many(self, paths: Iterable[str], raise_errors: bool = False) -> Dict[str, Dict]:
+        """批量获取评分信息
+
+        一次数据库查询取出所有持久化记录，只解析 stat 发生变化的文件。
+
+        Args:
+            paths: 文件路径列表
+            raise_errors: 为 True 时解析失败直接抛出，否则跳过该文件
+
+        Returns:
+            {绝对路径: 评分信息} 字典；无法读取的文件不在结果中
+        """
+        results: Dict[str, Dict] = {}
+        pending: Dict[str, Tuple[int, int]] = {}
+
+        for path in paths:
+            abs_path = os.path.abspath(path)
+            if abs_path in results or abs_path in pending:
+                continue
+            try:
+                stat_key = self._stat_key(abs_path)
+            except OSError:
+                if raise_errors:
+                    raise
+                continue
+
+            cached = self._memory_get(abs_path, stat_key)
+            if cached is not None:
+                results[abs_path] = cached
+            else:
+                pending[abs_path] = stat_key
+
+        if not pending:
+            return results
+
+        stored = self._load_entries(pending)
+        to_store = []
+        for abs_path, stat_key in pending.items():
+            info = stored.get(abs_path)
+            if info is None:
+                try:
+                    info = self.parser(abs_path)
+                except Exception:
+                    if raise_errors:
+                        raise
+                    logger.warning(f"解析评分信息失败: {abs_path}", exc_info=True)
+                    continue
+                to_store.append((abs_path, stat_key, info))
+
+            self._memory_set(abs_path, stat_key, info)
+            results[abs_path] = dict(info)
+
+        if to_store:
+            self._store_entries(to_store)
+
+        return results
+
+    def invalidate(self, path: str) -> None:
+        """使指定文件的索引失效（写入评分后调用）
+
+        Args:
+            path: 文件路径
+        """
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            self._memory.pop(abs_path, None)
+        try:
+            GradeInfoIndexEntry.objects.filter(path_hash=_path_hash(abs_path)).delete()
+        except Exception as e:
+            logger.warning(f"清除评分信息索引失败: {abs_path} - {e}")
+
+    def clear_memory(self) -> None:
+        """清空进程内记忆"""
+        with self._lock:
+            self._memory.clear()
+
+    # ==================== 私有方法 ====================
+
+    @staticmethod
+    def _stat_key(abs_path: str) -> Tuple[int, int]:
+        st = os.stat(abs_path)
+        return st.st_mtime_ns, st.st_size
+
+    def _memory_get(self, abs_path: str, stat_key: Tuple[int, int]) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(abs_path)
+            if entry is None or entry[0] != stat_key:
+                return None
+            self._memory.move_to_end(abs_path)
+            return dict(entry[1])
+
+    def _memory_set(self, abs_path: str, stat_key: Tuple[int, int], info: Dict) -> None:
+        with self._lock:
+            self._memory[abs_path] = (stat_key, dict(info))
+            self._memory.move_to_end(abs_path)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load_entries(self, pending: Dict[str, Tuple[int, int]]) -> Dict[str, Dict]:
+        hashes = {_path_hash(abs_path): abs_path for abs_path in pending}
+        try:
+            rows = GradeInfoIndexEntry.objects.filter(path_hash__in=list(hashes)).values_list(
+                "path_hash", "mtime_ns", "file_size", "grade_info"
+            )
+            stored = {}
+            for path_hash, mtime_ns, file_size, grade_info in rows:
+                abs_path = hashes[path_hash]
+                if pending[abs_path] == (mtime_ns, file_size):
+                    stored[abs_path] = grade_info
+            return stored
+        except Exception as e:
+            logger.warning(f"读取评分信息索引失败: {e}")
+            return {}
+
+    def _store_entries(self, entries) -> None:
+        objs = [
+            GradeInfoIndexEntry(
+                path_hash=_path_hash(abs_path),
+                file_path=abs_path,
+                mtime_ns=stat_key[0],
+                file_size=stat_key[1],
+                grade_info=info,
+            )
+            for abs_path, stat_key, info in entries
+        ]
+        try:
+            GradeInfoIndexEntry.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["path_hash"],
+                update_fields=["file_path", "mtime_ns", "file_size", "grade_info", "parsed_at"],
+            )
+        except Exception as e:
+            logger.warning(f"写入评分信息索引失败: {e}")
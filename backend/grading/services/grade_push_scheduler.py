@@ -0,0 +1,358 @@
+"""
+评分提交推送调度
+
+Git 仓库中的作业每保存一次评分，push_grade_changes 都要提交并推送一次，
+批改一个班就是几十次提交和网络推送。本模块按仓库记录已评分但尚未提交的文件：
+- 仓库有新的已评分文件时开始计时，GRADE_PUSH_DELAY_SECONDS 内没有新的评分、
+  或累计等待超过 GRADE_PUSH_MAX_WAIT_SECONDS、或文件数达到 GRADE_PUSH_BATCH_SIZE 时，
+  在后台线程中把这些文件作为一次提交并推送
+- 教师离开作业文件夹时前端调用 flush_grade_pushes，立即在后台提交推送
+- 提交失败时文件放回待提交列表，推送失败（包括超过 GRADE_PUSH_GIT_TIMEOUT_SECONDS 未完成）
+  时先 rebase 到远程分支，两者都按指数退避重试，最多 GRADE_PUSH_MAX_RETRIES 次；
+  仍失败时保留未提交或未推送状态，下一次提交时一起处理
+- 提交成功后把这些文件评分状态中的 last_graded_commit 更新为新提交，rebase 后再更新为
+  新的 HEAD，避免评分提交本身被当作“作业有更新”
+- status() 返回待提交文件数、是否正在推送、上次推送时间和错误信息，供页面显示
+
+同一仓库的提交推送串行执行；进程退出时提交推送所有待处理的文件。
+调度只在当前进程内有效。
+
+配置（settings）：
+- GRADE_PUSH_DELAY_SECONDS: 最后一次评分后等待的时间（秒），默认 30；0 表示立即提交推送
+- GRADE_PUSH_MAX_WAIT_SECONDS: 第一份评分最多等待的时间（秒），默认 300
+- GRADE_PUSH_BATCH_SIZE: 待提交文件数达到该值时立即提交，默认 30
+- GRADE_PUSH_MAX_RETRIES: 提交或推送失败的重试次数，默认 3
+- GRADE_PUSH_RETRY_SECONDS: 第一次重试前等待的时间（秒），之后每次加倍，默认 10
+- GRADE_PUSH_GIT_TIMEOUT_SECONDS: git push / pull --rebase 的超时（秒），默认 120
+
+使用示例：
+    scheduler = get_push_scheduler()
+    scheduler.mark_dirty(repository, full_path)   # 保存评分后调用
+    scheduler.flush_async(repository.id)          # 教师离开作业时调用
+    scheduler.status(repository.id)               # {"pending": 3, "pushing": False, ...}
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from grading.utils import GIT_REMOTE_TIMEOUT_SECONDS, GitHandler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELAY_SECONDS = 30.0
+DEFAULT_MAX_WAIT_SECONDS = 300.0
+DEFAULT_BATCH_SIZE = 30
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_SECONDS = 10.0
+
+
+class _RepoState:
+    def __init__(self, repo_root: str, branch: Optional[str]):
+        self.repo_root = repo_root
+        self.branch = branch
+        self.dirty: Set[str] = set()
+        # 正在提交的文件（计入待提交数）
+        self.committing: List[str] = []
+        # 已提交但尚未推送的文件（rebase 后需要更新评分状态中的提交）
+        self.unpushed_paths: Set[str] = set()
+        self.first_dirty_at: Optional[float] = None
+        self.timer: Optional[threading.Timer] = None
+        # 串行执行同一仓库的提交推送
+        self.run_lock = threading.Lock()
+        self.unpushed = False
+        self.pushing = False
+        self.attempts = 0
+        self.last_commit: Optional[str] = None
+        self.last_pushed_at = None
+        self.last_error = ""
+
+
+class GradePushScheduler:
+    """按仓库合并评分提交和推送"""
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        max_wait: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_seconds: Optional[float] = None,
+        git_timeout: Optional[float] = None,
+    ):
+        self._overrides = {
+            "GRADE_PUSH_DELAY_SECONDS": delay,
+            "GRADE_PUSH_MAX_WAIT_SECONDS": max_wait,
+            "GRADE_PUSH_BATCH_SIZE": batch_size,
+            "GRADE_PUSH_MAX_RETRIES": max_retries,
+            "GRADE_PUSH_RETRY_SECONDS": retry_seconds,
+            "GRADE_PUSH_GIT_TIMEOUT_SECONDS": git_timeout,
+        }
+        self._repos: Dict[int, _RepoState] = {}
+        self._lock = threading.Lock()
+
+    def _config(self, name: str, default, cast):
+        value = self._overrides[name]
+        if value is not None:
+            return value
+        return cast(getattr(settings, name, default))
+
+    @property
+    def delay(self) -> float:
+        return self._config("GRADE_PUSH_DELAY_SECONDS", DEFAULT_DELAY_SECONDS, float)
+
+    @property
+    def max_wait(self) -> float:
+        return self._config("GRADE_PUSH_MAX_WAIT_SECONDS", DEFAULT_MAX_WAIT_SECONDS, float)
+
+    @property
+    def batch_size(self) -> int:
+        return self._config("GRADE_PUSH_BATCH_SIZE", DEFAULT_BATCH_SIZE, int)
+
+    @property
+    def max_retries(self) -> int:
+        return self._config("GRADE_PUSH_MAX_RETRIES", DEFAULT_MAX_RETRIES, int)
+
+    @property
+    def retry_seconds(self) -> float:
+        return self._config("GRADE_PUSH_RETRY_SECONDS", DEFAULT_RETRY_SECONDS, float)
+
+    @property
+    def git_timeout(self) -> float:
+        return self._config("GRADE_PUSH_GIT_TIMEOUT_SECONDS", GIT_REMOTE_TIMEOUT_SECONDS, float)
+
+    def mark_dirty(self, repository, full_path: str) -> None:
+        """记录一个已评分、需要提交推送的文件"""
+        repo_root = os.path.abspath(repository.get_full_path())
+        full_path = os.path.abspath(full_path)
+        if not full_path.startswith(repo_root + os.sep):
+            logger.warning(f"文件不在仓库内，跳过提交: {full_path}")
+            return
+        rel_path = os.path.relpath(full_path, repo_root).replace(os.sep, "/")
+
+        with self._lock:
+            state = self._repos.get(repository.id)
+            if state is None:
+                state = self._repos[repository.id] = _RepoState(
+                    repo_root, repository.branch or None
+                )
+            else:
+                state.repo_root = repo_root
+                state.branch = repository.branch or None
+            state.dirty.add(rel_path)
+            now = time.monotonic()
+            if state.first_dirty_at is None:
+                state.first_dirty_at = now
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+
+            if self.delay <= 0:
+                run_now, wait = True, 0.0
+            else:
+                remaining = state.first_dirty_at + self.max_wait - now
+                run_now = len(state.dirty) >= self.batch_size or remaining <= 0
+                wait = min(self.delay, remaining)
+            if not run_now:
+                state.timer = self._start_timer(wait, repository.id)
+
+        if run_now:
+            if self.delay <= 0:
+                self.flush(repository.id)
+            else:
+                self.flush_async(repository.id)
+
+    def flush(self, repository_id: Optional[int] = None) -> None:
+        """立即提交并推送指定仓库（或全部仓库）待处理的文件"""
+        if repository_id is None:
+            with self._lock:
+                repo_ids = list(self._repos)
+            for repo_id in repo_ids:
+                try:
+                    self.flush(repo_id)
+                except Exception as e:
+                    logger.error(f"评分提交推送失败: 仓库 {repo_id} - {e}")
+            return
+        self._run(repository_id, retry=False)
+
+    def flush_async(self, repository_id: int) -> None:
+        """在后台线程中提交并推送指定仓库待处理的文件"""
+        thread = threading.Thread(
+            target=self._run_in_background, args=(repository_id, False), daemon=True
+        )
+        thread.start()
+
+    def status(self, repository_id: int) -> dict:
+        """仓库的提交推送状态"""
+        with self._lock:
+            state = self._repos.get(repository_id)
+            if state is None:
+                return {
+                    "pending": 0,
+                    "pushing": False,
+                    "unpushed": False,
+                    "last_commit": None,
+                    "last_pushed_at": None,
+                    "last_error": "",
+                }
+            return {
+                "pending": len(state.dirty) + len(state.committing),
+                "pushing": state.pushing,
+                "unpushed": state.unpushed,
+                "last_commit": state.last_commit,
+                "last_pushed_at": (
+                    state.last_pushed_at.isoformat() if state.last_pushed_at else None
+                ),
+                "last_error": state.last_error,
+            }
+
+    def _start_timer(self, wait: float, repository_id: int, retry: bool = False) -> threading.Timer:
+        timer = threading.Timer(wait, self._run_in_background, args=(repository_id, retry))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _run_in_background(self, repository_id: int, retry: bool) -> None:
+        close_old_connections()
+        try:
+            self._run(repository_id, retry=retry)
+        except Exception as e:
+            logger.error(f"评分提交推送失败: 仓库 {repository_id} - {e}", exc_info=True)
+        finally:
+            close_old_connections()
+
+    def _run(self, repository_id: int, retry: bool) -> None:
+        with self._lock:
+            state = self._repos.get(repository_id)
+        if state is None:
+            return
+
+        with state.run_lock:
+            with self._lock:
+                if state.timer is not None:
+                    state.timer.cancel()
+                    state.timer = None
+                paths = sorted(state.dirty)
+                state.dirty.clear()
+                state.first_dirty_at = None
+                state.committing = paths
+                state.pushing = bool(paths) or state.unpushed
+                if not retry:
+                    state.attempts = 0
+
+            try:
+                if paths:
+                    self._commit(repository_id, state, paths)
+                if state.unpushed:
+                    self._push(repository_id, state)
+            finally:
+                with self._lock:
+                    state.committing = []
+                    state.pushing = False
+
+    def _commit(self, repository_id: int, state: _RepoState, paths: List[str]) -> None:
+        if len(paths) == 1:
+            message = f"评分更新: {paths[0]}"
+        else:
+            message = f"评分更新: {len(paths)} 个文件\n\n" + "\n".join(paths)
+        try:
+            commit = GitHandler.commit_paths(state.repo_root, message, paths)
+        except Exception as e:
+            with self._lock:
+                state.dirty.update(paths)
+                if state.first_dirty_at is None:
+                    state.first_dirty_at = time.monotonic()
+                state.attempts += 1
+                attempts = state.attempts
+                state.last_error = str(e)
+            if attempts > self.max_retries:
+                logger.error(f"评分提交失败，已重试 {self.max_retries} 次: {state.repo_root} - {e}")
+                return
+            self._schedule_retry(repository_id, state, attempts, f"评分提交失败 - {e}")
+            return
+        if not commit:
+            return
+
+        logger.info(f"评分提交: {state.repo_root} {commit[:8]}（{len(paths)} 个文件）")
+        with self._lock:
+            state.last_commit = commit
+            state.unpushed = True
+            state.unpushed_paths.update(paths)
+        self._update_graded_commit(repository_id, paths, commit)
+
+    def _update_graded_commit(self, repository_id: int, paths, commit: str) -> None:
+        try:
+            from grading.models import FileGradeStatus
+
+            FileGradeStatus.objects.filter(
+                repository_id=repository_id, file_path__in=list(paths)
+            ).update(last_graded_commit=commit)
+        except Exception as e:
+            logger.warning(f"更新评分提交失败: {e}")
+
+    def _push(self, repository_id: int, state: _RepoState) -> None:
+        if GitHandler.push_branch(state.repo_root, state.branch, timeout=self.git_timeout):
+            with self._lock:
+                state.unpushed = False
+                state.unpushed_paths.clear()
+                state.attempts = 0
+                state.last_pushed_at = timezone.now()
+                state.last_error = ""
+            return
+
+        with self._lock:
+            state.attempts += 1
+            attempts = state.attempts
+            if attempts > self.max_retries:
+                state.last_error = f"推送失败，已重试 {self.max_retries} 次"
+            else:
+                state.last_error = "推送失败，稍后自动重试"
+        if attempts > self.max_retries:
+            logger.error(f"评分推送失败，已重试 {self.max_retries} 次: {state.repo_root}")
+            return
+        # 远程分支有新的提交时推送会被拒绝，先 rebase 再重试
+        if GitHandler.rebase_onto_remote(state.repo_root, state.branch, timeout=self.git_timeout):
+            # rebase 改写了本地的评分提交
+            head = GitHandler.get_head_commit(state.repo_root)
+            with self._lock:
+                paths = sorted(state.unpushed_paths)
+                if head:
+                    state.last_commit = head
+            if head and paths:
+                self._update_graded_commit(repository_id, paths, head)
+        self._schedule_retry(repository_id, state, attempts, "评分推送失败")
+
+    def _schedule_retry(
+        self, repository_id: int, state: _RepoState, attempts: int, reason: str
+    ) -> None:
+        wait = self.retry_seconds * (2 ** (attempts - 1))
+        logger.warning(f"{reason}，{wait:.0f} 秒后第 {attempts} 次重试: {state.repo_root}")
+        with self._lock:
+            if state.timer is None:
+                state.timer = self._start_timer(wait, repository_id, retry=True)
+
+
+_scheduler: Optional[GradePushScheduler] = None
+_singleton_lock = threading.Lock()
+
+
+def get_push_scheduler() -> GradePushScheduler:
+    """进程内共享的提交推送调度器"""
+    global _scheduler
+    with _singleton_lock:
+        if _scheduler is None:
+            _scheduler = GradePushScheduler()
+        return _scheduler
+
+
+@atexit.register
+def _flush_all() -> None:
+    if _scheduler is not None:
+        _scheduler.flush()
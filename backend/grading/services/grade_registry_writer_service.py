@@ -4,22 +4,34 @@
 提供两种场景的成绩写入服务：
 1. 作业评分系统场景：从作业目录批量写入成绩
 2. 工具箱模块场景：从班级目录的Excel文件批量写入成绩
+
+作业评分系统场景分两个阶段：
+- 解析阶段：在进程池中并发解析所有Word文档（学生姓名、评价校验、成绩），不持有登分册锁
+- 写入阶段：加载登分册（获取文件锁）后一次性写入所有成绩并保存，锁只在写入阶段持有
+
+解析前先比对登分册同步清单（见 registry_sync），未变化的文件不再解析。
 """
 
 import logging
-import math
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
+from grading import docx_extract
+from grading.docx_extract import extract_word_file_info, sanitize_grade_value
 from grading.grade_registry_writer import (
     GradeFileProcessor,
     NameMatcher,
     RegistryManager,
 )
+from grading.services.registry_sync import RegistrySync
 
 logger = logging.getLogger(__name__)
 
@@ -287,6 +299,9 @@ class GradeRegistryWriterService:
     # 安全加固：文件大小限制（100MB）
     MAX_FILE_SIZE = 100 * 1024 * 1024
 
+    # 性能优化：文件数少于该值时在当前进程内解析，避免启动进程池的开销
+    EXTRACT_POOL_MIN_FILES = 8
+
     def __init__(self, user, tenant, scenario: str):
         """
         初始化服务
@@ -474,65 +489,10 @@ class GradeRegistryWriterService:
             from openpyxl import load_workbook
 
             workbook = load_workbook(file_path, read_only=True, data_only=True)
-            worksheet = workbook.active
-
-            # 3. 检查是否有有效的工作表
-            if worksheet is None:
-                self.logger.error("Excel文件没有有效的工作表: %s", file_path)
-                workbook.close()
-                return False, "Excel文件格式错误：没有有效的工作表"
-
-            # 4. 检查是否有数据（至少要有表头行）
-            if worksheet.max_row < 1:
-                self.logger.warning("Excel文件没有数据: %s", file_path)
-                workbook.close()
-                return False, "Excel文件没有数据"
-
-            # 5. 检查工作表是否有列
-            if worksheet.max_column < 1:
-                self.logger.warning("Excel文件没有列: %s", file_path)
-                workbook.close()
-                return False, "Excel文件格式错误：没有列"
-
-            # 6. 检查是否有过多的行或列（防止恶意文件）
-            MAX_ROWS = 10000
-            MAX_COLS = 100
-            if worksheet.max_row > MAX_ROWS:
-                self.logger.error(
-                    "Excel文件行数过多: %s, 行数: %d, 限制: %d",
-                    file_path,
-                    worksheet.max_row,
-                    MAX_ROWS,
-                )
-                workbook.close()
-                self.audit_logger.logger.warning(
-                    "安全事件：Excel文件行数异常 - 用户: %s, 租户: %s, 文件: %s, 行数: %d",
-                    self.user.username if self.user else "Unknown",
-                    self.tenant.name if self.tenant else "Unknown",
-                    file_path,
-                    worksheet.max_row,
-                )
-                return False, f"Excel文件行数过多（{worksheet.max_row} > {MAX_ROWS}）"
-
-            if worksheet.max_column > MAX_COLS:
-                self.logger.error(
-                    "Excel文件列数过多: %s, 列数: %d, 限制: %d",
-                    file_path,
-                    worksheet.max_column,
-                    MAX_COLS,
-                )
+            try:
+                return self._validate_worksheet(workbook.active, file_path)
+            finally:
                 workbook.close()
-                self.audit_logger.logger.warning(
-                    "安全事件：Excel文件列数异常 - 用户: %s, 租户: %s, 文件: %s, 列数: %d",
-                    self.user.username if self.user else "Unknown",
-                    self.tenant.name if self.tenant else "Unknown",
-                    file_path,
-                    worksheet.max_column,
-                )
-                return False, f"Excel文件列数过多（{worksheet.max_column} > {MAX_COLS}）"
-
-            workbook.close()
-            return True, None
 
         except PermissionError as e:
             self.logger.error("Excel文件权限错误: %s - %s", file_path, str(e))
@@ -548,6 +508,69 @@ class GradeRegistryWriterService:
             )
             return False, f"Excel文件损坏或格式错误: {str(e)}"
 
+    def _validate_worksheet(self, worksheet, file_path: str) -> Tuple[bool, Optional[str]]:
+        """
+        验证已打开工作表的结构与规模（安全加固）
+
+        Args:
+            worksheet: openpyxl 工作表
+            file_path: Excel文件路径（用于日志）
+
+        Returns:
+            (是否有效, 错误消息)
+        """
+        # 1. 检查是否有有效的工作表
+        if worksheet is None:
+            self.logger.error("Excel文件没有有效的工作表: %s", file_path)
+            return False, "Excel文件格式错误：没有有效的工作表"
+
+        # 2. 检查是否有数据（至少要有表头行）
+        if worksheet.max_row < 1:
+            self.logger.warning("Excel文件没有数据: %s", file_path)
+            return False, "Excel文件没有数据"
+
+        # 3. 检查工作表是否有列
+        if worksheet.max_column < 1:
+            self.logger.warning("Excel文件没有列: %s", file_path)
+            return False, "Excel文件格式错误：没有列"
+
+        # 4. 检查是否有过多的行或列（防止恶意文件）
+        MAX_ROWS = 10000
+        MAX_COLS = 100
+        if worksheet.max_row > MAX_ROWS:
+            self.logger.error(
+                "Excel文件行数过多: %s, 行数: %d, 限制: %d",
+                file_path,
+                worksheet.max_row,
+                MAX_ROWS,
+            )
+            self.audit_logger.logger.warning(
+                "安全事件：Excel文件行数异常 - 用户: %s, 租户: %s, 文件: %s, 行数: %d",
+                self.user.username if self.user else "Unknown",
+                self.tenant.name if self.tenant else "Unknown",
+                file_path,
+                worksheet.max_row,
+            )
+            return False, f"Excel文件行数过多（{worksheet.max_row} > {MAX_ROWS}）"
+
+        if worksheet.max_column > MAX_COLS:
+            self.logger.error(
+                "Excel文件列数过多: %s, 列数: %d, 限制: %d",
+                file_path,
+                worksheet.max_column,
+                MAX_COLS,
+            )
+            self.audit_logger.logger.warning(
+                "安全事件：Excel文件列数异常 - 用户: %s, 租户: %s, 文件: %s, 列数: %d",
+                self.user.username if self.user else "Unknown",
+                self.tenant.name if self.tenant else "Unknown",
+                file_path,
+                worksheet.max_column,
+            )
+            return False, f"Excel文件列数过多（{worksheet.max_column} > {MAX_COLS}）"
+
+        return True, None
+
     def _validate_tenant_isolation(self, file_path: str) -> Tuple[bool, Optional[str]]:
         """
         验证租户隔离（安全加固）
@@ -614,6 +637,8 @@ class GradeRegistryWriterService:
         homework_dir: str,
         class_dir: str,
         progress_tracker: Optional[BatchGradeProgressTracker] = None,
+        force_full: bool = False,
+        manifest_key: Optional[str] = None,
     ) -> Dict[str, any]:
         """
         处理作业评分系统场景
@@ -623,6 +648,9 @@ class GradeRegistryWriterService:
         Args:
             homework_dir: 作业目录路径（如：/path/to/第1次作业）
             class_dir: 班级目录路径（如：/path/to/2024级计算机1班）
+            progress_tracker: 进度跟踪器
+            force_full: 为 True 时忽略同步清单，重新解析全部文件
+            manifest_key: 同步清单的登分册标识，默认为登分册绝对路径
 
         Returns:
             处理结果字典，包含成功、失败、跳过的文件列表和统计信息
@@ -653,6 +681,7 @@ class GradeRegistryWriterService:
                 "failed": 0,
                 "skipped": 0,
             },
+            "reused_files": 0,
             "error_message": None,
         }
 
@@ -730,7 +759,6 @@ class GradeRegistryWriterService:
                 return result
 
             # 3. 扫描作业目录下的Word文档（性能优化：批量读取文件列表）
-            word_files = []
             if not os.path.exists(homework_dir):
                 result["error_message"] = f"作业目录不存在: {homework_dir}"
                 self.logger.error(result["error_message"])
@@ -739,10 +767,7 @@ class GradeRegistryWriterService:
                 return result
 
             # 性能优化：批量读取文件列表
-            for root, _, files in os.walk(homework_dir):
-                for file in files:
-                    if file.endswith((".docx", ".doc")) and not file.startswith("~$"):
-                        word_files.append(os.path.join(root, file))
+            word_files = self._scan_word_files(homework_dir)
 
             if not word_files:
                 result["error_message"] = f"作业目录中没有找到Word文档: {homework_dir}"
@@ -767,104 +792,49 @@ class GradeRegistryWriterService:
             self.logger.info("开始扫描作业目录: %s", homework_dir)
             self.logger.info("识别到 %d 个Word文档文件", len(word_files))
 
-            # 4. 加载登分册
-            registry_manager = RegistryManager(registry_path)
-
-            if not registry_manager.load():
-                error_message = getattr(registry_manager, "last_error_message", None)
-                result["error_message"] = error_message or "加载登分册失败"
-                self.logger.error("登分册加载失败: %s", result["error_message"])
-                if progress_tracker:
-                    progress_tracker.fail(result["error_message"])
-                return result
+            # 4. 解析并写入登分册（同步清单、并发解析、一次加载/备份/保存）
+            outcome = self._write_homeworks_to_registry(
+                registry_path,
+                [
+                    {
+                        "homework_number": homework_number,
+                        "homework_dir": homework_dir,
+                        "word_files": word_files,
+                        "result": result,
+                    }
+                ],
+                progress_tracker=progress_tracker,
+                force_full=force_full,
+                manifest_key=manifest_key,
+            )
 
-            is_valid, error_msg = registry_manager.validate_format()
-            if not is_valid:
-                result["error_message"] = error_msg
-                if progress_tracker:
-                    progress_tracker.fail(result["error_message"])
-                return result
+            if outcome["success"]:
+                result["success"] = True
+                self.logger.info(
+                    "作业评分系统场景处理完成 - 成功: %d, 失败: %d, 跳过: %d",
+                    result["statistics"]["success"],
+                    result["statistics"]["failed"],
+                    result["statistics"]["skipped"],
+                )
 
-            # 5. 创建备份
-            if not registry_manager.create_backup():
-                result["error_message"] = "创建登分册备份失败"
+                # 记录审计日志
+                self.audit_logger.end_operation(
+                    success=True,
+                    homework_number=homework_number,
+                    total_files=result["statistics"]["total"],
+                    success_count=result["statistics"]["success"],
+                    failed_count=result["statistics"]["failed"],
+                    skipped_count=result["statistics"]["skipped"],
+                    registry_path=registry_path,
+                    up_to_date=outcome["up_to_date"],
+                )
                 if progress_tracker:
-                    progress_tracker.fail(result["error_message"])
-                return result
-
-            # 6. 处理每个Word文档
-            try:
-                # 查找或创建作业列
-                homework_col = registry_manager.find_or_create_homework_column(homework_number)
-
-                for index, word_file in enumerate(word_files, start=1):
-                    file_result = self._process_single_word_file(
-                        word_file, registry_manager, homework_col
-                    )
-
-                    if file_result["success"]:
-                        result["processed_files"].append(file_result)
-                        result["statistics"]["success"] += 1
-                    elif file_result["skipped"]:
-                        result["skipped_files"].append(file_result)
-                        result["statistics"]["skipped"] += 1
-                    else:
-                        result["failed_files"].append(file_result)
-                        result["statistics"]["failed"] += 1
-
-                    if progress_tracker:
-                        progress_tracker.update_progress(
-                            processed=index,
-                            success=result["statistics"]["success"],
-                            failed=result["statistics"]["failed"],
-                            skipped=result["statistics"]["skipped"],
-                            current_file=os.path.basename(word_file),
-                            message=f"正在处理第 {index}/{len(word_files)} 个文件",
-                        )
-
-                # 7. 保存登分册
-                if registry_manager.save():
-                    result["success"] = True
-                    registry_manager.delete_backup()
-                    self.logger.info(
-                        "作业评分系统场景处理完成 - 成功: %d, 失败: %d, 跳过: %d",
-                        result["statistics"]["success"],
-                        result["statistics"]["failed"],
-                        result["statistics"]["skipped"],
+                    progress_tracker.complete(
+                        summary=result["statistics"],
+                        message="登分册已是最新" if outcome["up_to_date"] else "批量登分完成",
                     )
-
-                    # 记录审计日志
-                    self.audit_logger.end_operation(
-                        success=True,
-                        homework_number=homework_number,
-                        total_files=result["statistics"]["total"],
-                        success_count=result["statistics"]["success"],
-                        failed_count=result["statistics"]["failed"],
-                        skipped_count=result["statistics"]["skipped"],
-                        registry_path=registry_path,
-                    )
-                    if progress_tracker:
-                        progress_tracker.complete(
-                            summary=result["statistics"],
-                            message="批量登分完成",
-                        )
-                else:
-                    result["error_message"] = "保存登分册失败"
-                    registry_manager.restore_from_backup()
-                    self.logger.error("保存登分册失败，已从备份恢复")
-                    if progress_tracker:
-                        progress_tracker.fail(result["error_message"])
-
-                    # 记录审计日志
-                    self.audit_logger.end_operation(
-                        success=False,
-                        error_message=result["error_message"],
-                    )
-
-            except Exception as e:
-                result["error_message"] = f"处理文件时出错: {str(e)}"
-                self.logger.error("处理文件时出错: %s", str(e), exc_info=True)
-                registry_manager.restore_from_backup()
+            else:
+                result["error_message"] = outcome["error_message"]
                 if progress_tracker:
                     progress_tracker.fail(result["error_message"])
 
@@ -872,7 +842,7 @@ class GradeRegistryWriterService:
                 self.audit_logger.end_operation(
                     success=False,
                     error_message=result["error_message"],
-                    exception_type=type(e).__name__,
+                    exception_type=outcome["exception_type"],
                 )
 
         except Exception as e:
@@ -893,17 +863,538 @@ class GradeRegistryWriterService:
 
         return result
 
+    def process_course_scenario(
+        self,
+        course_dir: str,
+        progress_tracker: Optional[BatchGradeProgressTracker] = None,
+        force_full: bool = False,
+        manifest_key_prefix: Optional[str] = None,
+    ) -> Dict[str, any]:
+        """
+        整门课程批量登分
+
+        扫描课程目录下的所有班级目录（含“成绩登分册.xlsx”）及其中的所有作业目录，
+        每个登分册只验证、加载、备份、保存一次，一次写入全部作业列。
+
+        Args:
+            course_dir: 课程目录路径（如：/path/to/Python程序设计）
+            progress_tracker: 进度跟踪器（覆盖全部班级的文件）
+            force_full: 为 True 时忽略同步清单，重新解析全部文件
+            manifest_key_prefix: 同步清单的登分册标识前缀，标识为前缀加登分册相对课程目录的路径；
+                默认为登分册绝对路径（课程目录是临时下载目录时使用）
+
+        Returns:
+            汇总结果字典，registries 中包含每个登分册及其各次作业的处理结果
+        """
+        self.logger.info("开始处理整门课程批量登分 - 课程目录: %s", course_dir)
+
+        self.audit_logger.start_operation("course_batch_write", course_directory=course_dir)
+
+        result = {
+            "success": False,
+            "course_dir": course_dir,
+            "registries": [],
+            "statistics": {
+                "registries": 0,
+                "homeworks": 0,
+                "total": 0,
+                "success": 0,
+                "failed": 0,
+                "skipped": 0,
+            },
+            "reused_files": 0,
+            "error_message": None,
+        }
+
+        if progress_tracker:
+            progress_tracker.start(message="正在扫描课程目录...")
+
+        try:
+            # 安全加固：验证课程目录路径与租户隔离
+            is_valid, error_msg = self._validate_path_security(course_dir, course_dir)
+            if not is_valid:
+                result["error_message"] = f"课程目录路径验证失败: {error_msg}"
+            else:
+                is_valid, error_msg = self._validate_tenant_isolation(course_dir)
+                if not is_valid:
+                    result["error_message"] = error_msg
+            if result["error_message"]:
+                self.logger.error(result["error_message"])
+                if progress_tracker:
+                    progress_tracker.fail(result["error_message"])
+                return result
+
+            # 1. 扫描班级目录与作业目录
+            plans = []
+            for class_name in sorted(os.listdir(course_dir)):
+                class_dir = os.path.join(course_dir, class_name)
+                if class_name.startswith(".") or not os.path.isdir(class_dir):
+                    continue
+                registry_path = self.find_grade_registry(class_dir)
+                if not registry_path:
+                    continue
+
+                # 同一批次的多个目录（如补交目录）合并到同一列
+                grouped: Dict[int, List[str]] = {}
+                for homework_name in sorted(os.listdir(class_dir)):
+                    homework_dir = os.path.join(class_dir, homework_name)
+                    if not os.path.isdir(homework_dir):
+                        continue
+                    homework_number = GradeFileProcessor.extract_homework_number_from_path(
+                        homework_dir
+                    )
+                    if homework_number is not None:
+                        grouped.setdefault(homework_number, []).append(homework_dir)
+
+                homeworks = []
+                for homework_number, homework_dirs in sorted(grouped.items()):
+                    word_files = [
+                        word_file
+                        for homework_dir in homework_dirs
+                        for word_file in self._scan_word_files(homework_dir)
+                    ]
+                    if not word_files:
+                        continue
+                    homeworks.append(
+                        {
+                            "homework_number": homework_number,
+                            "homework_dir": (
+                                homework_dirs[0] if len(homework_dirs) == 1 else class_dir
+                            ),
+                            "word_files": word_files,
+                            "result": {
+                                "homework_number": homework_number,
+                                "homework_dirs": homework_dirs,
+                                "processed_files": [],
+                                "failed_files": [],
+                                "skipped_files": [],
+                                "statistics": {
+                                    "total": len(word_files),
+                                    "success": 0,
+                                    "failed": 0,
+                                    "skipped": 0,
+                                },
+                                "reused_files": 0,
+                            },
+                        }
+                    )
+                if homeworks:
+                    plans.append((class_name, class_dir, registry_path, homeworks))
+
+            if not plans:
+                result["error_message"] = f"课程目录中没有找到可登分的班级作业: {course_dir}"
+                self.logger.warning(result["error_message"])
+                if progress_tracker:
+                    progress_tracker.fail(result["error_message"])
+                return result
+
+            total = sum(len(hw["word_files"]) for *_, homeworks in plans for hw in homeworks)
+            result["statistics"]["total"] = total
+            if progress_tracker:
+                progress_tracker.update_total(total)
+            self.logger.info("找到 %d 个登分册，共 %d 个Word文档", len(plans), total)
+
+            # 2. 逐个登分册写入（每个登分册一次会话）
+            processed = 0
+            for class_name, class_dir, registry_path, homeworks in plans:
+                registry_result = {
+                    "class_name": class_name,
+                    "registry_path": registry_path,
+                    "success": False,
+                    "up_to_date": False,
+                    "error_message": None,
+                    "homeworks": [hw["result"] for hw in homeworks],
+                }
+                result["registries"].append(registry_result)
+                result["statistics"]["registries"] += 1
+                result["statistics"]["homeworks"] += len(homeworks)
+
+                # 完整性检查在写入会话加载登分册后进行，避免重复打开工作簿
+                is_valid, error_msg = self._validate_file_size(registry_path)
+                if is_valid and not registry_path.lower().endswith(".xlsx"):
+                    is_valid, error_msg = False, "文件格式错误：必须是Excel文件(.xlsx)"
+                if is_valid:
+                    manifest_key = None
+                    if manifest_key_prefix:
+                        rel_path = os.path.relpath(registry_path, course_dir)
+                        manifest_key = manifest_key_prefix + rel_path.replace(os.sep, "/")
+                    try:
+                        outcome = self._write_homeworks_to_registry(
+                            registry_path,
+                            homeworks,
+                            progress_tracker=progress_tracker,
+                            force_full=force_full,
+                            progress_offset=processed,
+                            progress_total=total,
+                            validate_worksheet=True,
+                            manifest_key=manifest_key,
+                        )
+                    except Exception as e:
+                        # 单个登分册损坏（如不是有效的 xlsx）不影响其余登分册
+                        self.logger.error("登分册写入出错: %s - %s", registry_path, str(e))
+                        outcome = {"success": False, "up_to_date": False, "error_message": str(e)}
+                    registry_result["success"] = outcome["success"]
+                    registry_result["up_to_date"] = outcome["up_to_date"]
+                    error_msg = outcome["error_message"]
+                if not registry_result["success"]:
+                    registry_result["error_message"] = f"登分册写入失败: {error_msg}"
+                    self.logger.error("%s - %s", registry_path, registry_result["error_message"])
+
+                processed += sum(len(hw["word_files"]) for hw in homeworks)
+                for hw in homeworks:
+                    result["reused_files"] += hw["result"]["reused_files"]
+                    if registry_result["success"]:
+                        for field in ("success", "failed", "skipped"):
+                            result["statistics"][field] += hw["result"]["statistics"][field]
+                    else:
+                        result["statistics"]["failed"] += len(hw["word_files"])
+
+            failed_registries = [r for r in result["registries"] if not r["success"]]
+            result["success"] = not failed_registries
+            if failed_registries:
+                result["error_message"] = (
+                    f"{len(failed_registries)}/{len(result['registries'])} 个登分册写入失败"
+                )
+
+            self.logger.info(
+                "整门课程批量登分完成 - 登分册: %d, 成功: %d, 失败: %d, 跳过: %d",
+                result["statistics"]["registries"],
+                result["statistics"]["success"],
+                result["statistics"]["failed"],
+                result["statistics"]["skipped"],
+            )
+            self.audit_logger.end_operation(
+                success=result["success"],
+                error_message=result["error_message"],
+                registry_count=result["statistics"]["registries"],
+                homework_count=result["statistics"]["homeworks"],
+                total_files=total,
+                success_count=result["statistics"]["success"],
+                failed_count=result["statistics"]["failed"],
+                skipped_count=result["statistics"]["skipped"],
+            )
+            if progress_tracker:
+                if result["success"]:
+                    progress_tracker.complete(
+                        summary=result["statistics"], message="整门课程批量登分完成"
+                    )
+                else:
+                    progress_tracker.fail(result["error_message"])
+
+        except Exception as e:
+            result["error_message"] = f"处理整门课程批量登分时出错: {str(e)}"
+            self.logger.error("处理整门课程批量登分时出错: %s", str(e), exc_info=True)
+            if progress_tracker:
+                progress_tracker.fail(result["error_message"])
+            self.audit_logger.end_operation(
+                success=False,
+                error_message=result["error_message"],
+                exception_type=type(e).__name__,
+            )
+
+        return result
+
+    @staticmethod
+    def _scan_word_files(homework_dir: str) -> List[str]:
+        """递归列出作业目录下的Word文档（跳过 Office 临时文件）"""
+        word_files = []
+        for root, _, files in os.walk(homework_dir):
+            for file in files:
+                if file.endswith((".docx", ".doc")) and not file.startswith("~$"):
+                    word_files.append(os.path.join(root, file))
+        return word_files
+
+    def _write_homeworks_to_registry(
+        self,
+        registry_path: str,
+        batches: List[Dict[str, any]],
+        progress_tracker: Optional[BatchGradeProgressTracker] = None,
+        force_full: bool = False,
+        manifest_key: Optional[str] = None,
+        progress_offset: int = 0,
+        progress_total: Optional[int] = None,
+        validate_worksheet: bool = False,
+    ) -> Dict[str, any]:
+        """
+        解析多个作业批次的Word文档，并在一次登分册会话中写入
+
+        同一登分册只加载、备份、保存一次；各批次的处理结果计入各自的 result。
+
+        Args:
+            registry_path: 登分册路径（已通过大小与完整性验证）
+            batches: 作业批次列表，每项包含 homework_number、homework_dir、word_files、result
+            progress_tracker: 进度跟踪器
+            force_full: 为 True 时忽略同步清单，重新解析全部文件
+            manifest_key: 同步清单的登分册标识，默认为登分册绝对路径
+            progress_offset: 进度计数的起始值（多个登分册共用一个进度时使用）
+            progress_total: 进度消息中的文件总数，默认为本次文件数
+            validate_worksheet: 为 True 时在加载后检查工作表完整性（调用方未预先验证时使用）
+
+        Returns:
+            {"success", "error_message", "up_to_date", "exception_type"}
+        """
+        outcome = {
+            "success": False,
+            "error_message": None,
+            "up_to_date": False,
+            "exception_type": None,
+        }
+
+        # 1. 增量同步：比对同步清单，未变化的文件复用上次的解析结果
+        key = manifest_key or os.path.abspath(registry_path)
+        syncs = []
+        known: Dict[str, Dict[str, any]] = {}
+        for batch in batches:
+            sync = RegistrySync(key, batch["homework_number"])
+            if not force_full:
+                sync.load()
+            reused = sync.scan(batch["homework_dir"], batch["word_files"])
+            batch["result"]["reused_files"] = len(reused)
+            known.update(reused)
+            syncs.append(sync)
+
+        if all(
+            sync.is_up_to_date(registry_path, batch["word_files"])
+            for sync, batch in zip(syncs, batches)
+        ):
+            self.logger.info("登分册与作业文件均未变化，跳过写入: %s", registry_path)
+            for sync, batch in zip(syncs, batches):
+                for file_result in sync.replay(batch["word_files"]):
+                    self._record_file_result(batch["result"], file_result)
+            outcome["success"] = True
+            outcome["up_to_date"] = True
+            return outcome
+
+        # 2. 解析阶段：并发解析变化的Word文档（不持有登分册锁）
+        word_files = [word_file for batch in batches for word_file in batch["word_files"]]
+        extracted = self._extract_word_files(
+            word_files,
+            progress_tracker,
+            known=known,
+            progress_offset=progress_offset,
+            progress_total=progress_total,
+        )
+        batch_infos = []
+        offset = 0
+        for batch in batches:
+            batch_infos.append(extracted[offset : offset + len(batch["word_files"])])
+            offset += len(batch["word_files"])
+
+        # 3. 写入阶段：加载登分册（获取文件锁），一次性写入后保存
+        registry_manager = RegistryManager(registry_path)
+
+        if not registry_manager.load():
+            error_message = getattr(registry_manager, "last_error_message", None)
+            outcome["error_message"] = error_message or "加载登分册失败"
+            self.logger.error("登分册加载失败: %s", outcome["error_message"])
+            return outcome
+
+        is_valid, error_msg = True, None
+        if validate_worksheet:
+            is_valid, error_msg = self._validate_worksheet(
+                registry_manager.worksheet, registry_path
+            )
+        if is_valid:
+            is_valid, error_msg = registry_manager.validate_format()
+        if not is_valid:
+            outcome["error_message"] = error_msg
+            return outcome
+
+        # 创建备份
+        if not registry_manager.create_backup():
+            outcome["error_message"] = "创建登分册备份失败"
+            return outcome
+
+        # 4. 应用解析结果（成绩与单元格一致时 write_grade 不改动单元格）
+        try:
+            batch_file_results = []
+            for batch, infos in zip(batches, batch_infos):
+                # 查找或创建作业列
+                homework_col = registry_manager.find_or_create_homework_column(
+                    batch["homework_number"]
+                )
+                file_results = []
+                for word_file, info in zip(batch["word_files"], infos):
+                    file_result = self._apply_word_file_info(
+                        word_file, info, registry_manager, homework_col
+                    )
+                    file_results.append(file_result)
+                    self._record_file_result(batch["result"], file_result)
+                batch_file_results.append(file_results)
+
+            # 5. 保存登分册
+            if registry_manager.save():
+                outcome["success"] = True
+                registry_manager.delete_backup()
+                for sync, batch, infos, file_results in zip(
+                    syncs, batches, batch_infos, batch_file_results
+                ):
+                    sync.save(registry_path, batch["word_files"], infos, file_results)
+            else:
+                outcome["error_message"] = "保存登分册失败"
+                registry_manager.restore_from_backup()
+                self.logger.error("保存登分册失败，已从备份恢复")
+
+        except Exception as e:
+            outcome["error_message"] = f"处理文件时出错: {str(e)}"
+            outcome["exception_type"] = type(e).__name__
+            self.logger.error("处理文件时出错: %s", str(e), exc_info=True)
+            registry_manager.restore_from_backup()
+
+        return outcome
+
+    @staticmethod
+    def _record_file_result(result: Dict[str, any], file_result: Dict[str, any]) -> None:
+        """把单个文件的处理结果计入汇总"""
+        if file_result["success"]:
+            result["processed_files"].append(file_result)
+            result["statistics"]["success"] += 1
+        elif file_result["skipped"]:
+            result["skipped_files"].append(file_result)
+            result["statistics"]["skipped"] += 1
+        else:
+            result["failed_files"].append(file_result)
+            result["statistics"]["failed"] += 1
+
+    def _extract_word_file(self, word_file: str) -> Dict[str, any]:
+        """
+        解析单个Word文档（含文件大小验证）
+
+        Args:
+            word_file: Word文档路径
+
+        Returns:
+            解析结果字典，文件大小验证失败时包含 size_error
+        """
+        is_valid, error_msg = self._validate_file_size(word_file)
+        if not is_valid:
+            return {"size_error": error_msg}
+        return extract_word_file_info(word_file)
+
+    def _get_extract_workers(self, file_count: int) -> int:
+        """解析阶段的进程数（settings.GRADE_EXTRACT_WORKERS，默认CPU核数）"""
+        if file_count < self.EXTRACT_POOL_MIN_FILES:
+            return 1
+        workers = getattr(settings, "GRADE_EXTRACT_WORKERS", None) or os.cpu_count() or 1
+        return max(1, min(int(workers), file_count))
+
+    def _extract_word_files(
+        self,
+        word_files: List[str],
+        progress_tracker: Optional[BatchGradeProgressTracker] = None,
+        known: Optional[Dict[str, Dict[str, any]]] = None,
+        progress_offset: int = 0,
+        progress_total: Optional[int] = None,
+    ) -> List[Dict[str, any]]:
+        """
+        解析阶段：并发解析所有Word文档
+
+        文档解析是CPU密集的XML处理，使用进程池并行；进程池不可用时退回逐个解析。
+
+        Args:
+            word_files: Word文档路径列表
+            progress_tracker: 进度跟踪器
+            known: 可直接复用的解析结果 {文件路径: 解析结果}（来自同步清单）
+            progress_offset: 进度计数的起始值
+            progress_total: 进度消息中的文件总数，默认为 len(word_files)
+
+        Returns:
+            与 word_files 一一对应的解析结果列表
+        """
+        extracted: List[Optional[Dict[str, any]]] = [None] * len(word_files)
+        total = progress_total or len(word_files)
+        done = progress_offset
+
+        def report(index: int):
+            nonlocal done
+            done += 1
+            if progress_tracker:
+                progress_tracker.update_progress(
+                    processed=done,
+                    success=0,
+                    failed=0,
+                    skipped=0,
+                    current_file=os.path.basename(word_files[index]),
+                    message=f"正在解析第 {done}/{total} 个文件",
+                )
+
+        known = known or {}
+        pending = []
+        for index, word_file in enumerate(word_files):
+            if word_file in known:
+                extracted[index] = known[word_file]
+                done += 1
+                continue
+            is_valid, error_msg = self._validate_file_size(word_file)
+            if is_valid:
+                pending.append(index)
+            else:
+                extracted[index] = {"size_error": error_msg}
+                report(index)
+
+        workers = self._get_extract_workers(len(pending))
+        if workers > 1:
+            self.logger.info("使用 %d 个进程并发解析 %d 个Word文档", workers, len(pending))
+            try:
+                # spawn：避免在多线程的 Web 进程中 fork；
+                # 工作函数位于不依赖 Django 的 docx_extract 模块，子进程无需初始化 Django
+                with ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    futures = {
+                        executor.submit(
+                            docx_extract.extract_word_file_info, word_files[index]
+                        ): index
+                        for index in pending
+                    }
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        extracted[index] = future.result()
+                        report(index)
+            except (BrokenProcessPool, OSError) as e:
+                self.logger.warning("进程池解析失败，改为逐个解析: %s", str(e))
+
+        for index in pending:
+            if extracted[index] is None:
+                extracted[index] = extract_word_file_info(word_files[index])
+                report(index)
+
+        return extracted
+
     def _process_single_word_file(
         self, word_file: str, registry_manager: RegistryManager, homework_col: int
     ) -> Dict[str, any]:
         """
-        处理单个Word文档
+        处理单个Word文档（解析后立即写入）
 
         Args:
             word_file: Word文档路径
             registry_manager: 登分册管理器
             homework_col: 作业列索引
 
+        Returns:
+            处理结果字典
+        """
+        return self._apply_word_file_info(
+            word_file, self._extract_word_file(word_file), registry_manager, homework_col
+        )
+
+    def _apply_word_file_info(
+        self,
+        word_file: str,
+        info: Dict[str, any],
+        registry_manager: RegistryManager,
+        homework_col: int,
+    ) -> Dict[str, any]:
+        """
+        写入阶段：把单个Word文档的解析结果写入登分册
+
+        Args:
+            word_file: Word文档路径
+            info: extract_word_file_info 的解析结果
+            registry_manager: 登分册管理器（已加载）
+            homework_col: 作业列索引
+
         Returns:
             处理结果字典
         """
@@ -921,15 +1412,18 @@ class GradeRegistryWriterService:
 
         try:
             # 安全加固：验证文件大小
-            is_valid, error_msg = self._validate_file_size(word_file)
-            if not is_valid:
+            if "size_error" in info:
+                error_msg = info["size_error"]
                 file_result["error_message"] = error_msg
                 self.logger.warning("文件大小验证失败: %s - %s", file_basename, error_msg)
                 self.audit_logger.log_file_processing(word_file, "failed", error_msg)
                 return file_result
 
+            if info["error"]:
+                raise RuntimeError(info["error"])
+
             # 1. 提取学生姓名
-            student_name = GradeFileProcessor.extract_student_name(word_file)
+            student_name = info["student_name"]
             if not student_name:
                 file_result["error_message"] = "无法提取学生姓名"
                 self.logger.warning("无法提取学生姓名: %s", file_basename)
@@ -938,16 +1432,15 @@ class GradeRegistryWriterService:
             file_result["student_name"] = student_name
 
             # 2. 验证实验报告评价（需求: 4.5, 5.2, 7.1-7.7）
-            is_valid, error_msg = GradeFileProcessor.validate_lab_report_comment(word_file)
-            if not is_valid:
+            if not info["comment_valid"]:
+                error_msg = info["comment_error"]
                 file_result["error_message"] = error_msg
                 self.logger.warning("实验报告评价验证失败: %s - %s", file_basename, error_msg)
                 self.audit_logger.log_file_processing(word_file, "failed", error_msg)
                 return file_result
 
             # 3. 提取成绩
-            grade = GradeFileProcessor.extract_grade_from_word(word_file)
-            grade = self._sanitize_grade_value(grade)
+            grade = info["grade"]
             if not grade:
                 file_result["error_message"] = "无法提取成绩"
                 self.logger.warning("无法提取成绩: %s", file_basename)
@@ -1253,16 +1746,7 @@ class GradeRegistryWriterService:
     @staticmethod
     def _sanitize_grade_value(value) -> Optional[str]:
         """将成绩值转换为非空字符串，过滤 NaN/None。"""
-        if value is None:
-            return None
-        if isinstance(value, float) and math.isnan(value):
-            return None
-        text = str(value).strip()
-        if not text:
-            return None
-        if text.lower() in {"nan", "none", "null"}:
-            return None
-        return text
+        return sanitize_grade_value(value)
 
     def _process_single_excel_file(
         self, excel_file: str, registry_manager: RegistryManager
@@ -0,0 +1,209 @@
+"""
+评分写入合并队列
+
+教师批改一份作业时，前端通常在几秒内先后调用 save_teacher_comment、add_grade_to_file，
+每次调用都要重写一次 Word 文档、更新评分状态并提交推送 Git。
+本模块按文件合并短时间内的写入：
+- 第一次提交时开始计时，窗口内同一文件的后续提交只合并修改（后提交的字段覆盖先提交的）
+- 窗口结束后在后台线程中调用 apply 一次性写入文档、更新状态和 Git
+- 写入完成前 pending() 返回尚未落盘的修改，读取接口据此保证读到自己的写入
+- 同一文件的写入串行执行；进程退出时写入所有未完成的修改
+- 后台写入失败（异常或 apply 返回的警告）按文件记录，error() / errors_under() 供读取接口
+  和状态接口返回；该文件下一次写入成功后清除
+
+队列只在当前进程内有效：多进程部署时，其他进程在窗口内仍会读到文件中的旧内容。
+
+配置（settings）：
+- GRADE_WRITE_DELAY_SECONDS: 合并窗口（秒），默认 2；0 表示在调用线程内立即写入
+
+使用示例：
+    queue = GradeWriteQueue(apply=apply_grade_write)
+    queue.submit(full_path, {"comment": "很好"}, {"teacher_name": "张老师"})
+    queue.submit(full_path, {"grade": "A"}, {})      # 与上一次合并为一次写入
+    queue.pending(full_path)                          # {"comment": "很好", "grade": "A"}
+    queue.error(full_path)                            # 后台写入失败的原因，没有时为 None
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELAY_SECONDS = 2.0
+
+
+class _PendingWrite:
+    def __init__(self):
+        self.changes: Dict[str, Any] = {}
+        self.context: Dict[str, Any] = {}
+        self.timer: Optional[threading.Timer] = None
+
+
+class GradeWriteQueue:
+    """按文件合并评分和评价写入的延迟写队列
+
+    apply(path, changes, context) 负责实际写入，返回值会作为立即写入时 submit 的返回值。
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[str, Dict[str, Any], Dict[str, Any]], Any],
+        delay: Optional[float] = None,
+    ):
+        self.apply = apply
+        self._delay = delay
+        self._pending: Dict[str, _PendingWrite] = {}
+        # 已从队列取出但尚未写完的修改（同一文件可能有一个正在写、一个在等待）
+        self._inflight: Dict[str, List[Dict[str, Any]]] = {}
+        self._path_locks: Dict[str, threading.Lock] = {}
+        # 后台写入失败的原因：{文件路径: 错误信息}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> float:
+        if self._delay is not None:
+            return self._delay
+        return float(getattr(settings, "GRADE_WRITE_DELAY_SECONDS", DEFAULT_DELAY_SECONDS))
+
+    def submit(
+        self,
+        path: str,
+        changes: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        immediate: bool = False,
+    ) -> Any:
+        """提交一次写入
+
+        Args:
+            path: 文件路径
+            changes: 要写入的字段（如 grade、comment），与尚未写入的修改合并
+            context: 写入所需的其他参数，与之前的参数合并
+            immediate: 为 True 时连同已合并的修改立即在当前线程写入
+
+        Returns:
+            立即写入时返回 apply 的返回值，否则返回 None
+        """
+        key = os.path.abspath(path)
+        delay = self.delay
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = _PendingWrite()
+            entry.changes.update(changes)
+            entry.context.update(context or {})
+            if not immediate and delay > 0 and entry.timer is None:
+                entry.timer = threading.Timer(delay, self._flush_in_background, args=(key,))
+                entry.timer.daemon = True
+                entry.timer.start()
+
+        if immediate or delay <= 0:
+            return self.flush(key)
+        return None
+
+    def pending(self, path: str) -> Dict[str, Any]:
+        """尚未写入文件的修改（没有时返回空字典）"""
+        key = os.path.abspath(path)
+        with self._lock:
+            merged: Dict[str, Any] = {}
+            for changes in self._inflight.get(key, ()):
+                merged.update(changes)
+            entry = self._pending.get(key)
+            if entry is not None:
+                merged.update(entry.changes)
+            return merged
+
+    def error(self, path: str) -> Optional[str]:
+        """该文件最近一次后台写入失败的原因（之后已写入成功时为 None）"""
+        with self._lock:
+            return self._errors.get(os.path.abspath(path))
+
+    def errors_under(self, directory: str) -> Dict[str, str]:
+        """目录下所有后台写入失败的文件：{文件路径: 错误信息}"""
+        prefix = os.path.abspath(directory) + os.sep
+        with self._lock:
+            return {path: error for path, error in self._errors.items() if path.startswith(prefix)}
+
+    def flush(self, path: Optional[str] = None) -> Any:
+        """立即写入指定文件（或全部文件）尚未写入的修改
+
+        Returns:
+            指定文件时返回 apply 的返回值；没有待写入的修改时返回 None
+        """
+        if path is None:
+            with self._lock:
+                keys = list(self._pending)
+            for key in keys:
+                self._flush_and_record(key)
+            return None
+
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is None:
+                return None
+            if entry.timer is not None:
+                entry.timer.cancel()
+            self._inflight.setdefault(key, []).append(entry.changes)
+            path_lock = self._path_locks.setdefault(key, threading.Lock())
+
+        try:
+            with path_lock:
+                result = self.apply(key, entry.changes, entry.context)
+            with self._lock:
+                self._errors.pop(key, None)
+            return result
+        finally:
+            with self._lock:
+                inflight = self._inflight[key]
+                inflight[:] = [changes for changes in inflight if changes is not entry.changes]
+                if not inflight:
+                    del self._inflight[key]
+                    del self._path_locks[key]
+
+    def flush_under(self, directory: str) -> None:
+        """立即写入目录下所有文件尚未写入的修改"""
+        prefix = os.path.abspath(directory) + os.sep
+        with self._lock:
+            keys = [key for key in self._pending if key.startswith(prefix)]
+        for key in keys:
+            self._flush_and_record(key)
+
+    def _flush_in_background(self, key: str) -> None:
+        close_old_connections()
+        try:
+            self._flush_and_record(key)
+        finally:
+            close_old_connections()
+
+    def _flush_and_record(self, key: str) -> None:
+        """写入一个文件，失败或返回警告时记录下来（没有调用方可以接收返回值）"""
+        try:
+            warning = self.flush(key)
+        except Exception as e:
+            logger.error(f"评分写入失败: {key} - {e}", exc_info=True)
+            warning = f"评分写入失败: {e}"
+        if warning:
+            with self._lock:
+                self._errors[key] = str(warning)
+
+
+_queues: List[GradeWriteQueue] = []
+
+
+def register_queue(queue: GradeWriteQueue) -> GradeWriteQueue:
+    """登记队列，进程退出时写入其中尚未写入的修改"""
+    _queues.append(queue)
+    return queue
+
+
+@atexit.register
+def _flush_all() -> None:
+    for queue in _queues:
+        queue.flush()
@@ -0,0 +1,227 @@
+"""
+登分册增量同步模块
+
+批量登分过去每次都重新解析作业目录中的全部 Word 文档。本模块按 (登分册, 作业批次)
+持久化一份同步清单，记录每个源文件的相对路径、mtime、大小、内容哈希、解析结果
+以及上次写入的成绩：
+- stat 一致或内容哈希一致（如远程仓库重新下载到临时目录）的文件直接复用解析结果
+- 登分册自上次写入后未被修改、且源文件集合与内容都未变化时，无需加载登分册
+- 强制全量重建时忽略已有清单，全部重新解析后覆盖清单
+
+清单读写失败只记录警告，不影响登分本身。
+
+使用示例：
+    sync = RegistrySync(registry_path, homework_number)
+    sync.load()
+    known = sync.scan(homework_dir, word_files)     # {文件路径: 解析结果}
+    if sync.is_up_to_date(registry_path, word_files):
+        file_results = sync.replay(word_files)
+    ...
+    sync.save(registry_path, word_files, extracted, file_results)
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from grading.models import RegistrySyncEntry, RegistrySyncManifest
+
+logger = logging.getLogger(__name__)
+
+# 计算内容哈希时的读取块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def file_content_hash(path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RegistrySync:
+    """单个 (登分册, 作业批次) 的增量同步清单"""
+
+    def __init__(self, manifest_key: str, homework_number: int):
+        """初始化同步清单（不会立即读取数据库）
+
+        Args:
+            manifest_key: 登分册标识，本地登分册为绝对路径；远程仓库每次下载到临时目录，
+                调用方应传入与临时路径无关的稳定标识
+            homework_number: 作业批次
+        """
+        self.manifest_key = manifest_key
+        self.homework_number = homework_number
+        self.manifest: Optional[RegistrySyncManifest] = None
+        self.entries: Dict[str, RegistrySyncEntry] = {}
+        # {文件路径: (相对路径, mtime_ns, 大小, 内容哈希)}，由 scan() 填充
+        self.file_states: Dict[str, Tuple[str, int, int, str]] = {}
+        self.reused = 0
+
+    # ==================== 公共接口 ====================
+
+    def load(self) -> "RegistrySync":
+        """读取已有清单；强制全量重建时不调用"""
+        try:
+            self.manifest = RegistrySyncManifest.objects.filter(
+                manifest_key=_sha256(self.manifest_key), homework_number=self.homework_number
+            ).first()
+            if self.manifest:
+                self.entries = {entry.file_path: entry for entry in self.manifest.entries.all()}
+        except Exception as e:
+            logger.warning(f"读取登分册同步清单失败: {self.manifest_key} - {e}")
+            self.manifest = None
+            self.entries = {}
+        return self
+
+    def scan(self, homework_dir: str, word_files: List[str]) -> Dict[str, Dict]:
+        """比对源文件与清单
+
+        stat 一致时直接复用；stat 变化时计算内容哈希，哈希一致同样复用。
+
+        Args:
+            homework_dir: 作业目录
+            word_files: Word 文档路径列表
+
+        Returns:
+            {文件路径: 解析结果}，只包含可复用的文件
+        """
+        known: Dict[str, Dict] = {}
+        for word_file in word_files:
+            rel_path = os.path.relpath(word_file, homework_dir).replace(os.sep, "/")
+            try:
+                st = os.stat(word_file)
+            except OSError:
+                continue
+            entry = self.entries.get(rel_path)
+            if entry and (entry.mtime_ns, entry.file_size) == (st.st_mtime_ns, st.st_size):
+                content_hash = entry.content_hash
+            else:
+                try:
+                    content_hash = file_content_hash(word_file)
+                except OSError:
+                    continue
+            self.file_states[word_file] = (rel_path, st.st_mtime_ns, st.st_size, content_hash)
+            if entry and entry.content_hash == content_hash:
+                known[word_file] = dict(entry.extracted)
+
+        self.reused = len(known)
+        if self.entries:
+            logger.info(
+                f"登分册同步清单: 文件={len(word_files)}, 未变化={len(known)}, "
+                f"需解析={len(word_files) - len(known)}"
+            )
+        return known
+
+    def is_up_to_date(self, registry_path: str, word_files: List[str]) -> bool:
+        """登分册未被修改，且源文件集合与内容都与上次一致"""
+        if not self.manifest or self.reused != len(word_files):
+            return False
+        if len(self.entries) != len(word_files):
+            return False
+        try:
+            st = os.stat(registry_path)
+        except OSError:
+            return False
+        return (st.st_mtime_ns, st.st_size) == (
+            self.manifest.registry_mtime_ns,
+            self.manifest.registry_size,
+        )
+
+    def replay(self, word_files: List[str]) -> List[Dict]:
+        """按清单生成本次的处理结果（登分册无需改动）
+
+        上次已写入或成绩一致的文件记为跳过，上次失败的文件沿用失败原因。
+        """
+        file_results = []
+        for word_file in word_files:
+            entry = self.entries[self.file_states[word_file][0]]
+            failed = entry.status == RegistrySyncEntry.STATUS_FAILED
+            file_results.append(
+                {
+                    "file_path": word_file,
+                    "file_name": os.path.basename(word_file),
+                    "student_name": entry.extracted.get("student_name"),
+                    "grade": entry.written_grade or entry.extracted.get("grade"),
+                    "success": False,
+                    "skipped": not failed,
+                    "error_message": entry.error_message if failed else "成绩未变化，跳过写入",
+                }
+            )
+        return file_results
+
+    def save(
+        self,
+        registry_path: str,
+        word_files: List[str],
+        extracted: List[Dict],
+        file_results: List[Dict],
+    ) -> None:
+        """登分册保存成功后覆盖清单
+
+        解析出错（异常、文件过大）的文件不记录，下次重新解析。
+
+        Args:
+            registry_path: 已保存的登分册路径
+            word_files: Word 文档路径列表
+            extracted: 与 word_files 对应的解析结果
+            file_results: 与 word_files 对应的处理结果
+        """
+        entries = []
+        for word_file, info, file_result in zip(word_files, extracted, file_results):
+            state = self.file_states.get(word_file)
+            if not state or "size_error" in info or info.get("error"):
+                continue
+            rel_path, mtime_ns, file_size, content_hash = state
+            if file_result["success"]:
+                status = RegistrySyncEntry.STATUS_SUCCESS
+            elif file_result["skipped"]:
+                status = RegistrySyncEntry.STATUS_SKIPPED
+            else:
+                status = RegistrySyncEntry.STATUS_FAILED
+            entries.append(
+                RegistrySyncEntry(
+                    path_hash=_sha256(rel_path),
+                    file_path=rel_path,
+                    mtime_ns=mtime_ns,
+                    file_size=file_size,
+                    content_hash=content_hash,
+                    extracted=info,
+                    written_grade=(
+                        file_result.get("grade")
+                        if status != RegistrySyncEntry.STATUS_FAILED
+                        else None
+                    ),
+                    status=status,
+                    error_message=file_result.get("error_message") or "",
+                )
+            )
+
+        try:
+            st = os.stat(registry_path)
+            with transaction.atomic():
+                manifest, _ = RegistrySyncManifest.objects.update_or_create(
+                    manifest_key=_sha256(self.manifest_key),
+                    homework_number=self.homework_number,
+                    defaults={
+                        "registry_path": self.manifest_key,
+                        "registry_mtime_ns": st.st_mtime_ns,
+                        "registry_size": st.st_size,
+                    },
+                )
+                manifest.entries.all().delete()
+                for entry in entries:
+                    entry.manifest = manifest
+                RegistrySyncEntry.objects.bulk_create(entries)
+            self.manifest = manifest
+        except Exception as e:
+            logger.warning(f"写入登分册同步清单失败: {self.manifest_key} - {e}")
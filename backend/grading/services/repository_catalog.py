@@ -0,0 +1,404 @@
+"""
+仓库文件目录服务模块
+
+为本地仓库维护持久化的文件与目录元数据（RepositoryCatalogEntry），包括：
+- 路径、上级目录、层级、大小、mtime、扩展名
+- 由路径推断的课程 / 班级 / 作业 / 学生，以及评分信息索引条目指针
+- 增量刷新：逐级 stat 目录，只重新列出 mtime 变化的目录
+- refresh_paths() 按变化路径局部刷新（文件系统监听器使用；目录 mtime 不反映文件内容的原地修改）
+
+列表、计数和空间统计通过索引查询完成，耗时与文件系统遍历速度无关。
+
+刷新只在请求之外进行：文件系统监听器（watch_repository_caches）按事件刷新并持续标记
+目录为“当前”，未运行监听器时由 refresh_repository_catalogs 命令定期刷新。
+请求中通过 RepositoryCatalog.current() 读取，目录未标记为当前时返回 None，
+调用方回退到直接读取文件系统。
+
+使用示例：
+    catalog = RepositoryCatalog.current(repository)
+    if catalog is not None:
+        catalog.list_courses()                     # ["数据结构", "Python程序设计"]
+        catalog.count_files("数据结构/1班/第1次作业")  # 目录下直接包含的 .docx 数量
+        catalog.total_size()                       # 仓库文件总字节数
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from grading.grade_registry_writer import GradeFileProcessor
+from grading.models import GradeInfoIndexEntry, RepositoryCatalogEntry
+
+logger = logging.getLogger(__name__)
+
+# 完整刷新后目录保持“当前”的默认时长（秒），超过后读取方回退到文件系统
+DEFAULT_MAX_AGE_SECONDS = 120
+
+# 每个仓库一把刷新锁，避免同一进程内并发刷新；锁的创建由模块锁保护
+_refresh_locks: Dict[int, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _refresh_lock(repository_id: int) -> threading.Lock:
+    with _refresh_locks_guard:
+        lock = _refresh_locks.get(repository_id)
+        if lock is None:
+            lock = _refresh_locks[repository_id] = threading.Lock()
+        return lock
+
+
+def _path_hash(path: str) -> str:
+    return hashlib.sha256(path.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def _parent_path(path: str) -> str:
+    return path.rsplit("/", 1)[0] if "/" in path else ""
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".") or name.startswith("~$")
+
+
+class RepositoryCatalog:
+    """单个本地仓库的文件目录"""
+
+    def __init__(self, repository, max_age_seconds: Optional[float] = None):
+        """初始化仓库文件目录
+
+        Args:
+            repository: 仓库对象
+            max_age_seconds: 完整刷新后目录保持“当前”的时长（秒），默认读取
+                settings.REPOSITORY_CATALOG_MAX_AGE_SECONDS
+        """
+        self.repository = repository
+        self.root = os.path.abspath(repository.get_full_path())
+        if max_age_seconds is None:
+            max_age_seconds = getattr(
+                settings, "REPOSITORY_CATALOG_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS
+            )
+        self.max_age_seconds = max_age_seconds
+
+    @property
+    def entries(self):
+        return RepositoryCatalogEntry.objects.filter(repository=self.repository)
+
+    # ==================== 当前标记 ====================
+
+    @staticmethod
+    def _current_key(repository_id: int) -> str:
+        return f"repo_catalog:current:{repository_id}"
+
+    @classmethod
+    def current(cls, repository) -> Optional["RepositoryCatalog"]:
+        """返回已标记为当前的目录，否则返回 None（不访问文件系统，也不刷新）"""
+        if not cache.get(cls._current_key(repository.id)):
+            return None
+        return cls(repository)
+
+    def mark_current(self, timeout: Optional[float] = None) -> None:
+        """标记目录为当前，timeout 秒后自动过期（默认 max_age_seconds）"""
+        cache.set(
+            self._current_key(self.repository.id),
+            True,
+            self.max_age_seconds if timeout is None else timeout,
+        )
+
+    @classmethod
+    def mark_stale(cls, repository) -> None:
+        """取消当前标记：刷新失败时调用，读取方随即回退到文件系统"""
+        cache.delete(cls._current_key(repository.id))
+
+    # ==================== 刷新 ====================
+
+    def refresh(self, full: bool = False, rel_root: str = "") -> Dict[str, int]:
+        """增量刷新目录
+
+        自根目录逐级 stat 子目录；目录 mtime 与记录一致时沿用记录中的子目录，
+        不一致（或 full=True）时重新列出该目录并同步其直接子项。
+        刷新整个仓库后标记目录为当前。
+
+        Args:
+            full: 为 True 时重新列出所有目录
+            rel_root: 只刷新该相对目录及其下级目录，默认整个仓库
+
+        Returns:
+            {"scanned_dirs", "created", "updated", "deleted"}
+        """
+        stats = {"scanned_dirs": 0, "created": 0, "updated": 0, "deleted": 0}
+        with _refresh_lock(self.repository.id):
+            if not os.path.isdir(self.root):
+                stats["deleted"], _ = self.entries.delete()
+                return stats
+
+            dirs = self.entries.filter(is_dir=True)
+            if rel_root:
+                dirs = dirs.filter(Q(path=rel_root) | Q(path__startswith=f"{rel_root}/"))
+            known_dirs = dict(dirs.values_list("path", "mtime_ns"))
+            child_dirs: Dict[str, List[str]] = defaultdict(list)
+            for path in known_dirs:
+                if path:
+                    child_dirs[_parent_path(path)].append(path)
+
+            stack = [rel_root]
+            while stack:
+                rel_dir = stack.pop()
+                try:
+                    mtime_ns = os.stat(self._abs(rel_dir)).st_mtime_ns
+                except OSError:
+                    continue
+                if full or known_dirs.get(rel_dir) != mtime_ns:
+                    stack.extend(self._rescan_dir(rel_dir, stats))
+                else:
+                    stack.extend(child_dirs.get(rel_dir, []))
+
+        if not rel_root:
+            self.mark_current()
+        if any(stats[field] for field in ("created", "updated", "deleted")):
+            logger.info("仓库文件目录已刷新: %s - %s", self.repository.name, stats)
+        return stats
+
+    def refresh_paths(self, abs_paths: Iterable[str]) -> Dict[str, int]:
+        """按变化路径局部刷新：重新列出每个路径的上级目录（以及仍存在的目录本身）
+
+        Args:
+            abs_paths: 变化的绝对路径
+
+        Returns:
+            同 refresh()
+        """
+        stats = {"scanned_dirs": 0, "created": 0, "updated": 0, "deleted": 0}
+        rel_dirs = set()
+        for abs_path in abs_paths:
+            rel_path = self.relative_path(abs_path)
+            if rel_path is None:
+                continue
+            if rel_path:
+                rel_dirs.add(_parent_path(rel_path))
+            if os.path.isdir(abs_path):
+                rel_dirs.add(rel_path)
+
+        with _refresh_lock(self.repository.id):
+            for rel_dir in sorted(rel_dirs):
+                if os.path.isdir(self._abs(rel_dir)):
+                    self._rescan_dir(rel_dir, stats)
+        return stats
+
+    def relative_path(self, abs_path: str) -> Optional[str]:
+        """绝对路径在仓库内的相对路径；不在仓库内或位于隐藏目录下时返回 None"""
+        abs_path = os.path.abspath(abs_path)
+        if abs_path != self.root and not abs_path.startswith(self.root + os.sep):
+            return None
+        rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, "/")
+        rel_path = "" if rel_path == "." else rel_path
+        if rel_path and any(_is_hidden(part) for part in rel_path.split("/")):
+            return None
+        return rel_path
+
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.root, *rel_path.split("/")) if rel_path else self.root
+
+    def _rescan_dir(self, rel_dir: str, stats: Dict[str, int]) -> List[str]:
+        """重新列出单个目录并同步其直接子项，返回子目录的相对路径"""
+        abs_dir = self._abs(rel_dir)
+        try:
+            dir_mtime_ns = os.stat(abs_dir).st_mtime_ns
+            with os.scandir(abs_dir) as it:
+                scanned = []
+                for entry in it:
+                    if _is_hidden(entry.name):
+                        continue
+                    try:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    scanned.append((entry.name, is_dir, entry_stat))
+        except OSError as e:
+            logger.warning("列出目录失败: %s - %s", abs_dir, str(e))
+            return []
+        stats["scanned_dirs"] += 1
+
+        existing = {
+            entry.name: entry for entry in self.entries.filter(parent_hash=_path_hash(rel_dir))
+        }
+        to_create: List[RepositoryCatalogEntry] = []
+        to_update: List[RepositoryCatalogEntry] = []
+        removed: List[RepositoryCatalogEntry] = []
+        subdirs: List[str] = []
+        for name, is_dir, entry_stat in scanned:
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if is_dir:
+                subdirs.append(rel_path)
+            current = existing.pop(name, None)
+            if current is not None and current.is_dir != is_dir:
+                removed.append(current)
+                current = None
+            if current is None:
+                # 目录的 mtime 由它自己的扫描写入，新目录先记为 0 以确保随后被扫描
+                to_create.append(
+                    self._build_entry(
+                        rel_path,
+                        is_dir,
+                        0 if is_dir else entry_stat.st_size,
+                        0 if is_dir else entry_stat.st_mtime_ns,
+                    )
+                )
+            elif not is_dir and (current.size, current.mtime_ns) != (
+                entry_stat.st_size,
+                entry_stat.st_mtime_ns,
+            ):
+                current.size = entry_stat.st_size
+                current.mtime_ns = entry_stat.st_mtime_ns
+                to_update.append(current)
+        removed.extend(existing.values())
+
+        if removed:
+            stats["deleted"] += self._delete_entries(removed)
+        self._attach_grade_index(to_create + to_update)
+        if to_create:
+            RepositoryCatalogEntry.objects.bulk_create(to_create, ignore_conflicts=True)
+            stats["created"] += len(to_create)
+        if to_update:
+            RepositoryCatalogEntry.objects.bulk_update(
+                to_update, ["size", "mtime_ns", "grade_index"]
+            )
+            stats["updated"] += len(to_update)
+
+        # 最后写入目录自身的 mtime：中途失败时下次刷新会重新扫描该目录
+        own = self._build_entry(rel_dir, True, 0, dir_mtime_ns)
+        RepositoryCatalogEntry.objects.update_or_create(
+            repository=self.repository,
+            path_hash=own.path_hash,
+            defaults={
+                field: getattr(own, field)
+                for field in (
+                    "path",
+                    "parent_hash",
+                    "name",
+                    "is_dir",
+                    "depth",
+                    "size",
+                    "mtime_ns",
+                    "extension",
+                    "course_name",
+                    "class_name",
+                    "homework_name",
+                    "student_name",
+                )
+            },
+        )
+        return subdirs
+
+    def _delete_entries(self, entries: List[RepositoryCatalogEntry]) -> int:
+        """删除条目；目录连同其所有下级条目一起删除"""
+        deleted, _ = self.entries.filter(id__in=[entry.id for entry in entries]).delete()
+        for entry in entries:
+            if entry.is_dir:
+                count, _ = self.entries.filter(path__startswith=f"{entry.path}/").delete()
+                deleted += count
+        return deleted
+
+    def _build_entry(
+        self, rel_path: str, is_dir: bool, size: int, mtime_ns: int
+    ) -> RepositoryCatalogEntry:
+        parts = rel_path.split("/") if rel_path else []
+        name = parts[-1] if parts else ""
+        dir_parts = parts if is_dir else parts[:-1]
+        student_name = ""
+        if not is_dir and len(dir_parts) >= 3:
+            student_name = GradeFileProcessor.extract_student_name(name) or ""
+        return RepositoryCatalogEntry(
+            repository=self.repository,
+            path_hash=_path_hash(rel_path),
+            path=rel_path,
+            parent_hash=_path_hash(_parent_path(rel_path)) if rel_path else "",
+            name=name[:255],
+            is_dir=is_dir,
+            depth=len(parts),
+            size=size,
+            mtime_ns=mtime_ns,
+            extension="" if is_dir else os.path.splitext(name)[1].lower()[:20],
+            course_name=dir_parts[0] if len(dir_parts) >= 1 else "",
+            class_name=dir_parts[1] if len(dir_parts) >= 2 else "",
+            homework_name=dir_parts[2] if len(dir_parts) >= 3 else "",
+            student_name=student_name[:100],
+        )
+
+    def _attach_grade_index(self, entries: List[RepositoryCatalogEntry]) -> None:
+        """为 Word 文档关联已有的评分信息索引条目（按绝对路径哈希一次查询）"""
+        by_hash = {
+            _path_hash(self._abs(entry.path)): entry
+            for entry in entries
+            if entry.extension in (".docx", ".doc")
+        }
+        if not by_hash:
+            return
+        index_ids = dict(
+            GradeInfoIndexEntry.objects.filter(path_hash__in=list(by_hash)).values_list(
+                "path_hash", "id"
+            )
+        )
+        for path_hash, entry in by_hash.items():
+            entry.grade_index_id = index_ids.get(path_hash)
+
+    # ==================== 查询 ====================
+
+    def has_dir(self, rel_dir: str = "") -> bool:
+        """目录是否已记录（尚未扫描到的新目录返回 False，调用方应回退到文件系统）"""
+        return self.entries.filter(path_hash=_path_hash(rel_dir.strip("/")), is_dir=True).exists()
+
+    def list_subtree(self, rel_dir: str = ""):
+        """目录本身及其所有下级条目（按路径排序）"""
+        rel_dir = rel_dir.strip("/")
+        queryset = self.entries
+        if rel_dir:
+            queryset = queryset.filter(Q(path=rel_dir) | Q(path__startswith=f"{rel_dir}/"))
+        return queryset.order_by("path")
+
+    def list_children(self, rel_dir: str = ""):
+        """目录的直接子项（目录在前，按名称排序）"""
+        return self.entries.filter(parent_hash=_path_hash(rel_dir.strip("/"))).order_by(
+            "-is_dir", "name"
+        )
+
+    def list_files(self, rel_dir: str = "", max_depth: Optional[int] = None):
+        """目录下的所有文件
+
+        Args:
+            rel_dir: 仓库内相对目录
+            max_depth: 相对 rel_dir 的最大层级（直接子文件为 1），None 表示不限
+        """
+        rel_dir = rel_dir.strip("/")
+        queryset = self.entries.filter(is_dir=False)
+        if rel_dir:
+            queryset = queryset.filter(path__startswith=f"{rel_dir}/")
+        if max_depth is not None:
+            base_depth = len(rel_dir.split("/")) if rel_dir else 0
+            queryset = queryset.filter(depth__lte=base_depth + max_depth)
+        return queryset.order_by("path")
+
+    def count_files(self, rel_dir: str = "", extension: Optional[str] = ".docx") -> int:
+        """目录下直接包含的文件数量"""
+        queryset = self.list_children(rel_dir).filter(is_dir=False)
+        if extension:
+            queryset = queryset.filter(extension=extension)
+        return queryset.count()
+
+    def total_size(self) -> int:
+        """仓库内所有文件的总字节数"""
+        return self.entries.filter(is_dir=False).aggregate(total=Sum("size"))["total"] or 0
+
+    def list_courses(self) -> List[str]:
+        """课程目录（仓库根目录下的一级目录）名称"""
+        return list(
+            self.entries.filter(is_dir=True, depth=1)
+            .order_by("name")
+            .values_list("name", flat=True)
+        )
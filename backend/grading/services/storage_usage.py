@@ -0,0 +1,301 @@
+"""
+存储空间用量统计模块
+
+按仓库（以及仓库内的每个学生）维护字节计数（StorageUsage）：
+- 保存、覆盖或删除文件时调用 record_change() 以 F() 表达式原子累加增量
+- 空间检查直接读取计数行，不再遍历仓库目录
+- 汇总行不存在时按仓库文件目录的当前合计（目录不是当前时为 0）新建，标记为未对账，
+  请求中不执行对账
+- reconcile() 以仓库文件目录（RepositoryCatalog）和提交记录为准重算计数，修正仓库外的修改
+  造成的偏差，并回收不再被引用的提交 blob；由 manage.py reconcile_storage_usage 定期执行，
+  --pending 只对账尚未对账的仓库
+- 计数包含提交 blob 单独占用的空间（与工作副本硬链接的 blob 不重复计算）
+- tenant_report() 一次查询返回租户下所有仓库的用量
+
+使用示例：
+    service = StorageUsageService()
+    service.record_change(repository, delta_bytes=file_size, delta_files=1, student=student)
+    usage = service.get_repository_usage(repository)   # StorageUsage，O(1)
+    # [{"repository_id": ..., "used_bytes": ...}, ...]
+    service.tenant_report(tenant)
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Q, Sum
+from django.utils import timezone
+
+from grading.models import Repository, StorageUsage, Submission
+from grading.services.repository_catalog import RepositoryCatalog
+from grading.services.submission_blob_store import SubmissionBlobStore
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_MB = 1024 * 1024
+
+
+class StorageUsageService:
+    """存储空间用量计数服务"""
+
+    def record_change(
+        self, repository: Repository, delta_bytes: int, delta_files: int = 0, student=None
+    ) -> None:
+        """累加一次文件变化
+
+        仓库汇总行不存在时以初始计数加本次变化新建（尚未对账），
+        由 reconcile_storage_usage 对账，避免在上传请求中遍历整个仓库。
+
+        Args:
+            repository: 仓库对象
+            delta_bytes: 字节增量（删除为负数）
+            delta_files: 文件数量增量（新建 1，删除 -1，覆盖 0）
+            student: 文件所属学生（可选）
+        """
+        if not delta_bytes and not delta_files:
+            return
+
+        with transaction.atomic():
+            self._add(repository, None, delta_bytes, delta_files)
+            if student is not None:
+                self._add(repository, student, delta_bytes, delta_files)
+
+    def _add(self, repository: Repository, student, delta_bytes: int, delta_files: int) -> None:
+        """累加一行计数，不存在时以初始计数（学生行为 0）加本次变化新建"""
+        updated = StorageUsage.objects.filter(repository=repository, student=student).update(
+            used_bytes=F("used_bytes") + delta_bytes,
+            file_count=F("file_count") + delta_files,
+        )
+        if updated:
+            return
+        seed_bytes, seed_files = self._seed(repository) if student is None else (0, 0)
+        usage, created = StorageUsage.objects.get_or_create(
+            repository=repository,
+            student=student,
+            defaults={
+                "tenant": repository.tenant,
+                "used_bytes": max(seed_bytes + delta_bytes, 0),
+                "file_count": max(seed_files + delta_files, 0),
+            },
+        )
+        if not created:
+            StorageUsage.objects.filter(id=usage.id).update(
+                used_bytes=F("used_bytes") + delta_bytes,
+                file_count=F("file_count") + delta_files,
+            )
+
+    def _seed(self, repository: Repository) -> Tuple[int, int]:
+        """汇总行的初始计数 (字节数, 文件数)
+
+        仓库文件目录为当前时取其合计（不含提交 blob），否则为 0；
+        新建的行 reconciled_at 为空，由 reconcile_storage_usage --pending 修正。
+        """
+        try:
+            catalog = RepositoryCatalog.current(repository)
+            if catalog is None:
+                return 0, 0
+            totals = catalog.entries.filter(is_dir=False).aggregate(
+                total=Sum("size"), count=Count("id")
+            )
+        except Exception as e:
+            logger.warning(f"读取仓库文件目录失败，初始计数记为 0: {repository.name} - {e}")
+            return 0, 0
+        return totals["total"] or 0, totals["count"] or 0
+
+    def get_repository_usage(self, repository: Repository) -> StorageUsage:
+        """读取仓库汇总计数，不存在时以初始计数新建（尚未对账）"""
+        usage = StorageUsage.objects.filter(repository=repository, student__isnull=True).first()
+        if usage is None:
+            used_bytes, file_count = self._seed(repository)
+            usage, _ = StorageUsage.objects.get_or_create(
+                repository=repository,
+                student=None,
+                defaults={
+                    "tenant": repository.tenant,
+                    "used_bytes": used_bytes,
+                    "file_count": file_count,
+                },
+            )
+        return usage
+
+    def get_student_usage(self, repository: Repository, student) -> int:
+        """读取学生在仓库中的已使用空间（字节）"""
+        usage = (
+            StorageUsage.objects.filter(repository=repository, student=student)
+            .values_list("used_bytes", flat=True)
+            .first()
+        )
+        return usage or 0
+
+    def reconcile(self, repository: Repository) -> StorageUsage:
+        """以磁盘为准重算仓库汇总计数与各学生计数
+
+        仓库汇总来自完整刷新后的仓库文件目录（目录 mtime 不反映文件的原地修改，
+        对账需要重新 stat 每个文件）；学生计数按提交记录中的文件路径
+        （同名重新上传会覆盖同一文件，按路径去重）在文件目录中查找大小。
+        对账前先回收不再被提交记录引用的 blob；未与工作副本共用 inode 的 blob
+        （历史版本、已写入评分的副本对应的 blob）计入仓库汇总和引用它的学生。
+
+        Returns:
+            仓库汇总计数行
+        """
+        catalog = RepositoryCatalog(repository)
+        catalog.refresh(full=True)
+        totals = catalog.entries.filter(is_dir=False).aggregate(
+            total=Sum("size"), count=Count("id")
+        )
+
+        submissions = Submission.objects.filter(repository=repository)
+        store = SubmissionBlobStore.for_repository(repository)
+        store.collect_garbage(
+            dict(
+                submissions.exclude(content_hash="")
+                .order_by()
+                .values("content_hash")
+                .annotate(refs=Count("id"))
+                .values_list("content_hash", "refs")
+            )
+        )
+        blob_sizes = store.unshared_bytes()
+
+        # 学生文件：{学生ID: {仓库内相对路径}}，学生引用的 blob：{学生ID: {SHA-256}}
+        student_paths: Dict[int, set] = {}
+        student_blobs: Dict[int, set] = {}
+        for student_id, file_path, content_hash in submissions.values_list(
+            "student_id", "file_path", "content_hash"
+        ).distinct():
+            if content_hash in blob_sizes:
+                student_blobs.setdefault(student_id, set()).add(content_hash)
+            abs_path = os.path.abspath(file_path)
+            if not abs_path.startswith(catalog.root + os.sep):
+                continue
+            rel_path = os.path.relpath(abs_path, catalog.root).replace(os.sep, "/")
+            student_paths.setdefault(student_id, set()).add(rel_path)
+        all_paths = set().union(*student_paths.values()) if student_paths else set()
+        sizes = dict(
+            catalog.entries.filter(is_dir=False, path__in=list(all_paths)).values_list(
+                "path", "size"
+            )
+        )
+
+        now = timezone.now()
+        with transaction.atomic():
+            usage, _ = StorageUsage.objects.update_or_create(
+                repository=repository,
+                student=None,
+                defaults={
+                    "tenant": repository.tenant,
+                    "used_bytes": (totals["total"] or 0) + sum(blob_sizes.values()),
+                    "file_count": totals["count"] or 0,
+                    "reconciled_at": now,
+                },
+            )
+            StorageUsage.objects.filter(repository=repository, student__isnull=False).delete()
+            StorageUsage.objects.bulk_create(
+                [
+                    StorageUsage(
+                        tenant=repository.tenant,
+                        repository=repository,
+                        student_id=student_id,
+                        used_bytes=sum(sizes[path] for path in paths if path in sizes)
+                        + sum(blob_sizes[blob] for blob in student_blobs.get(student_id, ())),
+                        file_count=sum(1 for path in paths if path in sizes),
+                        reconciled_at=now,
+                    )
+                    for student_id, paths in student_paths.items()
+                ]
+            )
+
+        logger.info(
+            f"存储空间对账完成: {repository.name} - "
+            f"{usage.used_bytes} bytes, {usage.file_count} 个文件, {len(student_paths)} 名学生"
+        )
+        return usage
+
+    def reconcile_all(
+        self,
+        tenant=None,
+        repository_ids: Optional[List[int]] = None,
+        pending_only: bool = False,
+    ) -> int:
+        """对账所有激活的本地仓库
+
+        Args:
+            tenant: 只对账该租户的仓库（可选）
+            repository_ids: 只对账这些仓库（可选）
+            pending_only: 只对账尚未对账（没有汇总行或汇总行未对账）的仓库
+
+        Returns:
+            完成对账的仓库数量
+        """
+        repositories = Repository.objects.filter(is_active=True, repo_type="filesystem")
+        if tenant is not None:
+            repositories = repositories.filter(tenant=tenant)
+        if repository_ids:
+            repositories = repositories.filter(id__in=repository_ids)
+        if pending_only:
+            repositories = repositories.exclude(
+                id__in=StorageUsage.objects.filter(
+                    student__isnull=True, reconciled_at__isnull=False
+                ).values("repository_id")
+            )
+
+        count = 0
+        for repository in repositories.select_related("owner", "tenant"):
+            try:
+                self.reconcile(repository)
+                count += 1
+            except Exception as e:
+                logger.error(f"存储空间对账失败: {repository.name} - {e}", exc_info=True)
+        return count
+
+    def tenant_report(self, tenant) -> List[Dict]:
+        """租户下所有仓库的用量（单次查询，尚未对账的仓库用量为 None）"""
+        rows = (
+            Repository.objects.filter(tenant=tenant)
+            .annotate(
+                total_usage=FilteredRelation(
+                    "storage_usages", condition=Q(storage_usages__student__isnull=True)
+                )
+            )
+            .order_by("name")
+            .values(
+                "id",
+                "name",
+                "owner__username",
+                "repo_type",
+                "is_active",
+                "allocated_space_mb",
+                "total_usage__used_bytes",
+                "total_usage__file_count",
+                "total_usage__reconciled_at",
+            )
+        )
+
+        report = []
+        for row in rows:
+            used_bytes = row["total_usage__used_bytes"]
+            allocated_mb = row["allocated_space_mb"] or 0
+            used_mb = used_bytes / BYTES_PER_MB if used_bytes is not None else None
+            reconciled_at = row["total_usage__reconciled_at"]
+            report.append(
+                {
+                    "repository_id": row["id"],
+                    "name": row["name"],
+                    "owner": row["owner__username"],
+                    "repo_type": row["repo_type"],
+                    "is_active": row["is_active"],
+                    "used_bytes": used_bytes,
+                    "file_count": row["total_usage__file_count"],
+                    "total_mb": allocated_mb,
+                    "usage_percentage": (
+                        round(used_mb / allocated_mb * 100, 2)
+                        if used_mb is not None and allocated_mb > 0
+                        else None
+                    ),
+                    "reconciled_at": reconciled_at.isoformat() if reconciled_at else None,
+                }
+            )
+        return report
@@ -0,0 +1,256 @@
+"""
+提交文件内容寻址存储模块
+
+学生上传的每个版本按内容的 SHA-256 保存一份只读副本（blob）：
+- 写入时边写临时文件边计算哈希，完成后原子重命名为 <哈希前两位>/<哈希>，
+  内容相同的版本共用同一个 blob（已存在时直接丢弃临时文件）
+- 提交目录中的文件是从 blob 生成的工作副本：优先 reflink（写时复制，不占额外空间），
+  文件系统不支持时硬链接到 blob（SUBMISSION_BLOB_HARDLINK=False 时改为复制）；
+  副本先在同目录生成临时文件再原子替换，读取方不会看到写了一半的文件
+- 与 blob 硬链接的工作副本是只读的，写入评分前必须调用 detach() 换成独立副本，
+  否则会改写 blob 中的历史版本
+- blob 存放在仓库目录下的隐藏目录中，仓库文件目录和文件监听会跳过它；
+  空间统计单独计入未与工作副本共用 inode 的 blob（unshared_bytes）
+- collect_garbage() 按提交记录的引用计数删除不再被引用的 blob
+
+使用示例：
+    store = SubmissionBlobStore.for_repository(repository)
+    content_hash, size = store.write(uploaded_file.chunks())
+    store.materialize(content_hash, file_path)
+    with store.open(submission.content_hash) as f:   # 读取历史版本
+        ...
+    detach(file_path)                                # 写入评分前
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 仓库目录下的 blob 目录名（以 . 开头，目录扫描时会被跳过）
+BLOB_DIR_NAME = ".submission_blobs"
+
+# Linux FICLONE ioctl：在支持 reflink 的文件系统（btrfs、xfs）上共享数据块
+_FICLONE = 0x40049409
+
+# 不再被引用的 blob 至少保留的时间（秒）：上传事务提交前 blob 已写入但提交记录尚不可见
+DEFAULT_GC_GRACE_SECONDS = 3600
+
+
+def _tmp_path_beside(path: str) -> str:
+    directory, filename = os.path.split(os.path.abspath(path))
+    # 不用 mkstemp：副本应按 umask 取得普通文件权限，而不是 0600
+    return os.path.join(directory, f".{filename}.{uuid.uuid4().hex}.part")
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """以 reflink 方式创建 dst，文件系统不支持时返回 False（不留下 dst）"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def detach(path: str) -> bool:
+    """工作副本与 blob 硬链接时换成独立的可写副本（原子替换），返回是否替换
+
+    写入评分、评价之前调用；不是硬链接（或文件不存在）时什么也不做。
+    """
+    try:
+        if os.stat(path).st_nlink <= 1:
+            return False
+    except OSError:
+        return False
+    tmp_path = _tmp_path_beside(path)
+    try:
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+class SubmissionBlobStore:
+    """单个仓库的内容寻址 blob 存储"""
+
+    def __init__(self, root: str):
+        """初始化 blob 存储
+
+        Args:
+            root: blob 根目录
+        """
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+
+    @classmethod
+    def for_repository(cls, repository) -> "SubmissionBlobStore":
+        return cls(os.path.join(repository.get_full_path(), BLOB_DIR_NAME))
+
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return bool(content_hash) and os.path.isfile(self.blob_path(content_hash))
+
+    def open(self, content_hash: str):
+        """以二进制只读方式打开 blob"""
+        return open(self.blob_path(content_hash), "rb")
+
+    def unshared_size(self, content_hash: str) -> int:
+        """blob 单独占用的字节数：不存在或与工作副本硬链接时为 0"""
+        if not content_hash:
+            return 0
+        try:
+            stat = os.stat(self.blob_path(content_hash))
+        except OSError:
+            return 0
+        return stat.st_size if stat.st_nlink == 1 else 0
+
+    def unshared_bytes(self) -> Dict[str, int]:
+        """所有未与工作副本共用 inode 的 blob：{SHA-256: 字节数}"""
+        sizes = {}
+        for content_hash, stat in self._iter_blobs():
+            if stat.st_nlink == 1:
+                sizes[content_hash] = stat.st_size
+        return sizes
+
+    def write(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """流式写入内容，返回 (SHA-256, 字节数)
+
+        Raises:
+            OSError: 写入失败（临时文件会被清理）
+        """
+        content_hash, size, _ = self.write_blob(chunks)
+        return content_hash, size
+
+    def write_blob(self, chunks: Iterable[bytes]) -> Tuple[str, int, bool]:
+        """同 write()，另外返回本次是否新建了 blob"""
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            target = self.blob_path(content_hash)
+            if os.path.isfile(target):
+                os.remove(tmp_path)
+                logger.debug(f"内容已存在，复用 blob: {content_hash}")
+                return content_hash, size, False
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, target)
+            return content_hash, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def materialize(self, content_hash: str, dest_path: str) -> str:
+        """从 blob 生成工作副本（原子替换目标文件）
+
+        依次尝试 reflink、硬链接（SUBMISSION_BLOB_HARDLINK 开启时）和复制。
+
+        Raises:
+            OSError: 生成失败
+        """
+        directory = os.path.dirname(dest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        blob_path = self.blob_path(content_hash)
+        tmp_path = _tmp_path_beside(dest_path)
+        try:
+            if not _reflink(blob_path, tmp_path):
+                if getattr(settings, "SUBMISSION_BLOB_HARDLINK", True):
+                    try:
+                        os.link(blob_path, tmp_path)
+                    except OSError:
+                        # 跨设备或文件系统不支持硬链接
+                        shutil.copyfile(blob_path, tmp_path)
+                else:
+                    # copyfile 在 Linux 上使用 sendfile，数据不经过用户态
+                    shutil.copyfile(blob_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return dest_path
+
+    def collect_garbage(
+        self, reference_counts: Dict[str, int], grace_seconds: float = DEFAULT_GC_GRACE_SECONDS
+    ) -> Tuple[int, int]:
+        """删除引用计数为 0 的 blob，以及残留的临时文件
+
+        Args:
+            reference_counts: {SHA-256: 引用该 blob 的提交记录数}
+            grace_seconds: 修改时间在该时长以内的文件不删除（上传可能尚未提交）
+
+        Returns:
+            (删除的 blob 数量, 释放的字节数)
+        """
+        cutoff = time.time() - grace_seconds
+        deleted = freed = 0
+        for content_hash, stat in self._iter_blobs():
+            if reference_counts.get(content_hash, 0) > 0 or stat.st_mtime > cutoff:
+                continue
+            try:
+                os.remove(self.blob_path(content_hash))
+            except OSError as e:
+                logger.warning(f"删除 blob 失败: {content_hash} - {e}")
+                continue
+            deleted += 1
+            # 仍与工作副本硬链接的 blob 删除后不释放空间
+            if stat.st_nlink == 1:
+                freed += stat.st_size
+
+        if os.path.isdir(self.tmp_dir):
+            for entry in os.scandir(self.tmp_dir):
+                try:
+                    if entry.stat().st_mtime <= cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+
+        if deleted:
+            logger.info(f"blob 回收完成: {self.root} - 删除 {deleted} 个，释放 {freed} bytes")
+        return deleted, freed
+
+    def _iter_blobs(self):
+        """遍历所有 blob，产出 (SHA-256, os.stat_result)"""
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.scandir(self.root):
+            if not shard.is_dir(follow_symlinks=False) or shard.path == self.tmp_dir:
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    yield entry.name, entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
@@ -7,12 +7,13 @@ import os
 import tempfile
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from grading.models import GlobalConfig
 
 
+@override_settings(AI_SCORING_WORKERS=0)
 class AIScoringTest(TestCase):
     """Test cases for AI scoring functionality."""
 
@@ -304,6 +305,7 @@ class AIScoringFunctionTest(TestCase):
         self.assertEqual(convert_score_to_grade(None), "N/A")
 
 
+@override_settings(AI_SCORING_WORKERS=0)
 class AIScoringIntegrationTest(TestCase):
     """Integration tests for AI scoring."""
 
@@ -0,0 +1,130 @@
+"""
+AIScoringClient 单元测试
+
+测试进程级AI评分客户端：
+- 分数解析
+- 同步评分复用同一个 Ark 客户端
+- 评分结果缓存与相同内容去重
+"""
+
+import os
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from grading.models import AIScoreCacheEntry
+from grading.services import ai_scoring_client
+from grading.services.ai_score_cache import AIScoreCache
+from grading.services.ai_scoring_client import AIScoringClient, get_scoring_client, parse_score
+
+API_KEY = "00000000-0000-0000-0000-000000000000"
+
+
+def _response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeArk:
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        FakeArk.instances.append(self)
+
+    def _create(self, model, messages):
+        self.calls.append(messages[0]["content"])
+        time.sleep(0.05)
+        return _response("分数：85分\n评价：完成得很好")
+
+    def close(self):
+        pass
+
+
+class ParseScoreTest(SimpleTestCase):
+    """分数解析测试"""
+
+    def test_parse_score(self):
+        self.assertEqual(parse_score("分数：92分\n评价：很好"), 92)
+        self.assertEqual(parse_score("Score: 77"), 77)
+        self.assertEqual(parse_score("得到 88/100"), 88)
+        self.assertIsNone(parse_score("分数：150分"))
+        self.assertIsNone(parse_score(""))
+
+
+@patch.object(ai_scoring_client, "Ark", FakeArk)
+class AIScoringClientTest(SimpleTestCase):
+    """AIScoringClient 单元测试"""
+
+    def setUp(self):
+        FakeArk.instances = []
+
+    def test_sync_client_reused(self):
+        """测试多次评分复用同一个 Ark 客户端"""
+        client = AIScoringClient(api_key=API_KEY)
+        self.assertEqual(client.score("作业一"), (85, "分数：85分\n评价：完成得很好"))
+        client.score("作业二")
+        self.assertEqual(len(FakeArk.instances), 1)
+        self.assertEqual(len(FakeArk.instances[0].calls), 2)
+        self.assertTrue(FakeArk.instances[0].calls[1].endswith("作业二"))
+
+    def test_concurrent_identical_scored_once(self):
+        """测试多个线程同时评分相同内容时只调用一次AI服务"""
+        client = AIScoringClient(api_key=API_KEY)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.score("同一份作业")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(FakeArk.instances[0].calls), 1)
+        self.assertEqual({score for score, _ in results}, {85})
+
+    def test_get_scoring_client_singleton(self):
+        """测试进程级客户端按密钥复用"""
+        with patch.dict(os.environ, {"ARK_API_KEY": API_KEY}):
+            self.assertIs(get_scoring_client(), get_scoring_client())
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(get_scoring_client())
+
+
+@patch.object(ai_scoring_client, "Ark", FakeArk)
+class AIScoreCacheTest(TestCase):
+    """AIScoreCache 单元测试"""
+
+    def setUp(self):
+        FakeArk.instances = []
+
+    def test_key_normalization(self):
+        """测试空白和全角字符差异不影响缓存键"""
+        key = AIScoreCache.key("第一题 答案：ＡＢ\n\n结论", "m", 1)
+        self.assertEqual(key, AIScoreCache.key("  第一题  答案：AB 结论 ", "m", 1))
+        self.assertNotEqual(key, AIScoreCache.key("第一题 答案：AB 结论", "m", 2))
+        self.assertNotEqual(key, AIScoreCache.key("第一题 答案：AB 结论", "other", 1))
+
+    def test_rerun_served_from_cache(self):
+        """测试重新评分相同内容时不再调用AI服务"""
+        first = AIScoringClient(api_key=API_KEY, cache=AIScoreCache())
+        self.assertEqual(first.score("作业内容")[0], 85)
+        second = AIScoringClient(api_key=API_KEY, cache=AIScoreCache())
+        self.assertEqual(second.score("作业内容 ")[0], 85)
+        self.assertEqual(len(FakeArk.instances), 1)
+        self.assertEqual(AIScoreCacheEntry.objects.get().hit_count, 1)
+
+    def test_expired_entries(self):
+        """测试过期条目不命中且会被清理"""
+        cache = AIScoreCache(ttl_seconds=60)
+        cache.set("k", 90, "分数：90分", model="m", prompt_version=1)
+        self.assertEqual(cache.get("k"), (90, "分数：90分"))
+        AIScoreCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.prune(), 1)
@@ -11,11 +11,13 @@ import tempfile
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from docx import Document
 
 from grading.models import Course, Homework, Repository, Semester
+from grading.services.ai_scoring_client import AIScoringClient
+from grading.services.ai_scoring_jobs import TokenBucket
 
 
 class AIScoreViewTest(TestCase):
@@ -216,6 +218,7 @@ class AIScoreViewTest(TestCase):
                     self.assertEqual(data["ai_grade"], expected_grade)
 
 
+@override_settings(AI_SCORING_WORKERS=0)
 class BatchAIScoreViewTest(TestCase):
     """测试批量AI评分视图函数"""
 
@@ -288,23 +291,32 @@ class BatchAIScoreViewTest(TestCase):
 
     def test_batch_ai_score_rate_limit(self):
         """测试批量AI评分的速率限制 - 需求 8.3"""
+        # 每个文件的 AI 请求都先从共享令牌桶获取令牌
+        rate_limiter = TokenBucket(rate=1000)
+        client = AIScoringClient(
+            api_key="00000000-0000-0000-0000-000000000000", rate_limiter=rate_limiter
+        )
+        ark = MagicMock()
+        ark.chat.completions.create.return_value.choices = [
+            MagicMock(message=MagicMock(content="分数：85分\n评价：作业完成得很好"))
+        ]
 
-        # Mock AI服务返回
-        def mock_ai_score(content):
-            return (85, "作业完成得很好")
-
-        mock_rate_limit = MagicMock()
+        with (
+            patch.object(Repository, "get_full_path", return_value=self.temp_dir),
+            patch("grading.views.ARK_AVAILABLE", True),
+            patch("grading.views.get_scoring_client", return_value=client),
+            patch.object(client, "_get_client", return_value=ark),
+            patch.object(rate_limiter, "acquire", wraps=rate_limiter.acquire) as mock_acquire,
+        ):
+            response = self.client.post(
+                reverse("grading:batch_ai_score"),
+                {"dir_path": "homework_batch", "repo_id": self.repo.id},
+            )
 
-        with patch("grading.views.volcengine_score_homework", side_effect=mock_ai_score):
-            with patch("grading.views.rate_limit_api_request", mock_rate_limit):
-                response = self.client.post(
-                    reverse("grading:batch_ai_score"),
-                    {"dir_path": "homework_batch", "repo_id": self.repo.id},
-                )
-
-        # Note: Rate limiting is handled internally by volcengine_score_homework
-        # We just verify the batch operation completed successfully
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["success"], 3)
+        self.assertEqual(mock_acquire.call_count, 3)
+        self.assertEqual(ark.chat.completions.create.call_count, 3)
 
     def test_batch_ai_score_partial_failure(self):
         """测试批量AI评分部分失败 - 需求 8.6"""
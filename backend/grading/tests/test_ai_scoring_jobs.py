@@ -0,0 +1,265 @@
+"""
+批量AI评分任务单元测试
+
+测试后台评分任务：
+- 令牌桶限流器
+- 任务执行器的计数、异常处理与并发执行
+- 全部失败的任务标记为失败，中断的任务重新排队
+- 批量评分视图立即返回任务 ID，进度查询接口
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from grading.models import AIScoringJob, AIScoringJobItem, Repository
+from grading.services.ai_scoring_jobs import AIScoringJobRunner, TokenBucket
+
+
+class TokenBucketTest(SimpleTestCase):
+    """TokenBucket 单元测试"""
+
+    def test_burst_then_wait(self):
+        """测试令牌耗尽后按速率等待"""
+        bucket = TokenBucket(rate=20, capacity=2)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+
+    def test_shared_across_threads(self):
+        """测试多线程共享限流器时总速率不超过配置"""
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 第一个令牌立即可用，其余 5 个按 50/秒 补充
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class AIScoringJobRunnerTest(TestCase):
+    """AIScoringJobRunner 单元测试（同步执行）"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="teacher", password="pass")
+
+    def test_counts_and_details(self):
+        """测试各状态计数与处理结果明细"""
+
+        def processor(item):
+            if item.file_name == "坏文件.docx":
+                raise ValueError("文件损坏")
+            if item.file_name == "已锁定.docx":
+                return {"status": "skipped", "message": "文件已锁定"}
+            return {"status": "success", "grade": "B", "score": 85, "comment": "完成得很好"}
+
+        runner = AIScoringJobRunner(processor=processor, max_workers=0)
+        job = runner.create_job(
+            self.user,
+            ["/tmp/作业/张三.docx", "/tmp/作业/坏文件.docx", "/tmp/作业/已锁定.docx"],
+            base_dir="/tmp/作业",
+        )
+        runner.submit(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_SUCCESS)
+        self.assertIsNotNone(job.finished_at)
+        progress = job.progress()
+        self.assertEqual((progress["total"], progress["processed"], progress["success"]), (3, 3, 1))
+        self.assertEqual((progress["failed"], progress["skipped"]), (1, 1))
+        details = {d["file"]: d for d in progress["details"]}
+        self.assertEqual(details["张三.docx"]["grade"], "B")
+        self.assertIn("文件损坏", details["坏文件.docx"]["message"])
+        self.assertEqual(details["已锁定.docx"]["status"], "skipped")
+
+    def test_empty_job_finishes(self):
+        """测试没有文件的任务直接完成"""
+        runner = AIScoringJobRunner(processor=lambda item: {}, max_workers=0)
+        job = runner.create_job(self.user, [], base_dir="/tmp/作业")
+        runner.submit(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_SUCCESS)
+
+    def test_all_failed_marks_job_failed(self):
+        """测试所有文件都失败时任务标记为失败"""
+        runner = AIScoringJobRunner(
+            processor=lambda item: {"status": "failed", "message": "AI服务不可用"}, max_workers=0
+        )
+        job = runner.create_job(self.user, ["/tmp/作业/张三.docx", "/tmp/作业/李四.docx"], "/tmp")
+        runner.submit(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_ERROR)
+        self.assertEqual((job.processed_files, job.failed_files), (2, 2))
+        self.assertIn("全部 2 个文件处理失败", job.message)
+
+    def test_partial_failure_reported_in_message(self):
+        """测试部分文件失败时任务完成并在消息中说明"""
+
+        def processor(item):
+            if item.file_name == "坏文件.docx":
+                return {"status": "failed", "message": "文件损坏"}
+            return {"status": "success", "grade": "A", "score": 95, "comment": ""}
+
+        runner = AIScoringJobRunner(processor=processor, max_workers=0)
+        job = runner.create_job(self.user, ["/tmp/作业/张三.docx", "/tmp/作业/坏文件.docx"], "/tmp")
+        runner.submit(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_SUCCESS)
+        self.assertEqual(job.message, "1 个文件处理失败")
+
+    def test_unexpected_error_counts_item_failed(self):
+        """测试处理函数之外的异常也会把文件计为失败"""
+        runner = AIScoringJobRunner(processor=lambda item: {"status": "success"}, max_workers=0)
+        job = runner.create_job(self.user, ["/tmp/作业/张三.docx"], base_dir="/tmp/作业")
+
+        with patch.object(
+            AIScoringJobItem, "file_name", new_callable=lambda: property(lambda self: 1 / 0)
+        ):
+            runner.submit(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_ERROR)
+        self.assertEqual((job.processed_files, job.failed_files), (1, 1))
+        item = job.items.get()
+        self.assertEqual(item.status, AIScoringJobItem.STATUS_FAILED)
+        self.assertIn("division by zero", item.message)
+
+    @override_settings(AI_SCORING_STALE_SECONDS=60)
+    def test_orphaned_job_requeued(self):
+        """测试进程重启后中断的任务在查询时重新排队"""
+        processed = []
+
+        def processor(item):
+            processed.append(item.file_name)
+            return {"status": "success", "grade": "A", "score": 95, "comment": ""}
+
+        runner = AIScoringJobRunner(processor=processor, max_workers=0)
+        job = runner.create_job(
+            self.user,
+            ["/tmp/作业/张三.docx", "/tmp/作业/李四.docx", "/tmp/作业/王五.docx"],
+            base_dir="/tmp/作业",
+        )
+        # 模拟上一个进程：张三已完成，李四处理到一半进程退出，王五尚未开始
+        long_ago = timezone.now() - timezone.timedelta(minutes=10)
+        AIScoringJob.objects.filter(id=job.id).update(
+            status=AIScoringJob.STATUS_RUNNING,
+            started_at=long_ago,
+            processed_files=1,
+            success_files=1,
+        )
+        job.items.filter(file_path__endswith="张三.docx").update(
+            status=AIScoringJobItem.STATUS_SUCCESS, started_at=long_ago, finished_at=long_ago
+        )
+        job.items.filter(file_path__endswith="李四.docx").update(
+            status=AIScoringJobItem.STATUS_RUNNING, started_at=long_ago
+        )
+        job.refresh_from_db()
+
+        self.assertTrue(runner.resume_if_orphaned(job))
+
+        job.refresh_from_db()
+        self.assertEqual(sorted(processed), ["李四.docx", "王五.docx"])
+        self.assertEqual(job.status, AIScoringJob.STATUS_SUCCESS)
+        self.assertEqual((job.processed_files, job.success_files), (3, 3))
+        self.assertFalse(runner.resume_if_orphaned(job))
+
+    @override_settings(AI_SCORING_STALE_SECONDS=60)
+    def test_recent_job_not_requeued(self):
+        """测试最近仍有进展的任务（可能在其他进程执行）不重新排队"""
+        runner = AIScoringJobRunner(processor=lambda item: {"status": "success"}, max_workers=0)
+        job = runner.create_job(self.user, ["/tmp/作业/张三.docx"], base_dir="/tmp/作业")
+        AIScoringJob.objects.filter(id=job.id).update(
+            status=AIScoringJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+        job.refresh_from_db()
+
+        self.assertFalse(runner.resume_if_orphaned(job))
+        self.assertEqual(job.items.get().status, AIScoringJobItem.STATUS_PENDING)
+
+
+class AIScoringJobRunnerThreadedTest(TransactionTestCase):
+    """AIScoringJobRunner 线程池执行"""
+
+    def test_workers_run_concurrently(self):
+        """测试多个工作线程并发处理文件"""
+        user = User.objects.create_user(username="teacher", password="pass")
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def processor(item):
+            with lock:
+                active.append(item.id)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(item.id)
+            return {"status": "success", "grade": "A", "score": 95, "comment": ""}
+
+        runner = AIScoringJobRunner(processor=processor, max_workers=3)
+        job = runner.create_job(user, [f"/tmp/作业/{i}.docx" for i in range(6)], base_dir="/tmp")
+        runner.submit(job)
+        runner.shutdown(wait=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AIScoringJob.STATUS_SUCCESS)
+        self.assertEqual((job.processed_files, job.success_files), (6, 6))
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 3)
+
+
+@override_settings(AI_SCORING_WORKERS=0)
+class BatchAIScoreJobViewTest(TestCase):
+    """批量AI评分视图与任务进度接口"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="teacher", password="pass", is_staff=True)
+        self.client.login(username="teacher", password="pass")
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.temp_dir, "第一次作业"))
+        for name in ("张三.txt", "李四.txt"):
+            with open(os.path.join(self.temp_dir, "第一次作业", name), "w", encoding="utf-8") as f:
+                f.write(f"{name} 的作业内容")
+        self.repo = Repository.objects.create(name="repo", owner=self.user, is_active=True)
+
+        patcher = patch.object(Repository, "get_full_path", return_value=self.temp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("grading.views.push_grade_changes")
+    @patch("grading.views.write_grade_and_comment_to_file", return_value=None)
+    @patch("grading.views.volcengine_score_homework", return_value=(85, "完成得很好"))
+    def test_returns_job_and_progress(self, mock_score, mock_write, mock_push):
+        """测试批量评分返回任务 ID，进度接口返回计数"""
+        response = self.client.post(
+            reverse("grading:batch_ai_score"), {"dir_path": "第一次作业", "repo_id": self.repo.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "success")
+        self.assertEqual(data["job_status"], AIScoringJob.STATUS_SUCCESS)
+        self.assertEqual((data["total"], data["success"]), (2, 2))
+        self.assertEqual(mock_score.call_count, 2)
+        self.assertEqual(mock_push.call_count, 2)
+
+        progress_url = reverse("grading:ai_scoring_job_progress", args=[data["job_id"]])
+        progress = self.client.get(progress_url).json()["data"]
+        self.assertEqual(progress["processed"], 2)
+        self.assertEqual({d["grade"] for d in progress["details"]}, {"B"})
+
+        User.objects.create_user(username="other", password="pass")
+        self.client.login(username="other", password="pass")
+        self.assertEqual(self.client.get(progress_url).status_code, 403)
@@ -66,7 +66,7 @@ class BatchGradeTest(TestCase):
         df = pd.DataFrame(data)
         df.to_excel(excel_path, index=False)
 
-    @patch("grading.grade_registration.Document")
+    @patch("grading.grade_registration.open_docx")
     def test_batch_grade_registration_single_class(self, mock_document):
         """Test batch grade registration for single class repository."""
         # Mock the Document class
@@ -87,7 +87,7 @@ class BatchGradeTest(TestCase):
         # Verify results
         self._verify_batch_grade_results(self.single_class_repo)
 
-    @patch("grading.grade_registration.Document")
+    @patch("grading.grade_registration.open_docx")
     def test_batch_grade_registration_multi_class(self, mock_document):
         """Test batch grade registration for multi class repository."""
         # Mock the Document class
@@ -215,7 +215,7 @@ class BatchGradeTest(TestCase):
         except Exception as e:
             self.fail(f"处理无效文件时不应该出错: {str(e)}")
 
-    @patch("grading.grade_registration.Document")
+    @patch("grading.grade_registration.open_docx")
     def test_batch_grade_with_mixed_grades(self, mock_document):
         """Test batch grade with mixed grade types."""
         # Mock the Document class with different grades
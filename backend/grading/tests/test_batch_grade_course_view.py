@@ -0,0 +1,125 @@
+"""
+整门课程批量登分视图测试
+
+测试 batch_grade_course_to_registry：
+- Git 仓库通过存储适配器读取远程课程目录并登分
+- 更新后的登分册推送回远程仓库，未变化时不产生新提交
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from docx import Document
+from openpyxl import Workbook, load_workbook
+
+from grading.models import Course, Repository, Semester
+from grading.services.git_mirror_manager import GitMirrorManager
+
+
+def _git(cwd, *args, text=True):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=text,
+        check=True,
+    ).stdout
+
+
+@override_settings(GRADE_EXTRACT_WORKERS=1)
+class BatchGradeCourseGitRepositoryTest(TestCase):
+    """Git 仓库的整门课程批量登分"""
+
+    COURSE = "Python程序设计"
+    STUDENTS = ["张三", "李四"]
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.origin = os.path.join(self.temp_dir, "origin.git")
+        work = os.path.join(self.temp_dir, "work")
+        _git(self.temp_dir, "init", "-q", "--bare", "-b", "main", self.origin)
+        _git(self.temp_dir, "init", "-q", "-b", "main", work)
+
+        class_dir = os.path.join(work, self.COURSE, "1班")
+        homework_dir = os.path.join(class_dir, "第1次作业")
+        os.makedirs(homework_dir)
+        workbook = Workbook()
+        workbook.active.append(["序号", "学号", "姓名"])
+        for index, name in enumerate(self.STUDENTS, start=1):
+            workbook.active.append([index, f"2024{index:03d}", name])
+        workbook.save(os.path.join(class_dir, "成绩登分册.xlsx"))
+        for name in self.STUDENTS:
+            doc = Document()
+            doc.add_paragraph("老师评分：A")
+            doc.save(os.path.join(homework_dir, f"{name}_作业1.docx"))
+        _git(work, "add", "-A")
+        _git(work, "commit", "-q", "-m", "提交作业")
+        _git(work, "push", "-q", self.origin, "main")
+
+        manager = GitMirrorManager(
+            base_dir=os.path.join(self.temp_dir, "mirrors"), freshness_seconds=0
+        )
+        patcher = patch(
+            "grading.services.git_storage_adapter.get_mirror_manager", return_value=manager
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username="teacher", password="pass", is_staff=True)
+        semester = Semester.objects.create(
+            name="2024春季学期", start_date="2024-02-01", end_date="2024-06-30"
+        )
+        self.course = Course.objects.create(name=self.COURSE, semester=semester, teacher=self.user)
+        self.repository = Repository.objects.create(
+            name="作业仓库",
+            owner=self.user,
+            repo_type="git",
+            url=f"file://{self.origin}",
+            branch="main",
+            is_active=True,
+        )
+        self.client.force_login(self.user)
+
+    def _post(self):
+        return self.client.post(
+            f"/grading/course/{self.course.id}/batch-grade-to-registry/",
+            {"repo_id": self.repository.id},
+        )
+
+    def _remote_log(self):
+        return _git(self.origin, "log", "--format=%s", "main").splitlines()
+
+    def test_registers_and_pushes_registry(self):
+        response = self._post()
+
+        self.assertEqual(response.status_code, 200, response.content.decode())
+        self.assertEqual(response.json()["summary"]["success"], 2)
+        self.assertEqual(self._remote_log(), [f"Update registry: {self.COURSE}", "提交作业"])
+        content = _git(self.origin, "show", f"main:{self.COURSE}/1班/成绩登分册.xlsx", text=False)
+        worksheet = load_workbook(io.BytesIO(content)).active
+        self.assertEqual([worksheet.cell(row, 4).value for row in (2, 3)], ["A", "A"])
+
+    def test_unchanged_rerun_does_not_push(self):
+        self._post()
+        response = self._post()
+
+        self.assertEqual(response.status_code, 200, response.content.decode())
+        self.assertEqual(len(self._remote_log()), 2)
+
+    def test_missing_course_directory(self):
+        self.course.name = "不存在的课程"
+        self.course.save()
+
+        response = self._post()
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("未找到课程目录", response.json()["message"])
@@ -0,0 +1,90 @@
+"""
+缓存命名空间版本测试
+
+测试 CacheManager 按命名空间版本号失效：
+- 不依赖 delete_pattern 清除整个作用域
+- 用户、租户、全局作用域的失效范围
+- 命名空间写入与失效统计
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from grading.cache_manager import CacheManager
+from grading.models import Tenant
+
+
+class CacheNamespaceTest(TestCase):
+    """命名空间版本失效测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tenant = Tenant.objects.create(name="测试租户")
+        self.teacher = User.objects.create_user(username="teacher1", password="password")
+        self.cache_manager = CacheManager(user_id=self.teacher.id, tenant_id=self.tenant.id)
+
+    def test_clear_all(self):
+        """测试清除所有缓存（递增命名空间版本，LocMemCache 同样生效）"""
+        self.cache_manager.set_comment_templates("personal", str(self.teacher.id), [{"id": 1}])
+        self.cache_manager.set_course_list(teacher_id=self.teacher.id, courses=[{"id": 1}])
+        self.cache_manager.set_class_list([{"id": 1}], course_id=1)
+
+        self.cache_manager.clear_all()
+
+        self.assertIsNone(
+            self.cache_manager.get_comment_templates("personal", str(self.teacher.id))
+        )
+        self.assertIsNone(self.cache_manager.get_course_list(teacher_id=self.teacher.id))
+        self.assertIsNone(self.cache_manager.get_class_list(course_id=1))
+
+    def test_clear_scope_without_pattern_delete(self):
+        """测试不依赖 delete_pattern 清除整个作用域"""
+        self.assertFalse(hasattr(cache, "delete_pattern"))
+        self.cache_manager.set_dir_tree("/repo/a", {"name": "a"})
+        self.cache_manager.set_dir_tree("/repo/b", {"name": "b"})
+        self.cache_manager.set_file_count("/repo/a", 3)
+
+        self.cache_manager.clear_dir_tree()
+
+        self.assertIsNone(self.cache_manager.get_dir_tree("/repo/a"))
+        self.assertIsNone(self.cache_manager.get_dir_tree("/repo/b"))
+        self.assertEqual(self.cache_manager.get_file_count("/repo/a"), 3)
+
+    def test_clear_user_cache_keeps_other_users(self):
+        """测试清除用户缓存不影响同租户的其他用户"""
+        other = CacheManager(user_id=self.teacher.id + 1, tenant_id=self.tenant.id)
+        self.cache_manager.set_file_count("/repo", 1)
+        other.set_file_count("/repo", 2)
+
+        self.cache_manager.clear_user_cache()
+
+        self.assertIsNone(self.cache_manager.get_file_count("/repo"))
+        self.assertEqual(other.get_file_count("/repo"), 2)
+
+    def test_clear_tenant_and_global_scope(self):
+        """测试租户级与全局失效覆盖下级作用域"""
+        other = CacheManager(user_id=self.teacher.id + 1, tenant_id=self.tenant.id)
+        self.cache_manager.set_dir_tree("/repo", {"name": "repo"})
+        other.set_dir_tree("/repo", {"name": "repo"})
+
+        CacheManager(tenant_id=self.tenant.id).clear_tenant_cache()
+        self.assertIsNone(self.cache_manager.get_dir_tree("/repo"))
+        self.assertIsNone(other.get_dir_tree("/repo"))
+
+        self.cache_manager.set_dir_tree("/repo", {"name": "repo"})
+        CacheManager().clear_dir_tree()
+        self.assertIsNone(self.cache_manager.get_dir_tree("/repo"))
+
+    def test_namespace_stats(self):
+        """测试命名空间写入与失效统计"""
+        self.cache_manager.set_file_count("/repo/a", 1)
+        self.cache_manager.set_file_count("/repo/b", 2)
+        self.cache_manager.clear_file_count()
+
+        scope = f"file_count:tenant_{self.tenant.id}:user_{self.teacher.id}"
+        stats = self.cache_manager.get_cache_stats()["namespaces"][scope]
+        self.assertEqual(stats["writes"], 2)
+        self.assertEqual(stats["invalidations"], 1)
+        self.assertGreater(stats["version"], 0)
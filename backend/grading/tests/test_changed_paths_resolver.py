@@ -0,0 +1,207 @@
+"""
+ChangedPathsResolver 单元测试
+
+测试按提交分组的变更解析：
+- 每个 (上次评分提交, HEAD) 只执行一次 git diff
+- 结果缓存与 git diff 失败处理
+- 远程目录树批量检测作业文件更新
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from grading.models import FileGradeStatus, Repository
+from grading.services.changed_paths_resolver import ChangedPathsResolver
+from grading.services.git_mirror_manager import GitMirrorManager
+from grading.services.git_storage_adapter import GitStorageAdapter
+from grading.views import _get_git_directory_tree
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class ChangedPathsResolverTest(TestCase):
+    """ChangedPathsResolver 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.repo_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_root, ignore_errors=True)
+        _git(self.repo_root, "init", "-q", "-b", "main")
+        for name in ("张三.docx", "李四.docx", "王五.docx"):
+            self._write(f"数据结构/计算机1班/第一次作业/{name}", "v1")
+        self.first = self._commit("init")
+        self._write("数据结构/计算机1班/第一次作业/李四.docx", "v2")
+        self.second = self._commit("second")
+        self._write("数据结构/计算机1班/第一次作业/王五.docx", "v3")
+        self.head = self._commit("third")
+
+        self.git_calls = []
+
+    def _write(self, rel_path, content):
+        full_path = os.path.join(self.repo_root, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _commit(self, message):
+        _git(self.repo_root, "add", "-A")
+        _git(self.repo_root, "commit", "-q", "-m", message)
+        return _git(self.repo_root, "rev-parse", "HEAD")
+
+    def _resolver(self):
+        local = ChangedPathsResolver.for_local_repo(self.repo_root)
+
+        def run_git(args):
+            self.git_calls.append(args)
+            return local.run_git(args)
+
+        return ChangedPathsResolver(repo_key=self.repo_root, run_git=run_git)
+
+    def test_resolve_groups_by_commit(self):
+        """测试按提交分组，每组只执行一次 git diff"""
+        prefix = "数据结构/计算机1班/第一次作业"
+        pairs = [
+            (f"{prefix}/张三.docx", self.first),
+            (f"{prefix}/李四.docx", self.first),
+            (f"{prefix}/王五.docx", self.first),
+            (f"{prefix}/李四.docx", self.second),
+            (f"{prefix}/张三.docx", self.head),
+        ]
+        changed = self._resolver().resolve(pairs, self.head)
+        self.assertEqual(changed, {f"{prefix}/李四.docx", f"{prefix}/王五.docx"})
+        self.assertEqual(len(self.git_calls), 2)
+
+    def test_cached_across_resolvers(self):
+        """测试变更集合缓存到 Django 缓存"""
+        first = self._resolver().changed_paths(self.first, self.head)
+        second = self._resolver().changed_paths(self.first, self.head)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.git_calls), 1)
+
+    def test_unknown_commit(self):
+        """测试提交不存在时的处理"""
+        resolver = self._resolver()
+        pairs = [("数据结构/计算机1班/第一次作业/张三.docx", "0" * 40)]
+        self.assertIsNone(resolver.changed_paths("0" * 40, self.head))
+        self.assertEqual(resolver.resolve(pairs, self.head), set())
+        self.assertEqual(
+            resolver.resolve(pairs, self.head, assume_changed_on_error=True), {pairs[0][0]}
+        )
+        self.assertEqual(len(self.git_calls), 1)
+
+    def test_repo_root_below_git_toplevel(self):
+        """测试仓库根目录是 git 工作区子目录时，路径相对仓库根目录"""
+        repo_root = os.path.join(self.repo_root, "数据结构")
+        resolver = ChangedPathsResolver.for_local_repo(repo_root)
+        pairs = [
+            ("计算机1班/第一次作业/张三.docx", self.first),
+            ("计算机1班/第一次作业/李四.docx", self.first),
+        ]
+        self.assertEqual(resolver.resolve(pairs, self.head), {"计算机1班/第一次作业/李四.docx"})
+
+
+class GitTreeUpdatesTest(TestCase):
+    """远程目录树批量更新检测"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.origin = os.path.join(self.temp_dir, "origin")
+        os.makedirs(self.origin)
+        _git(self.origin, "init", "-q", "-b", "main")
+        for name in ("张三.docx", "李四.docx", "王五.docx"):
+            self._write(f"数据结构/计算机1班/第一次作业/{name}", "v1")
+        _git(self.origin, "add", "-A")
+        _git(self.origin, "commit", "-q", "-m", "init")
+        self.first = _git(self.origin, "rev-parse", "HEAD")
+
+        manager = GitMirrorManager(base_dir=os.path.join(self.temp_dir, "mirrors"))
+        patcher = patch(
+            "grading.services.git_storage_adapter.get_mirror_manager", return_value=manager
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # 评分时镜像已包含上次评分的提交（镜像为浅克隆）
+        self._adapter().get_head_commit()
+        self._write("数据结构/计算机1班/第一次作业/李四.docx", "v2")
+        _git(self.origin, "commit", "-q", "-am", "update")
+
+        user = User.objects.create_user(username="teacher", password="pass")
+        self.repository = Repository.objects.create(owner=user, name="repo", repo_type="git")
+        prefix = "数据结构/计算机1班/第一次作业"
+        for name in ("张三.docx", "李四.docx"):
+            FileGradeStatus.objects.create(
+                repository=self.repository,
+                file_path=f"{prefix}/{name}",
+                last_graded_commit=self.first,
+            )
+
+    def _write(self, rel_path, content):
+        full_path = os.path.join(self.origin, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _adapter(self):
+        return GitStorageAdapter(git_url=f"file://{self.origin}", branch="main")
+
+    def _find(self, nodes, node_id):
+        for node in nodes:
+            if node["id"] == node_id:
+                return node
+            found = self._find(node.get("children", []), node_id)
+            if found:
+                return found
+        return None
+
+    def test_tree_updates_single_diff(self):
+        """测试远程目录树每个提交只执行一次 git diff"""
+        adapter = self._adapter()
+        adapter.refresh()
+        real_execute = adapter._execute_git_command
+        diff_calls = []
+
+        def tracking(args, *a, **kw):
+            if args[0] == "diff":
+                diff_calls.append(args)
+            return real_execute(args, *a, **kw)
+
+        adapter._execute_git_command = tracking
+        nodes = _get_git_directory_tree(
+            adapter,
+            "数据结构",
+            base_prefix="数据结构",
+            repository=self.repository,
+            course_name="数据结构",
+            current_head=adapter.get_head_commit(),
+        )
+
+        self.assertEqual(len(diff_calls), 1)
+        folder = "计算机1班/第一次作业"
+        self.assertTrue(self._find(nodes, f"{folder}/李四.docx")["data"].get("has_updates"))
+        self.assertFalse(self._find(nodes, f"{folder}/张三.docx")["data"].get("has_updates"))
+        # 没有评分记录的文件视为有更新
+        self.assertTrue(self._find(nodes, f"{folder}/王五.docx")["data"].get("has_updates"))
+        self.assertTrue(self._find(nodes, folder)["data"]["has_updates"])
+        self.assertTrue(adapter.file_changed_since_commit(f"数据结构/{folder}", self.first))
+        self.assertFalse(
+            adapter.file_changed_since_commit(f"数据结构/{folder}/张三.docx", self.first)
+        )
+        self.assertEqual(len(diff_calls), 1)
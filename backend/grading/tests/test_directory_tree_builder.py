@@ -0,0 +1,242 @@
+"""
+DirectoryTreeBuilder 单元测试
+
+测试单次遍历目录树构建：
+- 节点结构与排序
+- 评分状态批量加载与 has_updates 传播
+- Git 仓库按提交分组执行 git diff
+- 仓库文件目录为当前时读取目录记录，否则遍历文件系统
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from grading.models import Course, FileGradeStatus, Homework, Repository, Semester
+from grading.services.directory_tree_builder import DirectoryTreeBuilder
+from grading.services.repository_catalog import RepositoryCatalog
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class DirectoryTreeBuilderTest(TestCase):
+    """DirectoryTreeBuilder 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.repo_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_root, ignore_errors=True)
+        self.course_name = "数据结构"
+        self.course_dir = os.path.join(self.repo_root, self.course_name)
+        for hw in ("第一次作业", "第二次作业"):
+            os.makedirs(os.path.join(self.course_dir, "计算机1班", hw))
+        self._write("计算机1班/第一次作业/张三.docx")
+        self._write("计算机1班/第一次作业/李四.docx")
+        self._write("计算机1班/第二次作业/张三.docx")
+
+        self.user = User.objects.create_user(username="teacher", password="pass")
+        self.repository = Repository.objects.create(
+            owner=self.user, name="repo", repo_type="filesystem"
+        )
+        patcher = patch.object(Repository, "get_full_path", return_value=self.repo_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.grade_calls = []
+
+    def _write(self, rel_path, content="content"):
+        path = os.path.join(self.course_dir, rel_path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _grade_info(self, path, base_dir=None, course_name=None):
+        self.grade_calls.append(path)
+        return {"has_grade": False}
+
+    def _build(self, file_path=""):
+        builder = DirectoryTreeBuilder(
+            self.course_dir,
+            course_name=self.course_name,
+            repository=self.repository,
+            grade_info_func=self._grade_info,
+        )
+        return builder.build(file_path)
+
+    def _find(self, nodes, node_id):
+        for node in nodes:
+            if node["id"] == node_id:
+                return node
+            found = self._find(node.get("children", []), node_id)
+            if found:
+                return found
+        return None
+
+    def _mark_graded(self, rel_path, **kwargs):
+        FileGradeStatus.objects.create(
+            repository=self.repository, file_path=f"{self.course_name}/{rel_path}", **kwargs
+        )
+
+    def test_node_structure(self):
+        """测试节点结构、排序和文件数量"""
+        nodes = self._build()
+        self.assertEqual([n["id"] for n in nodes], ["计算机1班"])
+        class_node = nodes[0]
+        self.assertEqual(class_node["type"], "folder")
+        hw_ids = [n["id"] for n in class_node["children"]]
+        self.assertEqual(hw_ids, ["计算机1班/第一次作业", "计算机1班/第二次作业"])
+        hw_node = class_node["children"][0]
+        self.assertEqual(hw_node["data"]["file_count"], 2)
+        file_node = hw_node["children"][0]
+        self.assertEqual(file_node["a_attr"]["data-ext"], ".docx")
+
+    def test_current_catalog_replaces_scandir(self):
+        """测试仓库文件目录为当前时不遍历文件系统，结果与遍历一致"""
+        expected = self._build()
+        RepositoryCatalog(self.repository).refresh()
+
+        with patch(
+            "grading.services.directory_tree_builder.os.scandir", side_effect=AssertionError
+        ):
+            nodes = self._build()
+
+        self.assertEqual(nodes, expected)
+
+    def test_stale_catalog_falls_back_to_filesystem(self):
+        """测试仓库文件目录未标记为当前时遍历文件系统"""
+        RepositoryCatalog(self.repository).refresh()
+        RepositoryCatalog.mark_stale(self.repository)
+        self._write("计算机1班/第二次作业/王五.docx")
+
+        nodes = self._build()
+
+        self.assertIsNotNone(self._find(nodes, "计算机1班/第二次作业/王五.docx"))
+        self.assertEqual(self._find(nodes, "计算机1班/第二次作业")["data"]["file_count"], 2)
+
+    def test_ungraded_files_mark_homework_folder(self):
+        """测试未评分文件标记更新并传播到作业文件夹"""
+        nodes = self._build()
+        hw_node = self._find(nodes, "计算机1班/第一次作业")
+        self.assertTrue(hw_node["data"]["has_updates"])
+        self.assertTrue(self._find(nodes, "计算机1班/第一次作业/张三.docx")["data"]["has_updates"])
+        # 班级目录不是作业文件夹，不标记
+        self.assertNotIn("has_updates", self._find(nodes, "计算机1班")["data"])
+
+    def test_graded_files_without_git_use_mtime(self):
+        """测试非 Git 仓库按修改时间判断更新"""
+        future = timezone.now() + timedelta(hours=1)
+        past = timezone.now() - timedelta(hours=1)
+        self._mark_graded("计算机1班/第一次作业/张三.docx", last_graded_at=future)
+        self._mark_graded("计算机1班/第一次作业/李四.docx", last_graded_at=past)
+        self._mark_graded("计算机1班/第二次作业/张三.docx", last_graded_at=future)
+
+        nodes = self._build()
+        self.assertNotIn("data", self._find(nodes, "计算机1班/第一次作业/张三.docx"))
+        self.assertTrue(self._find(nodes, "计算机1班/第一次作业/李四.docx")["data"]["has_updates"])
+        self.assertNotIn("has_updates", self._find(nodes, "计算机1班/第二次作业")["data"])
+        self.assertEqual(self.grade_calls, [])
+
+    def test_status_without_course_prefix(self):
+        """测试兼容不带课程前缀的评分状态记录"""
+        FileGradeStatus.objects.create(
+            repository=self.repository,
+            file_path="计算机1班/第二次作业/张三.docx",
+            last_graded_at=timezone.now() + timedelta(hours=1),
+        )
+        nodes = self._build()
+        self.assertNotIn("has_updates", self._find(nodes, "计算机1班/第二次作业")["data"])
+
+    def test_grade_info_batched_per_directory(self):
+        """测试提供批量函数时每个目录只读取一次评分信息"""
+        batches = []
+        graded = os.path.join(self.course_dir, "计算机1班", "第一次作业", "张三.docx")
+
+        def grade_info_many(paths):
+            batches.append(sorted(os.path.basename(p) for p in paths))
+            return {os.path.abspath(p): {"has_grade": p == graded} for p in paths}
+
+        builder = DirectoryTreeBuilder(
+            self.course_dir,
+            course_name=self.course_name,
+            repository=self.repository,
+            grade_info_func=self._grade_info,
+            grade_info_many_func=grade_info_many,
+        )
+        nodes = builder.build("")
+
+        self.assertEqual(sorted(batches), [["张三.docx"], ["张三.docx", "李四.docx"]])
+        self.assertEqual(self.grade_calls, [])
+        self.assertNotIn("data", self._find(nodes, "计算机1班/第一次作业/张三.docx"))
+        self.assertTrue(self._find(nodes, "计算机1班/第一次作业/李四.docx")["data"]["has_updates"])
+
+    def test_homework_type_for_second_level_folders(self):
+        """测试第二层文件夹附带作业类型"""
+        semester = Semester.objects.create(
+            name="2024春", start_date="2024-02-26", end_date="2024-07-01"
+        )
+        course = Course.objects.create(
+            name=self.course_name, semester=semester, teacher=self.user, course_type="lab"
+        )
+        Homework.objects.create(
+            course=course, title="作业1", folder_name="第一次作业", homework_type="normal"
+        )
+
+        nodes = self._build()
+        self.assertEqual(
+            self._find(nodes, "计算机1班/第一次作业")["data"]["homework_type"], "normal"
+        )
+        self.assertEqual(
+            self._find(nodes, "计算机1班/第二次作业")["data"]["homework_type"], "lab_report"
+        )
+
+    def test_git_diff_runs_once_per_commit(self):
+        """测试 Git 仓库每个提交只执行一次 git diff"""
+        _git(self.repo_root, "init", "-q")
+        _git(self.repo_root, "add", "-A")
+        _git(self.repo_root, "commit", "-q", "-m", "init")
+        first = _git(self.repo_root, "rev-parse", "HEAD")
+        for rel in (
+            "计算机1班/第一次作业/张三.docx",
+            "计算机1班/第一次作业/李四.docx",
+            "计算机1班/第二次作业/张三.docx",
+        ):
+            self._mark_graded(rel, last_graded_commit=first)
+
+        self._write("计算机1班/第一次作业/李四.docx", "changed")
+        _git(self.repo_root, "commit", "-q", "-am", "update")
+
+        real_run = subprocess.run
+        diff_calls = []
+
+        def tracking_run(cmd, *args, **kwargs):
+            if cmd[:2] == ["git", "diff"]:
+                diff_calls.append(cmd)
+            return real_run(cmd, *args, **kwargs)
+
+        with patch(
+            "grading.services.changed_paths_resolver.subprocess.run", side_effect=tracking_run
+        ):
+            nodes = self._build()
+
+        self.assertEqual(len(diff_calls), 1)
+        self.assertTrue(self._find(nodes, "计算机1班/第一次作业/李四.docx")["data"]["has_updates"])
+        self.assertNotIn("data", self._find(nodes, "计算机1班/第一次作业/张三.docx"))
+        self.assertTrue(self._find(nodes, "计算机1班/第一次作业")["data"]["has_updates"])
+        self.assertNotIn("has_updates", self._find(nodes, "计算机1班/第二次作业")["data"])
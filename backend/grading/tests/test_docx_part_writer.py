@@ -0,0 +1,239 @@
+"""
+docx_part_writer 单元测试
+
+测试只改写主文档部件的保存方式：
+- 主文档部件与 python-docx 完整保存的结果一致
+- 其他 zip 成员的压缩数据逐字节保留
+- 源文件使用数据描述符、ZIP64 本地文件头或扩展字段时仍能正确复制
+- 缺少 zipfile 内部属性时退回解压后重新压缩
+- 保存失败时原文件不变且不留下临时文件
+- write_grade_and_comment_to_file 使用该方式写入评分
+"""
+
+import io
+import os
+import shutil
+import stat
+import struct
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from docx import Document
+
+from grading.docx_part_writer import edit_docx
+from grading.docx_stream_reader import open_docx
+from grading.views import (
+    extract_grade_and_comment_from_cell,
+    find_teacher_signature_cell,
+    write_grade_and_comment_to_file,
+    write_grade_to_lab_report,
+)
+
+PNG_1X1 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108020000009077"
+    "53de0000000c4944415408d763f8ffff3f0005fe02fea7d6a4480000000049454e44ae426082"
+)
+
+
+def _raw_members(path):
+    """读取每个 zip 成员的原始压缩数据"""
+    members = {}
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            zf.fp.seek(info.header_offset)
+            header = zf.fp.read(zipfile.sizeFileHeader)
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            zf.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+            members[info.filename] = zf.fp.read(info.compress_size)
+    return members
+
+
+def _build_lab_report(path):
+    doc = Document()
+    doc.add_paragraph("实验报告")
+    doc.add_picture(BytesIO(PNG_1X1))
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "实验内容"
+    table.cell(1, 0).text = "教师（签字）："
+    doc.save(path)
+
+
+class DocxPartEditorTest(SimpleTestCase):
+    """测试主文档部件原地改写"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.path = os.path.join(self.temp_dir, "张三.docx")
+        _build_lab_report(self.path)
+
+    def test_document_part_matches_full_save(self):
+        expected_path = os.path.join(self.temp_dir, "expected.docx")
+        shutil.copy(self.path, expected_path)
+        doc = Document(expected_path)
+        write_grade_to_lab_report(doc, "A", "很好")
+        doc.save(expected_path)
+
+        editor = edit_docx(self.path)
+        write_grade_to_lab_report(editor.document, "A", "很好")
+        editor.save()
+
+        with zipfile.ZipFile(expected_path) as expected, zipfile.ZipFile(self.path) as actual:
+            self.assertEqual(actual.read("word/document.xml"), expected.read("word/document.xml"))
+            self.assertEqual(sorted(actual.namelist()), sorted(expected.namelist()))
+            self.assertIsNone(actual.testzip())
+        cell, _, _, _ = find_teacher_signature_cell(Document(self.path))
+        grade, comment, _ = extract_grade_and_comment_from_cell(cell)
+        self.assertEqual((grade, comment), ("A", "很好"))
+
+    def test_other_members_copied_byte_for_byte(self):
+        before = _raw_members(self.path)
+
+        editor = edit_docx(self.path)
+        editor.document.add_paragraph("老师评分：B")
+        editor.save()
+
+        after = _raw_members(self.path)
+        self.assertEqual(list(after), list(before))
+        changed = [name for name in before if before[name] != after[name]]
+        self.assertEqual(changed, ["word/document.xml"])
+
+    def test_keeps_file_mode(self):
+        os.chmod(self.path, 0o640)
+
+        editor = edit_docx(self.path)
+        editor.document.add_paragraph("老师评分：B")
+        editor.save()
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+
+    def test_source_with_data_descriptors(self):
+        class _Unseekable(io.RawIOBase):
+            def __init__(self, target):
+                self.target = target
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                return self.target.write(data)
+
+        # 写入不可定位的流时 zipfile 使用数据描述符
+        buffer = BytesIO()
+        with zipfile.ZipFile(self.path) as src, zipfile.ZipFile(_Unseekable(buffer), "w") as dst:
+            for info in src.infolist():
+                dst.writestr(info.filename, src.read(info.filename), zipfile.ZIP_DEFLATED)
+        with open(self.path, "wb") as f:
+            f.write(buffer.getvalue())
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertTrue(all(info.flag_bits & 0x08 for info in zf.infolist()))
+
+        editor = edit_docx(self.path)
+        editor.document.add_paragraph("老师评分：C")
+        editor.save()
+
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertIsNone(zf.testzip())
+        self.assertIn("老师评分：C", [p.text for p in Document(self.path).paragraphs])
+
+    def _rewrite_source(self, write_member):
+        """按 write_member(dst, info, data) 重新打包源文件"""
+        buffer = BytesIO()
+        with zipfile.ZipFile(self.path) as src, zipfile.ZipFile(buffer, "w") as dst:
+            for info in src.infolist():
+                write_member(dst, info, src.read(info.filename))
+        with open(self.path, "wb") as f:
+            f.write(buffer.getvalue())
+
+    def _edit_and_check(self, text):
+        editor = edit_docx(self.path)
+        editor.document.add_paragraph(text)
+        editor.save()
+
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertIsNone(zf.testzip())
+        self.assertIn(text, [p.text for p in Document(self.path).paragraphs])
+
+    def test_source_with_zip64_headers(self):
+        def write_member(dst, info, data):
+            with dst.open(zipfile.ZipInfo(info.filename), "w", force_zip64=True) as f:
+                f.write(data)
+
+        self._rewrite_source(write_member)
+
+        self._edit_and_check("老师评分：A")
+
+    def test_copied_members_drop_extra_fields(self):
+        # Info-ZIP 的扩展时间戳字段（0x5455）
+        timestamp = struct.pack("<HHBI", 0x5455, 5, 1, 1700000000)
+
+        def write_member(dst, info, data):
+            member = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            member.compress_type = zipfile.ZIP_DEFLATED
+            member.extra = timestamp
+            dst.writestr(member, data)
+
+        self._rewrite_source(write_member)
+
+        self._edit_and_check("老师评分：B")
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertEqual({info.extra for info in zf.infolist()}, {b""})
+
+    def test_falls_back_without_zipfile_internals(self):
+        with patch("grading.docx_part_writer._supports_raw_copy", return_value=False):
+            self._edit_and_check("老师评分：C")
+
+    def test_failed_save_keeps_original(self):
+        with open(self.path, "rb") as f:
+            original = f.read()
+
+        editor = edit_docx(self.path)
+        editor.document.add_paragraph("老师评分：D")
+        with patch("grading.docx_part_writer._copy_member_raw", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                editor.save()
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), original)
+        self.assertEqual(os.listdir(self.temp_dir), ["张三.docx"])
+
+
+class WriteGradeUsesPartEditorTest(SimpleTestCase):
+    """测试评分写入只改写主文档部件"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.path = os.path.join(self.temp_dir, "李四.docx")
+        _build_lab_report(self.path)
+
+    def test_lab_report_grade(self):
+        before = _raw_members(self.path)
+
+        warning = write_grade_and_comment_to_file(
+            self.path, grade="A", comment="完成得很好", is_lab_report=True
+        )
+
+        self.assertIsNone(warning)
+        after = _raw_members(self.path)
+        self.assertEqual(
+            [name for name in before if before[name] != after[name]], ["word/document.xml"]
+        )
+        with open_docx(self.path) as doc:
+            cell, _, _, _ = find_teacher_signature_cell(doc)
+            grade, comment, _ = extract_grade_and_comment_from_cell(cell)
+        self.assertEqual((grade, comment), ("A", "完成得很好"))
+
+    def test_homework_paragraphs(self):
+        write_grade_and_comment_to_file(
+            self.path, grade="B", comment="继续努力", is_lab_report=False
+        )
+        write_grade_and_comment_to_file(self.path, grade="A", is_lab_report=False)
+
+        texts = [p.text for p in Document(self.path).paragraphs]
+        self.assertEqual(texts.count("老师评分：A"), 1)
+        self.assertNotIn("老师评分：B", texts)
+        self.assertIn("教师评价：继续努力", texts)
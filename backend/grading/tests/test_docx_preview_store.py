@@ -0,0 +1,233 @@
+"""
+Word 预览缓存测试
+
+测试 DocxPreviewStore 和 DocxPrerenderer：
+- 再次转换同一文件直接读取缓存，不调用 mammoth
+- 图片写成资源文件并通过 URL 引用，而不是内联 base64
+- 文件修改后重新转换
+- 超过大小预算时淘汰最久未访问的条目
+- 预渲染文件夹中尚未缓存的 Word 文档
+- 预渲染接口拒绝仓库目录以外的路径
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from docx import Document
+
+from grading.models import Repository
+from grading.services.docx_preview_store import (
+    DocxPrerenderer,
+    DocxPreviewStore,
+    stat_key,
+)
+
+
+def _png_bytes():
+    """生成 1x1 像素的 PNG 图片"""
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _write_docx(path, text, with_image=False):
+    document = Document()
+    document.add_paragraph(text)
+    if with_image:
+        document.add_picture(BytesIO(_png_bytes()))
+    document.save(path)
+
+
+class DocxPreviewStoreTest(SimpleTestCase):
+    """测试预览存储"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.store = DocxPreviewStore(
+            os.path.join(self.temp_dir, "previews"), max_bytes=10 * 1024 * 1024
+        )
+        self.doc_path = os.path.join(self.temp_dir, "张三.docx")
+        _write_docx(self.doc_path, "第一次作业")
+
+    def test_second_render_hits_store(self):
+        first = self.store.render_path(self.doc_path)
+
+        with patch("grading.services.docx_preview_store.mammoth.convert_to_html") as mock_convert:
+            second = self.store.render_path(self.doc_path)
+
+        mock_convert.assert_not_called()
+        self.assertIn("第一次作业", first)
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.store.tmp_dir), [])
+
+    def test_modified_file_is_rendered_again(self):
+        self.store.render_path(self.doc_path)
+        _write_docx(self.doc_path, "修改后的作业")
+        stat = os.stat(self.doc_path)
+        os.utime(self.doc_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertIn("修改后的作业", self.store.render_path(self.doc_path))
+
+    def test_images_are_written_as_assets(self):
+        _write_docx(self.doc_path, "带图片的作业", with_image=True)
+        key = stat_key(self.doc_path)
+
+        html = self.store.render_path(self.doc_path)
+
+        self.assertNotIn("base64", html)
+        names = [name for name in os.listdir(self.store.entry_dir(key)) if name.endswith(".png")]
+        self.assertEqual(len(names), 1)
+        self.assertIn(f"/docx-preview/{key}/{names[0]}", html)
+        self.assertIsNotNone(self.store.asset_path(key, names[0]))
+        self.assertIsNone(self.store.asset_path(key, "../index.html"))
+
+    def test_remote_content_keyed_by_hash(self):
+        with open(self.doc_path, "rb") as f:
+            data = f.read()
+        self.store.render_bytes(data)
+
+        with patch("grading.services.docx_preview_store.mammoth.convert_to_html") as mock_convert:
+            html = self.store.render_bytes(data)
+
+        mock_convert.assert_not_called()
+        self.assertIn("第一次作业", html)
+
+    def test_evicts_least_recently_used(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.temp_dir, f"学生{i}.docx")
+            _write_docx(path, "内容" * 200)
+            self.store.render_path(path)
+            paths.append(path)
+        entry_size = self.store._dir_size(self.store.entry_dir(stat_key(paths[0])))
+
+        # 最早的条目最久未访问
+        old = time.time() - 3600
+        os.utime(os.path.join(self.store.entry_dir(stat_key(paths[0])), "index.html"), (old, old))
+        self.store.max_bytes = entry_size * 2
+        removed = self.store.evict()
+
+        self.assertEqual(removed, 2)
+        self.assertFalse(self.store.has(stat_key(paths[0])))
+        self.assertTrue(self.store.has(stat_key(paths[2])))
+
+
+class DocxPrerendererTest(SimpleTestCase):
+    """测试预渲染"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.store = DocxPreviewStore(
+            os.path.join(self.temp_dir, ".previews"), max_bytes=10 * 1024 * 1024
+        )
+        self.prerenderer = DocxPrerenderer(self.store, workers=0)
+        self.folder = os.path.join(self.temp_dir, "第1次作业")
+        os.makedirs(os.path.join(self.folder, "1班"))
+        _write_docx(os.path.join(self.folder, "张三.docx"), "张三的作业")
+        _write_docx(os.path.join(self.folder, "1班", "李四.docx"), "李四的作业")
+        with open(os.path.join(self.folder, "说明.txt"), "w", encoding="utf-8") as f:
+            f.write("不是 Word 文档")
+
+    def test_schedule_local_folder_warms_store(self):
+        scheduled = self.prerenderer.schedule_local_folder(self.folder)
+
+        self.assertEqual(scheduled, 2)
+        self.assertTrue(self.store.has(stat_key(os.path.join(self.folder, "张三.docx"))))
+        self.assertTrue(self.store.has(stat_key(os.path.join(self.folder, "1班", "李四.docx"))))
+        # 已缓存的文档不再提交
+        self.assertEqual(self.prerenderer.schedule_local_folder(self.folder), 0)
+
+    def test_schedule_remote_folder_reads_docx_only(self):
+        with open(os.path.join(self.folder, "张三.docx"), "rb") as f:
+            data = f.read()
+
+        class FakeAdapter:
+            def list_directory(self, path):
+                return [
+                    {"name": "张三.docx", "type": "file"},
+                    {"name": "说明.txt", "type": "file"},
+                    {"name": "1班", "type": "dir"},
+                ]
+
+            def read_file(self, path):
+                assert path == "数据结构/第1次作业/张三.docx", path
+                return data
+
+        self.assertTrue(
+            self.prerenderer.schedule_remote_folder(FakeAdapter(), "/数据结构/第1次作业/", 1)
+        )
+        with patch("grading.services.docx_preview_store.mammoth.convert_to_html") as mock_convert:
+            self.assertIn("张三的作业", self.store.render_bytes(data))
+        mock_convert.assert_not_called()
+
+
+class PrerenderFolderPreviewsViewTest(TestCase):
+    """测试 prerender_previews 接口的路径校验"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.repo_root = os.path.join(self.temp_dir, "repo")
+        os.makedirs(os.path.join(self.repo_root, "数据结构", "第1次作业"))
+        os.makedirs(os.path.join(self.temp_dir, "other"))
+        os.symlink(
+            os.path.join(self.temp_dir, "other"), os.path.join(self.repo_root, "数据结构", "外部")
+        )
+
+        self.user = User.objects.create_user(username="teacher", password="pass", is_staff=True)
+        self.repository = Repository.objects.create(
+            name="作业仓库", owner=self.user, repo_type="filesystem", path="repo", is_active=True
+        )
+        patcher = patch.object(Repository, "get_full_path", return_value=self.repo_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("grading.views.get_prerenderer")
+        self.mock_prerenderer = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_prerenderer.return_value.schedule_local_folder.return_value = 2
+        self.client.force_login(self.user)
+
+    def _post(self, course, path=""):
+        return self.client.post(
+            "/grading/prerender_previews/",
+            {"repo_id": self.repository.id, "course": course, "path": path},
+        ).json()
+
+    def test_schedules_folder_inside_repository(self):
+        response = self._post("数据结构", "第1次作业")
+
+        self.assertEqual(response, {"status": "success", "scheduled": 2})
+        self.mock_prerenderer.return_value.schedule_local_folder.assert_called_once_with(
+            os.path.realpath(os.path.join(self.repo_root, "数据结构", "第1次作业"))
+        )
+
+    def test_rejects_traversal_and_absolute_course(self):
+        for course, path in (
+            ("..", "other"),
+            ("数据结构/..", ""),
+            (self.temp_dir, ""),
+            ("数据结构", "../../other"),
+            ("数据结构", "外部"),
+        ):
+            with self.subTest(course=course, path=path):
+                self.assertEqual(self._post(course, path)["message"], "无权访问该路径")
+
+        self.mock_prerenderer.return_value.schedule_local_folder.assert_not_called()
@@ -0,0 +1,213 @@
+"""
+docx_stream_reader 单元测试
+
+测试流式只读解析与 python-docx 的结果一致：
+- 段落文本（换行、制表符、超链接）
+- 表格行单元格（横向、纵向合并，嵌套表格）
+- 惰性解析与提前停止
+- 评分提取函数在流式文档上的结果
+"""
+
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from grading.docx_grade_utils import (
+    _iter_tables,
+    extract_grade_from_homework_doc,
+    find_teacher_signature_cell,
+)
+from grading.docx_stream_reader import StreamTable, open_docx
+from grading.grade_registry_writer import GradeFileProcessor
+from grading.views import _parse_file_grade_info
+
+
+def _dump(doc):
+    """提取文档的全部只读文本结构，用于与 python-docx 对比"""
+    result = [[p.text for p in doc.paragraphs]]
+    for table in _iter_tables(doc):
+        rows = []
+        for row in table.rows:
+            try:
+                rows.append([cell.text for cell in row.cells])
+            except ValueError as e:
+                rows.append(str(e))
+        result.append(rows)
+    return result
+
+
+class DocxStreamReaderTest(SimpleTestCase):
+    """StreamDocument 单元测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _save(self, doc, name="test.docx"):
+        path = os.path.join(self.temp_dir, name)
+        doc.save(path)
+        return path
+
+    def _assert_same_as_python_docx(self, path):
+        with open_docx(path) as stream_doc:
+            self.assertEqual(_dump(stream_doc), _dump(Document(path)))
+
+    def test_paragraph_text(self):
+        """测试段落文本与 python-docx 一致"""
+        doc = Document()
+        doc.add_paragraph("老师评分：A")
+        paragraph = doc.add_paragraph("第一行")
+        run = paragraph.add_run("续写")
+        run.add_break()
+        paragraph.add_run("\t第二行")
+        page_break = OxmlElement("w:br")
+        page_break.set(qn("w:type"), "page")
+        run._r.append(page_break)
+        hyperlink = OxmlElement("w:hyperlink")
+        link_run = OxmlElement("w:r")
+        link_text = OxmlElement("w:t")
+        link_text.text = "链接"
+        link_run.append(link_text)
+        hyperlink.append(link_run)
+        paragraph._p.append(hyperlink)
+
+        self._assert_same_as_python_docx(self._save(doc))
+
+    def test_merged_and_nested_tables(self):
+        """测试合并单元格和嵌套表格与 python-docx 一致"""
+        doc = Document()
+        table = doc.add_table(rows=3, cols=3)
+        table.cell(0, 0).merge(table.cell(0, 1))
+        table.cell(1, 2).merge(table.cell(2, 2))
+        table.cell(1, 2).text = "A\n很好\n教师（签字）：张老师"
+        inner = table.cell(2, 0).add_table(rows=1, cols=2)
+        inner.cell(0, 0).text = "评定分数"
+        inner.cell(0, 1).text = "B"
+
+        self._assert_same_as_python_docx(self._save(doc))
+
+    def test_invalid_vertical_merge_raises_on_access(self):
+        """测试首行纵向合并与 python-docx 一样在访问 cells 时抛出 ValueError"""
+        doc = Document()
+        table = doc.add_table(rows=2, cols=2)
+        tc_pr = table.rows[0].cells[0]._tc.get_or_add_tcPr()
+        tc_pr.append(OxmlElement("w:vMerge"))
+        path = self._save(doc)
+
+        with self.assertRaises(ValueError):
+            Document(path).tables[0].rows[0].cells
+        with open_docx(path) as stream_doc:
+            table = next(iter(stream_doc.tables))
+            with self.assertRaises(ValueError):
+                table.rows[0].cells
+            self.assertEqual([c.text for c in table.rows[1].cells], ["", ""])
+
+    def test_tables_are_lazy(self):
+        """测试遍历表格时只解析到需要的位置"""
+        doc = Document()
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "第一个表格"
+        for i in range(5):
+            doc.add_paragraph(f"段落{i}")
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "第二个表格"
+        path = self._save(doc)
+
+        with open_docx(path) as stream_doc:
+            first = next(iter(stream_doc.tables))
+            self.assertEqual(first.rows[0].cells[0].text, "第一个表格")
+            self.assertEqual(len(stream_doc._blocks), 1)
+            # 再次遍历会重放已解析的表格并继续解析
+            self.assertEqual(len(stream_doc.tables), 2)
+            self.assertEqual(len(stream_doc.paragraphs), 5)
+
+        with open_docx(path) as stream_doc:
+            kinds = [isinstance(block, StreamTable) for block in stream_doc.iter_blocks()]
+        self.assertEqual(kinds[0], True)
+        self.assertEqual(kinds[-1], True)
+        self.assertEqual(kinds.count(False), 5)
+
+    def test_file_object_source(self):
+        """测试支持二进制文件对象"""
+        doc = Document()
+        doc.add_paragraph("教师评价：很好")
+        buffer = BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+
+        with open_docx(buffer) as stream_doc:
+            self.assertEqual([p.text for p in stream_doc.paragraphs], ["教师评价：很好"])
+
+    def test_missing_file(self):
+        """测试文件不存在时抛出异常"""
+        with self.assertRaises(Exception):
+            open_docx(os.path.join(self.temp_dir, "missing.docx"))
+
+
+class StreamGradeExtractionTest(SimpleTestCase):
+    """评分提取函数在流式文档上的结果"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _lab_report(self, cell_text):
+        doc = Document()
+        doc.add_paragraph("实验报告")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "实验名称"
+        table.cell(1, 1).text = cell_text
+        path = os.path.join(self.temp_dir, "实验报告.docx")
+        doc.save(path)
+        return path
+
+    def _homework(self, *paragraphs):
+        doc = Document()
+        for text in paragraphs:
+            doc.add_paragraph(text)
+        path = os.path.join(self.temp_dir, "作业.docx")
+        doc.save(path)
+        return path
+
+    def test_find_teacher_signature_cell(self):
+        """测试定位教师签字单元格"""
+        path = self._lab_report("A\n完成得很好\n教师（签字）：张老师")
+        with open_docx(path) as doc:
+            cell, table_idx, row_idx, col_idx = find_teacher_signature_cell(doc)
+        self.assertEqual((table_idx, row_idx, col_idx), (0, 1, 1))
+        self.assertTrue(cell.text.startswith("A\n"))
+
+    def test_parse_file_grade_info_lab_report(self):
+        """测试实验报告评分信息与 python-docx 解析一致"""
+        path = self._lab_report("B\n完成得不错\n教师（签字）：张老师")
+        info = _parse_file_grade_info(path)
+        self.assertTrue(info["has_grade"])
+        self.assertEqual(info["grade"], "B")
+        self.assertEqual(info["grade_type"], "letter")
+        self.assertTrue(info["in_table"])
+        self.assertEqual(info["comment"], "完成得不错")
+
+    def test_parse_file_grade_info_locked_homework(self):
+        """测试锁定标记与段落评分"""
+        path = self._homework("正文", "老师评分：D", "教师评价：【格式错误-已锁定】请修改格式")
+        info = _parse_file_grade_info(path)
+        self.assertEqual(info["grade"], "D")
+        self.assertTrue(info["locked"])
+        self.assertFalse(info["format_valid"])
+        self.assertTrue(info["has_comment"])
+
+    def test_extract_grade_from_word(self):
+        """测试 GradeFileProcessor 提取成绩"""
+        lab_path = self._lab_report("A\n很好\n教师（签字）：")
+        self.assertTrue(GradeFileProcessor.is_lab_report(lab_path))
+        self.assertEqual(GradeFileProcessor.extract_grade_from_word(lab_path), "A")
+
+        homework_path = self._homework("正文", "老师评分：C", "老师评分：B")
+        self.assertFalse(GradeFileProcessor.is_lab_report(homework_path))
+        self.assertEqual(GradeFileProcessor.extract_grade_from_word(homework_path), "B")
+        with open_docx(homework_path) as doc:
+            self.assertEqual(extract_grade_from_homework_doc(doc), "B")
@@ -0,0 +1,183 @@
+"""
+文件下载响应测试
+
+测试 serve_path / serve_bytes 及 serve_file 视图：
+- 完整文件流式返回，带 ETag、Last-Modified、Accept-Ranges
+- Range 请求返回 206 和对应字节，范围无效时返回 416
+- If-Range 与当前版本不一致时返回完整文件（日期必须与 Last-Modified 完全相同）
+- 空文件的 Range 请求返回完整响应
+- 条件请求命中时返回 304
+- 配置 X-Accel-Redirect 时交给 nginx 发送
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+
+from grading.models import GlobalConfig
+from grading.services.file_serving import parse_range, serve_bytes, serve_path
+
+
+def _body(response):
+    return b"".join(response.streaming_content) if response.streaming else response.content
+
+
+class ParseRangeTest(SimpleTestCase):
+    """测试 Range 请求头解析"""
+
+    def test_parse_forms(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+
+    def test_unsupported_forms_fall_back_to_full(self):
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+
+    def test_empty_file_falls_back_to_full(self):
+        self.assertIsNone(parse_range("bytes=0-", 0))
+        self.assertIsNone(parse_range("bytes=-10", 0))
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+        with self.assertRaises(ValueError):
+            parse_range("bytes=-0", 100)
+
+
+class ServePathTest(SimpleTestCase):
+    """测试本地文件响应"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.path = os.path.join(self.temp_dir, "实验报告.pdf")
+        self.content = bytes(range(256)) * 40
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+        self.factory = RequestFactory()
+
+    def _serve(self, **headers):
+        response = serve_path(self.factory.get("/file", **headers), self.path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_response_streams(self):
+        response = self._serve()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("inline", response["Content-Disposition"])
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(_body(response), self.content)
+
+    def test_range_request(self):
+        response = self._serve(HTTP_RANGE="bytes=100-199")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(_body(response), self.content[100:200])
+
+    def test_unsatisfiable_range(self):
+        response = self._serve(HTTP_RANGE=f"bytes={len(self.content)}-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_if_range_mismatch_returns_full_file(self):
+        response = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_body(response), self.content)
+
+    def test_if_range_match_returns_partial(self):
+        etag = self._serve()["ETag"]
+
+        response = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(_body(response), self.content[:10])
+
+    def test_if_range_date_must_match_exactly(self):
+        last_modified = self._serve()["Last-Modified"]
+        later = http_date(os.stat(self.path).st_mtime + 3600)
+
+        response = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=last_modified)
+        self.assertEqual(response.status_code, 206)
+        response = self._serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=later)
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_file_range_returns_full_response(self):
+        with open(self.path, "wb"):
+            pass
+
+        response = self._serve(HTTP_RANGE="bytes=0-")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "0")
+        self.assertEqual(_body(response), b"")
+
+    def test_conditional_requests_return_304(self):
+        first = self._serve()
+
+        self.assertEqual(self._serve(HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(
+            self._serve(HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304
+        )
+
+    def test_x_accel_redirect(self):
+        with override_settings(
+            FILE_SERVE_ACCEL_ROOT=self.temp_dir, FILE_SERVE_ACCEL_PREFIX="/protected/"
+        ):
+            response = self._serve()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/%E5%AE%9E%E9%AA%8C%E6%8A%A5%E5%91%8A.pdf"
+        )
+        self.assertIn("ETag", response)
+
+    def test_serve_bytes_range_and_etag(self):
+        request = self.factory.get("/file", HTTP_RANGE="bytes=-5")
+        response = serve_bytes(request, b"0123456789", filename="a.txt", as_attachment=True)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(_body(response), b"56789")
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertNotIn("Last-Modified", response)
+
+        request = self.factory.get("/file", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(serve_bytes(request, b"0123456789", filename="a.txt").status_code, 304)
+
+
+class ServeFileViewTest(TestCase):
+    """测试 serve_file 视图"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        GlobalConfig.set_value("default_repo_base_dir", self.temp_dir)
+        os.makedirs(os.path.join(self.temp_dir, "课程"))
+        with open(os.path.join(self.temp_dir, "课程", "作业.txt"), "wb") as f:
+            f.write(b"hello world")
+
+    def test_range_download(self):
+        response = self.client.get("/grading/file/课程/作业.txt", HTTP_RANGE="bytes=6-")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(_body(response), b"world")
+
+    def test_path_outside_base_dir_rejected(self):
+        response = self.client.get("/grading/file/../etc/passwd")
+
+        self.assertIn(response.status_code, (403, 404))
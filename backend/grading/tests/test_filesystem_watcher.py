@@ -0,0 +1,225 @@
+"""
+文件系统监听缓存失效测试
+
+测试 filesystem_watcher 模块：
+- inotify 与轮询监听器报告文件变化
+- 变化路径转换为各基础目录下的缓存键并精确失效
+- 事件分发到所属仓库
+- 只有被监听的所有者作用域使用更长的缓存过期时间
+- 开始监听时刷新仓库文件目录并持续标记为当前
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from grading.cache_manager import CacheManager
+from grading.services.filesystem_watcher import (
+    OVERFLOW,
+    InotifyWatcher,
+    PollingWatcher,
+    RepositoryCacheWatcher,
+    WatchedRoot,
+)
+from grading.services.repository_catalog import RepositoryCatalog
+
+
+class FilesystemWatcherTestMixin:
+    """临时仓库目录：<用户根目录>/<仓库>/<课程>/<班级>/<作业>"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.user_root = os.path.join(self.temp_dir, "teacher")
+        self.repo_root = os.path.join(self.user_root, "repo")
+        self.homework_dir = os.path.join(self.repo_root, "数据结构", "1班", "第1次作业")
+        os.makedirs(self.homework_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        cache.clear()
+        super().tearDown()
+
+    def _touch(self, path, content=b"x"):
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+class WatchedRootTest(FilesystemWatcherTestMixin, SimpleTestCase):
+    """测试变化路径到缓存键的转换"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = WatchedRoot(self.repo_root, user_id=1, tenant_id=2, base_dirs=[self.user_root])
+        self.manager = self.root.cache_manager
+
+    def test_invalidates_ancestors_for_every_base(self):
+        """测试文件变化清除所在目录和上级目录在各基础目录下的缓存"""
+        keys = [
+            "1班/第1次作业",  # 相对课程目录
+            "数据结构/1班/第1次作业",  # 相对仓库目录
+            "repo/数据结构/1班/第1次作业",  # 相对用户根目录
+            "数据结构",
+            "",
+        ]
+        for key in keys:
+            self.manager.set_file_count(key, 1)
+            self.manager.set_dir_tree(key, {"name": key})
+        self.manager.set_file_count("数据结构/2班", 5)
+
+        self.root.invalidate({os.path.join(self.homework_dir, "张三.docx"): False})
+
+        for key in keys:
+            self.assertIsNone(self.manager.get_file_count(key), key)
+            self.assertIsNone(self.manager.get_dir_tree(key), key)
+        self.assertEqual(self.manager.get_file_count("数据结构/2班"), 5)
+
+    def test_invalidates_file_content(self):
+        """测试文件变化清除文件本身的内容缓存"""
+        self.manager.set_file_content("数据结构/1班/第1次作业/张三.docx", "旧内容", "text/html")
+        self.manager.set_file_content("数据结构/1班/第1次作业/李四.docx", "内容", "text/html")
+
+        self.root.invalidate({os.path.join(self.homework_dir, "张三.docx"): False})
+
+        self.assertIsNone(self.manager.get_file_content("数据结构/1班/第1次作业/张三.docx"))
+        self.assertIsNotNone(self.manager.get_file_content("数据结构/1班/第1次作业/李四.docx"))
+
+
+class PollingWatcherTest(FilesystemWatcherTestMixin, SimpleTestCase):
+    """测试轮询监听器"""
+
+    def test_reports_created_modified_and_deleted(self):
+        watcher = PollingWatcher(interval=0)
+        existing = os.path.join(self.homework_dir, "李四.docx")
+        self._touch(existing)
+        watcher.add_root(self.repo_root)
+
+        created = os.path.join(self.homework_dir, "张三.docx")
+        self._touch(created)
+        self._touch(existing, b"changed")
+        self.assertEqual(
+            watcher.poll(0), {created: False, existing: False, self.homework_dir: True}
+        )
+
+        os.remove(created)
+        changed = watcher.poll(0)
+        self.assertIn(created, changed)
+
+    def test_ignores_hidden_directories(self):
+        watcher = PollingWatcher(interval=0)
+        os.makedirs(os.path.join(self.repo_root, ".git"))
+        watcher.add_root(self.repo_root)
+
+        self._touch(os.path.join(self.repo_root, ".git", "index"))
+
+        self.assertEqual(watcher.poll(0), {})
+
+
+@unittest.skipUnless(InotifyWatcher.is_supported(), "inotify 仅在 Linux 上可用")
+class InotifyWatcherTest(FilesystemWatcherTestMixin, SimpleTestCase):
+    """测试 inotify 监听器"""
+
+    def setUp(self):
+        super().setUp()
+        self.watcher = InotifyWatcher()
+        self.addCleanup(self.watcher.close)
+        self.watcher.add_root(self.repo_root)
+
+    def test_reports_file_write(self):
+        path = os.path.join(self.homework_dir, "张三.docx")
+        self._touch(path)
+
+        changed = self.watcher.poll(1)
+
+        self.assertFalse(changed[path])
+
+    def test_watches_new_directories(self):
+        new_dir = os.path.join(self.repo_root, "数据结构", "1班", "第2次作业")
+        os.makedirs(new_dir)
+        self.assertTrue(self.watcher.poll(1)[new_dir])
+
+        path = os.path.join(new_dir, "张三.docx")
+        self._touch(path)
+
+        self.assertIn(path, self.watcher.poll(1))
+
+
+class RepositoryCacheWatcherTest(FilesystemWatcherTestMixin, SimpleTestCase):
+    """测试事件分发"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = WatchedRoot(self.repo_root, user_id=1, tenant_id=2, base_dirs=[self.user_root])
+        other_root = os.path.join(self.user_root, "other")
+        os.makedirs(other_root)
+        self.other = WatchedRoot(other_root, user_id=1, tenant_id=2, base_dirs=[self.user_root])
+        with patch.object(
+            RepositoryCacheWatcher, "load_roots", return_value=[self.root, self.other]
+        ):
+            self.service = RepositoryCacheWatcher(polling=True, interval=0, debounce=0)
+            self.service.reload()
+
+    def test_dispatch_to_owning_repository(self):
+        path = os.path.join(self.homework_dir, "张三.docx")
+        with (
+            patch.object(self.root, "invalidate", return_value=1) as mock_root,
+            patch.object(self.other, "invalidate", return_value=1) as mock_other,
+        ):
+            self.service.dispatch({path: False})
+
+        mock_root.assert_called_once_with({path: False})
+        mock_other.assert_not_called()
+
+    def test_overflow_clears_all_roots(self):
+        with (
+            patch.object(self.root, "invalidate_all") as mock_root,
+            patch.object(self.other, "invalidate_all") as mock_other,
+        ):
+            self.service.dispatch({OVERFLOW: True})
+
+        mock_root.assert_called_once()
+        mock_other.assert_called_once()
+
+    def test_run_once_invalidates_changed_directory(self):
+        self.root.cache_manager.set_file_count("数据结构/1班/第1次作业", 0)
+        self._touch(os.path.join(self.homework_dir, "张三.docx"))
+
+        self.assertGreater(self.service.run_once(timeout=0), 0)
+        self.assertIsNone(self.root.cache_manager.get_file_count("数据结构/1班/第1次作业"))
+
+    def test_reload_keeps_catalog_current(self):
+        """测试开始监听时完整刷新仓库文件目录，之后只续期当前标记；刷新失败时取消标记"""
+        repository = SimpleNamespace(id=7, get_full_path=lambda: self.repo_root)
+        root = WatchedRoot(self.repo_root, 1, 2, base_dirs=[self.user_root], repository=repository)
+        with (
+            patch.object(RepositoryCacheWatcher, "load_roots", return_value=[root]),
+            patch.object(RepositoryCatalog, "refresh") as mock_refresh,
+        ):
+            service = RepositoryCacheWatcher(polling=True, interval=0, debounce=0)
+            service.reload()
+            self.assertIsNotNone(RepositoryCatalog.current(repository))
+            service.reload()
+        mock_refresh.assert_called_once()
+
+        with patch.object(RepositoryCatalog, "refresh_paths", side_effect=OSError):
+            root.invalidate({self.homework_dir: True})
+        self.assertIsNone(RepositoryCatalog.current(repository))
+
+    def test_extended_timeout_only_for_watched_scopes(self):
+        owner = self.root.cache_manager
+        admin = CacheManager(user_id=99, tenant_id=2)
+
+        with override_settings(CACHE_WATCHED_PATH_TIMEOUT=86400):
+            self.assertEqual(owner._path_timeout(300), 86400)
+            self.assertEqual(admin._path_timeout(300), 300)
+
+            # 监听器停止后所有作用域回到默认过期时间
+            CacheManager.set_watched_scopes((), timeout=0)
+            self.assertEqual(owner._path_timeout(300), 300)
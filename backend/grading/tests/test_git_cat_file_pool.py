@@ -0,0 +1,204 @@
+"""
+CatFilePool 单元测试
+
+测试常驻 git cat-file --batch 进程池：
+- 单个读取与流水线批量读取
+- 进程崩溃后重启、空闲关闭、并发上限
+- GitStorageAdapter.read_many
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from grading.services import git_cat_file_pool
+from grading.services.git_cat_file_pool import CatFilePool
+from grading.services.git_mirror_manager import GitMirrorManager
+from grading.services.git_storage_adapter import GitStorageAdapter
+from grading.services.storage_adapter import RemoteAccessError
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class CatFilePoolTest(SimpleTestCase):
+    """CatFilePool 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.repo = os.path.join(self.temp_dir, "repo")
+        os.makedirs(os.path.join(self.repo, "第一次作业"))
+        _git(self.repo, "init", "-q", "-b", "main")
+        self.files = {}
+        for i in range(50):
+            # 内容大于管道缓冲区，验证分块流水线不会死锁
+            content = (f"学生{i}\n".encode("utf-8")) * (i * 2000 + 1)
+            rel_path = f"第一次作业/学生 {i}.txt"
+            with open(os.path.join(self.repo, rel_path), "wb") as f:
+                f.write(content)
+            self.files[rel_path] = content
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "init")
+        self.head = _git(self.repo, "rev-parse", "HEAD")
+
+        self.spawned = []
+        real_init = git_cat_file_pool.CatFileProcess.__init__
+
+        def tracking_init(process, repo_dir):
+            real_init(process, repo_dir)
+            self.spawned.append(process)
+
+        patcher = patch.object(git_cat_file_pool.CatFileProcess, "__init__", tracking_init)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pool(self, **kwargs):
+        pool = CatFilePool(self.repo, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_read_and_missing(self):
+        """测试读取文件，不存在的对象和目录返回 None"""
+        pool = self._pool()
+        self.assertEqual(
+            pool.read(f"{self.head}:第一次作业/学生 1.txt"), self.files["第一次作业/学生 1.txt"]
+        )
+        self.assertIsNone(pool.read(f"{self.head}:第一次作业/不存在.txt"))
+        self.assertIsNone(pool.read(f"{self.head}:第一次作业"))
+        self.assertEqual(len(self.spawned), 1)
+
+    def test_read_many_pipelined(self):
+        """测试批量读取只使用一个进程且顺序一致"""
+        pool = self._pool()
+        paths = list(self.files) * 3
+        contents = pool.read_many([f"{self.head}:{p}" for p in paths])
+        self.assertEqual(contents, [self.files[p] for p in paths])
+        self.assertEqual(len(self.spawned), 1)
+
+    def test_restart_after_crash(self):
+        """测试进程被杀死后重启并重试"""
+        pool = self._pool()
+        pool.read(f"{self.head}:第一次作业/学生 0.txt")
+        self.spawned[0]._proc.kill()
+        self.spawned[0]._proc.wait()
+
+        self.assertEqual(
+            pool.read(f"{self.head}:第一次作业/学生 2.txt"), self.files["第一次作业/学生 2.txt"]
+        )
+        self.assertEqual(len(self.spawned), 2)
+
+    def test_idle_processes_closed(self):
+        """测试空闲超时的进程被关闭"""
+        pool = self._pool(idle_timeout=0)
+        pool.read(f"{self.head}:第一次作业/学生 0.txt")
+        pool.read(f"{self.head}:第一次作业/学生 0.txt")
+        self.assertEqual(len(self.spawned), 2)
+        self.assertFalse(self.spawned[0].alive)
+        self.assertEqual(pool._idle, [])
+
+    def test_idle_processes_reaped_without_further_use(self):
+        """测试池不再使用时空闲进程也会由定时器关闭"""
+        pool = self._pool(idle_timeout=0.05)
+        pool.read(f"{self.head}:第一次作业/学生 0.txt")
+        self.assertTrue(self.spawned[0].alive)
+
+        deadline = time.monotonic() + 5
+        while self.spawned[0].alive and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(self.spawned[0].alive)
+        self.assertEqual(pool._idle, [])
+
+    def test_unexpected_error_kills_process(self):
+        """测试借用期间出现非 CatFileError 异常时进程被杀死且不归还"""
+        pool = self._pool()
+        with patch.object(git_cat_file_pool.CatFileProcess, "request", side_effect=OSError("boom")):
+            with self.assertRaises(OSError):
+                pool.read(f"{self.head}:第一次作业/学生 0.txt")
+        self.assertEqual(len(self.spawned), 1)
+        self.assertFalse(self.spawned[0].alive)
+        self.assertEqual(pool._idle, [])
+
+    def test_bounded_concurrency(self):
+        """测试并发读取不超过进程上限"""
+        pool = self._pool(max_processes=2)
+        barrier = threading.Barrier(6)
+        errors = []
+
+        def worker(i):
+            barrier.wait()
+            path = f"第一次作业/学生 {i}.txt"
+            if pool.read(f"{self.head}:{path}") != self.files[path]:
+                errors.append(path)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.spawned), 2)
+
+
+class GitStorageAdapterReadManyTest(SimpleTestCase):
+    """GitStorageAdapter.read_many 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        origin = os.path.join(self.temp_dir, "origin")
+        os.makedirs(os.path.join(origin, "第一次作业"))
+        _git(origin, "init", "-q", "-b", "main")
+        for name in ("张三.docx", "李四.docx"):
+            with open(os.path.join(origin, "第一次作业", name), "w", encoding="utf-8") as f:
+                f.write(name)
+        _git(origin, "add", "-A")
+        _git(origin, "commit", "-q", "-m", "init")
+
+        manager = GitMirrorManager(base_dir=os.path.join(self.temp_dir, "mirrors"))
+        patcher = patch(
+            "grading.services.git_storage_adapter.get_mirror_manager", return_value=manager
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.adapter = GitStorageAdapter(git_url=f"file://{origin}", branch="main")
+        self.addCleanup(
+            lambda: manager.get_mirror(self.adapter.git_url, "main").cat_file_pool.close()
+        )
+
+    def test_read_many(self):
+        """测试批量读取与缓存"""
+        paths = ["第一次作业/张三.docx", "第一次作业/李四.docx"]
+        self.assertEqual(
+            self.adapter.read_many(paths),
+            {
+                "第一次作业/张三.docx": "张三.docx".encode(),
+                "第一次作业/李四.docx": "李四.docx".encode(),
+            },
+        )
+        with patch.object(CatFilePool, "read_many") as read_many:
+            self.assertEqual(self.adapter.read_file(paths[0]), "张三.docx".encode())
+        read_many.assert_not_called()
+
+    def test_missing_file_raises(self):
+        """测试任一文件不存在时抛出 RemoteAccessError"""
+        with self.assertRaises(RemoteAccessError):
+            self.adapter.read_many(["第一次作业/张三.docx", "第一次作业/不存在.docx"])
+        self.assertFalse(self.adapter.file_exists("第一次作业/不存在.docx"))
+        self.assertTrue(self.adapter.file_exists("第一次作业/张三.docx"))
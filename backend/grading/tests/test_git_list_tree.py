@@ -0,0 +1,144 @@
+"""
+GitStorageAdapter.list_tree 单元测试
+
+测试递归列出远程子树：
+- 一次 ls-tree 得到嵌套结构
+- 按 tree 对象 SHA 缓存，子树不变时跨提交复用
+- 远程目录树视图只列出一次
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from grading.services.git_mirror_manager import GitMirrorManager
+from grading.services.git_storage_adapter import GitStorageAdapter
+from grading.views import _get_git_directory_tree
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class GitListTreeTest(SimpleTestCase):
+    """list_tree 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.origin = os.path.join(self.temp_dir, "origin")
+        os.makedirs(self.origin)
+        _git(self.origin, "init", "-q", "-b", "main")
+        self._write("第一次作业/张三.docx", "v1")
+        self._write("第一次作业/附件/图 1.png", "png")
+        self._write("第二次作业/李四.txt", "v1")
+        self._write("README.md", "readme")
+        self._commit("init")
+
+        self.manager = GitMirrorManager(
+            base_dir=os.path.join(self.temp_dir, "mirrors"), freshness_seconds=60
+        )
+        patcher = patch(
+            "grading.services.git_storage_adapter.get_mirror_manager", return_value=self.manager
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, rel_path, content):
+        full_path = os.path.join(self.origin, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _commit(self, message):
+        _git(self.origin, "add", "-A")
+        _git(self.origin, "commit", "-q", "-m", message)
+
+    def _adapter(self):
+        adapter = GitStorageAdapter(git_url=f"file://{self.origin}", branch="main")
+        real_execute = adapter._execute_git_command
+        commands = []
+
+        def tracking(args, *a, **kw):
+            commands.append(args[0])
+            return real_execute(args, *a, **kw)
+
+        adapter._execute_git_command = tracking
+        return adapter, commands
+
+    def test_nested_structure(self):
+        """测试一次 ls-tree 得到与逐级 list_directory 一致的结构"""
+        adapter, commands = self._adapter()
+        tree = adapter.list_tree("")
+        self.assertEqual(commands.count("ls-tree"), 1)
+
+        def flatten(entries, prefix=""):
+            result = {}
+            for entry in entries:
+                path = f"{prefix}/{entry['name']}" if prefix else entry["name"]
+                result[path] = (entry["type"], entry["size"], entry["hash"])
+                result.update(flatten(entry.get("children", []), path))
+            return result
+
+        expected = {}
+        pending = [""]
+        while pending:
+            path = pending.pop()
+            for entry in adapter.list_directory(path):
+                child = f"{path}/{entry['name']}" if path else entry["name"]
+                expected[child] = (entry["type"], entry["size"], entry["hash"])
+                if entry["type"] == "dir":
+                    pending.append(child)
+
+        self.assertEqual(flatten(tree), expected)
+        self.assertIn("第一次作业/附件/图 1.png", expected)
+
+        subtree = adapter.list_tree("第一次作业")
+        self.assertEqual(sorted(e["name"] for e in subtree), ["张三.docx", "附件"])
+        self.assertEqual(
+            adapter.list_tree("第一次作业", recursive=False), adapter.list_directory("第一次作业")
+        )
+
+    def test_unchanged_subtree_cached_across_commits(self):
+        """测试其他目录有新提交时未变化的子树不重新列出"""
+        adapter, _ = self._adapter()
+        adapter.list_tree("第一次作业")
+
+        self._write("第二次作业/王五.txt", "new")
+        self._commit("second")
+        fresh, commands = self._adapter()
+        fresh.refresh()
+
+        fresh.list_tree("第一次作业")
+        self.assertNotIn("ls-tree", commands)
+        names = [e["name"] for e in fresh.list_tree("第二次作业")]
+        self.assertEqual(commands.count("ls-tree"), 1)
+        self.assertIn("王五.txt", names)
+
+    def test_directory_tree_view_lists_once(self):
+        """测试远程目录树只调用一次 list_tree"""
+        adapter, _ = self._adapter()
+        with (
+            patch.object(adapter, "list_directory") as list_directory,
+            patch.object(adapter, "list_tree", wraps=adapter.list_tree) as list_tree,
+        ):
+            nodes = _get_git_directory_tree(adapter, "")
+
+        list_directory.assert_not_called()
+        list_tree.assert_called_once_with("")
+        folder = next(n for n in nodes if n["text"] == "第一次作业")
+        self.assertEqual(folder["type"], "folder")
+        attachments = next(n for n in folder["children"] if n["text"] == "附件")
+        self.assertEqual(attachments["children"][0]["id"], "第一次作业/附件/图 1.png")
@@ -0,0 +1,177 @@
+"""
+GitMirrorManager 单元测试
+
+测试远程仓库镜像管理：
+- 新鲜度窗口内只 fetch 一次
+- 并发请求共享一次 fetch
+- 适配器固定读取同一提交
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from grading.services.git_mirror_manager import GitMirrorManager
+from grading.services.git_storage_adapter import GitStorageAdapter
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class GitMirrorManagerTest(SimpleTestCase):
+    """GitMirrorManager 单元测试"""
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, ignore_errors=True)
+        self.manager = GitMirrorManager(base_dir=self.base_dir, freshness_seconds=60)
+        self.fetches = []
+
+    def _fetch(self, repo_dir):
+        self.fetches.append(repo_dir)
+
+    def _resolve(self, repo_dir):
+        return f"sha{len(self.fetches)}"
+
+    def _ensure(self, **kwargs):
+        return self.manager.ensure_fresh(
+            "https://example.com/repo.git", "main", self._fetch, self._resolve, **kwargs
+        )
+
+    def test_fetch_once_within_window(self):
+        """测试新鲜度窗口内不重复 fetch"""
+        first = self._ensure()
+        second = self._ensure()
+        self.assertIs(first, second)
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(second.head_commit, "sha1")
+        self.assertTrue(os.path.isdir(first.repo_dir))
+
+    def test_expired_and_forced_fetch(self):
+        """测试窗口过期、强制刷新与失效"""
+        self._ensure()
+        self._ensure(max_age=0)
+        self._ensure(force=True)
+        self.manager.invalidate("https://example.com/repo.git", "main")
+        mirror = self._ensure()
+        self.assertEqual(len(self.fetches), 4)
+        self.assertEqual(mirror.head_commit, "sha4")
+
+    def test_mirror_per_branch(self):
+        """测试不同分支使用不同镜像目录"""
+        main = self.manager.get_mirror("https://example.com/repo.git", "main")
+        dev = self.manager.get_mirror("https://example.com/repo.git", "dev")
+        self.assertNotEqual(main.repo_dir, dev.repo_dir)
+
+    def test_concurrent_requests_share_fetch(self):
+        """测试并发请求只触发一次 fetch"""
+        barrier = threading.Barrier(5)
+
+        def worker():
+            barrier.wait()
+            self._ensure()
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.fetches), 1)
+
+    def test_failed_fetch_not_marked_fresh(self):
+        """测试 fetch 失败时镜像不被标记为新鲜"""
+
+        def failing(repo_dir):
+            raise RuntimeError("network")
+
+        with self.assertRaises(RuntimeError):
+            self.manager.ensure_fresh(
+                "https://example.com/repo.git", "main", failing, self._resolve
+            )
+        self._ensure()
+        self.assertEqual(len(self.fetches), 1)
+
+
+class GitStorageAdapterMirrorTest(SimpleTestCase):
+    """GitStorageAdapter 使用镜像的集成测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.origin = os.path.join(self.temp_dir, "origin")
+        os.makedirs(os.path.join(self.origin, "第一次作业"))
+        _git(self.origin, "init", "-q", "-b", "main")
+        self._commit("第一次作业/张三.txt", "v1")
+
+        self.manager = GitMirrorManager(
+            base_dir=os.path.join(self.temp_dir, "mirrors"), freshness_seconds=60
+        )
+        patcher = patch(
+            "grading.services.git_storage_adapter.get_mirror_manager", return_value=self.manager
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _commit(self, rel_path, content):
+        with open(os.path.join(self.origin, rel_path), "w", encoding="utf-8") as f:
+            f.write(content)
+        _git(self.origin, "add", "-A")
+        _git(self.origin, "commit", "-q", "-m", content)
+        return _git(self.origin, "rev-parse", "HEAD")
+
+    def _adapter(self):
+        adapter = GitStorageAdapter(git_url=f"file://{self.origin}", branch="main")
+        real_execute = adapter._execute_git_command
+        commands = []
+
+        def tracking(args, *a, **kw):
+            commands.append(args[0])
+            return real_execute(args, *a, **kw)
+
+        adapter._execute_git_command = tracking
+        return adapter, commands
+
+    def test_tree_reads_fetch_once(self):
+        """测试一次请求内的多次读取只 fetch 一次"""
+        adapter, commands = self._adapter()
+        head = adapter.get_head_commit()
+        adapter.list_directory("")
+        adapter.list_directory("第一次作业")
+        self.assertEqual(adapter.read_file("第一次作业/张三.txt"), b"v1")
+        self.assertEqual(commands.count("fetch"), 1)
+        self.assertEqual(head, _git(self.origin, "rev-parse", "HEAD"))
+
+        # 新适配器在新鲜度窗口内复用镜像
+        other, other_commands = self._adapter()
+        other.list_directory("第一次作业")
+        self.assertNotIn("fetch", other_commands)
+
+    def test_reads_pinned_to_one_commit(self):
+        """测试远程有新提交时，已固定的适配器仍读取原提交"""
+        adapter, _ = self._adapter()
+        first_head = adapter.get_head_commit()
+        new_head = self._commit("第一次作业/张三.txt", "v2")
+
+        fresh, _ = self._adapter()
+        self.assertEqual(fresh.refresh(), new_head)
+        self.assertEqual(fresh.read_file("第一次作业/张三.txt"), b"v2")
+
+        self.assertEqual(adapter.get_head_commit(), first_head)
+        self.assertEqual(adapter.read_file("第一次作业/张三.txt"), b"v1")
+        self.assertTrue(
+            adapter.file_changed_since_commit("第一次作业/张三.txt", first_head) is False
+        )
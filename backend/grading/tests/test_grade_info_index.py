@@ -0,0 +1,96 @@
+"""
+GradeInfoIndex 单元测试
+
+测试评分信息索引：
+- 进程内记忆命中与 stat 变化后重新解析
+- get_many 批量解析
+- 数据库持久化与失效
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from grading.models import GradeInfoIndexEntry
+from grading.services.grade_info_index import GradeInfoIndex
+
+
+class GradeInfoIndexTest(TestCase):
+    """GradeInfoIndex 单元测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.parsed = []
+        self.index = GradeInfoIndex(parser=self._parse)
+
+    def _parse(self, path):
+        self.parsed.append(path)
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return {"has_grade": "老师评分" in content, "grade": "A" if "A" in content else None}
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_memory_hit(self):
+        """测试同一文件只解析一次"""
+        path = self._write("张三.txt", "老师评分：A")
+        self.assertEqual(self.index.get(path), {"has_grade": True, "grade": "A"})
+        self.assertEqual(self.index.get(path)["grade"], "A")
+        self.assertEqual(self.parsed, [path])
+
+    def test_reparse_after_stat_change(self):
+        """测试文件变化后重新解析"""
+        path = self._write("张三.txt", "正文")
+        self.assertFalse(self.index.get(path)["has_grade"])
+        self._write("张三.txt", "正文\n老师评分：A")
+        self.assertTrue(self.index.get(path)["has_grade"])
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_get_many(self):
+        """测试批量获取并跳过不存在的文件"""
+        a = self._write("a.txt", "老师评分：A")
+        b = self._write("b.txt", "正文")
+        missing = os.path.join(self.temp_dir, "missing.txt")
+
+        results = self.index.get_many([a, b, a, missing])
+        self.assertEqual(set(results), {a, b})
+        self.assertEqual(sorted(self.parsed), sorted([a, b]))
+        self.assertEqual(GradeInfoIndexEntry.objects.count(), 2)
+
+    def test_persisted_entry_survives_memory_clear(self):
+        """测试清空进程内记忆后从数据库命中"""
+        path = self._write("张三.txt", "老师评分：A")
+        self.index.get(path)
+        self.index.clear_memory()
+        other = GradeInfoIndex(parser=self._parse)
+        self.assertEqual(other.get(path)["grade"], "A")
+        self.assertEqual(self.parsed, [path])
+
+    def test_invalidate(self):
+        """测试失效后重新解析"""
+        path = self._write("张三.txt", "老师评分：A")
+        self.index.get(path)
+        self.index.invalidate(path)
+        self.assertFalse(GradeInfoIndexEntry.objects.exists())
+        self.index.get(path)
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_parse_error_not_cached(self):
+        """测试解析失败时不写入索引"""
+        path = self._write("坏文件.txt", "x")
+
+        def failing(p):
+            raise ValueError("bad")
+
+        index = GradeInfoIndex(parser=failing)
+        with self.assertRaises(ValueError):
+            index.get(path)
+        self.assertEqual(index.get_many([path]), {})
+        self.assertFalse(GradeInfoIndexEntry.objects.exists())
@@ -0,0 +1,311 @@
+"""
+评分提交推送调度测试
+
+测试 GradePushScheduler：
+- 多个已评分文件合并为一次提交并推送
+- 待提交文件数达到阈值时在后台提交推送
+- 提交失败和推送失败（包括超时）时按退避重试，推送前先 rebase，成功后清除错误
+- 提交后和 rebase 后更新评分状态中的 last_graded_commit
+- flush_grade_pushes / grade_push_status 接口
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from grading.models import FileGradeStatus, Repository
+from grading.services.grade_push_scheduler import GradePushScheduler
+from grading.utils import GitHandler
+
+
+def _git(cwd, *args):
+    result = subprocess.run(
+        ["git", "-c", "core.quotepath=false", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+class _GitRepoMixin:
+    """创建一个带 origin 远程仓库的工作目录"""
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.remote = os.path.join(self.temp_dir, "remote.git")
+        self.work = os.path.join(self.temp_dir, "work")
+        _git(self.temp_dir, "init", "--bare", "-b", "main", self.remote)
+        _git(self.temp_dir, "clone", self.remote, self.work)
+        _git(self.work, "config", "user.name", "测试老师")
+        _git(self.work, "config", "user.email", "teacher@example.com")
+        _git(self.work, "checkout", "-b", "main")
+        for name in ("张三.docx", "李四.docx", "王五.docx"):
+            self._write(f"1班/作业1/{name}", "未评分")
+        _git(self.work, "add", "-A")
+        _git(self.work, "commit", "-m", "提交作业")
+        _git(self.work, "push", "origin", "main")
+
+    def _write(self, rel_path, content):
+        path = os.path.join(self.work, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _remote_log(self):
+        return _git(self.remote, "log", "--format=%s", "main").splitlines()
+
+    def _wait_until(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return condition()
+
+
+class GradePushSchedulerTest(_GitRepoMixin, SimpleTestCase):
+    """测试合并提交和推送"""
+
+    def setUp(self):
+        super().setUp()
+        self.repository = SimpleNamespace(id=1, branch="main", get_full_path=lambda: self.work)
+
+    def test_batches_files_into_one_commit(self):
+        scheduler = GradePushScheduler(delay=60)
+        for name in ("张三.docx", "李四.docx"):
+            path = self._write(f"1班/作业1/{name}", "老师评分：A")
+            scheduler.mark_dirty(self.repository, path)
+
+        self.assertEqual(scheduler.status(1)["pending"], 2)
+        self.assertEqual(self._remote_log(), ["提交作业"])
+
+        scheduler.flush(1)
+
+        log = self._remote_log()
+        self.assertEqual(log, ["评分更新: 2 个文件", "提交作业"])
+        changed = _git(self.remote, "show", "--name-only", "--format=", "main").splitlines()
+        self.assertEqual(sorted(changed), ["1班/作业1/张三.docx", "1班/作业1/李四.docx"])
+        status = scheduler.status(1)
+        self.assertEqual(
+            (status["pending"], status["unpushed"], status["last_error"]), (0, False, "")
+        )
+        self.assertEqual(status["last_commit"], _git(self.work, "rev-parse", "HEAD"))
+        self.assertIsNotNone(status["last_pushed_at"])
+
+    def test_unrelated_changes_not_committed(self):
+        scheduler = GradePushScheduler(delay=60)
+        self._write("1班/作业1/王五.docx", "学生重新提交")
+        path = self._write("1班/作业1/张三.docx", "老师评分：B")
+        scheduler.mark_dirty(self.repository, path)
+
+        scheduler.flush(1)
+
+        changed = _git(self.remote, "show", "--name-only", "--format=", "main").splitlines()
+        self.assertEqual(changed, ["1班/作业1/张三.docx"])
+        self.assertIn("王五.docx", _git(self.work, "status", "--porcelain"))
+
+    def test_batch_size_triggers_background_push(self):
+        scheduler = GradePushScheduler(delay=60, batch_size=2)
+        for name in ("张三.docx", "李四.docx"):
+            scheduler.mark_dirty(self.repository, self._write(f"1班/作业1/{name}", "老师评分：C"))
+
+        self.assertTrue(self._wait_until(lambda: len(self._remote_log()) == 2))
+        self.assertTrue(self._wait_until(lambda: not scheduler.status(1)["pushing"]))
+
+    def test_debounce_timer_pushes(self):
+        scheduler = GradePushScheduler(delay=0.05)
+        scheduler.mark_dirty(self.repository, self._write("1班/作业1/张三.docx", "老师评分：A"))
+
+        self.assertTrue(
+            self._wait_until(lambda: self._remote_log()[0] == "评分更新: 1班/作业1/张三.docx")
+        )
+
+    def test_push_retried_after_failure(self):
+        scheduler = GradePushScheduler(delay=60, retry_seconds=0.01)
+        scheduler.mark_dirty(self.repository, self._write("1班/作业1/张三.docx", "老师评分：A"))
+
+        with (
+            patch(
+                "grading.services.grade_push_scheduler.GitHandler.push_branch",
+                side_effect=[False, True],
+            ) as mock_push,
+            patch(
+                "grading.services.grade_push_scheduler.GitHandler.rebase_onto_remote"
+            ) as mock_rebase,
+        ):
+            scheduler.flush(1)
+            self.assertTrue(scheduler.status(1)["unpushed"])
+            self.assertTrue(self._wait_until(lambda: not scheduler.status(1)["unpushed"]))
+
+        self.assertEqual(mock_push.call_count, 2)
+        mock_rebase.assert_called_once_with(self.work, "main", timeout=120.0)
+        self.assertEqual(scheduler.status(1)["last_error"], "")
+
+    def test_commit_retried_after_failure(self):
+        scheduler = GradePushScheduler(delay=60, retry_seconds=0.01)
+        scheduler.mark_dirty(self.repository, self._write("1班/作业1/张三.docx", "老师评分：A"))
+
+        results = [RuntimeError("index.lock 已存在")]
+        commit_paths = GitHandler.commit_paths
+
+        def commit(*args):
+            if results:
+                raise results.pop()
+            return commit_paths(*args)
+
+        with patch(
+            "grading.services.grade_push_scheduler.GitHandler.commit_paths", side_effect=commit
+        ):
+            scheduler.flush(1)
+            self.assertIn("index.lock", scheduler.status(1)["last_error"])
+            self.assertEqual(scheduler.status(1)["pending"], 1)
+            self.assertTrue(self._wait_until(lambda: len(self._remote_log()) == 2))
+        self.assertTrue(self._wait_until(lambda: scheduler.status(1)["pending"] == 0))
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = GradePushScheduler(delay=60, max_retries=0)
+        scheduler.mark_dirty(self.repository, self._write("1班/作业1/张三.docx", "老师评分：A"))
+
+        with patch(
+            "grading.services.grade_push_scheduler.GitHandler.push_branch", return_value=False
+        ):
+            scheduler.flush(1)
+
+        status = scheduler.status(1)
+        self.assertTrue(status["unpushed"])
+        self.assertIn("推送失败", status["last_error"])
+
+        # 下一次提交时一起推送
+        scheduler.mark_dirty(self.repository, self._write("1班/作业1/李四.docx", "老师评分：B"))
+        scheduler.flush(1)
+        self.assertEqual(len(self._remote_log()), 3)
+        self.assertFalse(scheduler.status(1)["unpushed"])
+
+
+class GradePushStatusTest(_GitRepoMixin, TestCase):
+    """测试评分状态更新和接口"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username="teacher", password="testpass123", is_staff=True
+        )
+        self.repository = Repository.objects.create(
+            name="作业仓库",
+            owner=self.user,
+            repo_type="git",
+            url="https://example.com/homework.git",
+            branch="main",
+            is_active=True,
+        )
+        self.client.force_login(self.user)
+
+    def test_commit_updates_last_graded_commit(self):
+        head = _git(self.work, "rev-parse", "HEAD")
+        FileGradeStatus.objects.create(
+            repository=self.repository, file_path="1班/作业1/张三.docx", last_graded_commit=head
+        )
+        scheduler = GradePushScheduler(delay=60)
+        path = self._write("1班/作业1/张三.docx", "老师评分：A")
+        with patch.object(Repository, "get_full_path", return_value=self.work):
+            scheduler.mark_dirty(self.repository, path)
+
+        scheduler.flush(self.repository.id)
+
+        status = FileGradeStatus.objects.get(repository=self.repository)
+        self.assertEqual(status.last_graded_commit, _git(self.work, "rev-parse", "HEAD"))
+        self.assertNotEqual(status.last_graded_commit, head)
+
+    def test_rebase_updates_last_graded_commit(self):
+        # 另一位教师先推送了新的提交，本次推送会被拒绝
+        other = os.path.join(self.temp_dir, "other")
+        _git(self.temp_dir, "clone", "-b", "main", self.remote, other)
+        with open(os.path.join(other, "说明.txt"), "w", encoding="utf-8") as f:
+            f.write("作业要求")
+        _git(other, "add", "-A")
+        _git(other, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-m", "说明")
+        _git(other, "push", "origin", "main")
+
+        FileGradeStatus.objects.create(
+            repository=self.repository, file_path="1班/作业1/张三.docx", last_graded_commit=""
+        )
+        scheduler = GradePushScheduler(delay=60, retry_seconds=0.01)
+        path = self._write("1班/作业1/张三.docx", "老师评分：A")
+        with patch.object(Repository, "get_full_path", return_value=self.work):
+            scheduler.mark_dirty(self.repository, path)
+        scheduler.flush(self.repository.id)
+        self.assertTrue(
+            self._wait_until(lambda: not scheduler.status(self.repository.id)["unpushed"])
+        )
+
+        head = _git(self.work, "rev-parse", "HEAD")
+        self.assertEqual(_git(self.remote, "rev-parse", "main"), head)
+        status = FileGradeStatus.objects.get(repository=self.repository)
+        self.assertEqual(status.last_graded_commit, head)
+
+    def test_flush_only_writes_repository_grades(self):
+        with (
+            patch("grading.views.get_push_scheduler") as mock_get_scheduler,
+            patch("grading.views._grade_write_queue") as mock_queue,
+            patch.object(Repository, "get_full_path", return_value=self.work),
+        ):
+            mock_get_scheduler.return_value.status.return_value = {"pending": 0}
+            self.client.post("/grading/flush_grade_pushes/", {"repo_id": self.repository.id})
+
+        mock_queue.flush_under.assert_called_once_with(self.work)
+        mock_queue.flush.assert_not_called()
+
+    def test_flush_and_status_views(self):
+        with patch("grading.views.get_push_scheduler") as mock_get_scheduler:
+            mock_get_scheduler.return_value.status.return_value = {"pending": 2, "pushing": False}
+
+            response = self.client.post(
+                "/grading/flush_grade_pushes/", {"repo_id": self.repository.id}
+            )
+            self.assertEqual(response.json()["push"]["pending"], 2)
+            mock_get_scheduler.return_value.flush_async.assert_called_once_with(self.repository.id)
+
+            response = self.client.get(
+                "/grading/grade_push_status/", {"repo_id": self.repository.id}
+            )
+            self.assertEqual(response.json()["status"], "success")
+
+        response = self.client.get("/grading/grade_push_status/", {"repo_id": 999999})
+        self.assertEqual(response.json()["status"], "error")
+
+
+class GitHandlerRemoteTest(SimpleTestCase):
+    """测试推送和 rebase 的超时"""
+
+    def test_push_timeout_counts_as_failure(self):
+        with patch(
+            "grading.utils.subprocess.run",
+            side_effect=subprocess.TimeoutExpired(["git", "push"], 5),
+        ) as mock_run:
+            self.assertFalse(GitHandler.push_branch("/tmp/repo", "main", timeout=5))
+
+        kwargs = mock_run.call_args.kwargs
+        self.assertEqual(kwargs["timeout"], 5)
+        self.assertEqual(kwargs["env"]["GIT_TERMINAL_PROMPT"], "0")
+
+    def test_rebase_timeout_aborts(self):
+        with patch(
+            "grading.utils.subprocess.run",
+            side_effect=[subprocess.TimeoutExpired(["git", "pull"], 5), None],
+        ) as mock_run:
+            self.assertFalse(GitHandler.rebase_onto_remote("/tmp/repo", "main", timeout=5))
+
+        self.assertEqual(mock_run.call_args_list[0].kwargs["env"]["GIT_TERMINAL_PROMPT"], "0")
+        self.assertEqual(mock_run.call_args.args[0], ["git", "rebase", "--abort"])
@@ -74,7 +74,7 @@ class GradeRegistrationTest(TestCase):
         self.assertTrue(2 <= len(student_name) <= 4)
         self.assertTrue(all("\u4e00" <= char <= "\u9fff" for char in student_name))
 
-    @patch("grading.grade_registration.Document")
+    @patch("grading.grade_registration.open_docx")
     def test_extract_grade_from_docx(self, mock_document):
         """Test extracting grade from docx file."""
         # Mock the Document class
@@ -114,7 +114,7 @@ class GradeRegistrationTest(TestCase):
             excel_path=excel_path, student_name="黄嘉伟", homework_dir_name="第一次作业", grade="A"
         )
 
-    @patch("grading.grade_registration.Document")
+    @patch("grading.grade_registration.open_docx")
     def test_process_docx_files(self, mock_document):
         """Test processing entire repository docx files."""
         # Mock the Document class
@@ -253,6 +253,52 @@ class GradeRegistrationTest(TestCase):
         self.assertEqual(df.iloc[0]["姓名"], "新学生")
         self.assertEqual(df.iloc[0]["第1次作业"], "A")
 
+    @patch("grading.grade_registration.open_docx")
+    def test_process_docx_files_single_workbook_round_trip(self, mock_document):
+        """Test that a whole repository is registered with one load and one save."""
+        mock_paragraph = MagicMock()
+        mock_paragraph.text = "老师评分：C"
+        mock_document.return_value.paragraphs = [mock_paragraph]
+        self._create_excel_file(self.single_class_excel)
+        for name in ("李四", "王五", "赵六"):
+            (self.single_class_repo / "第一次作业" / f"{name}.docx").touch()
+        (self.single_class_repo / "第二次作业").mkdir()
+        (self.single_class_repo / "第二次作业" / "李四.docx").touch()
+
+        import openpyxl
+
+        with patch(
+            "grading.grade_registration.openpyxl.load_workbook", wraps=openpyxl.load_workbook
+        ) as load_workbook, patch.object(
+            GradeRegistration, "_save_workbook_atomic", wraps=self.grade_reg._save_workbook_atomic
+        ) as save:
+            outcomes = self.grade_reg.process_docx_files(str(self.single_class_repo))
+
+        self.assertEqual(load_workbook.call_count, 1)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(len(outcomes), 5)
+        self.assertTrue(all(o["status"] == "success" for o in outcomes))
+
+        df = pd.read_excel(self.single_class_excel)
+        self.assertEqual(len(df), 4)  # 赵六 appended to the existing 3 students
+        self.assertEqual(df[df["姓名"] == "赵六"].iloc[0]["第1次作业"], "C")
+        self.assertEqual(df[df["姓名"] == "李四"].iloc[0]["第2次作业"], "C")
+        self.assertEqual(list(self.single_class_repo.glob("tmp*.xlsx")), [])
+
+    def test_write_grades_failure_keeps_workbook(self):
+        """Test that a failed save leaves the original workbook untouched."""
+        self._create_excel_file(self.single_class_excel)
+        original = self.single_class_excel.read_bytes()
+
+        with patch("openpyxl.workbook.workbook.Workbook.save", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.grade_reg.write_grades_to_excel(
+                    str(self.single_class_excel), [("朱俏任", "第一次作业", "A")]
+                )
+
+        self.assertEqual(self.single_class_excel.read_bytes(), original)
+        self.assertEqual(len(list(self.single_class_repo.iterdir())), 2)
+
     def _create_excel_file(self, excel_path):
         """创建有效的Excel文件"""
         data = {
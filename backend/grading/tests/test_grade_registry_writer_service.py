@@ -14,12 +14,17 @@ import tempfile
 from datetime import datetime
 from unittest.mock import MagicMock, Mock, patch
 
+from django.test import override_settings
+from docx import Document
+from openpyxl import Workbook, load_workbook
+
 from grading.grade_registry_writer import NameMatcher as CoreNameMatcher
 from grading.grade_registry_writer import RegistryManager
-from grading.models import Tenant
+from grading.models import RegistrySyncEntry, Tenant
 from grading.services.grade_registry_writer_service import (
     AuditLogger,
     GradeRegistryWriterService,
+    extract_word_file_info,
 )
 
 from .base import BaseTestCase
@@ -435,7 +440,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.addCleanup(size_patcher.stop)
         self.mock_validate_size = size_patcher.start()
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     @patch("grading.services.grade_registry_writer_service.NameMatcher")
     def test_process_single_word_file_success(self, mock_name_matcher, mock_processor):
         """测试成功处理单个Word文档"""
@@ -456,7 +461,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.assertEqual(result["grade"], "A")
         self.assertIsNone(result["error_message"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     def test_process_single_word_file_no_student_name(self, mock_processor):
         """测试无法提取学生姓名"""
         mock_processor.extract_student_name.return_value = None
@@ -468,7 +473,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.assertFalse(result["success"])
         self.assertIn("无法提取学生姓名", result["error_message"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     def test_process_single_word_file_no_grade(self, mock_processor):
         """测试无法提取成绩"""
         mock_processor.extract_student_name.return_value = "张三"
@@ -481,7 +486,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.assertFalse(result["success"])
         self.assertIn("无法提取成绩", result["error_message"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     @patch("grading.services.grade_registry_writer_service.NameMatcher")
     def test_process_single_word_file_name_not_matched(self, mock_name_matcher, mock_processor):
         """测试学生姓名未匹配"""
@@ -497,7 +502,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.assertFalse(result["success"])
         self.assertIn("未找到匹配的学生", result["error_message"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     @patch("grading.services.grade_registry_writer_service.NameMatcher")
     def test_process_single_word_file_filename_contains_student(
         self, mock_name_matcher, mock_processor
@@ -514,7 +519,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
 
         self.assertTrue(result["success"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     @patch("grading.services.grade_registry_writer_service.NameMatcher")
     def test_process_single_word_file_multiple_matches(self, mock_name_matcher, mock_processor):
         """测试学生姓名匹配到多个"""
@@ -530,7 +535,7 @@ class GradeRegistryWriterServiceProcessSingleWordFileTest(BaseTestCase):
         self.assertFalse(result["success"])
         self.assertIn("姓名匹配到多个学生", result["error_message"])
 
-    @patch("grading.services.grade_registry_writer_service.GradeFileProcessor")
+    @patch("grading.docx_extract.GradeFileProcessor")
     @patch("grading.services.grade_registry_writer_service.NameMatcher")
     def test_process_single_word_file_grade_skipped(self, mock_name_matcher, mock_processor):
         """测试成绩相同跳过写入"""
@@ -736,6 +741,285 @@ class GradeRegistryWriterServiceGradingSystemScenarioTest(BaseTestCase):
         self.assertIn("没有找到Word文档", result["error_message"])
 
 
+class GradingSystemFixtureMixin:
+    """作业评分系统场景的真实文件夹具：10 份作业（后两份没有成绩）和一个登分册"""
+
+    STUDENTS = [f"学生{i}" for i in range(1, 11)]
+
+    def setUp(self):
+        super().setUp()
+        self.tenant = Tenant.objects.create(name="测试租户")
+        self.service = GradeRegistryWriterService(
+            self.user, self.tenant, GradeRegistryWriterService.SCENARIO_GRADING_SYSTEM
+        )
+        self.temp_dir = tempfile.mkdtemp()
+        self.homework_dir = os.path.join(self.temp_dir, "第1次作业")
+        self.class_dir = os.path.join(self.temp_dir, "2024级计算机1班")
+        os.makedirs(self.homework_dir)
+        os.makedirs(self.class_dir)
+
+        self.registry_path = os.path.join(self.class_dir, "成绩登分册.xlsx")
+        workbook = Workbook()
+        worksheet = workbook.active
+        worksheet.append(["序号", "学号", "姓名"])
+        for index, name in enumerate(self.STUDENTS, start=1):
+            worksheet.append([index, f"2024{index:03d}", name])
+        workbook.save(self.registry_path)
+
+        for index, name in enumerate(self.STUDENTS):
+            doc = Document()
+            doc.add_paragraph("作业正文")
+            if index < 8:
+                doc.add_paragraph(f"老师评分：{'ABCD'[index % 4]}")
+            doc.save(os.path.join(self.homework_dir, f"{name}_作业1.docx"))
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        super().tearDown()
+
+    def _registry_grades(self):
+        worksheet = load_workbook(self.registry_path).active
+        return {
+            worksheet.cell(row, 3).value: worksheet.cell(row, 4).value
+            for row in range(2, worksheet.max_row + 1)
+        }
+
+
+class GradeRegistryWriterServiceParallelExtractTest(GradingSystemFixtureMixin, BaseTestCase):
+    """测试作业评分系统场景的并发解析与集中写入"""
+
+    def _run(self):
+        tracker = Mock()
+        with patch.object(
+            RegistryManager, "load", autospec=True, side_effect=RegistryManager.load
+        ) as mock_load:
+            result = self.service.process_grading_system_scenario(
+                self.homework_dir, self.class_dir, progress_tracker=tracker
+            )
+        self.assertEqual(mock_load.call_count, 1)
+
+        self.assertTrue(result["success"], result["error_message"])
+        self.assertEqual(result["statistics"]["success"], 8)
+        self.assertEqual(result["statistics"]["failed"], 2)
+        self.assertTrue(all("无法提取成绩" in f["error_message"] for f in result["failed_files"]))
+
+        grades = self._registry_grades()
+        self.assertEqual(grades["学生1"], "A")
+        self.assertEqual(grades["学生8"], "D")
+        self.assertIsNone(grades["学生9"])
+
+        # 解析阶段逐个上报进度，最后汇总完成
+        messages = [c.kwargs["message"] for c in tracker.update_progress.call_args_list]
+        self.assertEqual(len(messages), 10)
+        self.assertEqual(messages[-1], "正在解析第 10/10 个文件")
+        tracker.complete.assert_called_once()
+
+    @override_settings(GRADE_EXTRACT_WORKERS=2)
+    def test_process_pool_extraction(self):
+        """测试使用进程池解析后一次性写入登分册"""
+        self.assertEqual(self.service._get_extract_workers(len(self.STUDENTS)), 2)
+        # 逐个解析的退回路径不应被使用：结果必须全部来自进程池
+        with patch(
+            "grading.services.grade_registry_writer_service.extract_word_file_info",
+            side_effect=AssertionError("进程池解析失败，退回逐个解析"),
+        ) as mock_inline:
+            self._run()
+        mock_inline.assert_not_called()
+
+    @override_settings(GRADE_EXTRACT_WORKERS=1)
+    def test_inline_extraction(self):
+        """测试单进程解析结果与进程池一致"""
+        self.assertEqual(self.service._get_extract_workers(len(self.STUDENTS)), 1)
+        self._run()
+
+
+@override_settings(GRADE_EXTRACT_WORKERS=1)
+class GradeRegistryWriterServiceIncrementalSyncTest(GradingSystemFixtureMixin, BaseTestCase):
+    """测试登分册同步清单的增量登分"""
+
+    def _run(self, **kwargs):
+        with patch(
+            "grading.services.grade_registry_writer_service.extract_word_file_info",
+            side_effect=extract_word_file_info,
+        ) as mock_extract, patch.object(
+            RegistryManager, "load", autospec=True, side_effect=RegistryManager.load
+        ) as mock_load:
+            result = self.service.process_grading_system_scenario(
+                self.homework_dir, self.class_dir, **kwargs
+            )
+        self.assertTrue(result["success"], result["error_message"])
+        return result, mock_extract.call_count, mock_load.call_count
+
+    def test_unchanged_rerun_skips_registry(self):
+        """测试文件与登分册均未变化时不解析文件、不加载登分册"""
+        self._run()
+        result, extracted, loaded = self._run()
+
+        self.assertEqual((extracted, loaded), (0, 0))
+        self.assertEqual(result["reused_files"], 10)
+        self.assertEqual(result["statistics"]["skipped"], 8)
+        self.assertEqual(result["statistics"]["failed"], 2)
+        self.assertIn("无法提取成绩", result["failed_files"][0]["error_message"])
+
+    def test_only_changed_files_extracted(self):
+        """测试只重新解析变化的文件，并只改动成绩不同的单元格"""
+        self._run()
+        doc = Document()
+        doc.add_paragraph("老师评分：B")
+        doc.save(os.path.join(self.homework_dir, "学生1_作业1.docx"))
+
+        result, extracted, loaded = self._run()
+
+        self.assertEqual((extracted, loaded), (1, 1))
+        self.assertEqual(result["statistics"]["success"], 1)
+        self.assertEqual(result["statistics"]["skipped"], 7)
+        self.assertEqual(self._registry_grades()["学生1"], "B")
+
+    def test_registry_modified_reapplies_cached_results(self):
+        """测试登分册被修改后用缓存的解析结果重新写入"""
+        self._run()
+        workbook = load_workbook(self.registry_path)
+        workbook.active.cell(2, 4).value = "E"
+        workbook.save(self.registry_path)
+
+        result, extracted, loaded = self._run()
+
+        self.assertEqual((extracted, loaded), (0, 1))
+        self.assertEqual(result["statistics"]["success"], 1)
+        self.assertEqual(self._registry_grades()["学生1"], "A")
+
+    def test_force_full_rebuild(self):
+        """测试强制全量重建时重新解析全部文件"""
+        self._run()
+        result, extracted, _ = self._run(force_full=True)
+
+        self.assertEqual(extracted, 10)
+        self.assertEqual(result["reused_files"], 0)
+        self.assertEqual(RegistrySyncEntry.objects.count(), 10)
+        self.assertEqual(
+            RegistrySyncEntry.objects.filter(status=RegistrySyncEntry.STATUS_FAILED).count(), 2
+        )
+
+
+@override_settings(GRADE_EXTRACT_WORKERS=1)
+class GradeRegistryWriterServiceCourseScenarioTest(BaseTestCase):
+    """测试整门课程批量登分：每个登分册一次会话写入全部作业"""
+
+    CLASSES = ["2024级计算机1班", "2024级计算机2班"]
+    STUDENTS = ["张三", "李四", "王五"]
+
+    def setUp(self):
+        super().setUp()
+        self.tenant = Tenant.objects.create(name="测试租户")
+        self.service = GradeRegistryWriterService(
+            self.user, self.tenant, GradeRegistryWriterService.SCENARIO_GRADING_SYSTEM
+        )
+        self.temp_dir = tempfile.mkdtemp()
+        self.course_dir = os.path.join(self.temp_dir, "Python程序设计")
+        for class_name in self.CLASSES:
+            class_dir = os.path.join(self.course_dir, class_name)
+            os.makedirs(class_dir)
+            workbook = Workbook()
+            worksheet = workbook.active
+            worksheet.append(["序号", "学号", "姓名"])
+            for index, name in enumerate(self.STUDENTS, start=1):
+                worksheet.append([index, f"2024{index:03d}", name])
+            workbook.save(os.path.join(class_dir, "成绩登分册.xlsx"))
+
+            for number, grade in ((1, "A"), (2, "B")):
+                homework_dir = os.path.join(class_dir, f"第{number}次作业")
+                os.makedirs(homework_dir)
+                for name in self.STUDENTS:
+                    doc = Document()
+                    doc.add_paragraph(f"老师评分：{grade}")
+                    doc.save(os.path.join(homework_dir, f"{name}_作业{number}.docx"))
+
+        # 没有登分册的班级目录应被忽略
+        os.makedirs(os.path.join(self.course_dir, "旁听", "第1次作业"))
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        super().tearDown()
+
+    def _run(self, **kwargs):
+        with patch.object(
+            RegistryManager, "load", autospec=True, side_effect=RegistryManager.load
+        ) as mock_load, patch.object(
+            RegistryManager, "save", autospec=True, side_effect=RegistryManager.save
+        ) as mock_save, patch.object(
+            RegistryManager,
+            "create_backup",
+            autospec=True,
+            side_effect=RegistryManager.create_backup,
+        ) as mock_backup:
+            result = self.service.process_course_scenario(self.course_dir, **kwargs)
+        return result, (mock_load.call_count, mock_backup.call_count, mock_save.call_count)
+
+    def test_one_session_per_registry(self):
+        """测试每个登分册只加载、备份、保存一次，并写入全部作业列"""
+        with patch.object(
+            self.service, "_validate_excel_integrity", wraps=self.service._validate_excel_integrity
+        ) as mock_integrity:
+            result, calls = self._run()
+
+        self.assertTrue(result["success"], result["error_message"])
+        self.assertEqual(calls, (2, 2, 2))
+        mock_integrity.assert_not_called()
+        self.assertEqual(result["statistics"]["registries"], 2)
+        self.assertEqual(result["statistics"]["homeworks"], 4)
+        self.assertEqual(result["statistics"]["total"], 12)
+        self.assertEqual(result["statistics"]["success"], 12)
+        self.assertEqual(
+            [hw["homework_number"] for hw in result["registries"][0]["homeworks"]], [1, 2]
+        )
+
+        for class_name in self.CLASSES:
+            worksheet = load_workbook(
+                os.path.join(self.course_dir, class_name, "成绩登分册.xlsx")
+            ).active
+            # 第 N 次作业写在姓名列之后第 N 列
+            for row in range(2, 5):
+                self.assertEqual(worksheet.cell(row, 4).value, "A")
+                self.assertEqual(worksheet.cell(row, 5).value, "B")
+
+    def test_unchanged_rerun_skips_registries(self):
+        """测试再次登分时未变化的登分册不再加载"""
+        self._run()
+        result, calls = self._run()
+
+        self.assertTrue(result["success"], result["error_message"])
+        self.assertEqual(calls, (0, 0, 0))
+        self.assertEqual(result["reused_files"], 12)
+        self.assertTrue(all(r["up_to_date"] for r in result["registries"]))
+
+    def test_failed_registry_does_not_block_others(self):
+        """测试单个登分册失败时其余登分册照常写入"""
+        broken = os.path.join(self.course_dir, self.CLASSES[0], "成绩登分册.xlsx")
+        with open(broken, "wb") as f:
+            f.write(b"not a workbook")
+
+        result, _ = self._run()
+
+        self.assertFalse(result["success"])
+        self.assertIn("1/2", result["error_message"])
+        self.assertFalse(result["registries"][0]["success"])
+        self.assertTrue(result["registries"][1]["success"])
+        self.assertEqual(result["statistics"]["failed"], 6)
+        self.assertEqual(result["statistics"]["success"], 6)
+
+    def test_empty_course_directory(self):
+        """测试课程目录下没有可登分的班级"""
+        empty_dir = os.path.join(self.temp_dir, "空课程")
+        os.makedirs(empty_dir)
+
+        result = self.service.process_course_scenario(empty_dir)
+
+        self.assertFalse(result["success"])
+        self.assertIn("没有找到可登分的班级作业", result["error_message"])
+
+
 class GradeRegistryWriterServiceToolboxScenarioTest(BaseTestCase):
     """测试工具箱模块场景的完整流程"""
 
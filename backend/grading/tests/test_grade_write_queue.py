@@ -0,0 +1,367 @@
+"""
+评分写入合并队列测试
+
+测试 GradeWriteQueue 及其在评分接口中的使用：
+- 窗口内同一文件的多次提交合并为一次写入，后提交的字段覆盖先提交的
+- 写入完成前 pending() 返回待写入的修改（包括正在写入的修改）
+- 立即写入时连同已合并的修改一起写入并返回结果
+- 保存评价和评分只重写一次文件、推送一次，读取接口能读到尚未写入的内容
+- 后台写入失败时记录原因，下一次保存立即写入并返回警告，状态接口列出失败的文件
+- 是否需要立即写入由评分信息索引判断，文件未变化时不重新解析
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from docx import Document
+
+from grading import views
+from grading.models import Course, GlobalConfig, Repository, Semester, Tenant, UserProfile
+from grading.services.grade_write_queue import GradeWriteQueue
+
+
+class GradeWriteQueueTest(SimpleTestCase):
+    """测试合并队列"""
+
+    def setUp(self):
+        self.calls = []
+        self.queue = GradeWriteQueue(apply=self._apply, delay=60)
+        self.addCleanup(self.queue.flush)
+
+    def _apply(self, path, changes, context):
+        self.calls.append((path, dict(changes), dict(context)))
+        return "written"
+
+    def test_merges_changes_within_window(self):
+        self.queue.submit(
+            "/tmp/a.docx", {"grade": "B", "comment": "不错"}, {"teacher_name": "张老师"}
+        )
+        self.queue.submit("/tmp/a.docx", {"grade": "A"}, {"course": "数据结构"})
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.queue.pending("/tmp/a.docx"), {"grade": "A", "comment": "不错"})
+
+        self.assertEqual(self.queue.flush("/tmp/a.docx"), "written")
+        self.assertEqual(
+            self.calls,
+            [
+                (
+                    "/tmp/a.docx",
+                    {"grade": "A", "comment": "不错"},
+                    {"teacher_name": "张老师", "course": "数据结构"},
+                )
+            ],
+        )
+        self.assertEqual(self.queue.pending("/tmp/a.docx"), {})
+        self.assertIsNone(self.queue.flush("/tmp/a.docx"))
+
+    def test_immediate_submit_includes_pending_changes(self):
+        self.queue.submit("/tmp/a.docx", {"comment": "不错"})
+
+        result = self.queue.submit("/tmp/a.docx", {"grade": "C"}, immediate=True)
+
+        self.assertEqual(result, "written")
+        self.assertEqual(self.calls[0][1], {"comment": "不错", "grade": "C"})
+
+    def test_zero_delay_writes_immediately(self):
+        queue = GradeWriteQueue(apply=self._apply, delay=0)
+
+        self.assertEqual(queue.submit("/tmp/b.docx", {"grade": "A"}), "written")
+        self.assertEqual(len(self.calls), 1)
+
+    def test_timer_flushes_in_background(self):
+        done = threading.Event()
+
+        def apply(path, changes, context):
+            self.calls.append(changes)
+            done.set()
+
+        queue = GradeWriteQueue(apply=apply, delay=0.05)
+        queue.submit("/tmp/c.docx", {"grade": "A"})
+        queue.submit("/tmp/c.docx", {"comment": "很好"})
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.calls, [{"grade": "A", "comment": "很好"}])
+
+    def test_pending_visible_while_writing(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def apply(path, changes, context):
+            started.set()
+            release.wait(5)
+
+        queue = GradeWriteQueue(apply=apply, delay=60)
+        queue.submit("/tmp/d.docx", {"grade": "A"})
+        writer = threading.Thread(target=queue.flush, args=("/tmp/d.docx",))
+        writer.start()
+        self.assertTrue(started.wait(5))
+
+        queue.submit("/tmp/d.docx", {"comment": "很好"})
+        self.assertEqual(queue.pending("/tmp/d.docx"), {"grade": "A", "comment": "很好"})
+
+        release.set()
+        writer.join(5)
+        self.assertEqual(queue.pending("/tmp/d.docx"), {"comment": "很好"})
+        queue.flush("/tmp/d.docx")
+
+    def test_background_failure_recorded(self):
+        done = threading.Event()
+        results = [OSError("磁盘已满"), "文件已锁定"]
+
+        def apply(path, changes, context):
+            result = results.pop(0)
+            done.set()
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        queue = GradeWriteQueue(apply=apply, delay=0.01)
+        queue.submit("/tmp/e/a.docx", {"grade": "A"})
+        self.assertTrue(done.wait(5))
+        self.assertTrue(self._wait_for(lambda: queue.error("/tmp/e/a.docx")))
+        self.assertIn("磁盘已满", queue.error("/tmp/e/a.docx"))
+
+        # apply 返回的警告也记录下来
+        done.clear()
+        queue.submit("/tmp/e/b.docx", {"grade": "B"})
+        self.assertTrue(done.wait(5))
+        self.assertTrue(self._wait_for(lambda: queue.error("/tmp/e/b.docx")))
+        self.assertEqual(
+            queue.errors_under("/tmp/e"),
+            {"/tmp/e/a.docx": queue.error("/tmp/e/a.docx"), "/tmp/e/b.docx": "文件已锁定"},
+        )
+        self.assertEqual(queue.errors_under("/tmp/f"), {})
+
+        # 之后写入成功时清除
+        results.append(None)
+        self.assertIsNone(queue.submit("/tmp/e/a.docx", {"grade": "A"}, immediate=True))
+        self.assertIsNone(queue.error("/tmp/e/a.docx"))
+
+    def test_flush_under_only_writes_directory(self):
+        self.queue.submit("/tmp/repo1/a.docx", {"grade": "A"})
+        self.queue.submit("/tmp/repo10/b.docx", {"grade": "B"})
+
+        self.queue.flush_under("/tmp/repo1")
+
+        self.assertEqual([call[0] for call in self.calls], ["/tmp/repo1/a.docx"])
+        self.assertEqual(self.queue.pending("/tmp/repo10/b.docx"), {"grade": "B"})
+
+    def _wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return condition()
+
+
+@override_settings(GRADE_WRITE_DELAY_SECONDS=60)
+class GradeWriteCoalescingViewTest(TestCase):
+    """测试评分接口合并写入"""
+
+    def setUp(self):
+        tenant = Tenant.objects.create(name="测试租户")
+        self.user = User.objects.create_user(
+            username="teacher", password="testpass123", is_staff=True
+        )
+        UserProfile.objects.create(user=self.user, tenant=tenant)
+        today = date.today()
+        semester = Semester.objects.create(
+            name="2024春季学期",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=60),
+            is_active=True,
+        )
+        Course.objects.create(
+            name="数据结构",
+            course_type="theory",
+            semester=semester,
+            teacher=self.user,
+            location="教室B",
+        )
+
+        self.temp_base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_base_dir, ignore_errors=True)
+        GlobalConfig.set_value("default_repo_base_dir", self.temp_base_dir)
+        self.repository = Repository.objects.create(
+            name="测试仓库",
+            owner=self.user,
+            tenant=tenant,
+            repo_type="filesystem",
+            path="test-repo",
+            is_active=True,
+        )
+        repo_dir = self.repository.get_full_path()
+        os.makedirs(repo_dir, exist_ok=True)
+        self.full_path = os.path.join(repo_dir, "作业.docx")
+        doc = Document()
+        doc.add_paragraph("作业内容")
+        doc.save(self.full_path)
+
+        self.addCleanup(views._grade_write_queue.flush)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comment_and_grade_written_once(self):
+        with (
+            patch(
+                "grading.views.write_grade_and_comment_to_file",
+                wraps=views.write_grade_and_comment_to_file,
+            ) as mock_write,
+            patch("grading.views.push_grade_changes") as mock_push,
+        ):
+            response = self.client.post(
+                "/grading/save_teacher_comment/",
+                {
+                    "file_path": "作业.docx",
+                    "comment": "思路清晰",
+                    "grade": "B",
+                    "repo_id": self.repository.id,
+                },
+            )
+            self.assertTrue(response.json().get("success"))
+            response = self.client.post(
+                "/grading/add_grade_to_file/",
+                {
+                    "path": "作业.docx",
+                    "grade": "A",
+                    "grade_type": "letter",
+                    "repo_id": self.repository.id,
+                    "is_lab_report": "false",
+                },
+            )
+            self.assertEqual(response.json().get("status"), "success")
+
+            # 尚未写入文件，但读取接口返回待写入的内容
+            mock_write.assert_not_called()
+            comment = self.client.get(
+                "/grading/get_teacher_comment/",
+                {"file_path": "作业.docx", "repo_id": self.repository.id},
+            ).json()
+            self.assertEqual(comment["comment"], "思路清晰")
+            info = self.client.get(
+                "/grading/get_file_grade_info/",
+                {"path": "作业.docx", "repo_id": self.repository.id},
+            ).json()
+            self.assertEqual(
+                (info["has_grade"], info["grade"], info["grade_type"]), (True, "A", "letter")
+            )
+
+            views._grade_write_queue.flush(self.full_path)
+
+        self.assertEqual(mock_write.call_count, 1)
+        self.assertEqual(mock_push.call_count, 1)
+        texts = [p.text for p in Document(self.full_path).paragraphs]
+        self.assertIn("老师评分：A", texts)
+        self.assertIn("教师评价：思路清晰", texts)
+        self.assertNotIn("老师评分：B", texts)
+
+    def test_remove_grade_flushes_pending_write(self):
+        self.client.post(
+            "/grading/add_grade_to_file/",
+            {
+                "path": "作业.docx",
+                "grade": "A",
+                "grade_type": "letter",
+                "repo_id": self.repository.id,
+                "is_lab_report": "false",
+            },
+        )
+
+        self.client.post(
+            "/grading/remove_grade/", {"path": "作业.docx", "repo_id": self.repository.id}
+        )
+
+        self.assertEqual(views._grade_write_queue.pending(self.full_path), {})
+        texts = [p.text for p in Document(self.full_path).paragraphs]
+        self.assertNotIn("老师评分：A", texts)
+
+    def test_failed_background_write_reported(self):
+        with patch(
+            "grading.views.write_grade_and_comment_to_file", side_effect=OSError("磁盘已满")
+        ):
+            self.client.post(
+                "/grading/add_grade_to_file/",
+                {
+                    "path": "作业.docx",
+                    "grade": "A",
+                    "grade_type": "letter",
+                    "repo_id": self.repository.id,
+                    "is_lab_report": "false",
+                },
+            )
+            views._grade_write_queue.flush()
+
+        info = self.client.get(
+            "/grading/get_file_grade_info/", {"path": "作业.docx", "repo_id": self.repository.id}
+        ).json()
+        self.assertIn("磁盘已满", info["write_error"])
+        status = self.client.get(
+            "/grading/grade_push_status/", {"repo_id": self.repository.id}
+        ).json()
+        self.assertEqual(list(status["write_errors"]), ["作业.docx"])
+
+        # 下一次保存立即写入，并提示上次的失败
+        response = self.client.post(
+            "/grading/add_grade_to_file/",
+            {
+                "path": "作业.docx",
+                "grade": "B",
+                "grade_type": "letter",
+                "repo_id": self.repository.id,
+                "is_lab_report": "false",
+            },
+        ).json()
+        self.assertIn("上次保存未能写入文件", response["warning"])
+        self.assertEqual(views._grade_write_queue.pending(self.full_path), {})
+        self.assertIn("老师评分：B", [p.text for p in Document(self.full_path).paragraphs])
+        self.assertIsNone(views._grade_write_queue.error(self.full_path))
+
+
+class GradeWriteNeedsSyncTest(TestCase):
+    """测试是否需要立即写入的判断"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def _save(self, name, signature=False, locked=False):
+        doc = Document()
+        table = doc.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "实验名称"
+        if signature:
+            table.cell(0, 1).text = "教师（签字）：\n时间："
+        if locked:
+            doc.add_paragraph("【格式错误-已锁定】")
+        path = os.path.join(self.temp_dir, name)
+        doc.save(path)
+        return path
+
+    def test_uses_grade_info_index(self):
+        valid = self._save("有签字.docx", signature=True)
+        missing = self._save("无签字.docx")
+        locked = self._save("已锁定.docx", locked=True)
+
+        expected = {
+            (valid, True): False,
+            (missing, True): True,
+            (missing, False): False,
+            (locked, False): True,
+        }
+        for path in (valid, missing, locked):
+            views._grade_info_index.get(path)
+
+        # 索引中已有解析结果，不再打开文件
+        with patch("grading.views.open_docx", side_effect=AssertionError("重新解析了文件")):
+            for (path, is_lab_report), needs_sync in expected.items():
+                self.assertEqual(
+                    views._grade_write_needs_sync(path, is_lab_report), needs_sync, path
+                )
@@ -0,0 +1,188 @@
+"""
+RepositoryCatalog 单元测试
+
+测试仓库文件目录：
+- 首次刷新记录所有文件与目录，并推断课程 / 班级 / 作业 / 学生
+- 增量刷新只重新列出 mtime 变化的目录
+- 删除目录时连同下级条目一起删除
+- 按变化路径局部刷新
+- 只刷新指定目录
+- 列表、计数与空间统计查询
+- 完整刷新后标记为当前，读取方只使用当前的目录
+"""
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from grading.models import Repository, RepositoryCatalogEntry
+from grading.services.repository_catalog import RepositoryCatalog
+
+
+class RepositoryCatalogTest(TestCase):
+    """RepositoryCatalog 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.homework_dir = os.path.join(self.temp_dir, "数据结构", "1班", "第1次作业")
+        os.makedirs(self.homework_dir)
+        os.makedirs(os.path.join(self.temp_dir, ".git"))
+
+        owner = User.objects.create_user(username="teacher", password="testpass123")
+        self.repository = Repository.objects.create(
+            owner=owner, name="作业仓库", repo_type="filesystem", path="repo"
+        )
+        patcher = patch.object(Repository, "get_full_path", return_value=self.temp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.catalog = RepositoryCatalog(self.repository)
+
+    def _write(self, rel_path, content=b"x"):
+        path = os.path.join(self.temp_dir, *rel_path.split("/"))
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _bump_dir_mtime(self, rel_dir):
+        """部分文件系统的 mtime 精度较低，手动推进目录 mtime 以确保被识别为变化"""
+        path = os.path.join(self.temp_dir, *rel_dir.split("/")) if rel_dir else self.temp_dir
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_initial_refresh(self):
+        """测试首次刷新记录文件与推断字段，并跳过隐藏目录"""
+        self._write("数据结构/1班/第1次作业/张三.docx", b"12345")
+
+        stats = self.catalog.refresh()
+
+        self.assertEqual(stats["created"], 4)
+        entry = RepositoryCatalogEntry.objects.get(
+            repository=self.repository, path="数据结构/1班/第1次作业/张三.docx"
+        )
+        self.assertEqual(entry.size, 5)
+        self.assertEqual(entry.depth, 4)
+        self.assertEqual(entry.extension, ".docx")
+        self.assertEqual(
+            (entry.course_name, entry.class_name, entry.homework_name, entry.student_name),
+            ("数据结构", "1班", "第1次作业", "张三"),
+        )
+        self.assertFalse(
+            RepositoryCatalogEntry.objects.filter(repository=self.repository, name=".git").exists()
+        )
+        self.assertEqual(self.catalog.list_courses(), ["数据结构"])
+
+    def test_unchanged_directories_are_not_rescanned(self):
+        """测试目录 mtime 未变化时不重新列出"""
+        self._write("数据结构/1班/第1次作业/张三.docx")
+        self.catalog.refresh()
+
+        self.assertEqual(self.catalog.refresh()["scanned_dirs"], 0)
+
+        self._write("数据结构/1班/第1次作业/李四.docx")
+        self._bump_dir_mtime("数据结构/1班/第1次作业")
+        stats = self.catalog.refresh()
+
+        self.assertEqual(stats["scanned_dirs"], 1)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(self.catalog.count_files("数据结构/1班/第1次作业"), 2)
+
+    def test_deleted_directory_removes_descendants(self):
+        """测试删除目录时连同下级条目一起删除"""
+        self._write("数据结构/1班/第1次作业/张三.docx")
+        self.catalog.refresh()
+
+        shutil.rmtree(os.path.join(self.temp_dir, "数据结构", "1班"))
+        self._bump_dir_mtime("数据结构")
+        self.catalog.refresh()
+
+        self.assertEqual(
+            list(self.catalog.entries.order_by("path").values_list("path", flat=True)),
+            ["", "数据结构"],
+        )
+
+    def test_refresh_paths_detects_in_place_modification(self):
+        """测试按变化路径刷新能识别不改变目录 mtime 的文件修改"""
+        path = self._write("数据结构/1班/第1次作业/张三.docx", b"1")
+        self.catalog.refresh()
+
+        self._write("数据结构/1班/第1次作业/张三.docx", b"123")
+        stats = self.catalog.refresh_paths([path])
+
+        self.assertEqual(stats["updated"], 1)
+        self.assertEqual(self.catalog.total_size(), 3)
+
+    def test_list_files_respects_depth(self):
+        """测试按层级列出目录下的文件"""
+        self._write("数据结构/1班/第1次作业/张三.docx")
+        os.makedirs(os.path.join(self.homework_dir, "附件"))
+        self._write("数据结构/1班/第1次作业/附件/图1.png")
+        self.catalog.refresh()
+
+        files = self.catalog.list_files("数据结构/1班/第1次作业", max_depth=1)
+
+        self.assertEqual([entry.name for entry in files], ["张三.docx"])
+        self.assertEqual(self.catalog.list_files("数据结构").count(), 2)
+
+    def test_full_refresh_marks_current(self):
+        """测试只有刷新整个仓库才标记为当前，刷新失败时取消标记"""
+        self.assertIsNone(RepositoryCatalog.current(self.repository))
+
+        self.catalog.refresh(rel_root="数据结构")
+        self.assertIsNone(RepositoryCatalog.current(self.repository))
+
+        self.catalog.refresh()
+        self.assertIsNotNone(RepositoryCatalog.current(self.repository))
+
+        RepositoryCatalog.mark_stale(self.repository)
+        self.assertIsNone(RepositoryCatalog.current(self.repository))
+
+    def test_list_subtree_and_has_dir(self):
+        """测试子树查询与目录记录检查"""
+        self._write("数据结构/1班/第1次作业/张三.docx")
+        self.catalog.refresh()
+        os.makedirs(os.path.join(self.temp_dir, "Python程序设计"))
+
+        self.assertEqual(
+            list(self.catalog.list_subtree("数据结构/1班").values_list("path", flat=True)),
+            ["数据结构/1班", "数据结构/1班/第1次作业", "数据结构/1班/第1次作业/张三.docx"],
+        )
+        self.assertTrue(self.catalog.has_dir("数据结构/1班"))
+        # 尚未刷新的新目录
+        self.assertFalse(self.catalog.has_dir("Python程序设计"))
+        self.assertEqual(
+            self.catalog.relative_path(os.path.join(self.temp_dir, "数据结构")), "数据结构"
+        )
+        self.assertIsNone(self.catalog.relative_path(os.path.join(self.temp_dir, ".git")))
+
+    def test_refresh_subtree_only_scans_folder(self):
+        """测试只刷新指定目录：重新列出作业文件夹，不扫描其他课程"""
+        self._write("数据结构/1班/第1次作业/张三.docx", b"1")
+        os.makedirs(os.path.join(self.temp_dir, "Python程序设计"))
+        self.catalog.refresh()
+
+        self._write("数据结构/1班/第1次作业/张三.docx", b"123")
+        stats = self.catalog.refresh(full=True, rel_root="数据结构/1班/第1次作业")
+
+        self.assertEqual((stats["scanned_dirs"], stats["updated"]), (1, 1))
+        self.assertEqual(self.catalog.total_size(), 3)
+
+    def test_refresh_command_marks_current(self):
+        """测试 refresh_repository_catalogs 命令刷新目录并标记为当前"""
+        self._write("数据结构/1班/第1次作业/张三.docx")
+
+        call_command(
+            "refresh_repository_catalogs", repository=[self.repository.id], stdout=StringIO()
+        )
+
+        catalog = RepositoryCatalog.current(self.repository)
+        self.assertIsNotNone(catalog)
+        self.assertEqual(catalog.count_files("数据结构/1班/第1次作业"), 1)
@@ -0,0 +1,195 @@
+"""
+StorageUsageService 单元测试
+
+测试存储空间计数：
+- 上传时累加仓库与学生计数，覆盖同名文件只累加差值
+- 汇总行不存在时以初始计数新建，请求中不对账；--pending 只对账这些仓库
+- 空间检查读取计数，不遍历仓库目录
+- 对账修正仓库外修改造成的偏差
+- 提交 blob 单独占用的空间计入用量，对账时回收不再被引用的 blob
+- 租户用量报表单次查询
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+
+from grading.models import (
+    Class,
+    Course,
+    Homework,
+    Repository,
+    Semester,
+    StorageUsage,
+    Tenant,
+)
+from grading.services.file_upload_service import FileUploadService
+from grading.services.repository_catalog import RepositoryCatalog
+from grading.services.storage_usage import StorageUsageService
+from grading.services.submission_blob_store import SubmissionBlobStore
+
+
+class StorageUsageServiceTest(TestCase):
+    """StorageUsageService 单元测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        patcher = patch.object(Repository, "get_full_path", return_value=self.temp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 不依赖测试机文件系统是否支持 reflink：工作副本总是硬链接到 blob
+        patcher = patch("grading.services.submission_blob_store._reflink", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tenant = Tenant.objects.create(name="测试学校", is_active=True)
+        self.teacher = User.objects.create_user(username="teacher", password="testpass123")
+        self.student = User.objects.create_user(
+            username="student", password="testpass123", first_name="张三"
+        )
+        today = date.today()
+        semester = Semester.objects.create(
+            name="2024年春季学期",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=60),
+        )
+        course = Course.objects.create(
+            semester=semester, teacher=self.teacher, name="数据结构", tenant=self.tenant
+        )
+        class_obj = Class.objects.create(tenant=self.tenant, course=course, name="1班")
+        self.repository = Repository.objects.create(
+            owner=self.teacher,
+            tenant=self.tenant,
+            class_obj=class_obj,
+            name="作业仓库",
+            repo_type="filesystem",
+            allocated_space_mb=1,
+        )
+        self.homework = Homework.objects.create(
+            tenant=self.tenant,
+            course=course,
+            class_obj=class_obj,
+            title="第一次作业",
+            folder_name="第1次作业",
+        )
+        self.service = StorageUsageService()
+        self.upload_service = FileUploadService()
+
+    def _upload(self, name, size):
+        return self.upload_service.upload_submission(
+            student=self.student,
+            homework=self.homework,
+            file=SimpleUploadedFile(name, b"x" * size),
+            repository=self.repository,
+        )
+
+    def test_upload_updates_counters(self):
+        """测试上传累加计数，覆盖同名文件只累加差值，被覆盖版本的 blob 计入用量"""
+        self._upload("作业.docx", 1000)
+        self._upload("作业.docx", 1500)
+        self._upload("附件.pdf", 200)
+
+        # 工作副本 1500 + 200，第一版的 blob 不再与工作副本共用 inode：1000
+        usage = self.service.get_repository_usage(self.repository)
+        self.assertEqual((usage.used_bytes, usage.file_count), (2700, 2))
+        self.assertEqual(self.service.get_student_usage(self.repository, self.student), 2700)
+
+        self.service.reconcile(self.repository)
+        usage.refresh_from_db()
+        self.assertEqual((usage.used_bytes, usage.file_count), (2700, 2))
+        self.assertEqual(self.service.get_student_usage(self.repository, self.student), 2700)
+
+    def test_reconcile_collects_unreferenced_blobs(self):
+        """测试对账回收不再被提交记录引用的 blob"""
+        submission = self._upload("作业.docx", 1000)
+        self._upload("作业.docx", 1500)
+        store = SubmissionBlobStore.for_repository(self.repository)
+        old_blob = store.blob_path(submission.content_hash)
+        os.utime(old_blob, (0, 0))
+        submission.delete()
+
+        usage = self.service.reconcile(self.repository)
+
+        self.assertFalse(os.path.exists(old_blob))
+        self.assertEqual(usage.used_bytes, 1500)
+
+    def test_first_change_does_not_reconcile(self):
+        """测试汇总行不存在时以本次变化新建（尚未对账），请求中不对账"""
+        with open(os.path.join(self.temp_dir, "说明.txt"), "wb") as f:
+            f.write(b"x" * 50)
+
+        with patch.object(StorageUsageService, "reconcile", side_effect=AssertionError):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.service.record_change(self.repository, 100, 1, student=self.student)
+
+        usage = StorageUsage.objects.get(repository=self.repository, student__isnull=True)
+        self.assertEqual((usage.used_bytes, usage.file_count, usage.reconciled_at), (100, 1, None))
+
+    def test_missing_row_seeded_from_current_catalog(self):
+        """测试读取时汇总行不存在则按当前文件目录的合计新建，--pending 只对账未对账的仓库"""
+        with open(os.path.join(self.temp_dir, "说明.txt"), "wb") as f:
+            f.write(b"x" * 50)
+        RepositoryCatalog(self.repository).refresh()
+
+        with patch.object(StorageUsageService, "reconcile", side_effect=AssertionError):
+            usage = self.service.get_repository_usage(self.repository)
+        self.assertEqual((usage.used_bytes, usage.file_count, usage.reconciled_at), (50, 1, None))
+
+        call_command("reconcile_storage_usage", pending=True, stdout=StringIO())
+        usage.refresh_from_db()
+        self.assertIsNotNone(usage.reconciled_at)
+
+        with patch.object(StorageUsageService, "reconcile") as mock_reconcile:
+            call_command("reconcile_storage_usage", pending=True, stdout=StringIO())
+        mock_reconcile.assert_not_called()
+
+    def test_check_storage_space_reads_counter(self):
+        """测试空间检查读取计数而不刷新仓库文件目录"""
+        self._upload("作业.docx", 1024 * 512)
+
+        with patch.object(RepositoryCatalog, "refresh", side_effect=AssertionError):
+            used_mb, total_mb, percentage = self.upload_service.check_storage_space(self.repository)
+
+        self.assertEqual((used_mb, total_mb), (0, 1))
+        self.assertEqual(percentage, 50.0)
+
+    def test_reconcile_corrects_drift(self):
+        """测试对账以磁盘为准修正计数"""
+        submission = self._upload("作业.docx", 100)
+        with open(submission.file_path, "wb") as f:
+            f.write(b"x" * 300)
+        with open(os.path.join(self.temp_dir, "说明.txt"), "wb") as f:
+            f.write(b"x" * 50)
+
+        call_command("reconcile_storage_usage", repository=[self.repository.id], stdout=StringIO())
+
+        usage = StorageUsage.objects.get(repository=self.repository, student__isnull=True)
+        self.assertEqual((usage.used_bytes, usage.file_count), (350, 2))
+        self.assertIsNotNone(usage.reconciled_at)
+        self.assertEqual(self.service.get_student_usage(self.repository, self.student), 300)
+
+    def test_tenant_report_single_query(self):
+        """测试租户报表单次查询，未对账的仓库用量为空"""
+        self._upload("作业.docx", 1024 * 256)
+        Repository.objects.create(
+            owner=self.teacher, tenant=self.tenant, name="新仓库", repo_type="filesystem"
+        )
+
+        with self.assertNumQueries(1):
+            report = self.service.tenant_report(self.tenant)
+
+        by_name = {row["name"]: row for row in report}
+        self.assertEqual(by_name["作业仓库"]["used_bytes"], 1024 * 256)
+        self.assertEqual(by_name["作业仓库"]["usage_percentage"], 25.0)
+        self.assertIsNone(by_name["新仓库"]["used_bytes"])
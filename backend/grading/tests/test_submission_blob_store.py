@@ -0,0 +1,194 @@
+"""
+提交文件内容寻址存储测试
+
+测试 SubmissionBlobStore 及其在上传流程中的使用：
+- 流式写入计算哈希，相同内容只保存一份
+- 工作副本原子替换；硬链接的副本写入前与 blob 分离，修改副本不影响 blob
+- 按引用计数回收不再被引用的 blob
+- 上传记录内容哈希，相同内容的新版本共用 blob 且不重写未修改的工作副本
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from grading.models import Class, Course, Homework, Repository, Semester, Tenant
+from grading.services.file_upload_service import FileUploadService
+from grading.services.submission_blob_store import BLOB_DIR_NAME, SubmissionBlobStore, detach
+
+
+class SubmissionBlobStoreTest(SimpleTestCase):
+    """测试 blob 存储"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.store = SubmissionBlobStore(os.path.join(self.temp_dir, BLOB_DIR_NAME))
+
+    def _blob_files(self):
+        return [
+            name
+            for root, _, names in os.walk(self.store.root)
+            for name in names
+            if not root.startswith(self.store.tmp_dir)
+        ]
+
+    def test_write_hashes_while_streaming(self):
+        content_hash, size = self.store.write([b"hello ", b"world"])
+
+        self.assertEqual(content_hash, hashlib.sha256(b"hello world").hexdigest())
+        self.assertEqual(size, 11)
+        with self.store.open(content_hash) as f:
+            self.assertEqual(f.read(), b"hello world")
+        self.assertEqual(os.listdir(self.store.tmp_dir), [])
+
+    def test_identical_content_shares_blob(self):
+        first, _ = self.store.write([b"same"])
+        second, _ = self.store.write([b"sa", b"me"])
+
+        self.assertEqual(first, second)
+        self.assertEqual(self._blob_files(), [first])
+
+    def test_failed_write_leaves_no_temp_file(self):
+        def chunks():
+            yield b"partial"
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            self.store.write(chunks())
+        self.assertEqual(os.listdir(self.store.tmp_dir), [])
+        self.assertEqual(self._blob_files(), [])
+
+    def test_materialized_copy_is_independent(self):
+        content_hash, _ = self.store.write([b"original"])
+        dest = os.path.join(self.temp_dir, "课程", "张三.docx")
+
+        self.store.materialize(content_hash, dest)
+        # 写入评分前先与 blob 分离
+        detach(dest)
+        with open(dest, "wb") as f:
+            f.write(b"graded")
+
+        with self.store.open(content_hash) as f:
+            self.assertEqual(f.read(), b"original")
+        self.assertEqual(os.listdir(os.path.dirname(dest)), ["张三.docx"])
+
+    @patch("grading.services.submission_blob_store._reflink", return_value=False)
+    def test_materialize_hardlinks_and_detach_breaks_link(self, _mock_reflink):
+        content_hash, size = self.store.write([b"original"])
+        dest = os.path.join(self.temp_dir, "张三.docx")
+
+        self.store.materialize(content_hash, dest)
+
+        self.assertTrue(os.path.samefile(dest, self.store.blob_path(content_hash)))
+        self.assertEqual(self.store.unshared_size(content_hash), 0)
+        self.assertTrue(detach(dest))
+        self.assertFalse(os.path.samefile(dest, self.store.blob_path(content_hash)))
+        self.assertEqual(self.store.unshared_bytes(), {content_hash: size})
+        self.assertFalse(detach(dest))
+
+    @override_settings(SUBMISSION_BLOB_HARDLINK=False)
+    @patch("grading.services.submission_blob_store._reflink", return_value=False)
+    def test_materialize_copies_when_hardlink_disabled(self, _mock_reflink):
+        content_hash, _ = self.store.write([b"original"])
+        dest = os.path.join(self.temp_dir, "张三.docx")
+
+        self.store.materialize(content_hash, dest)
+
+        self.assertFalse(os.path.samefile(dest, self.store.blob_path(content_hash)))
+
+    def test_collect_garbage_removes_unreferenced_blobs(self):
+        referenced, _ = self.store.write([b"referenced"])
+        orphan, orphan_size = self.store.write([b"orphan"])
+        recent, _ = self.store.write([b"recent upload"])
+        old = time.time() - 7200
+        for content_hash in (referenced, orphan):
+            os.utime(self.store.blob_path(content_hash), (old, old))
+
+        deleted, freed = self.store.collect_garbage({referenced: 2, orphan: 0})
+
+        self.assertEqual((deleted, freed), (1, orphan_size))
+        self.assertEqual(sorted(self._blob_files()), sorted([referenced, recent]))
+
+
+class UploadContentHashTest(TestCase):
+    """测试上传流程记录内容哈希并去重"""
+
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        patcher = patch.object(Repository, "get_full_path", return_value=self.temp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tenant = Tenant.objects.create(name="测试学校")
+        teacher = User.objects.create_user(username="teacher", password="testpass123")
+        self.student = User.objects.create_user(username="student", password="testpass123")
+        today = date.today()
+        semester = Semester.objects.create(
+            name="2024年春季学期",
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=60),
+        )
+        course = Course.objects.create(
+            semester=semester, teacher=teacher, name="数据结构", tenant=tenant
+        )
+        class_obj = Class.objects.create(tenant=tenant, course=course, name="1班")
+        self.repository = Repository.objects.create(
+            owner=teacher,
+            tenant=tenant,
+            class_obj=class_obj,
+            name="作业仓库",
+            repo_type="filesystem",
+        )
+        self.homework = Homework.objects.create(
+            tenant=tenant,
+            course=course,
+            class_obj=class_obj,
+            title="第一次作业",
+            folder_name="第1次作业",
+        )
+        self.service = FileUploadService()
+
+    def _upload(self, content):
+        return self.service.upload_submission(
+            student=self.student,
+            homework=self.homework,
+            file=SimpleUploadedFile("作业.docx", content),
+            repository=self.repository,
+        )
+
+    def test_identical_reupload_shares_blob_and_keeps_file(self):
+        """测试相同内容重新上传共用 blob，且不重写工作副本"""
+        first = self._upload(b"version one")
+        mtime_ns = os.stat(first.file_path).st_mtime_ns
+
+        with patch.object(SubmissionBlobStore, "materialize") as mock_materialize:
+            second = self._upload(b"version one")
+
+        mock_materialize.assert_not_called()
+        self.assertEqual(second.version, 2)
+        self.assertEqual(second.content_hash, first.content_hash)
+        self.assertEqual(first.content_hash, hashlib.sha256(b"version one").hexdigest())
+        self.assertEqual(os.stat(first.file_path).st_mtime_ns, mtime_ns)
+
+    def test_changed_content_keeps_previous_version(self):
+        """测试新内容覆盖工作副本，旧版本仍可从 blob 读取"""
+        first = self._upload(b"version one")
+        second = self._upload(b"version two")
+
+        with open(second.file_path, "rb") as f:
+            self.assertEqual(f.read(), b"version two")
+        store = SubmissionBlobStore.for_repository(self.repository)
+        with store.open(first.content_hash) as f:
+            self.assertEqual(f.read(), b"version one")
@@ -0,0 +1,151 @@
+"""
+两级缓存后端测试
+
+测试 TwoTierCache 的进程内 LRU 层：
+- 命中与共享层回填
+- 容量淘汰
+- 与命名空间版本号的一致性（版本号在进程内层的保留时间）
+- 统计信息
+"""
+
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from grading.cache_manager import CacheManager, TwoTierCache
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    """测试两级缓存后端"""
+
+    def _make_cache(self, **options):
+        location = f"two-tier-{uuid.uuid4().hex}"
+        return TwoTierCache(
+            location,
+            {
+                "OPTIONS": {
+                    "SHARED": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                        "LOCATION": location,
+                    },
+                    **options,
+                }
+            },
+        )
+
+    def test_local_hit_skips_shared(self):
+        """测试进程内命中不访问共享层"""
+        tiered = self._make_cache()
+        tiered.set("dir_tree:/a", {"name": "a"})
+
+        with patch.object(tiered.shared, "get", side_effect=AssertionError) as mock_get:
+            self.assertEqual(tiered.get("dir_tree:/a"), {"name": "a"})
+        mock_get.assert_not_called()
+
+    def test_returned_value_is_a_copy(self):
+        """测试修改返回值不影响缓存"""
+        tiered = self._make_cache()
+        tiered.set("dir_tree:/a", {"children": []})
+
+        tiered.get("dir_tree:/a")["children"].append("x")
+
+        self.assertEqual(tiered.get("dir_tree:/a"), {"children": []})
+
+    def test_shared_hit_fills_local(self):
+        """测试共享层命中后回填进程内层"""
+        tiered = self._make_cache()
+        tiered.shared.set("file_count:/a", 3)
+
+        self.assertEqual(tiered.get("file_count:/a"), 3)
+        self.assertEqual(tiered.get("file_count:/a"), 3)
+
+        counters = tiered.get_stats()["prefixes"]["file_count"]
+        self.assertEqual(counters["shared_hits"], 1)
+        self.assertEqual(counters["local_hits"], 1)
+
+    def test_unlisted_prefix_always_reads_shared(self):
+        """测试未配置的前缀（如进度信息）不进入进程内层"""
+        tiered = self._make_cache()
+        tiered.set("batch_grade_progress:1", {"processed": 1})
+        tiered.shared.set("batch_grade_progress:1", {"processed": 2})
+
+        self.assertEqual(tiered.get("batch_grade_progress:1"), {"processed": 2})
+        self.assertEqual(tiered.get_stats()["entries"], 0)
+
+    def test_evicts_by_entries_and_bytes(self):
+        """测试按条目数与字节数淘汰"""
+        tiered = self._make_cache(LOCAL_MAX_ENTRIES=2, LOCAL_MAX_BYTES=10_000)
+        for name in ("a", "b", "c"):
+            tiered.set(f"dir_tree:/{name}", name)
+        tiered.set("file_content:/big", "x" * 20_000)
+
+        stats = tiered.get_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["prefixes"]["dir_tree"]["evictions"], 1)
+        self.assertNotIn("file_content", stats["prefixes"])
+        self.assertEqual(tiered.get("file_content:/big"), "x" * 20_000)
+
+    def test_local_entries_expire(self):
+        """测试进程内条目过期后回到共享层"""
+        tiered = self._make_cache(LOCAL_TIMEOUT=0.5)
+        tiered.set("dir_tree:/a", "old")
+        tiered.shared.set("dir_tree:/a", "new")
+
+        with patch("grading.cache_manager.time.monotonic", return_value=10**9):
+            self.assertEqual(tiered.get("dir_tree:/a"), "new")
+
+    def test_namespace_invalidation_reaches_other_processes(self):
+        """测试另一个进程递增命名空间版本后本进程的进程内条目不再命中"""
+        tiered = self._make_cache()
+        with patch("grading.cache_manager.cache", tiered):
+            manager = CacheManager(user_id=1, tenant_id=1)
+            manager.set_dir_tree("/a", {"name": "a"})
+            self.assertEqual(manager.get_dir_tree("/a"), {"name": "a"})
+
+            # 模拟其他进程：只修改共享层的版本号
+            ns_key = manager._namespace_key(manager._scope_parts(CacheManager.PREFIX_DIR_TREE))
+            tiered.shared.incr(ns_key)
+
+            # 本进程持有的版本号最多延迟 LOCAL_METADATA_TIMEOUT 秒
+            self.assertEqual(manager.get_dir_tree("/a"), {"name": "a"})
+            with patch("grading.cache_manager.time.monotonic", return_value=10**9):
+                self.assertIsNone(manager.get_dir_tree("/a"))
+
+    def test_local_invalidation_visible_immediately(self):
+        """测试本进程的命名空间失效立即生效"""
+        tiered = self._make_cache()
+        with patch("grading.cache_manager.cache", tiered):
+            manager = CacheManager(user_id=1, tenant_id=1)
+            manager.set_dir_tree("/a", {"name": "a"})
+            manager.clear_dir_tree()
+
+            self.assertIsNone(manager.get_dir_tree("/a"))
+
+    def test_manager_local_hit_skips_shared(self):
+        """测试进程内命中时版本号和监听作用域也不访问共享层"""
+        tiered = self._make_cache()
+        with (
+            patch("grading.cache_manager.cache", tiered),
+            self.settings(CACHE_WATCHED_PATH_TIMEOUT=3600),
+        ):
+            CacheManager.set_watched_scopes([(1, 1)], timeout=60)
+            manager = CacheManager(user_id=1, tenant_id=1)
+            manager.set_dir_tree("/a", {"name": "a"})
+
+            with (
+                patch.object(tiered.shared, "get", side_effect=AssertionError),
+                patch.object(tiered.shared, "get_many", side_effect=AssertionError),
+            ):
+                self.assertEqual(manager.get_dir_tree("/a"), {"name": "a"})
+                self.assertEqual(manager._path_timeout(CacheManager.TIMEOUT_DIR_TREE), 3600)
+
+    def test_clear_empties_both_tiers(self):
+        """测试 clear 同时清空两层"""
+        tiered = self._make_cache()
+        tiered.set("dir_tree:/a", "a")
+
+        tiered.clear()
+
+        self.assertIsNone(tiered.get("dir_tree:/a"))
+        self.assertEqual(tiered.get_stats()["bytes"], 0)
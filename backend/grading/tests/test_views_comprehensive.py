@@ -21,6 +21,7 @@ from grading.models import (
     Tenant,
     UserProfile,
 )
+from grading.services.repository_catalog import RepositoryCatalog
 from grading.views import (
     auto_create_or_update_course,
     auto_detect_course_type,
@@ -865,6 +866,27 @@ class GetDirectoryFileCountCachedTest(MockTestCase):
             
             self.assertEqual(count2, 1)
 
+    def test_count_reads_current_catalog(self):
+        """Test counting reads the repository catalog when it is current"""
+        homework_dir = os.path.join(self.temp_dir, "catalog_homework")
+        os.makedirs(homework_dir)
+        for name in ("file1.docx", "file2.docx", "notes.txt"):
+            with open(os.path.join(homework_dir, name), "w") as f:
+                f.write("test")
+        repository = Repository.objects.create(
+            owner=self.user, name="catalog_repo", repo_type="filesystem"
+        )
+
+        with patch.object(Repository, "get_full_path", return_value=self.temp_dir):
+            RepositoryCatalog(repository).refresh()
+            with patch("grading.views.os.listdir", side_effect=AssertionError):
+                count = get_directory_file_count_cached(
+                    "catalog_homework", base_dir=self.temp_dir, repository=repository
+                )
+            RepositoryCatalog.mark_stale(repository)
+
+        self.assertEqual(count, 2)
+
     def test_count_nonexistent_directory(self):
         """Test counting files in nonexistent directory"""
         count = get_directory_file_count_cached(
@@ -30,7 +30,6 @@ from grading.views import (
     _get_repo_head_commit,
     _file_changed_since_commit,
     _file_has_updates,
-    _homework_folder_has_updates,
 )
 
 User = get_user_model()
@@ -291,14 +290,12 @@ class TestGitOperations(BaseFileOperationTestCase):
         
         test_file = os.path.join(self.temp_dir, 'test.txt')
         
-        with patch('grading.views.GitHandler') as mock_git_handler:
+        with patch('grading.views.get_push_scheduler') as mock_get_scheduler:
             push_grade_changes(self.repository, test_file)
             
-            mock_git_handler.commit_and_push.assert_called_once_with(
-                self.temp_dir,
-                message='评分更新: test.txt',
-                branch='main',
-                paths='test.txt'
+            # 提交推送交给调度器合并执行
+            mock_get_scheduler.return_value.mark_dirty.assert_called_once_with(
+                self.repository, test_file
             )
     
     def test_push_grade_changes_local_repo(self):
@@ -309,11 +306,11 @@ class TestGitOperations(BaseFileOperationTestCase):
         
         test_file = os.path.join(self.temp_dir, 'test.txt')
         
-        with patch('grading.views.GitHandler') as mock_git_handler:
+        with patch('grading.views.get_push_scheduler') as mock_get_scheduler:
             push_grade_changes(self.repository, test_file)
             
-            # Should not call GitHandler for local repos
-            mock_git_handler.commit_and_push.assert_not_called()
+            # Should not schedule pushes for local repos
+            mock_get_scheduler.return_value.mark_dirty.assert_not_called()
     
     def test_get_repo_head_commit_success(self):
         """Test _get_repo_head_commit with successful Git operation."""
@@ -500,60 +497,6 @@ class TestFileUpdateDetection(BaseFileOperationTestCase):
             )
         
         self.assertTrue(result)
-    
-    def test_homework_folder_has_updates_with_changes(self):
-        """Test _homework_folder_has_updates with file changes."""
-        # Create homework folder structure
-        homework_dir = os.path.join(self.temp_dir, 'homework1')
-        os.makedirs(homework_dir)
-        
-        # Create test files
-        test_files = ['file1.txt', 'file2.txt']
-        for filename in test_files:
-            with open(os.path.join(homework_dir, filename), 'w') as f:
-                f.write('test content')
-        
-        with patch('grading.views.get_file_grade_info') as mock_grade_info:
-            mock_grade_info.return_value = {'has_grade': False}
-            
-            result = _homework_folder_has_updates(
-                self.repository,
-                homework_dir,
-                'homework1',
-                base_dir=self.temp_dir
-            )
-        
-        self.assertTrue(result)
-    
-    def test_homework_folder_has_updates_no_changes(self):
-        """Test _homework_folder_has_updates with no changes."""
-        # Create homework folder structure
-        homework_dir = os.path.join(self.temp_dir, 'homework1')
-        os.makedirs(homework_dir)
-        
-        # Create test file
-        with open(os.path.join(homework_dir, 'file1.txt'), 'w') as f:
-            f.write('test content')
-        
-        # Create FileGradeStatus for the file
-        FileGradeStatus.objects.create(
-            repository=self.repository,
-            file_path='homework1/file1.txt',
-            last_graded_commit='abc123'
-        )
-        
-        with patch('grading.views._file_changed_since_commit') as mock_changed:
-            mock_changed.return_value = False
-            
-            result = _homework_folder_has_updates(
-                self.repository,
-                homework_dir,
-                'homework1',
-                current_head='abc123',
-                base_dir=self.temp_dir
-            )
-        
-        self.assertFalse(result)
 
 
 class TestFileGradeInfoAdvanced(BaseFileOperationTestCase):
@@ -749,44 +692,6 @@ class TestErrorHandlingAndEdgeCases(BaseFileOperationTestCase):
         
         # Should handle error gracefully and return False
         self.assertFalse(result)
-    
-    def test_homework_folder_has_updates_empty_folder(self):
-        """Test _homework_folder_has_updates with empty folder."""
-        # Create empty homework folder
-        homework_dir = os.path.join(self.temp_dir, 'empty_homework')
-        os.makedirs(homework_dir)
-        
-        result = _homework_folder_has_updates(
-            self.repository,
-            homework_dir,
-            'empty_homework',
-            base_dir=self.temp_dir
-        )
-        
-        self.assertFalse(result)
-    
-    def test_homework_folder_has_updates_deep_nesting(self):
-        """Test _homework_folder_has_updates with deeply nested files."""
-        # Create deeply nested structure
-        deep_dir = os.path.join(self.temp_dir, 'homework', 'level1', 'level2', 'level3')
-        os.makedirs(deep_dir)
-        
-        # Create file at deep level
-        with open(os.path.join(deep_dir, 'deep_file.txt'), 'w') as f:
-            f.write('deep content')
-        
-        homework_dir = os.path.join(self.temp_dir, 'homework')
-        
-        result = _homework_folder_has_updates(
-            self.repository,
-            homework_dir,
-            'homework',
-            base_dir=self.temp_dir
-        )
-        
-        # Should skip files beyond depth limit
-        # The exact behavior depends on the depth limit in the function
-        self.assertIsInstance(result, bool)
 
 
 if __name__ == '__main__':
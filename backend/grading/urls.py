@@ -12,6 +12,10 @@ urlpatterns = [
     path("get_courses_list/", views.get_courses_list_view, name="get_courses_list"),
     path("get_directory_tree/", views.get_directory_tree_view, name="get_directory_tree"),
     path("get_file_content/", views.get_file_content, name="get_file_content"),
+    path("prerender_previews/", views.prerender_folder_previews, name="prerender_previews"),
+    path("docx-preview/<str:key>/<str:name>", views.docx_preview_asset, name="docx_preview_asset"),
+    path("grade_push_status/", views.grade_push_status, name="grade_push_status"),
+    path("flush_grade_pushes/", views.flush_grade_pushes, name="flush_grade_pushes"),
     path("save_grade/", views.save_grade, name="save_grade"),
     path("add_grade_to_file/", views.add_grade_to_file, name="add_grade_to_file"),
     path("remove_grade/", views.remove_grade, name="remove_grade"),
@@ -29,6 +33,11 @@ urlpatterns = [
         views.batch_grade_to_registry,
         name="batch_grade_to_registry",
     ),
+    path(
+        "course/<int:course_id>/batch-grade-to-registry/",
+        views.batch_grade_course_to_registry,
+        name="batch_grade_course_to_registry",
+    ),
     path(
         "batch-grade/progress/<str:tracking_id>/",
         views.batch_grade_progress,
@@ -38,6 +47,11 @@ urlpatterns = [
     path("batch-ai-score/", views.batch_ai_score_advanced_view, name="batch_ai_score_advanced"),
     path("batch-ai-score/get-classes/", views._get_class_list, name="get_class_list"),
     path("batch-ai-score/get-homework/", views._get_homework_list, name="get_homework_list"),
+    path(
+        "batch-ai-score/jobs/<int:job_id>/progress/",
+        views.ai_scoring_job_progress,
+        name="ai_scoring_job_progress",
+    ),
     # 评分类型管理
     path("change-grade-type/", views.change_grade_type_view, name="change_grade_type"),
     path("get-grade-type-config/", views.get_grade_type_config_view, name="get_grade_type_config"),
@@ -118,6 +132,11 @@ urlpatterns = [
     path("api/tenants/", api_views.tenant_list_api, name="api_tenant_list"),
     path("api/tenant-dashboard/", api_views.tenant_dashboard_api, name="api_tenant_dashboard"),
     path("api/tenant-users/", api_views.tenant_users_api, name="api_tenant_users"),
+    path(
+        "api/tenant-storage-usage/",
+        api_views.tenant_storage_usage_api,
+        name="api_tenant_storage_usage",
+    ),
     path("api/student/assignments/", api_views.student_assignment_list_api, name="api_student_assignments"),
     path(
         "api/student/upload/",
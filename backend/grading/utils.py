@@ -17,6 +17,9 @@ from .config import FILE_ENCODINGS
 
 logger = logging.getLogger(__name__)
 
+# 推送、拉取等访问远程仓库的 git 命令的默认超时（秒）
+GIT_REMOTE_TIMEOUT_SECONDS = 120
+
 
 class GitHandler:
     @staticmethod
@@ -156,6 +159,112 @@ class GitHandler:
         """Docstring."""
         return os.path.exists(os.path.join(path, ".git"))
 
+    @staticmethod
+    def commit_paths(repo_path, message, paths):
+        """Commit the given paths only.
+
+        Returns the new commit hash, or None when the paths have no changes.
+        Raises RuntimeError when git fails.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        paths = list(paths)
+        if not paths:
+            return None
+
+        def run(*args):
+            return subprocess.run(["git", *args], cwd=repo_path, capture_output=True, text=True)
+
+        result = run("add", "-A", "--", *paths)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "git add 失败")
+        result = run("diff", "--cached", "--quiet", "--", *paths)
+        if result.returncode == 0:
+            return None
+        result = run("commit", "-m", message, "--", *paths)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or result.stdout.strip() or "git commit 失败")
+        result = run("rev-parse", "HEAD")
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "git rev-parse 失败")
+        return result.stdout.strip()
+
+    @staticmethod
+    def _remote_env():
+        """Environment for git commands that talk to origin: never prompt for credentials."""
+        env = os.environ.copy()
+        env["GIT_TERMINAL_PROMPT"] = "0"
+        return env
+
+    @staticmethod
+    def push_branch(repo_path, branch=None, timeout=GIT_REMOTE_TIMEOUT_SECONDS):
+        """Push HEAD to origin (to the given branch when specified).
+
+        A push that does not finish within timeout seconds counts as failed.
+        """
+        try:
+            cmd = ["git", "push", "origin", f"HEAD:{branch}" if branch else "HEAD"]
+            result = subprocess.run(
+                cmd,
+                cwd=repo_path,
+                env=GitHandler._remote_env(),
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+            if result.returncode != 0:
+                logger.warning(f"git push 失败: {result.stderr.strip()}")
+            return result.returncode == 0
+        except subprocess.TimeoutExpired:
+            logger.warning(f"git push 超时（{timeout} 秒）: {repo_path}")
+            return False
+        except Exception:
+            return False
+
+    @staticmethod
+    def rebase_onto_remote(repo_path, branch=None, timeout=GIT_REMOTE_TIMEOUT_SECONDS):
+        """Rebase local commits onto origin (used before retrying a rejected push)."""
+        try:
+            cmd = ["git", "pull", "--rebase", "--autostash", "origin"]
+            if branch:
+                cmd.append(branch)
+            try:
+                result = subprocess.run(
+                    cmd,
+                    cwd=repo_path,
+                    env=GitHandler._remote_env(),
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                )
+                succeeded = result.returncode == 0
+            except subprocess.TimeoutExpired:
+                logger.warning(f"git pull --rebase 超时（{timeout} 秒）: {repo_path}")
+                succeeded = False
+            if not succeeded:
+                subprocess.run(
+                    ["git", "rebase", "--abort"], cwd=repo_path, capture_output=True, text=True
+                )
+            return succeeded
+        except Exception:
+            return False
+
+    @staticmethod
+    def get_head_commit(path):
+        """Return the commit hash of HEAD, or None."""
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=path,
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode == 0:
+                return result.stdout.strip()
+            return None
+        except Exception:
+            return None
+
     @staticmethod
     def get_current_branch(path):
         """Docstring."""
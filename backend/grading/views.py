@@ -9,13 +9,10 @@ import shutil
 import subprocess
 import tempfile
 import threading
-import time
 import traceback
 import uuid
-from collections import deque
 from io import BytesIO
 from pathlib import Path
-from queue import Queue
 from typing import List, Optional, Tuple
 
 import mammoth
@@ -25,7 +22,13 @@ from django.core.cache import cache
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, HttpResponseForbidden, HttpResponseServerError, JsonResponse
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseServerError,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 from django.utils.decorators import method_decorator  # noqa: F401
@@ -37,12 +40,9 @@ from docx import Document
 # Initialize logger first
 logger = logging.getLogger(__name__)
 
-try:
-    from volcenginesdkarkruntime import Ark
+from grading.services.ai_scoring_client import ARK_AVAILABLE, get_scoring_client
 
-    ARK_AVAILABLE = True
-except ImportError:
-    ARK_AVAILABLE = False
+if not ARK_AVAILABLE:
     logger.warning("volcenginesdkarkruntime not available, AI scoring will be disabled")
 
 from grading import docx_grade_utils
@@ -53,7 +53,10 @@ from grading.services.grade_registry_writer_service import (
 
 # 导入缓存管理器
 from .cache_manager import get_cache_manager
+from .docx_part_writer import edit_docx
+from .docx_stream_reader import open_docx
 from .models import (
+    AIScoringJob,
     Class,
     Course,
     CourseSchedule,
@@ -70,21 +73,23 @@ from .query_optimization import (
     optimize_course_queryset,
     optimize_repository_queryset,
 )
+from .services.ai_scoring_jobs import AIScoringJobRunner
+from .services.directory_tree_builder import DirectoryTreeBuilder
+from .services.docx_preview_store import get_prerenderer, get_preview_store
+from .services.file_serving import serve_path
 from .services.file_upload_service import FileUploadService
+from .services.grade_info_index import GradeInfoIndex
+from .services.grade_push_scheduler import get_push_scheduler
+from .services.grade_write_queue import GradeWriteQueue, register_queue
+from .services.repository_catalog import RepositoryCatalog
+from .services.submission_blob_store import detach as detach_working_copy
 from .utils import FileHandler, GitHandler
 
 # Create your views here.
 
 
-# 全局请求队列和限流配置
-API_REQUEST_QUEUE = Queue()
-API_RATE_LIMIT = 2  # 每秒最多2个请求
-API_REQUEST_INTERVAL = 1.0 / API_RATE_LIMIT  # 请求间隔
-LAST_REQUEST_TIME = 0
-REQUEST_LOCK = threading.Lock()
-
-# 请求历史记录（用于限流）
-REQUEST_HISTORY = deque(maxlen=10)
+# 批量AI评分写回（Word 写入、评分状态、Git 推送）串行执行
+AI_SCORING_WRITE_LOCK = threading.Lock()
 
 FALLBACK_HOMEWORK_SEARCH_MAX_DEPTH = 5
 FALLBACK_HOMEWORK_SEARCH_MAX_MATCHES = 3
@@ -222,22 +227,11 @@ def update_file_grade_status(repository, relative_path, course_name=None, user=N
 
 
 def push_grade_changes(repository, full_path):
+    """登记已评分的文件，由调度器合并提交并推送（见 grade_push_scheduler）"""
     if not repository or not repository.is_git_repository():
         return
 
-    repo_root = repository.get_full_path()
-    try:
-        rel_path = os.path.relpath(full_path, repo_root)
-    except Exception:
-        rel_path = None
-
-    message = f"评分更新: {rel_path or os.path.basename(full_path)}"
-    GitHandler.commit_and_push(
-        repo_root,
-        message=message,
-        branch=repository.branch or None,
-        paths=rel_path,
-    )
+    get_push_scheduler().mark_dirty(repository, full_path)
 
 
 def maybe_sync_repository(repository, request=None, min_interval_seconds=60):
@@ -959,7 +953,7 @@ def validate_file_operation(file_path_param="file_path", require_write=True):
     return decorator
 
 
-def get_directory_file_count_cached(dir_path, base_dir=None, request=None):
+def get_directory_file_count_cached(dir_path, base_dir=None, request=None, repository=None):
     """
     获取目录文件数量（带缓存）
 
@@ -967,6 +961,7 @@ def get_directory_file_count_cached(dir_path, base_dir=None, request=None):
         dir_path: 目录路径
         base_dir: 基础目录
         request: Django请求对象（用于获取用户和租户信息）
+        repository: 本地仓库（可选）；目录位于仓库内且仓库文件目录为当前时从目录查询
 
     Returns:
         文件数量
@@ -1001,12 +996,14 @@ def get_directory_file_count_cached(dir_path, base_dir=None, request=None):
             logger.error(f"不是目录: {full_path}")
             return 0
 
-        # 统计.docx文件
-        file_count = 0
-        for item in os.listdir(full_path):
-            item_path = os.path.join(full_path, item)
-            if os.path.isfile(item_path) and item.lower().endswith(".docx"):
-                file_count += 1
+        file_count = _count_docx_from_catalog(repository, full_path)
+        if file_count is None:
+            # 统计.docx文件
+            file_count = 0
+            for item in os.listdir(full_path):
+                item_path = os.path.join(full_path, item)
+                if os.path.isfile(item_path) and item.lower().endswith(".docx"):
+                    file_count += 1
 
         # 缓存结果
         cache_manager.set_file_count(dir_path, file_count)
@@ -1023,6 +1020,23 @@ def get_directory_file_count_cached(dir_path, base_dir=None, request=None):
         return 0
 
 
+def _count_docx_from_catalog(repository, full_path):
+    """从仓库文件目录统计目录下直接包含的 .docx 数量；目录不可用时返回 None"""
+    if repository is None or repository.repo_type != "filesystem":
+        return None
+    try:
+        catalog = RepositoryCatalog.current(repository)
+        if catalog is None:
+            return None
+        rel_dir = catalog.relative_path(full_path)
+        if rel_dir is None or not catalog.has_dir(rel_dir):
+            return None
+        return catalog.count_files(rel_dir, extension=".docx")
+    except Exception as e:
+        logger.warning(f"读取仓库文件目录失败，回退到列出目录: {e}")
+        return None
+
+
 def clear_directory_file_count_cache(request=None):
     """
     清除目录文件数量缓存
@@ -1193,7 +1207,9 @@ def get_dir_file_count(request):
         base_dir = get_base_directory(request)
 
         # 使用缓存获取文件数量
-        file_count = get_directory_file_count_cached(dir_path, base_dir=base_dir, request=request)
+        file_count = get_directory_file_count_cached(
+            dir_path, base_dir=base_dir, request=request, repository=repository
+        )
 
         # 直接返回文件数量字符串
         return HttpResponse(str(file_count))
@@ -1316,16 +1332,8 @@ def serve_file(request, file_path):
         return HttpResponse(error_msg, status=status_code)
 
     try:
-        # 获取文件类型
-        content_type, _ = mimetypes.guess_type(full_path)
-        if not content_type:
-            content_type = "application/octet-stream"
-
-        # 以二进制模式读取文件
-        with open(full_path, "rb") as f:
-            response = HttpResponse(f.read(), content_type=content_type)
-            response["Content-Disposition"] = f'inline; filename="{os.path.basename(file_path)}"'
-            return response
+        # 流式返回，支持 Range 断点续传和条件请求
+        return serve_path(request, full_path, filename=os.path.basename(file_path))
 
     except Exception as e:
         logger.error(f"文件服务失败: {str(e)}")
@@ -1651,95 +1659,6 @@ def _file_has_updates(
     return False
 
 
-def _homework_folder_has_updates(
-    repository,
-    folder_abs_path,
-    folder_rel_path,
-    repo_rel_prefix="",
-    current_head=None,
-    base_dir=None,
-    course_name=None,
-):
-    """判断作业文件夹是否有更新（相对上次评分）。"""
-    if not repository or not folder_abs_path:
-        return False
-
-    try:
-        if not os.path.isdir(folder_abs_path):
-            return False
-
-        repo_root = repository.get_full_path()
-        is_git_repo = GitHandler.is_git_repo(repo_root)
-        files = []
-        base_depth = folder_abs_path.rstrip(os.sep).count(os.sep)
-        for root, _, filenames in os.walk(folder_abs_path):
-            depth = root.rstrip(os.sep).count(os.sep) - base_depth
-            if depth > 2:
-                continue
-            for filename in filenames:
-                if filename.startswith("."):
-                    continue
-                abs_path = os.path.join(root, filename)
-                rel_sub = os.path.relpath(abs_path, folder_abs_path).replace("\\", "/")
-                rel_path = f"{folder_rel_path}/{rel_sub}".replace("\\", "/").lstrip("/")
-                if repo_rel_prefix:
-                    rel_path = f"{repo_rel_prefix}/{rel_path}".replace("\\", "/")
-                files.append((rel_path, abs_path))
-
-        if not files:
-            return False
-
-        from grading.models import FileGradeStatus
-
-        file_keys = []
-        fallback_keys = []
-        for rel_path, _ in files:
-            file_keys.append(rel_path)
-            if repo_rel_prefix and rel_path.startswith(f"{repo_rel_prefix}/"):
-                fallback_keys.append(rel_path[len(repo_rel_prefix) + 1 :])
-
-        status_queryset = FileGradeStatus.objects.filter(
-            repository=repository, file_path__in=(file_keys + fallback_keys)
-        )
-        status_map = {status.file_path: status.last_graded_at for status in status_queryset}
-        commit_map = {status.file_path: status.last_graded_commit for status in status_queryset}
-
-        current_head = current_head or _get_repo_head_commit(repository)
-
-        for rel_path, abs_path in files:
-            alt_path = None
-            if repo_rel_prefix and rel_path.startswith(f"{repo_rel_prefix}/"):
-                alt_path = rel_path[len(repo_rel_prefix) + 1 :]
-            last_graded_at = status_map.get(rel_path) or (
-                status_map.get(alt_path) if alt_path else None
-            )
-            last_graded_commit = commit_map.get(rel_path) or (
-                commit_map.get(alt_path) if alt_path else None
-            )
-            if not last_graded_at and not last_graded_commit:
-                grade_info = get_file_grade_info(
-                    abs_path, base_dir=base_dir, course_name=course_name
-                )
-                if not grade_info.get("has_grade"):
-                    return True
-                continue
-
-            if is_git_repo and current_head and last_graded_commit:
-                if current_head != last_graded_commit and _file_changed_since_commit(
-                    repository, rel_path, last_graded_commit, current_head
-                ):
-                    return True
-                continue
-
-            if last_graded_at and os.path.getmtime(abs_path) > last_graded_at.timestamp():
-                return True
-
-    except Exception as e:
-        logger.warning(f"检测作业更新失败: {e}")
-
-    return False
-
-
 def get_directory_tree(
     file_path: str = "",
     base_dir: str | None = None,
@@ -1750,6 +1669,9 @@ def get_directory_tree(
 ):
     """获取目录树结构（返回Python对象列表）
 
+    单次遍历构建整棵子树，评分状态与 git 变更批量计算，
+    详见 grading.services.directory_tree_builder。
+
     Args:
         file_path: 相对路径（相对于 base_dir）
         base_dir: 基础目录，若为空则读取全局默认目录
@@ -1797,172 +1719,20 @@ def get_directory_tree(
             logger.error(error_msg)
             return []
 
-        items = []
-        current_head = _get_repo_head_commit(repository) if repository else None
-        repo_base_dir = repository.get_full_path() if repository else None
-        try:
-            # 获取目录内容并过滤掉隐藏文件和目录
-            for item in sorted(os.listdir(full_path)):
-                # 跳过隐藏文件和目录
-                if item.startswith("."):
-                    continue
-
-                item_path = os.path.join(full_path, item)
-                # 确保相对路径使用正斜杠，以便前端JavaScript正确处理
-                if file_path:
-                    relative_path = f"{file_path}/{item}".replace("\\", "/")
-                else:
-                    relative_path = item
-
-                # 检查项目权限
-                if not os.access(item_path, os.R_OK):
-                    logger.warning(f"No read permission for item: {item_path}")
-                    continue
-
-                # 获取项目状态
-                is_dir = os.path.isdir(item_path)
-
-                # 构建节点数据
-                node = {
-                    "id": relative_path,
-                    "text": item,
-                    "type": "folder" if is_dir else "file",
-                    "icon": "jstree-folder" if is_dir else "jstree-file",
-                    "state": {"opened": False, "disabled": False, "selected": False},
-                }
-
-                # 如果是目录，递归获取子目录并统计文件数量
-                if is_dir:
-                    children = get_directory_tree(
-                        relative_path,
-                        base_dir=base_dir,
-                        course_name=course_name,
-                        request=request,
-                        repository=repository,
-                        homework_names=homework_names,
-                    )
-                    if children:
-                        node["children"] = children
-                    else:
-                        node["children"] = []
-                        node["state"]["disabled"] = True
-                    file_count = get_directory_file_count_cached(
-                        relative_path, base_dir=base_dir, request=request
-                    )
-                    node["data"] = {"file_count": file_count}
-                    if (
-                        _is_homework_folder_rel_path(relative_path, course_name)
-                        or (homework_names and item in homework_names)
-                        or _direct_file_updates(node.get("children", []))
-                    ):
-                        if _children_have_updates(node.get("children", [])):
-                            node["data"]["has_updates"] = True
-                            logger.info(
-                                "[STAR] folder_update course=%s rel=%s",
-                                course_name,
-                                relative_path,
-                            )
-
-                    # 如果提供了课程名称，检查是否是作业文件夹（第二层）
-                    # file_path不为空但不包含'/'表示是第二层（班级下的作业文件夹）
-                    if course_name and file_path and "/" not in file_path:
-                        # 这是班级下的作业文件夹
-                        try:
-                            course = Course.objects.select_related(
-                                "semester", "teacher", "tenant"
-                            ).get(name=course_name)
-                            try:
-                                homework = Homework.objects.get(course=course, folder_name=item)
-                                node["data"]["homework_type"] = homework.homework_type
-                                node["data"][
-                                    "homework_type_display"
-                                ] = homework.get_homework_type_display()
-                                logger.info(
-                                    f"作业文件夹 '{item}' (路径: {relative_path}) 类型: {homework.get_homework_type_display()}"
-                                )
-                            except Homework.DoesNotExist:
-                                # 作业不存在，根据课程类型使用默认类型
-                                # 实验课、实践课、理论+实验课默认为实验报告
-                                default_type = (
-                                    "lab_report"
-                                    if course.course_type in ["lab", "practice", "mixed"]
-                                    else "normal"
-                                )
-                                default_display = (
-                                    "实验报告" if default_type == "lab_report" else "普通作业"
-                                )
-
-                                node["data"]["homework_type"] = default_type
-                                node["data"]["homework_type_display"] = default_display
-                                logger.info(
-                                    f"作业文件夹 '{item}' (路径: {relative_path}) 使用默认类型: {default_display} (基于课程类型: {course.get_course_type_display()})"
-                                )
-                        except Course.DoesNotExist:
-                            pass
-
-                        if repository:
-                            repo_rel_prefix = course_name if course_name else ""
-                            has_updates = _homework_folder_has_updates(
-                                repository,
-                                item_path,
-                                relative_path,
-                                repo_rel_prefix=repo_rel_prefix,
-                                current_head=current_head,
-                                base_dir=repo_base_dir,
-                                course_name=course_name,
-                            )
-                            if has_updates:
-                                node["data"]["has_updates"] = True
-                                logger.info(
-                                    "[STAR] homework_folder_update course=%s rel=%s",
-                                    course_name,
-                                    relative_path,
-                                )
-                # 如果是文件，添加文件特定的属性
-                else:
-                    # 获取文件扩展名
-                    _, ext = os.path.splitext(item)
-                    node["a_attr"] = {
-                        "href": "#",
-                        "data-type": "file",
-                        "data-ext": ext.lower(),
-                    }
-                    if repository and _is_homework_file_rel_path(relative_path, course_name):
-                        rel_path = relative_path.replace("\\", "/").lstrip("/")
-                        repo_rel_prefix = course_name if course_name else ""
-                        if repo_rel_prefix and not rel_path.startswith(f"{repo_rel_prefix}/"):
-                            rel_path = f"{repo_rel_prefix}/{rel_path}"
-                        if _file_has_updates(
-                            repository,
-                            rel_path,
-                            item_path,
-                            repo_rel_prefix=repo_rel_prefix,
-                            current_head=current_head,
-                            base_dir=repo_base_dir,
-                            course_name=course_name,
-                        ):
-                            node["data"] = node.get("data", {})
-                            node["data"]["has_updates"] = True
-                            logger.info(
-                                "[STAR] file_update course=%s rel=%s",
-                                course_name,
-                                rel_path,
-                            )
-
-                items.append(node)
-                logger.info(f"Added {'directory' if is_dir else 'file'}: {item}")
-
-            # 按类型和名称排序：目录在前，文件在后
-            items.sort(key=lambda x: (x["type"] == "file", x["text"].lower()))
-
-            logger.info(f"Successfully generated directory tree for path: {full_path}")
-            logger.info(f"Found {len(items)} items")
-            return items
+        builder = DirectoryTreeBuilder(
+            base_dir,
+            course_name=course_name,
+            repository=repository,
+            homework_names=homework_names,
+            cache_manager=get_cache_manager(request),
+            grade_info_func=get_file_grade_info,
+            grade_info_many_func=get_file_grade_info_many,
+        )
+        items = builder.build(file_path)
 
-        except Exception as e:
-            error_msg = f"Error listing directory contents: {str(e)}"
-            logger.error(error_msg)
-            return []
+        logger.info(f"Successfully generated directory tree for path: {full_path}")
+        logger.info(f"Found {len(items)} items")
+        return items
 
     except Exception as e:
         error_msg = f"Error in get_directory_tree: {str(e)}"
@@ -1989,40 +1759,98 @@ def _build_git_adapter(repository: Repository):
     )
 
 
-def _get_git_file_has_updates(repository, adapter, rel_path, course_name, current_head):
-    if not repository or not rel_path:
-        return False
+def _get_git_file_updates(repository, adapter, rel_paths, course_name, current_head):
+    """批量判断远程作业文件是否有更新（相对上次评分）
+
+    一次查询加载评分状态，按上次评分提交分组执行 git diff。
+
+    Returns:
+        有更新的文件路径集合
+    """
+    if not repository or not rel_paths:
+        return set()
     try:
         from grading.models import FileGradeStatus
 
-        file_keys = [rel_path]
-        fallback_key = None
-        if course_name and rel_path.startswith(f"{course_name}/"):
-            fallback_key = rel_path[len(course_name) + 1 :]
-            file_keys.append(fallback_key)
+        keys_by_path = {}
+        for rel_path in rel_paths:
+            file_keys = [rel_path]
+            if course_name and rel_path.startswith(f"{course_name}/"):
+                file_keys.append(rel_path[len(course_name) + 1 :])
+            keys_by_path[rel_path] = file_keys
 
-        status = FileGradeStatus.objects.filter(
-            repository=repository, file_path__in=file_keys
-        ).first()
-        if not status:
-            return True
+        commit_map = dict(
+            FileGradeStatus.objects.filter(
+                repository=repository,
+                file_path__in=[key for keys in keys_by_path.values() for key in keys],
+            ).values_list("file_path", "last_graded_commit")
+        )
 
-        if current_head and status.last_graded_commit:
-            if current_head != status.last_graded_commit:
-                changed = adapter.file_changed_since_commit(rel_path, status.last_graded_commit)
-                if changed is None:
-                    return True
-                return changed
-            return False
+        updated = set()
+        commit_pairs = []
+        for rel_path, file_keys in keys_by_path.items():
+            key = next((k for k in file_keys if k in commit_map), None)
+            if key is None:
+                updated.add(rel_path)
+            elif current_head and commit_map[key] and commit_map[key] != current_head:
+                commit_pairs.append((rel_path, commit_map[key]))
+
+        if commit_pairs:
+            updated |= adapter.changed_paths_resolver().resolve(
+                commit_pairs, current_head, assume_changed_on_error=True
+            )
+        return updated
     except Exception as e:
         logger.warning(f"检测远程文件更新失败: {e}")
-        return True
+        return set(rel_paths)
 
-    return False
+
+def _collect_git_homework_files(entries, path, base_prefix, course_name):
+    """收集已列出子树中需要检测更新的作业文件（仓库相对路径）"""
+    files = []
+    for entry in entries:
+        name = entry.get("name", "")
+        if not name or name.startswith("."):
+            continue
+        full_path = f"{path}/{name}" if path else name
+        if entry.get("type") == "dir":
+            files.extend(
+                _collect_git_homework_files(
+                    entry.get("children", []), full_path, base_prefix, course_name
+                )
+            )
+            continue
+        rel_id = full_path
+        if base_prefix and rel_id.startswith(f"{base_prefix}/"):
+            rel_id = rel_id[len(base_prefix) + 1 :]
+        if _is_homework_file_rel_path(rel_id, course_name):
+            files.append(full_path)
+    return files
 
 
-def _get_git_directory_tree(adapter, path: str, base_prefix: str = "", repository=None, course_name=None, current_head=None, homework_names=None):
-    entries = adapter.list_directory(path)
+def _get_git_directory_tree(
+    adapter,
+    path: str,
+    base_prefix: str = "",
+    repository=None,
+    course_name=None,
+    current_head=None,
+    homework_names=None,
+    entries=None,
+    updated_paths=None,
+):
+    # 顶层调用一次性递归列出整个子树，子目录直接使用已列出的 children；
+    # 同时批量计算所有作业文件的更新状态
+    if entries is None:
+        entries = adapter.list_tree(path)
+        if repository:
+            updated_paths = _get_git_file_updates(
+                repository,
+                adapter,
+                _collect_git_homework_files(entries, path, base_prefix, course_name),
+                course_name,
+                current_head,
+            )
     nodes = []
     for entry in entries:
         name = entry.get("name", "")
@@ -2052,6 +1880,8 @@ def _get_git_directory_tree(adapter, path: str, base_prefix: str = "", repositor
                 course_name=course_name,
                 current_head=current_head,
                 homework_names=homework_names,
+                entries=entry.get("children", []),
+                updated_paths=updated_paths,
             )
             node["children"] = children
             if (
@@ -2073,9 +1903,7 @@ def _get_git_directory_tree(adapter, path: str, base_prefix: str = "", repositor
             if repository and _is_homework_file_rel_path(rel_id, course_name):
                 repo_rel_path = full_path
                 node["data"] = node.get("data", {})
-                if _get_git_file_has_updates(
-                    repository, adapter, repo_rel_path, course_name, current_head
-                ):
+                if updated_paths and repo_rel_path in updated_paths:
                     node["data"]["has_updates"] = True
                     logger.info(
                         "[STAR] git_file_update course=%s rel=%s",
@@ -2490,92 +2318,63 @@ def get_directory_tree_view(request):
         return JsonResponse({"children": []}, safe=False)
 
 
-def get_file_grade_info(full_path, base_dir=None, course_name=None):
-    """获取文件中的评分信息
+def _parse_file_grade_info(full_path):
+    """解析文件内容中的评分信息
+
+    只包含由文件内容决定的字段，结果由 _grade_info_index 按文件 stat 缓存；
+    is_lab_report 等依赖课程上下文的字段由 get_file_grade_info 计算。
 
     Args:
         full_path: 文件完整路径
-        base_dir: 基础目录（用于判断作业类型）
 
     Returns:
-        dict: 包含评分信息的字典
+        dict: 评分信息字典
     """
-    try:
-        # 获取文件扩展名
-        _, ext = os.path.splitext(full_path)
-        ext = ext.lower()
-
-        grade_info = {
-            "has_grade": False,
-            "grade": None,
-            "grade_type": None,  # 'letter' 或 'text' 或 'percentage'
-            "in_table": False,
-            "ai_grading_disabled": False,
-            "locked": False,  # 是否被锁定（格式错误的实验报告）
-            "is_lab_report": False,  # 是否为实验报告
-            "has_comment": False,  # 是否有评价
-            "format_valid": True,  # 格式是否有效（锁定时用于放行教师修改）
-        }
-
-        # 判断是否为实验报告
-        grade_info["is_lab_report"] = is_lab_report_file(
-            course_name=course_name, file_path=full_path, base_dir=base_dir
-        )
-
-        if ext == ".docx":
-            # 对于 Word 文档，使用 python-docx 检查评分
-            try:
-                doc = Document(full_path)
-
-                # 首先检查表格中是否有评分
-                for table in _iter_tables(doc):
-                    for row_idx, row in enumerate(table.rows):
-                        for col_idx, cell in enumerate(row.cells):
-                            cell_text = cell.text.strip()
-
-                            # 检查"评定分数"（旧格式）
-                            if "评定分数" in cell_text:
-                                # 检查下一个单元格是否有评分
-                                if col_idx + 1 < len(row.cells):
-                                    next_cell = row.cells[col_idx + 1]
-                                    if next_cell.text.strip():
-                                        grade_info["has_grade"] = True
-                                        grade_info["grade"] = next_cell.text.strip()
-                                        grade_info["in_table"] = True
-                                        # 判断评分类型
-                                        if grade_info["grade"] in [
-                                            "A",
-                                            "B",
-                                            "C",
-                                            "D",
-                                            "E",
-                                        ]:
-                                            grade_info["grade_type"] = "letter"
-                                        elif grade_info["grade"] in [
-                                            "优秀",
-                                            "良好",
-                                            "中等",
-                                            "及格",
-                                            "不及格",
-                                        ]:
-                                            grade_info["grade_type"] = "text"
-                                        break
-
-                            # 检查"教师（签字）"（实验报告格式）
-                            elif "教师（签字）" in cell_text or "教师(签字)" in cell_text:
-                                # 使用统一的提取函数从单元格中提取评分和评价
-                                extracted_grade, extracted_comment, _ = (
-                                    extract_grade_and_comment_from_cell(cell)
-                                )
+    _, ext = os.path.splitext(full_path)
+    ext = ext.lower()
+
+    grade_info = {
+        "has_grade": False,
+        "grade": None,
+        "grade_type": None,  # 'letter' 或 'text' 或 'percentage'
+        "in_table": False,
+        "locked": False,  # 是否被锁定（格式错误的实验报告）
+        "has_comment": False,  # 是否有评价
+        "format_valid": True,  # 格式是否有效（锁定时用于放行教师修改）
+        # 是否有"教师（签字）"单元格；表格中先找到"评定分数"评分时未知（None）
+        "signature_cell": None,
+    }
 
-                                if extracted_grade:
+    if ext == ".docx":
+        # 对于 Word 文档，流式解析 document.xml，找到评分后即停止读取
+        with open_docx(full_path) as doc:
+            # 首先检查表格中是否有评分
+            for table in _iter_tables(doc):
+                for row_idx, row in enumerate(table.rows):
+                    for col_idx, cell in enumerate(row.cells):
+                        cell_text = cell.text.strip()
+                        if docx_grade_utils.has_signature_marker(cell_text):
+                            grade_info["signature_cell"] = True
+
+                        # 检查"评定分数"（旧格式）
+                        if "评定分数" in cell_text:
+                            # 检查下一个单元格是否有评分
+                            if col_idx + 1 < len(row.cells):
+                                next_cell = row.cells[col_idx + 1]
+                                if next_cell.text.strip():
                                     grade_info["has_grade"] = True
-                                    grade_info["grade"] = extracted_grade
+                                    grade_info["grade"] = next_cell.text.strip()
                                     grade_info["in_table"] = True
                                     # 判断评分类型
-                                    if extracted_grade in ["A", "B", "C", "D", "E"]:
+                                    if grade_info["grade"] in [
+                                        "A",
+                                        "B",
+                                        "C",
+                                        "D",
+                                        "E",
+                                    ]:
                                         grade_info["grade_type"] = "letter"
-                                    elif extracted_grade in [
+                                    elif grade_info["grade"] in [
                                         "优秀",
                                         "良好",
                                         "中等",
@@ -2583,56 +2382,23 @@ def get_file_grade_info(full_path, base_dir=None, course_name=None):
                                         "不及格",
                                     ]:
                                         grade_info["grade_type"] = "text"
-                                    else:
-                                        # 尝试判断是否为百分制（数字）
-                                        try:
-                                            grade_value = float(extracted_grade)
-                                            if 0 <= grade_value <= 100:
-                                                grade_info["grade_type"] = "percentage"
-                                            else:
-                                                grade_info["grade_type"] = "letter"  # 默认
-                                        except (ValueError, TypeError):
-                                            grade_info["grade_type"] = "letter"  # 默认
-                                    # 保存评价（如果有）
-                                    if extracted_comment and extracted_comment.strip():
-                                        grade_info["comment"] = extracted_comment
-                                        grade_info["has_comment"] = True
-                                    logger.info(
-                                        f"使用统一提取函数获取评分: {extracted_grade}, 评价: {extracted_comment}"
-                                    )
                                     break
 
-                        if grade_info["has_grade"]:
-                            break
-                    if grade_info["has_grade"]:
-                        break
-
-                # 如果表格中没有找到，检查段落中是否有评分
-                if not grade_info["has_grade"]:
-                    for paragraph in doc.paragraphs:
-                        text = paragraph.text.strip()
-
-                        # 检查是否被锁定
-                        if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
-                            grade_info["locked"] = True
-                            logger.info("检测到文件已被锁定")
+                        # 检查"教师（签字）"（实验报告格式）
+                        elif "教师（签字）" in cell_text or "教师(签字)" in cell_text:
+                            # 使用统一的提取函数从单元格中提取评分和评价
+                            extracted_grade, extracted_comment, _ = (
+                                extract_grade_and_comment_from_cell(cell)
+                            )
 
-                        # 检查评价
-                        if text.startswith(("教师评价：", "AI评价：", "评价：")):
-                            comment_text = text.split("：", 1)[1].strip() if "：" in text else text
-                            if comment_text:
-                                grade_info["has_comment"] = True
-                                grade_info["comment"] = comment_text
-
-                        if text.startswith("老师评分："):
-                            grade_text = text.replace("老师评分：", "").strip()
-                            if grade_text:
+                            if extracted_grade:
                                 grade_info["has_grade"] = True
-                                grade_info["grade"] = grade_text
+                                grade_info["grade"] = extracted_grade
+                                grade_info["in_table"] = True
                                 # 判断评分类型
-                                if grade_text in ["A", "B", "C", "D", "E"]:
+                                if extracted_grade in ["A", "B", "C", "D", "E"]:
                                     grade_info["grade_type"] = "letter"
-                                elif grade_text in [
+                                elif extracted_grade in [
                                     "优秀",
                                     "良好",
                                     "中等",
@@ -2643,65 +2409,260 @@ def get_file_grade_info(full_path, base_dir=None, course_name=None):
                                 else:
                                     # 尝试判断是否为百分制（数字）
                                     try:
-                                        grade_value = float(grade_text)
+                                        grade_value = float(extracted_grade)
                                         if 0 <= grade_value <= 100:
                                             grade_info["grade_type"] = "percentage"
                                         else:
                                             grade_info["grade_type"] = "letter"  # 默认
                                     except (ValueError, TypeError):
                                         grade_info["grade_type"] = "letter"  # 默认
+                                # 保存评价（如果有）
+                                if extracted_comment and extracted_comment.strip():
+                                    grade_info["comment"] = extracted_comment
+                                    grade_info["has_comment"] = True
+                                logger.info(
+                                    f"使用统一提取函数获取评分: {extracted_grade}, "
+                                    f"评价: {extracted_comment}"
+                                )
+                                break
 
-                        if grade_info["locked"]:
-                            cell, _, _, _ = find_teacher_signature_cell(doc)
-                            grade_info["format_valid"] = bool(cell)
+                    if grade_info["has_grade"]:
+                        break
+                if grade_info["has_grade"]:
+                    break
 
-                        if grade_info["has_grade"] and grade_info["locked"]:
-                            break
+            # 如果表格中没有找到，检查段落中是否有评分
+            if not grade_info["has_grade"]:
+                # 所有表格都已扫描
+                if grade_info["signature_cell"] is None:
+                    grade_info["signature_cell"] = False
+                for paragraph in doc.paragraphs:
+                    text = paragraph.text.strip()
+
+                    # 检查是否被锁定
+                    if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
+                        grade_info["locked"] = True
+                        logger.info("检测到文件已被锁定")
+
+                    # 检查评价
+                    if text.startswith(("教师评价：", "AI评价：", "评价：")):
+                        comment_text = text.split("：", 1)[1].strip() if "：" in text else text
+                        if comment_text:
+                            grade_info["has_comment"] = True
+                            grade_info["comment"] = comment_text
+
+                    if text.startswith("老师评分："):
+                        grade_text = text.replace("老师评分：", "").strip()
+                        if grade_text:
+                            grade_info["has_grade"] = True
+                            grade_info["grade"] = grade_text
+                            # 判断评分类型
+                            if grade_text in ["A", "B", "C", "D", "E"]:
+                                grade_info["grade_type"] = "letter"
+                            elif grade_text in [
+                                "优秀",
+                                "良好",
+                                "中等",
+                                "及格",
+                                "不及格",
+                            ]:
+                                grade_info["grade_type"] = "text"
+                            else:
+                                # 尝试判断是否为百分制（数字）
+                                try:
+                                    grade_value = float(grade_text)
+                                    if 0 <= grade_value <= 100:
+                                        grade_info["grade_type"] = "percentage"
+                                    else:
+                                        grade_info["grade_type"] = "letter"  # 默认
+                                except (ValueError, TypeError):
+                                    grade_info["grade_type"] = "letter"  # 默认
 
-            except Exception as e:
-                logger.error(f"检查 Word 文档评分失败: {str(e)}")
-        else:
-            # 对于其他文件，尝试以文本方式检查
-            try:
-                with open(full_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
+                    if grade_info["locked"]:
+                        cell, _, _, _ = find_teacher_signature_cell(doc)
+                        grade_info["format_valid"] = bool(cell)
 
-                    # 查找评分行
-                    for line in lines:
-                        if line.strip().startswith("老师评分："):
-                            grade_text = line.strip().replace("老师评分：", "").strip()
-                            if grade_text:
-                                grade_info["has_grade"] = True
-                                grade_info["grade"] = grade_text
-                                # 判断评分类型
-                                if grade_text in ["A", "B", "C", "D", "E"]:
-                                    grade_info["grade_type"] = "letter"
-                                elif grade_text in [
-                                    "优秀",
-                                    "良好",
-                                    "中等",
-                                    "及格",
-                                    "不及格",
-                                ]:
-                                    grade_info["grade_type"] = "text"
-                                else:
-                                    # 尝试判断是否为百分制（数字）
-                                    try:
-                                        grade_value = float(grade_text)
-                                        if 0 <= grade_value <= 100:
-                                            grade_info["grade_type"] = "percentage"
-                                        else:
-                                            grade_info["grade_type"] = "letter"  # 默认
-                                    except (ValueError, TypeError):
+                    if grade_info["has_grade"] and grade_info["locked"]:
+                        break
+    else:
+        # 对于其他文件，尝试以文本方式检查
+        try:
+            with open(full_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+
+                # 查找评分行
+                for line in lines:
+                    if line.strip().startswith("老师评分："):
+                        grade_text = line.strip().replace("老师评分：", "").strip()
+                        if grade_text:
+                            grade_info["has_grade"] = True
+                            grade_info["grade"] = grade_text
+                            # 判断评分类型
+                            if grade_text in ["A", "B", "C", "D", "E"]:
+                                grade_info["grade_type"] = "letter"
+                            elif grade_text in [
+                                "优秀",
+                                "良好",
+                                "中等",
+                                "及格",
+                                "不及格",
+                            ]:
+                                grade_info["grade_type"] = "text"
+                            else:
+                                # 尝试判断是否为百分制（数字）
+                                try:
+                                    grade_value = float(grade_text)
+                                    if 0 <= grade_value <= 100:
+                                        grade_info["grade_type"] = "percentage"
+                                    else:
                                         grade_info["grade_type"] = "letter"  # 默认
-                                break
+                                except (ValueError, TypeError):
+                                    grade_info["grade_type"] = "letter"  # 默认
+                            break
+        except UnicodeDecodeError:
+            # 二进制文件（如 PDF）不包含文本评分
+            pass
 
-                if grade_info["locked"]:
-                    cell, _, _, _ = find_teacher_signature_cell(doc)
-                    grade_info["format_valid"] = bool(cell)
+    return grade_info
 
-            except Exception as e:
-                logger.error(f"检查文件评分失败: {str(e)}")
+
+_grade_info_index = GradeInfoIndex(parser=_parse_file_grade_info)
+
+
+def _infer_grade_type(grade):
+    """根据评分文本判断评分方式"""
+    if grade in ["A", "B", "C", "D", "E"]:
+        return "letter"
+    if grade in ["优秀", "良好", "中等", "及格", "不及格"]:
+        return "text"
+    try:
+        if 0 <= float(grade) <= 100:
+            return "percentage"
+    except (ValueError, TypeError):
+        pass
+    return "letter"
+
+
+def _apply_grade_write(full_path, changes, context):
+    """把合并后的评分和评价一次写入文件，然后更新评分状态并推送"""
+    warning = write_grade_and_comment_to_file(
+        full_path,
+        grade=changes.get("grade"),
+        comment=changes.get("comment"),
+        base_dir=context.get("base_dir"),
+        is_lab_report=context.get("is_lab_report"),
+        teacher_name=context.get("teacher_name"),
+        allow_locked=True,
+    )
+    if warning:
+        logger.warning(f"评分写入有警告: {full_path} - {warning}")
+
+    repository = context.get("repository")
+    if repository:
+        update_file_grade_status(
+            repository,
+            context.get("relative_path"),
+            course_name=context.get("course"),
+            user=context.get("user"),
+        )
+        push_grade_changes(repository, full_path)
+    return warning
+
+
+def _grade_write_needs_sync(full_path, is_lab_report):
+    """写入是否会产生格式警告（需要立即写入以便在响应中返回警告）
+
+    实验报告缺少"教师（签字）"单元格时会被给予D评分并锁定，
+    已锁定的文件格式仍未修复时会拒绝写入，这两种情况都不能延迟写入。
+    """
+    if not full_path.lower().endswith(".docx"):
+        return False
+    try:
+        # 优先使用评分信息索引，文件未变化时不必重新解析
+        info = _grade_info_index.get(full_path)
+        signature_cell = info.get("signature_cell")
+        if signature_cell is not None:
+            return (info.get("locked") or is_lab_report) and not signature_cell
+        with open_docx(full_path) as doc:
+            locked = any("格式错误-已锁定" in p.text for p in doc.paragraphs)
+            if not (locked or is_lab_report):
+                return False
+            cell, _, _, _ = find_teacher_signature_cell(doc)
+            return cell is None
+    except Exception as e:
+        logger.warning(f"检查文件格式失败，立即写入: {full_path} - {e}")
+        return True
+
+
+# 教师评分和评价的合并写入队列
+_grade_write_queue = register_queue(GradeWriteQueue(apply=_apply_grade_write))
+
+
+def _submit_grade_write(full_path, changes, context, is_lab_report):
+    """提交评分写入，返回需要告知教师的警告
+
+    上一次后台写入失败时本次立即写入，并在警告中带上失败原因，
+    请教师核对（失败那次的修改没有写入文件）。
+    """
+    previous_error = _grade_write_queue.error(full_path)
+    warning = _grade_write_queue.submit(
+        full_path,
+        changes,
+        context,
+        immediate=bool(previous_error) or _grade_write_needs_sync(full_path, is_lab_report),
+    )
+    if previous_error:
+        warning = "；".join(filter(None, [f"上次保存未能写入文件：{previous_error}", warning]))
+    return warning
+
+
+def get_file_grade_info(full_path, base_dir=None, course_name=None):
+    """获取文件中的评分信息
+
+    文件内容相关的字段来自评分信息索引，文件未变化时不会重复解析。
+
+    Args:
+        full_path: 文件完整路径
+        base_dir: 基础目录（用于判断作业类型）
+
+    Returns:
+        dict: 包含评分信息的字典
+    """
+    try:
+        grade_info = {
+            "has_grade": False,
+            "grade": None,
+            "grade_type": None,  # 'letter' 或 'text' 或 'percentage'
+            "in_table": False,
+            "ai_grading_disabled": False,
+            "locked": False,  # 是否被锁定（格式错误的实验报告）
+            "is_lab_report": False,  # 是否为实验报告
+            "has_comment": False,  # 是否有评价
+            "format_valid": True,  # 格式是否有效（锁定时用于放行教师修改）
+        }
+
+        # 判断是否为实验报告
+        grade_info["is_lab_report"] = is_lab_report_file(
+            course_name=course_name, file_path=full_path, base_dir=base_dir
+        )
+
+        try:
+            grade_info.update(_grade_info_index.get(full_path))
+        except Exception as e:
+            logger.error(f"检查文件评分失败: {str(e)}")
+
+        # 评分或评价尚在合并队列中时，返回待写入的内容
+        pending = _grade_write_queue.pending(full_path)
+        if pending.get("grade"):
+            grade_info["has_grade"] = True
+            grade_info["grade"] = pending["grade"]
+            grade_info["grade_type"] = _infer_grade_type(pending["grade"])
+        if pending.get("comment"):
+            grade_info["has_comment"] = True
+            grade_info["comment"] = pending["comment"]
+        write_error = _grade_write_queue.error(full_path)
+        if write_error:
+            grade_info["write_error"] = write_error
 
         if grade_info["has_grade"]:
             grade_info["ai_grading_disabled"] = True
@@ -2720,6 +2681,28 @@ def get_file_grade_info(full_path, base_dir=None, course_name=None):
         }
 
 
+def get_file_grade_info_many(paths):
+    """批量获取文件内容决定的评分信息（供目录级调用方使用）
+
+    一次查询评分信息索引，并叠加合并队列中尚未写入的评分和评价。
+    不计算依赖课程上下文的 is_lab_report。
+
+    Returns:
+        {绝对路径: 评分信息}；无法读取或解析的文件不在结果中
+    """
+    infos = _grade_info_index.get_many(paths)
+    for abs_path, info in infos.items():
+        pending = _grade_write_queue.pending(abs_path)
+        if pending.get("grade"):
+            info["has_grade"] = True
+            info["grade"] = pending["grade"]
+            info["grade_type"] = _infer_grade_type(pending["grade"])
+        if pending.get("comment"):
+            info["has_comment"] = True
+            info["comment"] = pending["comment"]
+    return infos
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_template_list(request):
@@ -2835,10 +2818,7 @@ def get_file_content(request):
                         if file_ext == ".docx":
                             try:
                                 try:
-                                    import mammoth
-
-                                    result = mammoth.convert_to_html(BytesIO(content_bytes))
-                                    html_content = result.value
+                                    html_content = get_preview_store().render_bytes(content_bytes)
                                     css = """
                                     <style>
                                         .docx-content {
@@ -3135,13 +3115,9 @@ def get_file_content(request):
             if file_ext == ".docx":
                 # Word 文档 - 直接处理，不依赖MIME类型
                 try:
-                    # 尝试使用 mammoth 读取
+                    # 尝试使用 mammoth 读取（结果按文件 stat 缓存在预览存储中）
                     try:
-                        import mammoth
-
-                        with open(full_path, "rb") as docx_file:
-                            result = mammoth.convert_to_html(docx_file)
-                            html_content = result.value
+                        html_content = get_preview_store().render_path(full_path)
 
                         # 添加样式
                         css = """
@@ -3779,6 +3755,123 @@ def get_file_content(request):
     return JsonResponse({"status": "error", "message": "不支持的请求方法"})
 
 
+@login_required
+@require_http_methods(["GET"])
+def docx_preview_asset(request, key, name):
+    """Word 预览中的图片资源（内容不可变，允许浏览器长期缓存）"""
+    asset_path = get_preview_store().asset_path(key, name)
+    if asset_path is None:
+        raise Http404("预览资源不存在")
+    response = serve_path(request, asset_path)
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def prerender_folder_previews(request):
+    """教师打开作业文件夹时，在后台预先转换其中的 Word 文档
+
+    参数：
+    - path: 文件夹路径（相对于课程目录）
+    - repo_id: 仓库ID
+    - course: 课程名称
+    """
+    path = request.POST.get("path", "").strip()
+    repo_id = request.POST.get("repo_id")
+    course = request.POST.get("course", "").strip()
+    if not repo_id:
+        return JsonResponse({"status": "error", "message": "仓库ID不能为空"})
+
+    # 课程名和路径都不能是绝对路径或包含上级目录
+    for value in (course, path):
+        parts = value.replace("\\", "/").split("/")
+        if os.path.isabs(value) or value.startswith("\\") or ".." in parts:
+            return JsonResponse({"status": "error", "message": "无权访问该路径"})
+
+    try:
+        repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
+    except Repository.DoesNotExist:
+        return JsonResponse({"status": "error", "message": "仓库不存在"})
+
+    try:
+        if repo.repo_type == "git":
+            adapter = _build_git_adapter(repo)
+            folder = "/".join(p for p in [course, path] if p).replace("\\", "/")
+            scheduled = int(get_prerenderer().schedule_remote_folder(adapter, folder, repo.id))
+        else:
+            # 解析符号链接后必须仍在仓库目录内
+            repo_root = os.path.realpath(repo.get_full_path())
+            folder = os.path.realpath(os.path.join(repo_root, course, path))
+            if folder != repo_root and not folder.startswith(repo_root + os.sep):
+                return JsonResponse({"status": "error", "message": "无权访问该路径"})
+            if not os.path.isdir(folder):
+                return JsonResponse({"status": "error", "message": "目录不存在"})
+            scheduled = get_prerenderer().schedule_local_folder(folder)
+    except Exception as e:
+        logger.warning(f"预渲染 Word 预览失败: {str(e)}")
+        return JsonResponse({"status": "error", "message": f"预渲染失败: {str(e)}"})
+
+    return JsonResponse({"status": "success", "scheduled": scheduled})
+
+
+@login_required
+@require_http_methods(["GET"])
+def grade_push_status(request):
+    """Git 仓库评分提交推送状态（待提交文件数、是否正在推送、上次推送时间、写入失败的文件）
+
+    参数：
+    - repo_id: 仓库ID
+    """
+    repo_id = request.GET.get("repo_id")
+    if not repo_id:
+        return JsonResponse({"status": "error", "message": "仓库ID不能为空"})
+
+    try:
+        repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
+    except Repository.DoesNotExist:
+        return JsonResponse({"status": "error", "message": "仓库不存在"})
+
+    # 后台写入失败的文件（相对仓库根目录）
+    repo_root = repo.get_full_path()
+    write_errors = {
+        os.path.relpath(path, repo_root).replace(os.sep, "/"): error
+        for path, error in _grade_write_queue.errors_under(repo_root).items()
+    }
+    return JsonResponse(
+        {
+            "status": "success",
+            "push": get_push_scheduler().status(repo.id),
+            "write_errors": write_errors,
+        }
+    )
+
+
+@login_required
+@require_http_methods(["POST"])
+def flush_grade_pushes(request):
+    """教师离开作业时，立即在后台提交推送仓库中已评分的文件
+
+    参数：
+    - repo_id: 仓库ID
+    """
+    repo_id = request.POST.get("repo_id")
+    if not repo_id:
+        return JsonResponse({"status": "error", "message": "仓库ID不能为空"})
+
+    try:
+        repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
+    except Repository.DoesNotExist:
+        return JsonResponse({"status": "error", "message": "仓库不存在"})
+
+    scheduler = get_push_scheduler()
+    if repo.is_git_repository():
+        # 合并窗口中该仓库尚未写入的评分先写入文件，写入时会登记到调度器
+        _grade_write_queue.flush_under(repo.get_full_path())
+        scheduler.flush_async(repo.id)
+    return JsonResponse({"status": "success", "push": scheduler.status(repo.id)})
+
+
 @login_required
 @require_http_methods(["POST"])
 @require_staff_user
@@ -3856,22 +3949,22 @@ def add_grade_to_file(request):
         # 需求 4.5, 5.2: 实验报告强制评价验证
         # 如果是实验报告且没有提供评价，阻止保存
         if is_lab_report:
-            # 检查是否已有评价（从文件中读取）
-            existing_comment = None
+            # 检查是否已有评价（尚未写入的评价或文件中的评价）
+            existing_comment = _grade_write_queue.pending(full_path).get("comment")
             try:
                 _, ext = os.path.splitext(full_path)
-                if ext.lower() == ".docx":
-                    doc = Document(full_path)
-                    # 尝试从实验报告表格中提取评价
-                    cell, _, _, _ = find_teacher_signature_cell(doc)
-                    if cell:
-                        _, existing_comment, _ = extract_grade_and_comment_from_cell(cell)
-                    else:
-                        for paragraph in doc.paragraphs:
-                            text = paragraph.text.strip()
-                            if text.startswith(("教师评价：", "AI评价：", "评价：")):
-                                existing_comment = text.split("：", 1)[1].strip()
-                                break
+                if not existing_comment and ext.lower() == ".docx":
+                    with open_docx(full_path) as doc:
+                        # 尝试从实验报告表格中提取评价
+                        cell, _, _, _ = find_teacher_signature_cell(doc)
+                        if cell:
+                            _, existing_comment, _ = extract_grade_and_comment_from_cell(cell)
+                        else:
+                            for paragraph in doc.paragraphs:
+                                text = paragraph.text.strip()
+                                if text.startswith(("教师评价：", "AI评价：", "评价：")):
+                                    existing_comment = text.split("：", 1)[1].strip()
+                                    break
             except Exception as e:
                 logger.warning(f"检查现有评价时出错: {e}")
 
@@ -3886,37 +3979,34 @@ def add_grade_to_file(request):
             f"调用统一写入接口: 路径={request.POST.get('path')}, 评分={grade}, 评分方式={grade_type}, 实验报告={is_lab_report}"
         )
 
-        # 调用统一的文件写入接口
-        warning = write_grade_and_comment_to_file(
-            full_path,
-            grade=grade,
-            base_dir=base_dir,
-            is_lab_report=is_lab_report,
-            teacher_name=get_teacher_display_name(request.user),
-            allow_locked=True,
-        )
-
+        repo = None
         if repo_id:
             try:
                 repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
-                push_grade_changes(repo, full_path)
             except Repository.DoesNotExist:
-                logger.warning("评分推送失败：仓库不存在或无权限")
+                logger.warning("评分推送和状态更新失败：仓库不存在或无权限")
+
+        # 通过合并队列写入：与短时间内的评价保存合并为一次文件写入、状态更新和推送
+        warning = _submit_grade_write(
+            full_path,
+            {"grade": grade},
+            {
+                "base_dir": base_dir,
+                "is_lab_report": is_lab_report,
+                "teacher_name": get_teacher_display_name(request.user),
+                "repository": repo,
+                "relative_path": request.POST.get("path"),
+                "course": course,
+                "user": request.user,
+            },
+            is_lab_report,
+        )
 
         logger.info(f"✅ 成功添加评分: {full_path}, 评分={grade}, 评分方式={grade_type}")
 
         file_type = get_file_extension(full_path)
         response_data = {"file_type": file_type, "grade": grade, "grade_type": grade_type}
 
-        if repo_id:
-            try:
-                repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
-                update_file_grade_status(
-                    repo, request.POST.get("path"), course_name=course, user=request.user
-                )
-            except Repository.DoesNotExist:
-                logger.warning("评分状态更新失败：仓库不存在或无权限")
-
         # 如果有警告信息，添加到响应中
         if warning:
             response_data["warning"] = warning
@@ -4102,6 +4192,9 @@ def remove_grade(request):
             logger.error(f"无权限修改文件: {full_path}")
             return JsonResponse({"status": "error", "message": "无权限修改文件"})
 
+        # 先写入尚在合并队列中的评分，避免删除后又被写回
+        _grade_write_queue.flush(full_path)
+
         # 从文件路径自动判断作业类型（会查询数据库中的作业批次类型）
         base_dir = get_base_directory(request)
         is_lab_report = is_lab_report_file(file_path=full_path, base_dir=base_dir)
@@ -4112,11 +4205,15 @@ def remove_grade(request):
         _, ext = os.path.splitext(full_path)
         ext = ext.lower()
 
+        # 与提交 blob 硬链接的工作副本先换成独立副本，避免改写历史版本
+        detach_working_copy(full_path)
+
         # 根据文件类型处理
         if ext == ".docx":
-            # 对于 Word 文档，使用 python-docx 删除评分和评价
+            # 对于 Word 文档，使用 python-docx 删除评分和评价（只改写主文档部件）
             try:
-                doc = Document(full_path)
+                editor = edit_docx(full_path)
+                doc = editor.document
 
                 if is_lab_report:
                     # 实验报告：清除表格中的评分和评价
@@ -4124,7 +4221,8 @@ def remove_grade(request):
                     success = clear_lab_report_grade_and_comment(doc)
 
                     if success:
-                        doc.save(full_path)
+                        editor.save()
+                        _grade_info_index.invalidate(full_path)
                         logger.info(f"成功清除实验报告的评分和评价: {full_path}")
                         return JsonResponse(
                             {
@@ -4164,7 +4262,8 @@ def remove_grade(request):
                             doc._body._body.remove(doc.paragraphs[i]._p)
 
                         # 保存文档
-                        doc.save(full_path)
+                        editor.save()
+                        _grade_info_index.invalidate(full_path)
                         logger.info(
                             f"成功删除 Word 文档中的 {len(paragraphs_to_remove)} 个评分/评价段落: {full_path}"
                         )
@@ -4238,6 +4337,7 @@ def remove_grade(request):
                         f.truncate()
                         # 写入剩余内容
                         f.writelines(lines_to_keep)
+                        _grade_info_index.invalidate(full_path)
 
                         logger.info(f"成功删除文件中的 {removed_count} 个评分/评价: {full_path}")
                         return JsonResponse(
@@ -4584,33 +4684,22 @@ def save_teacher_comment(request):
             f"请求保存教师评价和评分，路径: {full_path}, 评分: {grade}, 评价: {comment}, 课程: {course}, 实验报告: {is_lab_report}"
         )
 
-        # 使用统一函数同时写入评分和评价
-        warning = write_grade_and_comment_to_file(
+        # 通过合并队列同时写入评分和评价（与短时间内的评分保存合并为一次写入）
+        warning = _submit_grade_write(
             full_path,
-            grade=grade,
-            comment=comment,
-            base_dir=base_dir,
-            is_lab_report=is_lab_report,
-            teacher_name=get_teacher_display_name(request.user),
-            allow_locked=True,
+            {"grade": grade, "comment": comment},
+            {
+                "base_dir": base_dir,
+                "is_lab_report": is_lab_report,
+                "teacher_name": get_teacher_display_name(request.user),
+                "repository": repo,
+                "relative_path": file_path,
+                "course": course,
+                "user": request.user,
+            },
+            is_lab_report,
         )
 
-        if repo_id:
-            try:
-                repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
-                push_grade_changes(repo, full_path)
-            except Repository.DoesNotExist:
-                logger.warning("教师评价推送失败：仓库不存在或无权限")
-
-        if repo_id:
-            try:
-                repo = Repository.objects.get(id=repo_id, owner=request.user, is_active=True)
-                update_file_grade_status(
-                    repo, file_path, course_name=course, user=request.user
-                )
-            except Repository.DoesNotExist:
-                logger.warning("教师评价评分状态更新失败：仓库不存在或无权限")
-
         if warning:
             logger.warning(f"保存时有警告: {warning}")
             return create_success_response(
@@ -4689,6 +4778,9 @@ def get_file_grade_info_api(request):
             "locked": bool(grade_info.get("locked")),
             "format_valid": bool(grade_info.get("format_valid", True)),
         }
+        # 上一次后台写入失败的原因
+        if grade_info.get("write_error"):
+            response_data["write_error"] = grade_info["write_error"]
 
         return JsonResponse(response_data)
 
@@ -4796,6 +4888,12 @@ def get_teacher_comment(request):
 
         logger.info(f"验证通过，完整路径: {full_path}")
 
+        # 评价尚在合并队列中时直接返回待写入的评价
+        if not (repo and repo.repo_type == "git"):
+            pending_comment = _grade_write_queue.pending(full_path).get("comment")
+            if pending_comment:
+                return JsonResponse({"success": True, "comment": pending_comment})
+
         # 获取文件扩展名
         _, ext = os.path.splitext(full_path)
         ext = ext.lower()
@@ -4816,12 +4914,12 @@ def get_teacher_comment(request):
 
         # 根据文件类型处理
         if ext == ".docx":
-            # 对于 Word 文档，使用 python-docx 读取评价
+            # 对于 Word 文档，流式只读解析评价
             try:
                 if repo and repo.repo_type == "git":
-                    doc = Document(BytesIO(file_bytes))
+                    doc = open_docx(BytesIO(file_bytes))
                 else:
-                    doc = Document(full_path)
+                    doc = open_docx(full_path)
                 teacher_comment = None
 
                 logger.info(
@@ -5152,17 +5250,31 @@ def _execute_batch_grade_registration(request):
         logger.info(f"开始批量登分，仓库: {repository_path}")
 
         # 导入并执行批量登分逻辑
-        from huali_edu.grade_registration import GradeRegistration
+        from .grade_registration import GradeRegistration
 
         grader = GradeRegistration()
         grader.repo_path = Path(repository_path)
 
-        # 执行批量登分
-        grader.process_docx_files(repository_path)
+        # 执行批量登分（收集所有文件成绩后一次写入登记表）
+        outcomes = grader.process_docx_files(repository_path)
+        success_count = sum(1 for outcome in outcomes if outcome["status"] == "success")
+        failed = [outcome for outcome in outcomes if outcome["status"] != "success"]
 
         logger.info(f"批量登分完成，仓库: {repository_path}")
         return JsonResponse(
-            {"status": "success", "message": f"批量登分完成，仓库: {repository_name}"}
+            {
+                "status": "success",
+                "message": f"批量登分完成，仓库: {repository_name}，成功 {success_count} 个，"
+                f"失败 {len(failed)} 个",
+                "results": [
+                    {
+                        "file": os.path.relpath(outcome["file"], repository_path),
+                        "status": outcome["status"],
+                        "error": outcome.get("error", ""),
+                    }
+                    for outcome in failed
+                ],
+            }
         )
 
     except Exception as e:
@@ -5750,139 +5862,43 @@ def _execute_batch_ai_scoring(request):
 
         logger.info(f"找到 {len(file_list)} 个文件需要处理")
 
-        # 使用队列处理批量AI评分
-        results = process_batch_ai_scoring_with_queue(file_list, base_dir, request.user)
-        success_count = results["success"]
-        error_count = results["failed"]
-
-        return JsonResponse(
-            {
-                "status": "success",
-                "message": f"批量AI评分完成，成功 {success_count} 个，失败 {error_count} 个。",
-                "results": results,
-            }
-        )
-
-    except Exception as e:
-        logger.error(f"执行批量AI评分失败: {str(e)}")
-        return JsonResponse({"status": "error", "message": f"执行批量AI评分失败: {str(e)}"})
-
-
-def process_batch_ai_scoring_with_queue(file_list, base_dir, user=None):
-    """使用队列处理批量AI评分"""
-    logger.info(f"=== 开始批量AI评分，共 {len(file_list)} 个文件 ===")
-
-    results = {"total": len(file_list), "success": 0, "failed": 0, "skipped": 0, "results": []}
-
-    for i, file_path in enumerate(file_list, 1):
-        filename = os.path.basename(file_path)
-        logger.info(f"处理进度: {i}/{len(file_list)} - {filename}")
-
-        try:
-            # 检查是否已有评分
-            grade_info = get_file_grade_info(file_path)
-            if grade_info["has_grade"]:
-                logger.info(f"文件 {filename} 已有评分: {grade_info['grade']}，跳过AI评分")
-                results["skipped"] += 1
-                results["results"].append(
-                    {
-                        "file": filename,
-                        "status": "skipped",
-                        "reason": f"已有评分: {grade_info['grade']}",
-                    }
-                )
-                continue
-
-            # 处理单个文件
-            result = _process_single_file_for_ai_scoring(file_path, base_dir, filename, user)
-
-            if result["success"]:
-                results["success"] += 1
-                results["results"].append({"file": filename, "status": "success"})
-            else:
-                results["failed"] += 1
-                results["results"].append(
-                    {"file": filename, "status": "failed", "error": result.get("error", "未知错误")}
-                )
-
-            # 添加进度日志
-            if i % 5 == 0 or i == len(file_list):
-                logger.info(
-                    f"批量AI评分进度: {i}/{len(file_list)} (成功: {results['success']}, 失败: {results['failed']}, 跳过: {results['skipped']})"
-                )
-
-        except Exception as e:
-            logger.error(f"处理文件 {filename} 时发生异常: {str(e)}")
-            results["failed"] += 1
-            results["results"].append({"file": filename, "status": "failed", "error": str(e)})
-
-    logger.info("=== 批量AI评分完成 ===")
-    logger.info(
-        f"总计: {results['total']}, 成功: {results['success']}, 失败: {results['failed']}, 跳过: {results['skipped']}"
-    )
-
-    return results
-
-
-def _process_single_file_for_ai_scoring(file_path, base_dir, filename, user=None):
-    """处理单个文件进行AI评分"""
-    try:
-        # 检查文件是否已有评分
-        grade_info = get_file_grade_info(file_path)
-        if grade_info["has_grade"]:
-            logger.info(f"文件 {filename} 已有评分: {grade_info['grade']}，跳过AI评分")
-            return {
-                "file": filename,
-                "success": False,
-                "error": f"该作业已有评分：{grade_info['grade']}，无需重复评分",
-            }
-        else:
-            result = _perform_ai_scoring_for_file(file_path, base_dir, user)
-            return {"file": filename, **result}
-    except Exception as e:
-        logger.error(f"处理文件 {filename} 失败: {str(e)}")
-        return {
-            "file": filename,
-            "success": False,
-            "error": f"处理失败: {str(e)}",
-        }
-
-
-def _process_directory_recursively_for_ai_scoring(directory_path, base_dir, user=None):
-    """递归处理目录进行AI评分"""
-    results = []
-    success_count = 0
-    error_count = 0
-
-    try:
-        for root, dirs, files in os.walk(directory_path):
-            for filename in files:
-                if filename.endswith((".docx", ".txt")):
-                    file_path = os.path.join(root, filename)
-                    # 计算相对路径用于显示
-                    rel_path = os.path.relpath(file_path, base_dir)
-
-                    result = _process_single_file_for_ai_scoring(
-                        file_path, base_dir, rel_path, user
-                    )
-                    if result["success"]:
-                        success_count += 1
-                    else:
-                        error_count += 1
-                    results.append(result)
-
-    except Exception as e:
-        logger.error(f"递归处理目录失败: {str(e)}")
-        results.append(
+        # 创建后台评分任务，立即返回任务 ID
+        job = _ai_scoring_runner.create_job(
+            request.user, file_list, base_dir=base_dir, kind=AIScoringJob.KIND_ADVANCED
+        )
+        _ai_scoring_runner.submit(job)
+        job.refresh_from_db()
+
+        return JsonResponse(
             {
-                "file": "目录处理",
-                "success": False,
-                "error": f"目录处理失败: {str(e)}",
+                "status": "success",
+                "message": f"批量AI评分任务已提交，共 {job.total_files} 个文件。",
+                "job_id": job.id,
+                "results": job.progress(),
             }
         )
-        error_count += 1
 
-    return results, success_count, error_count
+    except Exception as e:
+        logger.error(f"执行批量AI评分失败: {str(e)}")
+        return JsonResponse({"status": "error", "message": f"执行批量AI评分失败: {str(e)}"})
+
+
+def _score_homework_job_item(item):
+    """高级批量评分：按班级评分类型评分单个文件（已有评分的跳过）"""
+    grade_info = get_file_grade_info(item.file_path)
+    if grade_info["has_grade"]:
+        logger.info(f"文件 {item.file_name} 已有评分: {grade_info['grade']}，跳过AI评分")
+        return {"status": "skipped", "message": f"已有评分: {grade_info['grade']}"}
+
+    result = _perform_ai_scoring_for_file(item.file_path, item.job.base_dir, item.job.user)
+    if not result.get("success"):
+        return {"status": "failed", "message": result.get("error", "未知错误")}
+    return {
+        "status": "success",
+        "grade": result.get("grade"),
+        "score": result.get("score"),
+        "comment": result.get("comment", ""),
+    }
 
 
 def generate_random_comment(grade):
@@ -6187,9 +6203,13 @@ def write_grade_and_comment_to_file(
     else:
         logger.info(f"=== 明确指定文件类型: is_lab_report={is_lab_report} ===")
 
+    # 与提交 blob 硬链接的工作副本先换成独立副本，避免改写历史版本
+    detach_working_copy(full_path)
+
     if ext.lower() == ".docx":
-        # Word文档处理
-        doc = Document(full_path)
+        # Word文档处理：只改写主文档部件，图片等其他部件原样复制
+        editor = edit_docx(full_path)
+        doc = editor.document
 
         # 检查文件是否已被锁定（格式错误的实验报告）
         for paragraph in doc.paragraphs:
@@ -6218,7 +6238,8 @@ def write_grade_and_comment_to_file(
 
             if success:
                 # 成功写入表格
-                doc.save(full_path)
+                editor.save()
+                _grade_info_index.invalidate(full_path)
                 logger.info(
                     f"✅ 实验报告写入成功: 评分={modified_grade}, 评价={modified_comment[:30]}..."
                 )
@@ -6245,7 +6266,8 @@ def write_grade_and_comment_to_file(
             logger.info(f">>> 按普通作业格式写入段落: 评分={grade}, 评价={comment}")
             write_grade_and_comment_paragraphs(doc, grade, comment)
 
-            doc.save(full_path)
+            editor.save()
+            _grade_info_index.invalidate(full_path)
             logger.info(f"已写入Word文档: 评分={grade}, 评价={comment or '无'}")
 
         # 返回格式警告（如果有）
@@ -6288,6 +6310,7 @@ def write_grade_and_comment_to_file(
                 f.write(f"\n老师评分：{grade}\n")
             if comment:
                 f.write(f"\n教师评价：{comment}\n")
+        _grade_info_index.invalidate(full_path)
 
         logger.info(f"已写入文本文件: 评分={grade}, 评价={comment}")
 
@@ -6344,176 +6367,30 @@ def add_grade_to_file_logic(full_path, grade, base_dir):
     write_grade_and_comment_to_file(full_path, grade=grade, base_dir=base_dir)
 
 
-def rate_limit_api_request():
-    """API请求限流函数"""
-    global LAST_REQUEST_TIME, REQUEST_HISTORY
-
-    with REQUEST_LOCK:
-        current_time = time.time()
-
-        # 检查是否需要等待
-        if current_time - LAST_REQUEST_TIME < API_REQUEST_INTERVAL:
-            wait_time = API_REQUEST_INTERVAL - (current_time - LAST_REQUEST_TIME)
-            logger.info(f"API限流：等待 {wait_time:.2f} 秒")
-            time.sleep(wait_time)
-
-        # 更新最后请求时间
-        LAST_REQUEST_TIME = time.time()
-        REQUEST_HISTORY.append(current_time)
-
-        # 记录请求频率
-        if len(REQUEST_HISTORY) >= 5:
-            recent_requests = [t for t in REQUEST_HISTORY if current_time - t <= 5.0]
-            logger.info(f"最近5秒内API请求次数: {len(recent_requests)}")
-
-
 def volcengine_score_homework(content):
+    """调用火山引擎AI评分（复用进程级客户端与连接池，自动应用速率限制）
+
+    Returns:
+        (分数, AI回复原文)；分数无法解析时为 None
+    """
     logger.info("=== 开始调用火山引擎AI评分 ===")
     logger.info(f"输入内容长度: {len(content)}")
-    logger.info(f"输入内容前100字符: {content[:100]}...")
 
     # 检查Ark SDK是否可用
     if not ARK_AVAILABLE:
         logger.error("volcenginesdkarkruntime SDK未安装")
         return None, "AI评分服务不可用，请安装volcenginesdkarkruntime"
 
-    # 应用API限流
-    rate_limit_api_request()
-
-    # 从环境变量获取 Ark API 密钥（与 tests 中保持一致）
-    api_key = os.environ.get("ARK_API_KEY")
-    if not api_key:
+    client = get_scoring_client()
+    if client is None:
         logger.error("未设置ARK_API_KEY环境变量")
         return None, "API密钥未配置"
 
-    # API密钥格式验证（火山引擎API密钥通常是UUID格式）
-    import re
-
-    uuid_pattern = r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
-
-    if re.match(uuid_pattern, api_key):
-        logger.info("API密钥格式正确（UUID格式）")
-    else:
-        logger.warning("API密钥格式可能不正确，请检查是否为有效的火山引擎API密钥")
-
-    # 创建客户端时设置更长的超时时间和重试配置
-    import ssl
-
-    import httpx
-
-    # 创建自定义SSL上下文
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-
-    # 创建自定义传输层
-    transport = httpx.HTTPTransport(verify=False, retries=3)  # 禁用SSL验证
-
-    # 创建自定义客户端
-    http_client = httpx.Client(transport=transport, timeout=60.0)
-
-    client = Ark(
-        api_key=api_key,
-        timeout=60.0,  # 增加超时时间到60秒
-        max_retries=3,  # 增加重试次数
-        http_client=http_client,
-    )
-
-    # 提示词：强制模型以固定的两行格式返回，便于稳定解析
-    prompt = (
-        "请作为严格的批改老师，对以下作业给出评分与评价。\n"
-        "要求：\n"
-        "1. 只按照如下格式输出，两行，不要添加其他内容；\n"
-        "2. 分数为0-100的整数；\n"
-        "3. 评价不超过50字。\n"
-        "格式：\n"
-        "分数：<整数>分\n"
-        "评价：<不超过50字>\n\n"
-        f"{content}"
-    )
-    logger.info(f"发送给AI的提示词长度: {len(prompt)}")
-
-    try:
-        logger.info("正在调用火山引擎API...")
-
-        # 添加网络诊断信息
-        import socket
-
-        dns_ok = False
-        try:
-            # 测试DNS解析（使用正确的API域名）
-            ip = socket.gethostbyname("ark.cn-beijing.volces.com")
-            logger.info(f"DNS解析正常: ark.cn-beijing.volces.com -> {ip}")
-            dns_ok = True
-        except Exception as dns_error:
-            logger.warning(f"主DNS解析失败: {dns_error}")
-            # 尝试备用域名
-            try:
-                ip = socket.gethostbyname("api.volcengineapi.com")
-                logger.info(f"备用DNS解析正常: api.volcengineapi.com -> {ip}")
-                dns_ok = True
-            except Exception as backup_dns_error:
-                logger.warning(f"备用DNS解析也失败: {backup_dns_error}")
-
-        if not dns_ok:
-            logger.warning("DNS解析失败，但继续尝试API调用")
-
-        # 模型名称，允许通过环境变量覆盖，默认 deepseek-r1-250528
-        model_name = os.environ.get("ARK_MODEL", "deepseek-r1-250528")
-        logger.info(f"使用模型: {model_name}")
-
-        # 在调试模式下测试网络连接
-        if os.environ.get("DEBUG", "False").lower() == "true":
-            try:
-                import requests
-
-                response = requests.get("https://ark.cn-beijing.volces.com", timeout=5)
-                logger.info(f"网络连接测试: 状态码 {response.status_code}")
-            except Exception as conn_error:
-                logger.debug(f"网络连接测试失败: {conn_error}")
-
-        resp = client.chat.completions.create(
-            model=model_name,
-            messages=[{"content": prompt, "role": "user"}],
-        )
-
-        result = resp.choices[0].message.content
-        logger.info(f"成功提取AI回复内容，长度: {len(result)}")
-
-    except Exception as e:
-        logger.error(f"调用火山引擎AI评分失败: {str(e)}")
-        logger.error(f"异常详情: {traceback.format_exc()}")
-        result = ""
-
-    # 从回复中尽量提取一个分数字样；若没有，则仅返回原文作为评价
-    import re
-
-    patterns = [
-        r"分数[:：]?\s*(\d{1,3})\s*分",
-        r"得分[:：]?\s*(\d{1,3})",
-        r"成绩[:：]?\s*(\d{1,3})",
-        r"Score[:：]?\s*(\d{1,3})",
-        r"(\d{1,3})\s*/\s*100",
-        r"(\d{1,3})\s*points",
-        r"(\d{1,3})\s*out of\s*100",
-    ]
-    score = None
-    for pattern in patterns:
-        match = re.search(pattern, result, flags=re.IGNORECASE)
-        if match:
-            try:
-                candidate = int(match.group(1))
-                if 0 <= candidate <= 100:
-                    score = candidate
-                    break
-            except Exception:
-                pass
+    score, comment = client.score(content)
     if score is None:
         logger.warning("未能从回复中提取到分数")
     else:
         logger.info(f"解析到分数: {score}")
-
-    comment = result
     return score, comment
 
 
@@ -7722,6 +7599,118 @@ def _build_git_auth_url(git_url: str, username: str = "", password: str = "") ->
     )
 
 
+def _push_files_to_git(repository: Repository, files: dict, message: str) -> None:
+    """把文件提交并推送到远程 Git 仓库
+
+    浅克隆远程分支到临时目录，写入文件后提交推送；任何 git 命令失败时抛出 RuntimeError。
+
+    Args:
+        repository: Git 仓库
+        files: {仓库内相对路径（/ 分隔）: 文件内容}
+        message: 提交说明
+    """
+    workdir = tempfile.mkdtemp(prefix="huali-grading-git-")
+    auth_url = _build_git_auth_url(
+        repository.git_url or repository.url or "",
+        username=repository.git_username or "",
+        password=repository.git_password or "",
+    )
+    branch = (repository.git_branch or repository.branch or "main").strip()
+
+    def _run_git(cmd_args):
+        env = os.environ.copy()
+        env["GIT_TERMINAL_PROMPT"] = "0"
+        env["GIT_ASKPASS"] = "echo"
+        if auth_url.startswith("git@") or auth_url.startswith("ssh://"):
+            ssh_key_path = os.path.expanduser("~/.ssh/id_ed25519")
+            if not os.path.isfile(ssh_key_path):
+                ssh_key_path = os.path.expanduser("~/.ssh/id_rsa")
+            if not os.path.isfile(ssh_key_path):
+                raise RuntimeError(f"未找到系统用户私钥: {ssh_key_path}")
+            env["GIT_SSH_COMMAND"] = (
+                f"ssh -i \"{ssh_key_path}\" -o BatchMode=yes "
+                "-o StrictHostKeyChecking=no -o ConnectTimeout=10"
+            )
+        result = subprocess.run(
+            ["git"] + cmd_args,
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=False,
+        )
+        if result.returncode != 0:
+            stderr = result.stderr or b""
+            try:
+                stderr_text = stderr.decode("utf-8")
+            except UnicodeDecodeError:
+                stderr_text = stderr.decode("gbk", errors="replace")
+            raise RuntimeError(f"{' '.join(cmd_args)} failed: {stderr_text.strip()}")
+
+    try:
+        _run_git(["init"])
+        _run_git(["config", "user.name", "huali-batch"])
+        _run_git(["config", "user.email", "huali-batch@local"])
+        _run_git(["remote", "add", "origin", auth_url])
+        _run_git(["fetch", "--depth", "1", "origin", branch])
+        _run_git(["checkout", "-B", branch, "FETCH_HEAD"])
+
+        changed = False
+        for rel_path, content in files.items():
+            repo_file_path = os.path.join(workdir, *rel_path.split("/"))
+            if os.path.isfile(repo_file_path):
+                with open(repo_file_path, "rb") as repo_file:
+                    if repo_file.read() == content:
+                        continue
+            os.makedirs(os.path.dirname(repo_file_path), exist_ok=True)
+            with open(repo_file_path, "wb") as repo_file:
+                repo_file.write(content)
+            _run_git(["add", repo_file_path])
+            changed = True
+
+        # 内容与远程一致时不产生空提交
+        if changed:
+            _run_git(["commit", "-m", message])
+            _run_git(["push", "origin", branch])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _download_git_course(adapter, course_name: str, dest_dir: str) -> str:
+    """把远程课程目录中的登分册和作业 Word 文档下载到本地目录
+
+    按 <课程>/<班级>/<作业> 结构，只下载班级目录中的 .xlsx 文件和作业目录中的 .docx 文件，
+    一次 list_tree 列出目录、一次 read_many 读取内容。
+
+    Returns:
+        本地课程目录路径
+    """
+    rel_paths = []
+    for class_entry in adapter.list_tree(course_name):
+        if class_entry.get("type") != "dir":
+            continue
+        class_name = class_entry["name"]
+        for entry in class_entry.get("children", []):
+            name = entry.get("name") or ""
+            if entry.get("type") == "file":
+                if name.lower().endswith(".xlsx") and not name.startswith("~$"):
+                    rel_paths.append(f"{class_name}/{name}")
+                continue
+            for child in entry.get("children", []):
+                child_name = child.get("name") or ""
+                if child.get("type") == "file" and child_name.lower().endswith(".docx"):
+                    rel_paths.append(f"{class_name}/{name}/{child_name}")
+
+    contents = adapter.read_many([f"{course_name}/{rel_path}" for rel_path in rel_paths])
+    course_dir = os.path.join(dest_dir, course_name)
+    os.makedirs(course_dir, exist_ok=True)
+    for rel_path in rel_paths:
+        local_path = os.path.join(course_dir, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "wb") as local_file:
+            local_file.write(contents[f"{course_name}/{rel_path}"])
+    return course_dir
+
+
 def _get_remote_default_branch(git_url: str, username: str = "", password: str = "") -> str | None:
     auth_url = _build_git_auth_url(git_url, username=username, password=password)
     try:
@@ -8504,12 +8493,12 @@ def ai_score_view(request):
         # 检查文件是否已被锁定
         _, ext = os.path.splitext(full_path)
         if ext.lower() == ".docx":
-            doc = Document(full_path)
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
-                    logger.warning(f"文件已锁定，不允许AI评分: {full_path}")
-                    return create_error_response("此文件因格式错误已被锁定，不允许修改评分")
+            with open_docx(full_path) as doc:
+                for paragraph in doc.paragraphs:
+                    text = paragraph.text.strip()
+                    if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
+                        logger.warning(f"文件已锁定，不允许AI评分: {full_path}")
+                        return create_error_response("此文件因格式错误已被锁定，不允许修改评分")
 
         # 如果是确认操作，直接写入AI评分
         if confirm:
@@ -8602,6 +8591,109 @@ def ai_score_view(request):
         return create_error_response(f"服务器内部错误: {str(e)}")
 
 
+def _is_docx_locked(file_path):
+    """检查 Word 文档是否带有格式错误锁定标记"""
+    with open_docx(file_path) as doc:
+        for paragraph in doc.paragraphs:
+            text = paragraph.text.strip()
+            if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
+                return True
+    return False
+
+
+def _score_directory_job_item(item):
+    """目录批量评分：提取文本、AI评分、写回单个文件
+
+    文本提取和AI评分在工作线程中并发执行；写回 Word、评分状态和 Git 推送
+    通过 AI_SCORING_WRITE_LOCK 串行执行。
+    """
+    job = item.job
+    file_path = item.file_path
+    file_name = item.file_name
+
+    # 检查文件是否已被锁定
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() == ".docx" and _is_docx_locked(file_path):
+        logger.warning(f"文件已锁定，跳过: {file_name}")
+        return {"status": "skipped", "message": "文件已锁定"}
+
+    # 读取文件内容
+    content = read_file_content(file_path)
+    if not content:
+        logger.warning(f"无法读取文件内容: {file_name}")
+        return {"status": "failed", "message": "无法读取文件内容"}
+
+    # 判断是否是实验报告 - 需求 6.3
+    is_lab_report = is_lab_report_file(file_path=file_path, base_dir=job.base_dir)
+
+    # 调用AI评分服务（自动应用速率限制）
+    try:
+        score, comment = volcengine_score_homework(content)
+    except Exception as e:
+        logger.error(f"AI评分服务调用失败: {file_name}, 错误: {str(e)}")
+        return {"status": "failed", "message": f"AI评分服务调用失败: {str(e)}"}
+
+    # 验证AI返回结果的完整性 - 需求 6.3, 6.4
+    if score is None:
+        logger.error(f"AI评分失败: {file_name}, 原因: {comment}")
+        return {"status": "failed", "message": f"AI评分失败: {comment}"}
+
+    # 实验报告必须有评价 - 需求 6.3, 6.4
+    if is_lab_report and (not comment or not comment.strip()):
+        logger.error(f"实验报告AI评分缺少评价内容: {file_name}")
+        return {"status": "failed", "message": "实验报告必须包含评价内容，请重新生成AI评分"}
+
+    # 将分数转换为等级
+    if score >= 90:
+        grade = "A"
+    elif score >= 80:
+        grade = "B"
+    elif score >= 70:
+        grade = "C"
+    elif score >= 60:
+        grade = "D"
+    else:
+        grade = "E"
+
+    # 写入评分和评价 - 需求 8.4
+    with AI_SCORING_WRITE_LOCK:
+        format_warning = write_grade_and_comment_to_file(
+            full_path=file_path,
+            grade=grade,
+            comment=f"AI评价：{comment}",
+            base_dir=job.base_dir,
+            is_lab_report=is_lab_report,
+            teacher_name=get_teacher_display_name(job.user),
+            allow_locked=True,
+        )
+
+        if job.repository:
+            rel_path = os.path.relpath(file_path, job.base_dir).replace("\\", "/")
+            update_file_grade_status(
+                job.repository, rel_path, course_name=job.course_name, user=job.user
+            )
+            push_grade_changes(job.repository, file_path)
+
+    logger.info(f"✅ AI评分成功: {file_name}, 等级={grade}, 分数={score}")
+    return {
+        "status": "success",
+        "grade": grade,
+        "score": score,
+        "comment": comment,
+        "message": format_warning or "",
+    }
+
+
+def _process_ai_scoring_job_item(item):
+    """批量AI评分任务的单文件处理函数（在后台工作线程中执行）"""
+    if item.job.kind == AIScoringJob.KIND_ADVANCED:
+        return _score_homework_job_item(item)
+    return _score_directory_job_item(item)
+
+
+_ai_scoring_runner = AIScoringJobRunner(processor=_process_ai_scoring_job_item)
+
+
 @login_required
 @require_http_methods(["POST"])
 @require_staff_user
@@ -8612,10 +8704,10 @@ def batch_ai_score_view(request):
     功能：
     1. 接收目录路径
     2. 遍历目录中的所有文件
-    3. 依次调用AI服务进行评分
-    4. 遵守速率限制（每秒最多2个请求）
+    3. 创建后台评分任务，由线程池并发调用AI服务进行评分
+    4. 遵守速率限制（所有工作线程共享令牌桶）
     5. 自动写入评分和评价
-    6. 返回处理结果摘要
+    6. 立即返回任务 ID 和进度摘要
 
     需求: 8.1, 8.2, 8.3, 8.4, 8.5, 8.6, 8.7
     """
@@ -8670,151 +8762,30 @@ def batch_ai_score_view(request):
 
         logger.info(f"找到 {len(files)} 个文件待评分")
 
-        # 批量处理结果
-        results = {"total": len(files), "success": 0, "failed": 0, "skipped": 0, "details": []}
-
-        # 依次处理每个文件
-        for idx, file_path in enumerate(files, 1):
-            file_name = os.path.basename(file_path)
-            logger.info(f"处理文件 {idx}/{len(files)}: {file_name}")
-
-            try:
-                # 检查文件是否已被锁定
-                _, ext = os.path.splitext(file_path)
-                if ext.lower() == ".docx":
-                    doc = Document(file_path)
-                    is_locked = False
-                    for paragraph in doc.paragraphs:
-                        text = paragraph.text.strip()
-                        if "【格式错误-已锁定】" in text or "格式错误-已锁定" in text:
-                            is_locked = True
-                            break
-
-                    if is_locked:
-                        logger.warning(f"文件已锁定，跳过: {file_name}")
-                        results["skipped"] += 1
-                        results["details"].append(
-                            {"file": file_name, "status": "skipped", "message": "文件已锁定"}
-                        )
-                        continue
-
-                # 读取文件内容
-                content = read_file_content(file_path)
-                if not content:
-                    logger.warning(f"无法读取文件内容: {file_name}")
-                    results["failed"] += 1
-                    results["details"].append(
-                        {"file": file_name, "status": "failed", "message": "无法读取文件内容"}
-                    )
-                    continue
-
-                # 判断是否是实验报告 - 需求 6.3
-                is_lab_report = is_lab_report_file(file_path=file_path, base_dir=base_dir)
-
-                # 调用AI评分服务（自动应用速率限制）
-                try:
-                    score, comment = volcengine_score_homework(content)
-
-                    # 验证AI返回结果的完整性 - 需求 6.3, 6.4
-                    if score is None:
-                        logger.error(f"AI评分失败: {file_name}, 原因: {comment}")
-                        results["failed"] += 1
-                        results["details"].append(
-                            {
-                                "file": file_name,
-                                "status": "failed",
-                                "message": f"AI评分失败: {comment}",
-                            }
-                        )
-                        continue
-
-                    # 实验报告必须有评价 - 需求 6.3, 6.4
-                    if is_lab_report and (not comment or not comment.strip()):
-                        logger.error(f"实验报告AI评分缺少评价内容: {file_name}")
-                        results["failed"] += 1
-                        results["details"].append(
-                            {
-                                "file": file_name,
-                                "status": "failed",
-                                "message": "实验报告必须包含评价内容，请重新生成AI评分",
-                            }
-                        )
-                        continue
-
-                    # 将分数转换为等级
-                    if score >= 90:
-                        grade = "A"
-                    elif score >= 80:
-                        grade = "B"
-                    elif score >= 70:
-                        grade = "C"
-                    elif score >= 60:
-                        grade = "D"
-                    else:
-                        grade = "E"
-
-                    # 写入评分和评价 - 需求 8.4
-                    format_warning = write_grade_and_comment_to_file(
-                        full_path=file_path,
-                        grade=grade,
-                        comment=f"AI评价：{comment}",
-                        base_dir=base_dir,
-                        is_lab_report=is_lab_report,
-                        teacher_name=get_teacher_display_name(request.user),
-                        allow_locked=True,
-                    )
-
-                    if repo:
-                        rel_path = os.path.relpath(file_path, base_dir).replace("\\", "/")
-                        update_file_grade_status(
-                            repo, rel_path, course_name=course, user=request.user
-                        )
-                        push_grade_changes(repo, file_path)
-
-                    results["success"] += 1
-                    result_detail = {
-                        "file": file_name,
-                        "status": "success",
-                        "grade": grade,
-                        "score": score,
-                        "comment": comment[:50] + "..." if len(comment) > 50 else comment,
-                    }
-
-                    if format_warning:
-                        result_detail["warning"] = format_warning
-
-                    results["details"].append(result_detail)
-                    logger.info(f"✅ AI评分成功: {file_name}, 等级={grade}, 分数={score}")
-
-                except Exception as e:
-                    logger.error(f"AI评分服务调用失败: {file_name}, 错误: {str(e)}")
-                    results["failed"] += 1
-                    results["details"].append(
-                        {
-                            "file": file_name,
-                            "status": "failed",
-                            "message": f"AI评分服务调用失败: {str(e)}",
-                        }
-                    )
-                    continue
-
-            except Exception as e:
-                logger.error(f"处理文件失败: {file_name}, 错误: {str(e)}")
-                logger.error(traceback.format_exc())
-                results["failed"] += 1
-                results["details"].append(
-                    {"file": file_name, "status": "failed", "message": f"处理失败: {str(e)}"}
-                )
-
-        # 返回批量处理结果
-        logger.info(
-            f"批量AI评分完成: 总数={results['total']}, 成功={results['success']}, 失败={results['failed']}, 跳过={results['skipped']}"
+        # 创建后台评分任务，立即返回任务 ID；进度通过 ai_scoring_job_progress 查询
+        job = _ai_scoring_runner.create_job(
+            request.user,
+            files,
+            base_dir=base_dir,
+            kind=AIScoringJob.KIND_DIRECTORY,
+            repository=repo,
+            course_name=course,
         )
+        _ai_scoring_runner.submit(job)
+        job.refresh_from_db()
+        progress = job.progress()
+        # 响应顶层的 status 表示请求结果，任务状态单独返回
+        progress["job_status"] = progress.pop("status")
+
+        if job.status == AIScoringJob.STATUS_SUCCESS:
+            message = (
+                f"批量AI评分完成: 成功{progress['success']}个, "
+                f"失败{progress['failed']}个, 跳过{progress['skipped']}个"
+            )
+        else:
+            message = f"批量AI评分任务已提交: 共{progress['total']}个文件"
 
-        return create_success_response(
-            data=results,
-            message=f"批量AI评分完成: 成功{results['success']}个, 失败{results['failed']}个, 跳过{results['skipped']}个",
-        )
+        return create_success_response(data=progress, message=message)
 
     except Exception as e:
         logger.error(f"批量AI评分视图异常: {str(e)}")
@@ -8950,6 +8921,9 @@ def batch_grade_to_registry(request, homework_id):
     URL参数:
         - homework_id: 作业ID
 
+    POST参数:
+        - force_full: 为 "true" 时忽略登分册同步清单，重新解析全部作业文件
+
     Returns:
         JSON响应包含处理结果
     """
@@ -9012,6 +8986,8 @@ def batch_grade_to_registry(request, homework_id):
 
         manual_relative_path = (request.POST.get("relative_path") or "").strip()
         repo_id = (request.POST.get("repo_id") or "").strip()
+        # 强制全量重建：忽略同步清单，重新解析全部作业文件
+        force_full = request.POST.get("force_full") == "true"
         repo_for_git = None
         if repo_id:
             repo_for_git = (
@@ -9080,13 +9056,12 @@ def batch_grade_to_registry(request, homework_id):
                 with open(registry_path, "wb") as registry_file:
                     registry_file.write(registry_bytes)
 
-                for entry in word_entries:
-                    name = entry.get("name") or ""
-                    if not name:
-                        continue
-                    content = adapter.read_file(
-                        f"{homework_dir_remote}/{name}".replace("\\", "/")
-                    )
+                word_names = [entry.get("name") for entry in word_entries if entry.get("name")]
+                word_contents = adapter.read_many(
+                    [f"{homework_dir_remote}/{name}".replace("\\", "/") for name in word_names]
+                )
+                for name in word_names:
+                    content = word_contents[f"{homework_dir_remote}/{name}".replace("\\", "/")]
                     with open(os.path.join(homework_dir_full_path, name), "wb") as out_file:
                         out_file.write(content)
 
@@ -9108,6 +9083,9 @@ def batch_grade_to_registry(request, homework_id):
                     homework_dir=homework_dir_full_path,
                     class_dir=class_dir_full_path,
                     progress_tracker=progress_tracker,
+                    force_full=force_full,
+                    # 远程仓库每次下载到新的临时目录，同步清单按仓库内路径标识登分册
+                    manifest_key=f"repo:{repo_for_git.id}:{class_dir_remote}/{registry_name}",
                 )
 
                 if result["success"]:
@@ -9127,64 +9105,14 @@ def batch_grade_to_registry(request, homework_id):
 
                     # Push updated registry back to remote
                     try:
-                        workdir = tempfile.mkdtemp(prefix="huali-grading-git-")
-                        auth_url = _build_git_auth_url(
-                            repo_for_git.git_url or repo_for_git.url or "",
-                            username=repo_for_git.git_username or "",
-                            password=repo_for_git.git_password or "",
-                        )
-                        branch = (repo_for_git.git_branch or repo_for_git.branch or "main").strip()
-
-                        def _run_git(cmd_args):
-                            env = os.environ.copy()
-                            env["GIT_TERMINAL_PROMPT"] = "0"
-                            env["GIT_ASKPASS"] = "echo"
-                            if auth_url.startswith("git@") or auth_url.startswith("ssh://"):
-                                ssh_key_path = os.path.expanduser("~/.ssh/id_ed25519")
-                                if not os.path.isfile(ssh_key_path):
-                                    ssh_key_path = os.path.expanduser("~/.ssh/id_rsa")
-                                if not os.path.isfile(ssh_key_path):
-                                    raise RuntimeError(f"未找到系统用户私钥: {ssh_key_path}")
-                                env["GIT_SSH_COMMAND"] = (
-                                    f"ssh -i \"{ssh_key_path}\" -o BatchMode=yes "
-                                    "-o StrictHostKeyChecking=no -o ConnectTimeout=10"
-                                )
-                            result = subprocess.run(
-                                ["git"] + cmd_args,
-                                cwd=workdir,
-                                env=env,
-                                capture_output=True,
-                                text=False,
-                            )
-                            if result.returncode != 0:
-                                stderr = result.stderr or b""
-                                try:
-                                    stderr_text = stderr.decode("utf-8")
-                                except UnicodeDecodeError:
-                                    stderr_text = stderr.decode("gbk", errors="replace")
-                                raise RuntimeError(
-                                    f"{' '.join(cmd_args)} failed: {stderr_text.strip()}"
-                                )
-
-                        _run_git(["init"])
-                        _run_git(["config", "user.name", "huali-batch"])
-                        _run_git(["config", "user.email", "huali-batch@local"])
-                        _run_git(["remote", "add", "origin", auth_url])
-                        _run_git(["fetch", "--depth", "1", "origin", branch])
-                        _run_git(["checkout", "-B", branch, "FETCH_HEAD"])
-
-                        repo_registry_path = os.path.join(
-                            workdir, course_name or "course", class_name, registry_name
+                        registry_rel_path = "/".join(
+                            [course_name or "course", class_name, registry_name]
                         )
-                        os.makedirs(os.path.dirname(repo_registry_path), exist_ok=True)
-                        with open(repo_registry_path, "wb") as registry_file:
-                            registry_file.write(registry_bytes)
-
-                        _run_git(["add", repo_registry_path])
-                        _run_git(
-                            ["commit", "-m", f"Update registry: {course_name}/{class_name}/{homework_folder}"]
+                        _push_files_to_git(
+                            repo_for_git,
+                            {registry_rel_path: registry_bytes},
+                            f"Update registry: {course_name}/{class_name}/{homework_folder}",
                         )
-                        _run_git(["push", "origin", branch])
                     except Exception as e:
                         return error_response(f"推送登分册失败: {str(e)}", status_code=500)
 
@@ -9330,6 +9258,7 @@ def batch_grade_to_registry(request, homework_id):
             homework_dir=homework_dir_full_path,
             class_dir=class_dir_full_path,
             progress_tracker=progress_tracker,
+            force_full=force_full,
         )
 
         # 7. 返回处理结果
@@ -9374,6 +9303,157 @@ def batch_grade_to_registry(request, homework_id):
         )
 
 
+@login_required
+@require_http_methods(["POST"])
+def batch_grade_course_to_registry(request, course_id):
+    """
+    整门课程批量登分：一次写入课程下所有班级、所有作业的成绩
+
+    目录结构：<repo_base>/<course_name>/<class_name>/<homework_folder>，
+    每个班级目录的登分册只加载、备份、保存一次。
+
+    URL参数:
+        - course_id: 课程ID
+
+    POST参数:
+        - repo_id: 仓库ID（可选，默认在用户的所有活跃仓库中查找课程目录）
+        - tracking_id: 进度跟踪ID（可选）
+        - force_full: 为 "true" 时忽略登分册同步清单，重新解析全部作业文件
+
+    Returns:
+        JSON响应包含每个登分册及其各次作业的处理结果
+    """
+    tracking_id = (request.POST.get("tracking_id") or "").strip()
+    tracking_id = re.sub(r"[^a-zA-Z0-9_-]", "", tracking_id)
+    tracking_id = tracking_id[:64] if tracking_id else uuid.uuid4().hex
+    progress_tracker = BatchGradeProgressTracker(tracking_id=tracking_id, user_id=request.user.id)
+    progress_tracker.start(message="正在准备整门课程批量登分...")
+
+    def error_response(message, status_code=400):
+        progress_tracker.fail(message)
+        return create_error_response(
+            message,
+            status_code=status_code,
+            response_format="success",
+            extra={"tracking_id": tracking_id},
+        )
+
+    try:
+        logger.info("整门课程批量登分 - 用户: %s, 课程ID: %s", request.user.username, course_id)
+
+        try:
+            course = Course.objects.get(id=course_id)
+        except Course.DoesNotExist:
+            return error_response("课程不存在", status_code=404)
+
+        if course.teacher != request.user and not request.user.is_superuser:
+            logger.error(
+                "无权限访问课程 - 课程ID: %s, 用户: %s", course_id, request.user.username
+            )
+            return error_response("无权限访问该课程", status_code=403)
+
+        repositories = Repository.objects.filter(owner=request.user, is_active=True)
+        repo_id = (request.POST.get("repo_id") or "").strip()
+        if repo_id:
+            repositories = repositories.filter(id=repo_id)
+
+        # 与单次作业登分一致：Git 仓库通过存储适配器读取远程课程目录
+        course_dir = None
+        git_repository = None
+        git_adapter = None
+        for repository in repositories:
+            if repository.repo_type == "git":
+                adapter = _build_git_adapter(repository)
+                if adapter.directory_exists(course.name):
+                    git_repository, git_adapter = repository, adapter
+                    break
+                continue
+            candidate = os.path.join(repository.get_full_path(), course.name)
+            if os.path.isdir(candidate):
+                course_dir = candidate
+                break
+        if not course_dir and not git_repository:
+            return error_response(f"未找到课程目录: {course.name}", status_code=404)
+
+        tenant = None
+        if hasattr(request, "tenant"):
+            tenant = request.tenant
+        elif hasattr(request.user, "profile"):
+            tenant = request.user.profile.tenant
+
+        service = GradeRegistryWriterService(
+            user=request.user,
+            tenant=tenant,
+            scenario=GradeRegistryWriterService.SCENARIO_GRADING_SYSTEM,
+        )
+        temp_root = None
+        try:
+            manifest_key_prefix = None
+            if git_repository:
+                progress_tracker.start(message="正在下载课程作业...")
+                temp_root = tempfile.mkdtemp(prefix="huali-grading-")
+                course_dir = _download_git_course(git_adapter, course.name, temp_root)
+                # 远程仓库每次下载到新的临时目录，同步清单按仓库内路径标识登分册
+                manifest_key_prefix = f"repo:{git_repository.id}:{course.name}/"
+
+            result = service.process_course_scenario(
+                course_dir,
+                progress_tracker=progress_tracker,
+                force_full=request.POST.get("force_full") == "true",
+                manifest_key_prefix=manifest_key_prefix,
+            )
+
+            if git_repository:
+                # 只推送本次写入了成绩的登分册
+                # （下载的登分册 mtime 总是新的，成绩未变化时也会重新保存）
+                changed = {}
+                for registry in result["registries"]:
+                    if not registry["success"] or not any(
+                        hw["statistics"]["success"] for hw in registry["homeworks"]
+                    ):
+                        continue
+                    rel_path = os.path.relpath(registry["registry_path"], course_dir)
+                    with open(registry["registry_path"], "rb") as registry_file:
+                        changed[f"{course.name}/{rel_path.replace(os.sep, '/')}"] = (
+                            registry_file.read()
+                        )
+                if changed:
+                    try:
+                        _push_files_to_git(
+                            git_repository, changed, f"Update registry: {course.name}"
+                        )
+                    except Exception as e:
+                        return error_response(f"推送登分册失败: {str(e)}", status_code=500)
+        finally:
+            if temp_root:
+                shutil.rmtree(temp_root, ignore_errors=True)
+
+        data = {
+            "course_name": course.name,
+            "summary": result["statistics"],
+            "reused_files": result["reused_files"],
+            "registries": result["registries"],
+            "tracking_id": tracking_id,
+        }
+        if result["success"]:
+            return create_success_response(
+                data=data, message="整门课程批量登分完成", response_format="success"
+            )
+        if result["registries"]:
+            # 部分登分册失败：返回已完成部分的结果
+            return create_error_response(
+                result["error_message"],
+                status_code=500,
+                response_format="success",
+                extra=data,
+            )
+        return error_response(result["error_message"] or "批量登分失败", status_code=400)
+
+    except Exception as e:
+        logger.error("整门课程批量登分异常: %s", str(e), exc_info=True)
+        return error_response(f"处理请求时出错: {str(e)}", status_code=500)
+
+
 @login_required
 def batch_grade_progress(request, tracking_id: str):
     """
@@ -9394,6 +9474,26 @@ def batch_grade_progress(request, tracking_id: str):
     return JsonResponse({"success": True, "data": progress})
 
 
+@login_required
+def ai_scoring_job_progress(request, job_id: int):
+    """
+    查询批量AI评分任务进度
+    """
+    job = AIScoringJob.objects.filter(id=job_id).first()
+    if not job:
+        return JsonResponse({"success": False, "message": "未找到任务"}, status=404)
+
+    # 仅允许查看自己的任务（超级管理员除外）
+    if job.user_id != request.user.id and not request.user.is_superuser:
+        return JsonResponse({"success": False, "message": "无权限查看该任务"}, status=403)
+
+    # 进程重启后中断的任务重新排队
+    if _ai_scoring_runner.resume_if_orphaned(job):
+        job.refresh_from_db()
+
+    return JsonResponse({"success": True, "data": job.progress()})
+
+
 # ==================== 缓存管理API ====================
 
 
@@ -9686,6 +9786,7 @@ def get_submission_history(request):
                 "id": sub.id,
                 "file_name": sub.file_name,
                 "file_size": sub.file_size,
+                "content_hash": sub.content_hash,
                 "version": sub.version,
                 "submitted_at": sub.submitted_at.isoformat(),
                 "grade": sub.grade,
@@ -36,6 +36,8 @@ MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", "10485760"))  # 默认10
 ALLOWED_EXTENSIONS = set(
     os.environ.get("ALLOWED_EXTENSIONS", "txt,pdf,png,jpg,jpeg,gif,doc,docx").split(",")
 )
+# 提交工作副本不支持 reflink 时硬链接到内容寻址 blob（写入评分前自动换成独立副本）
+SUBMISSION_BLOB_HARDLINK = os.environ.get("SUBMISSION_BLOB_HARDLINK", "True").lower() == "true"
 
 # Application definition
 
@@ -120,18 +122,79 @@ else:
 # Cache
 REDIS_URL = os.environ.get("REDIS_URL", "")
 if REDIS_URL:
-    CACHES = {
-        "default": {
-            "BACKEND": "django.core.cache.backends.redis.RedisCache",
-            "LOCATION": REDIS_URL,
-        }
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
     }
 else:
-    CACHES = {
-        "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        }
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+
+# 两级缓存：进程内 LRU（条目数、字节数、有效期秒数）在共享缓存之前
+CACHES = {
+    "default": {
+        "BACKEND": "grading.cache_manager.TwoTierCache",
+        "OPTIONS": {
+            "SHARED": SHARED_CACHE,
+            "LOCAL_MAX_ENTRIES": int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", "1024")),
+            "LOCAL_MAX_BYTES": int(os.environ.get("CACHE_LOCAL_MAX_BYTES", str(32 * 1024 * 1024))),
+            "LOCAL_TIMEOUT": float(os.environ.get("CACHE_LOCAL_TIMEOUT", "5")),
+            "LOCAL_METADATA_TIMEOUT": float(os.environ.get("CACHE_LOCAL_METADATA_TIMEOUT", "1")),
+        },
     }
+}
+
+# 仓库缓存监听（manage.py watch_repository_caches）：轮询间隔与事件合并窗口（秒）；
+# 监听运行时目录树、文件数量和文件内容缓存由文件事件失效，可设置更长的过期时间（0 表示使用默认值）
+CACHE_WATCHER_POLL_INTERVAL = float(os.environ.get("CACHE_WATCHER_POLL_INTERVAL", "2"))
+CACHE_WATCHER_DEBOUNCE = float(os.environ.get("CACHE_WATCHER_DEBOUNCE", "0.5"))
+CACHE_WATCHED_PATH_TIMEOUT = int(os.environ.get("CACHE_WATCHED_PATH_TIMEOUT", "0"))
+
+# 仓库文件目录：完整刷新后保持“当前”的时长（秒），超过后请求回退到读取文件系统；
+# 运行 watch_repository_caches 时由监听器续期，否则 refresh_repository_catalogs 的 cron 间隔应小于该值
+REPOSITORY_CATALOG_MAX_AGE_SECONDS = int(
+    os.environ.get("REPOSITORY_CATALOG_MAX_AGE_SECONDS", "120")
+)
+
+# Word 预览缓存：存储目录、大小预算（MB）和预渲染线程数（0 表示在请求线程内同步执行）
+DOCX_PREVIEW_DIR = os.environ.get(
+    "DOCX_PREVIEW_DIR", os.path.join(BASE_DIR, "cache", "docx_previews")
+)
+DOCX_PREVIEW_MAX_MB = int(os.environ.get("DOCX_PREVIEW_MAX_MB", "512"))
+DOCX_PREVIEW_WORKERS = int(os.environ.get("DOCX_PREVIEW_WORKERS", "2"))
+
+# 文件下载：部署在 nginx 之后时，FILE_SERVE_ACCEL_ROOT 下的文件通过 X-Accel-Redirect
+# 交给 nginx 发送（FILE_SERVE_ACCEL_PREFIX 为对应的 internal location，两者都为空表示不启用）
+FILE_SERVE_ACCEL_ROOT = os.environ.get("FILE_SERVE_ACCEL_ROOT", "")
+FILE_SERVE_ACCEL_PREFIX = os.environ.get("FILE_SERVE_ACCEL_PREFIX", "")
+
+# 远程 Git 仓库镜像：新鲜度窗口内不重复 fetch（秒）
+GIT_MIRROR_FRESHNESS_SECONDS = int(os.environ.get("GIT_MIRROR_FRESHNESS_SECONDS", "60"))
+
+# 批量AI评分：后台工作线程数（0 表示在请求线程内同步执行）和 AI 服务每秒请求数
+AI_SCORING_WORKERS = int(os.environ.get("AI_SCORING_WORKERS", "4"))
+AI_SCORING_RATE_LIMIT = float(os.environ.get("AI_SCORING_RATE_LIMIT", "2"))
+# 未完成的批量AI评分任务超过该时间（秒）没有进展时，查询进度会重新排队
+AI_SCORING_STALE_SECONDS = int(os.environ.get("AI_SCORING_STALE_SECONDS", "300"))
+# AI评分客户端连接池大小
+AI_SCORING_MAX_CONNECTIONS = int(os.environ.get("AI_SCORING_MAX_CONNECTIONS", "8"))
+# AI评分结果缓存有效期（秒），相同内容的作业在有效期内复用评分结果
+AI_SCORE_CACHE_TTL_SECONDS = int(os.environ.get("AI_SCORE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# 批量登分：解析Word文档的进程数（0 表示使用CPU核数）
+GRADE_EXTRACT_WORKERS = int(os.environ.get("GRADE_EXTRACT_WORKERS", "0"))
+# 教师评分和评价写入的合并窗口（秒），窗口内同一文件的多次保存合并为一次写入（0 表示立即写入）
+GRADE_WRITE_DELAY_SECONDS = float(os.environ.get("GRADE_WRITE_DELAY_SECONDS", "2"))
+# Git 仓库评分提交推送：最后一次评分后等待 GRADE_PUSH_DELAY_SECONDS 秒（0 表示立即提交推送），
+# 最多等待 GRADE_PUSH_MAX_WAIT_SECONDS 秒，待提交文件达到 GRADE_PUSH_BATCH_SIZE 个时立即提交；
+# 提交或推送失败按 GRADE_PUSH_RETRY_SECONDS 起的指数退避重试 GRADE_PUSH_MAX_RETRIES 次，
+# git push / pull --rebase 超过 GRADE_PUSH_GIT_TIMEOUT_SECONDS 秒视为失败
+GRADE_PUSH_DELAY_SECONDS = float(os.environ.get("GRADE_PUSH_DELAY_SECONDS", "30"))
+GRADE_PUSH_MAX_WAIT_SECONDS = float(os.environ.get("GRADE_PUSH_MAX_WAIT_SECONDS", "300"))
+GRADE_PUSH_BATCH_SIZE = int(os.environ.get("GRADE_PUSH_BATCH_SIZE", "30"))
+GRADE_PUSH_MAX_RETRIES = int(os.environ.get("GRADE_PUSH_MAX_RETRIES", "3"))
+GRADE_PUSH_RETRY_SECONDS = float(os.environ.get("GRADE_PUSH_RETRY_SECONDS", "10"))
+GRADE_PUSH_GIT_TIMEOUT_SECONDS = float(os.environ.get("GRADE_PUSH_GIT_TIMEOUT_SECONDS", "120"))
 
 
 # Password validation
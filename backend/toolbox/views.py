@@ -15,6 +15,7 @@ from django.views.decorators.http import require_http_methods
 
 from grading.grade_registry_writer import GradeFileProcessor
 from grading.models import Repository
+from grading.services.repository_catalog import RepositoryCatalog
 
 from .models import ConversionLog, FileConversionTask
 from .utils import AssignmentImportError, import_assignment_scores_to_gradebook
@@ -22,7 +23,17 @@ from .utils import AssignmentImportError, import_assignment_scores_to_gradebook
 logger = logging.getLogger(__name__)
 
 
-def _list_repo_courses(repo_path: str) -> list[str]:
+def _list_repo_courses(repository) -> list[str]:
+    # 只读取已由监听器或 refresh_repository_catalogs 刷新的目录；目录未刷新、已过期或为空时列出目录
+    try:
+        catalog = RepositoryCatalog.current(repository)
+        courses = catalog.list_courses() if catalog is not None else []
+        if courses:
+            return courses
+    except Exception:
+        logger.exception("读取仓库文件目录失败，回退到列出目录: %s", repository.name)
+
+    repo_path = os.path.abspath(repository.get_full_path())
     courses = []
     try:
         for name in sorted(os.listdir(repo_path)):
@@ -55,7 +66,7 @@ def assignment_grade_import_view(request):
                 "id": str(repo.id),
                 "name": repo.name,
                 "path": repo_path,
-                "courses": _list_repo_courses(repo_path),
+                "courses": _list_repo_courses(repo),
             }
         )
 
@@ -79,12 +79,35 @@ export default function BatchAiScore() {
     const data = await response.json().catch(() => null)
     if (!response.ok || (data && data.status !== 'success')) {
       setMessage((data && data.message) || '批量AI评分失败')
-    } else {
-      setMessage(data.message || '批量AI评分完成')
+      setLoading(false)
+      return
+    }
+    setMessage(data.message || '批量AI评分任务已提交')
+    if (data.job_id) {
+      await pollJobProgress(data.job_id)
     }
     setLoading(false)
   }
 
+  const pollJobProgress = async (jobId) => {
+    for (;;) {
+      const response = await apiFetch(`/grading/batch-ai-score/jobs/${jobId}/progress/`)
+      const data = await response.json().catch(() => null)
+      if (!response.ok || !data || !data.success) {
+        setMessage((data && data.message) || '查询评分进度失败')
+        return
+      }
+      const progress = data.data
+      const summary = `成功 ${progress.success} 个，失败 ${progress.failed} 个，跳过 ${progress.skipped} 个`
+      if (progress.status === 'success' || progress.status === 'error') {
+        setMessage(`批量AI评分完成：${summary}。`)
+        return
+      }
+      setMessage(`批量AI评分进行中（${progress.processed}/${progress.total}）：${summary}`)
+      await new Promise((resolve) => setTimeout(resolve, 2000))
+    }
+  }
+
   const canStart =
     selectedRepo &&
     (scoringType !== 'class' || selectedClass) &&
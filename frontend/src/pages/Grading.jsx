@@ -69,6 +69,19 @@ const formatFileIndex = (index, total) => {
   return `${index + 1} / ${total}`
 }
 
+// 作业文件夹（班级/作业批次），用于判断教师是否离开了当前作业
+const getHomeworkKey = (path) => {
+  if (!path) return ''
+  return path.split('/').filter(Boolean).slice(0, 2).join('/')
+}
+
+const formatPushTime = (value) => {
+  if (!value) return ''
+  const date = new Date(value)
+  if (Number.isNaN(date.getTime())) return ''
+  return date.toLocaleTimeString()
+}
+
 const getHomeworkFolderFromPath = (path) => {
   if (!path) return ''
   const parts = path.split('/').filter(Boolean)
@@ -134,10 +147,112 @@ export default function Grading() {
   const [batchProgress, setBatchProgress] = useState(null)
   const batchPollRef = useRef(null)
 
+  const [pushStatus, setPushStatus] = useState(null)
+  const homeworkKeyRef = useRef('')
+  const selectedRepoRef = useRef('')
+
   useEffect(() => {
     ensureCsrfToken()
   }, [])
 
+  useEffect(() => {
+    selectedRepoRef.current = selectedRepoId
+  }, [selectedRepoId])
+
+  const isGitRepo = useMemo(
+    () => repositories.some((repo) => String(repo.id) === selectedRepoId && repo.is_git),
+    [repositories, selectedRepoId],
+  )
+
+  const loadPushStatus = async (repoId) => {
+    if (!repoId) {
+      setPushStatus(null)
+      return
+    }
+    try {
+      const response = await fetch(
+        apiUrl(`/grading/grade_push_status/?repo_id=${encodeURIComponent(repoId)}`),
+        { credentials: 'include' },
+      )
+      const data = await response.json().catch(() => null)
+      if (response.ok && data?.status === 'success' && repoId === selectedRepoRef.current) {
+        setPushStatus(data.push)
+      }
+    } catch {
+      // ignore
+    }
+  }
+
+  // 评分写入有短暂的合并窗口，稍后再读取提交推送状态
+  const refreshPushStatusLater = () => {
+    if (!isGitRepo) {
+      return
+    }
+    const repoId = selectedRepoId
+    setTimeout(() => loadPushStatus(repoId), 3000)
+  }
+
+  const flushGradePushes = (repoId) => {
+    if (!repoId) {
+      return
+    }
+    // 离开作业或页面时立即提交推送已评分的文件，不等待结果
+    fetch(apiUrl('/grading/flush_grade_pushes/'), {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'X-CSRFToken': getCsrfToken(),
+      },
+      body: toParams({ repo_id: repoId }).toString(),
+      credentials: 'include',
+      keepalive: true,
+    })
+      .then((response) => response.json())
+      .then((data) => {
+        if (data?.status === 'success' && repoId === selectedRepoRef.current) {
+          setPushStatus(data.push)
+        }
+      })
+      .catch(() => {})
+  }
+
+  const leaveHomeworkIfChanged = (path) => {
+    const key = getHomeworkKey(path)
+    if (homeworkKeyRef.current && homeworkKeyRef.current !== key && isGitRepo) {
+      flushGradePushes(selectedRepoId)
+    }
+    homeworkKeyRef.current = key
+  }
+
+  useEffect(() => {
+    if (!isGitRepo) {
+      setPushStatus(null)
+      return undefined
+    }
+    loadPushStatus(selectedRepoId)
+    return undefined
+  }, [isGitRepo, selectedRepoId])
+
+  useEffect(() => {
+    if (!isGitRepo || !pushStatus) {
+      return undefined
+    }
+    if (!pushStatus.pending && !pushStatus.pushing && !pushStatus.unpushed) {
+      return undefined
+    }
+    const timer = setTimeout(() => loadPushStatus(selectedRepoId), 5000)
+    return () => clearTimeout(timer)
+  }, [isGitRepo, pushStatus, selectedRepoId])
+
+  useEffect(
+    () => () => {
+      if (homeworkKeyRef.current) {
+        flushGradePushes(selectedRepoRef.current)
+      }
+    },
+    [],
+  )
+
   const flatFiles = useMemo(() => flattenFiles(treeData, []), [treeData])
   const currentFileIndex = useMemo(() => {
     if (!selectedNode || selectedNode.type !== 'file') {
@@ -267,6 +382,10 @@ export default function Grading() {
 
   const handleRepoChange = async (repoId) => {
     const value = String(repoId || '')
+    if (homeworkKeyRef.current && selectedRepoRef.current && selectedRepoRef.current !== value) {
+      flushGradePushes(selectedRepoRef.current)
+    }
+    homeworkKeyRef.current = ''
     setSelectedRepoId(value)
     setSelectedCourse('')
     setCourseType('')
@@ -297,6 +416,10 @@ export default function Grading() {
       return
     }
     const value = String(courseName || '')
+    if (homeworkKeyRef.current && isGitRepo) {
+      flushGradePushes(selectedRepoId)
+    }
+    homeworkKeyRef.current = ''
     setSelectedCourse(value)
     setSelectedNodeId('')
     setSelectedNode(null)
@@ -365,6 +488,26 @@ export default function Grading() {
     }
   }
 
+  const prerenderFolderPreviews = (path) => {
+    if (!path || !selectedRepoId) {
+      return
+    }
+    // 后台预先转换文件夹中的 Word 文档，不等待结果
+    fetch(apiUrl('/grading/prerender_previews/'), {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'X-CSRFToken': getCsrfToken(),
+      },
+      body: toParams({
+        path,
+        repo_id: selectedRepoId,
+        course: selectedCourse,
+      }).toString(),
+      credentials: 'include',
+    }).catch(() => {})
+  }
+
   const loadFileContent = async (path) => {
     if (!path) {
       return
@@ -459,10 +602,12 @@ export default function Grading() {
   const handleSelectNode = async (node) => {
     setSelectedNodeId(node.id)
     setSelectedNode(node)
+    leaveHomeworkIfChanged(node.id)
 
     if (node.type === 'folder') {
       setFileContent(null)
       setGradeInfo(null)
+      prerenderFolderPreviews(node.id)
       await loadDirectoryFileCount(node.id)
       await resolveHomeworkInfo(node.id)
       return
@@ -559,6 +704,7 @@ export default function Grading() {
         }
         throw new Error(message)
       }
+      refreshPushStatusLater()
       await loadFileContent(selectedNode.id)
     } catch (error) {
       setGradeSubmitError(error.message || '评分失败')
@@ -621,6 +767,7 @@ export default function Grading() {
       if (!response.ok || !data || data.status !== 'success') {
         throw new Error((data && data.message) || 'AI 评分失败')
       }
+      refreshPushStatusLater()
       await loadFileContent(selectedNode.id)
     } catch (error) {
       setGradeSubmitError(error.message || 'AI 评分失败')
@@ -726,6 +873,7 @@ export default function Grading() {
         throw new Error((data && data.message) || '保存评语失败')
       }
       await recordCommentUsage(commentText.trim())
+      refreshPushStatusLater()
       setCommentModalOpen(false)
       await loadFileContent(selectedNode.id)
       if (pendingGradeRef.current) {
@@ -806,7 +954,9 @@ export default function Grading() {
     }, 1000)
   }
 
-  const handleBatchGrade = async () => {
+  // 按住 Shift 点击时强制全量重建（忽略登分册同步清单）
+  const handleBatchGrade = async (event) => {
+    const forceFull = Boolean(event?.shiftKey)
     if (!batchGradeState.enabled || !batchGradeState.homeworkId) {
       return
     }
@@ -831,6 +981,7 @@ export default function Grading() {
             tracking_id: trackingId,
             repo_id: selectedRepoId,
             course: selectedCourse,
+            force_full: forceFull ? 'true' : '',
           }).toString(),
           credentials: 'include',
         },
@@ -1044,6 +1195,7 @@ export default function Grading() {
                 }`}
                 onClick={handleBatchGrade}
                 disabled={!batchGradeState.enabled}
+                title="按住 Shift 点击可重新解析全部作业文件"
               >
                 批量登分{batchGradeState.folderName ? ` (${batchGradeState.folderName})` : ''}
               </button>
@@ -1057,6 +1209,40 @@ export default function Grading() {
               <p className="text-xs text-slate-400">选择作业文件夹后才能启用批量登分。</p>
             </div>
 
+            {isGitRepo && pushStatus ? (
+              <div className="mt-4 rounded-lg border border-slate-200 bg-slate-50 p-3 text-xs text-slate-600">
+                <div className="flex items-center justify-between">
+                  <p className="font-medium">
+                    {pushStatus.pushing
+                      ? '正在提交推送评分...'
+                      : pushStatus.pending
+                        ? `${pushStatus.pending} 份评分待提交`
+                        : pushStatus.unpushed
+                          ? '评分已提交，等待推送'
+                          : '评分已全部推送'}
+                  </p>
+                  {pushStatus.pending || pushStatus.unpushed ? (
+                    <button
+                      type="button"
+                      className="text-xs text-emerald-700 hover:underline"
+                      onClick={() => flushGradePushes(selectedRepoId)}
+                      disabled={pushStatus.pushing}
+                    >
+                      立即推送
+                    </button>
+                  ) : null}
+                </div>
+                {pushStatus.last_pushed_at ? (
+                  <p className="mt-1 text-slate-400">
+                    上次推送：{formatPushTime(pushStatus.last_pushed_at)}
+                  </p>
+                ) : null}
+                {pushStatus.last_error ? (
+                  <p className="mt-1 text-rose-600">{pushStatus.last_error}</p>
+                ) : null}
+              </div>
+            ) : null}
+
             {batchProgress ? (
               <div className="mt-4 rounded-lg border border-slate-200 bg-slate-50 p-3 text-xs text-slate-600">
                 <p className="font-medium">{batchProgress.message || '批量登分中...'}</p>